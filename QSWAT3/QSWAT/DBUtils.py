@@ -37,11 +37,14 @@ import csv
 import datetime
 import traceback
 import re
-from typing import Set, Any, List, Dict, Iterable, Optional, Tuple  # @UnusedImport @Reimport
+import numpy
+from typing import Set, Any, List, Dict, Iterable, Optional, Tuple, Callable  # @UnusedImport @Reimport
 
 from .QSWATUtils import QSWATUtils, ListFuns  # type: ignore
 from .QSWATData import BasinData, CellData  # type: ignore
 from .parameters import Parameters  # type: ignore
+from .profiling import Profiler  # type: ignore
+from .refdata import ReferenceData  # type: ignore
 
 class DBUtils:
     
@@ -111,6 +114,8 @@ class DBUtils:
             except Exception:
                 QSWATUtils.error('Failed to connect to reference database {0}: {1}.\n{2}'.format(self.dbRefFile, traceback.format_exc(),self.connectionProblem()), self.isBatch)
                 self.connRef = None  # type: ignore
+        ## snapshot of reference database lookup tables: loaded on first use
+        self._refData: Optional[ReferenceData] = None
         ## WaterBodies (HUC and HAWQS only)
         self.waterBodiesFile = QSWATUtils.join(projDir + '/..', Parameters._WATERBODIES) if isHUC else QSWATUtils.join(projDir, Parameters._WATERBODIES)
         ## Tables in project database containing 'landuse'
@@ -495,6 +500,12 @@ If you have a 32 bit version of Microsoft Access you need to install Microsoft's
         ListFuns.insertIntoSortedList(lid, self.landuseVals, True)
         return self._landuseTranslate.get(lid, lid)
     
+    def referenceData(self) -> Optional[ReferenceData]:
+        """Return snapshot of reference database lookup tables, or None if not available."""
+        if self._refData is None:
+            self._refData = ReferenceData.load(self.dbRefFile, self.connRef, self.isHUC or self.useSQLite or self.forTNC)
+        return self._refData
+    
     def storeLanduseCode(self, landuseCat: int, landuseCode: str) -> bool:
         """Store landuse codes in lookup tables."""
         landuseIDC = 0
@@ -503,29 +514,36 @@ If you have a 32 bit version of Microsoft Access you need to install Microsoft's
         urbanId = -1
         OK = True
         isUrban = landuseCode.startswith('U')
+        refData = self.referenceData()
         if isUrban:
             table = 'urban'
-            sql2 = self.sqlSelect(table, 'IUNUM, OV_N', '', 'URBNAME=?')
-            if self.connRef is None:
-                return False
-            try:
-                row = self.connRef.cursor().execute(sql2, (landuseCode,)).fetchone()
-            except Exception:
-                QSWATUtils.error('Could not read table {0} in reference database {1}: {2}'.format(table, self.dbRefFile, traceback.format_exc()), self.isBatch)
-                return False
+            if refData is not None:
+                row = refData.urbanData(landuseCode)
+            else:
+                sql2 = self.sqlSelect(table, 'IUNUM, OV_N', '', 'URBNAME=?')
+                if self.connRef is None:
+                    return False
+                try:
+                    row = self.connRef.cursor().execute(sql2, (landuseCode,)).fetchone()
+                except Exception:
+                    QSWATUtils.error('Could not read table {0} in reference database {1}: {2}'.format(table, self.dbRefFile, traceback.format_exc()), self.isBatch)
+                    return False
             if row:
                 urbanId = row[0]
                 landuseOVN = row[1]
         if urbanId < 0:  # not tried or not found in urban
             table = 'crop'
-            sql2 = self.sqlSelect(table, 'ICNUM, IDC, OV_N', '', 'CPNM=?')
-            if self.connRef is None:
-                return False
-            try:
-                row = self.connRef.cursor().execute(sql2, (landuseCode,)).fetchone()
-            except Exception:
-                QSWATUtils.error('Could not read table {0} in reference database {1}: {2}'.format(table, self.dbRefFile, traceback.format_exc()), self.isBatch)
-                return False
+            if refData is not None:
+                row = refData.cropData(landuseCode)
+            else:
+                sql2 = self.sqlSelect(table, 'ICNUM, IDC, OV_N', '', 'CPNM=?')
+                if self.connRef is None:
+                    return False
+                try:
+                    row = self.connRef.cursor().execute(sql2, (landuseCode,)).fetchone()
+                except Exception:
+                    QSWATUtils.error('Could not read table {0} in reference database {1}: {2}'.format(table, self.dbRefFile, traceback.format_exc()), self.isBatch)
+                    return False
             if not row:
                 if isUrban:
                     if self.landuseErrorReported:
@@ -652,15 +670,21 @@ If you have a 32 bit version of Microsoft Access you need to install Microsoft's
                 
     def checkSoilsDefined(self) -> bool:
         """Check if all soil names in soilNames are in usersoil table in reference database."""
+        refData = self.referenceData()
+        if refData is not None and not refData.usersoilLoaded(self.connRef, self.usersoil):
+            refData = None
         sql = self.sqlSelect(self.usersoil, 'SNAM', '', 'SNAM=?')
         errorReported = False
         for soilName in self.soilNames.values():
-            try:
-                row = self.connRef.cursor().execute(sql, (soilName,)).fetchone()
-            except Exception:
-                QSWATUtils.error('Could not read {0} table in database {1}: {2}'.format(self.usersoil, self.dbRefFile, traceback.format_exc()), self.isBatch)
-                return False
-            if not row:
+            if refData is not None:
+                found = refData.hasSoil(self.usersoil, soilName)
+            else:
+                try:
+                    found = self.connRef.cursor().execute(sql, (soilName,)).fetchone() is not None
+                except Exception:
+                    QSWATUtils.error('Could not read {0} table in database {1}: {2}'.format(self.usersoil, self.dbRefFile, traceback.format_exc()), self.isBatch)
+                    return False
+            if not found:
                 if not errorReported:
                     QSWATUtils.error('Soil name {0} (and perhaps others) not defined in {1} table in database {2}.'
                                      .format(soilName, self.usersoil, self.dbRefFile), self.isBatch)
@@ -802,6 +826,71 @@ If you have a 32 bit version of Microsoft Access you need to install Microsoft's
                 return index
         return n
     
+    def slopeIndexArray(self, slopePercents: numpy.ndarray) -> numpy.ndarray:
+        """Return array of slope indexes of slope percents: vectorized version of slopeIndex."""
+        # number of limits no greater than value is the first index with value < limit
+        return numpy.searchsorted(numpy.array(self.slopeLimits, dtype=numpy.float64), slopePercents, side='right')
+    
+    ## Largest range of values for which lookupArray uses a dense table
+    _MAXDENSELOOKUP = 1 << 20
+    
+    @staticmethod
+    def lookupArray(vals: numpy.ndarray, fun: Callable[[int], Any], dtype: Any, noData: Any, noDataOut: Any) -> numpy.ndarray:
+        """Return array of translations by fun of integer values vals.  noData values are not translated, and become noDataOut.
+        
+        fun is called once for each distinct value, in increasing order.  When the values fall in a small range 
+        the array is translated with a dense table indexed by value, else (as with SSURGO mukeys) 
+        with a map from the distinct values found by numpy.unique.
+        """
+        vals = numpy.asarray(vals)
+        result = numpy.full(vals.shape, noDataOut, dtype=dtype)
+        mask = vals != noData
+        defined = vals[mask].astype(numpy.int64)
+        if defined.size == 0:
+            return result
+        low = int(defined.min())
+        high = int(defined.max())
+        if high - low < DBUtils._MAXDENSELOOKUP:
+            offsets = defined - low
+            present = numpy.flatnonzero(numpy.bincount(offsets))
+            table = numpy.empty(high - low + 1, dtype=dtype)
+            # fill element by element, since fun may return tuples
+            for offset in present.tolist():
+                table[offset] = fun(offset + low)
+            result[mask] = table[offsets]
+        else:
+            uniques, inverse = numpy.unique(defined, return_inverse=True)
+            translations = {val: fun(val) for val in uniques.tolist()}
+            translated = numpy.empty(len(uniques), dtype=dtype)
+            for i, val in enumerate(uniques.tolist()):
+                translated[i] = translations[val]
+            result[mask] = translated[inverse]
+        return result
+    
+    def translateLanduseArray(self, lids: numpy.ndarray, noData: Any) -> numpy.ndarray:
+        """Vectorized version of translateLanduse.  noData values are not translated."""
+        return DBUtils.lookupArray(lids, self.translateLanduse, numpy.int64, noData, noData)
+    
+    def landuseCodeArray(self, lids: numpy.ndarray, noData: Any) -> numpy.ndarray:
+        """Vectorized version of getLanduseCode.  Returns array of codes, with empty string for noData values."""
+        return DBUtils.lookupArray(lids, self.getLanduseCode, object, noData, '')
+    
+    def translateSoilArray(self, sids: numpy.ndarray, noData: Any) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Vectorized version of translateSoil.  
+        
+        Returns array of translated soils, with noData values not translated, 
+        and boolean array of lookup success flags, false for noData values."""
+        sids = numpy.asarray(sids)
+        pairs = DBUtils.lookupArray(sids, self.translateSoil, object, noData, None)
+        mask = sids != noData
+        soils = numpy.array(sids, dtype=numpy.int64)
+        OKs = numpy.zeros(sids.shape, dtype=bool)
+        defined = pairs[mask]
+        if defined.size > 0:
+            soils[mask] = [sid for (sid, _) in defined]
+            OKs[mask] = [OK for (_, OK) in defined]
+        return soils, OKs
+    
     def slopeRange(self, slopeIndex: int) -> str:
         """Return the slope range for an index."""
         assert 0 <= slopeIndex <= len(self.slopeLimits)
@@ -1024,6 +1113,7 @@ If you have a 32 bit version of Microsoft Access you need to install Microsoft's
         sql2 = 'INSERT INTO ' + table + ' VALUES(?,?,?,?,?,?,?,?,?)'
         return (conn, sql1, sql2)
                         
+    @Profiler.timed('DBUtils.writeBasinsData', log=True)
     def writeBasinsData(self, basins: Dict[int, BasinData], conn: Any, sql1: str, sql2: str) -> None:
         """Write BASINSDATA1 and 2 tables in project database.""" 
         curs = conn.cursor()
@@ -1035,6 +1125,7 @@ If you have a 32 bit version of Microsoft Access you need to install Microsoft's
             if index < 0:
                 # error occurred - no point in repeating the failure
                 break
+        Profiler.setCount(index)
         if self.isHUC or self.useSQLite or self.forTNC:
             conn.commit()
         # else:
@@ -1252,33 +1343,22 @@ If you have a 32 bit version of Microsoft Access you need to install Microsoft's
                 return
             indexSQL = 'CREATE UNIQUE INDEX idx' + self._ELEVATIONBANDTABLEINDEX + ' ON ' + table + '([' + self._ELEVATIONBANDTABLEINDEX + '])'
             cursor.execute(indexSQL)
-            oid = 0
-            for (SWATBasin, bands) in basinElevBands.items():
-                oid += 1
+            rows = []
+            for oid, (SWATBasin, bands) in enumerate(basinElevBands.items(), start=1):
                 if bands:
-                    row = '({0!s},{1!s},'.format(oid, SWATBasin)
-                    for i in range(10):
-                        if i < len(bands):
-                            el = bands[i][1]  # mid point elevation
-                        else:
-                            el = 0
-                        row += '{:.2F},'.format(el)
-                    for i in range(10):
-                        if i < len(bands):
-                            frac = bands[i][2]
-                        else:
-                            frac = 0
-                        row += '{:.4F}'.format(frac / 100.0) # fractions were percentages
-                        sep = ',' if i < 9 else ')'
-                        row += sep
+                    # mid point elevations and fractions (which were percentages) of up to 10 bands, padded with zeros
+                    els = [round(float(band[1]), 2) for band in bands[:10]] + [0.0] * max(0, 10 - len(bands))
+                    fracs = [round(float(band[2]) / 100.0, 4) for band in bands[:10]] + [0.0] * max(0, 10 - len(bands))
+                    rows.append(tuple([oid, SWATBasin] + els + fracs))
                 else:
-                    row = '({0!s},{1!s},0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0)'.format(oid, SWATBasin)
-                sql = 'INSERT INTO ' + table + ' VALUES ' + row
-                try:
-                    cursor.execute(sql)
-                except Exception:
-                    QSWATUtils.error('Could not write to table {0} in project database {1}: {2}'.format(table, self.dbFile, traceback.format_exc()), self.isBatch)
-                    return
+                    rows.append(tuple([oid, SWATBasin] + [0] * 20))
+            sql = 'INSERT INTO ' + table + ' VALUES(' + ','.join(['?'] * 22) + ')'
+            try:
+                if len(rows) > 0:
+                    cursor.executemany(sql, rows)
+            except Exception:
+                QSWATUtils.error('Could not write to table {0} in project database {1}: {2}'.format(table, self.dbFile, traceback.format_exc()), self.isBatch)
+                return
             if self.isHUC or self.useSQLite:
                 conn.commit()
             else:
@@ -37,7 +37,6 @@ from osgeo import gdal  # type: ignore
 from numpy import array, ndarray, zeros
 import os.path
 import glob
-import time
 import traceback
 import math
 #import processing  # type: ignore  # @UnresolvedImport
@@ -46,10 +45,12 @@ if not TYPE_CHECKING:
     try:
         from .QSWATUtils import QSWATUtils, FileTypes, ListFuns
         from .parameters import Parameters
+        from .profiling import Profiler
     except ImportError:
         # for convert from Arc and to plus
         from QSWATUtils import QSWATUtils, FileTypes, ListFuns
         from parameters import Parameters
+        from profiling import Profiler
     
 
 class ReachData():
@@ -183,6 +184,10 @@ class QSWATTopology:
         self.ptSrcLinks = dict()
         ## links draining to inlets
         self.upstreamFromInlets = set()
+        ## True if topology was set up from the current stream reaches and watershed layers, so merging subbasins can patch it
+        self.isPatchable = False
+        ## True if merging subbasins has patched the topology since it was set up
+        self.isPatched = False
         ## key to MonitoringPoint table
         self.MonitoringPointFid = 0
         ## width of DEM cell in metres
@@ -244,28 +249,43 @@ class QSWATTopology:
         self.verticalFactor = verticalFactor
         self.outletAtStart = self.hasOutletAtStart(streamLayer)
         QSWATUtils.loginfo('Outlet at start is {0!s}'.format(self.outletAtStart))
+        # stream reaches may have changed
+        self.isPatchable = False
+        self.isPatched = False
         if not self.saveOutletsAndSources(streamLayer, existingWshed):
             return False
         return True
         
+    @Profiler.timed('QSWATTopology.setUp', log=True)
     def setUp(self, demLayer: QgsRasterLayer, streamLayer: QgsVectorLayer, wshedLayer: QgsVectorLayer, 
               outletLayer: Optional[QgsVectorLayer], extraOutletLayer: Optional[QgsVectorLayer], db: Any, 
               existing: bool, recalculate: bool, useGridModel: bool, reportErrors: bool) -> bool:
         """Create topological data from layers."""
         self.db = db
-        self.linkToBasin.clear()
-        self.basinToLink.clear()
+        # after merging subbasins only the merged reaches have changed, and the topology was patched for them,
+        # so reuse the patched link and basin maps, reach data and drainage areas 
+        # rather than reading the DEM at both ends of every reach and recalculating drainage areas
+        usePatch = self.isPatched and not recalculate and not useGridModel
+        # drainage areas can be reused only if every link was patched
+        drainAreasPatched = usePatch
+        # links found in stream reaches layer when using patch
+        patchedLinks: Set[int] = set()
+        self.isPatchable = False
+        self.isPatched = False
+        if not usePatch:
+            self.linkToBasin.clear()
+            self.basinToLink.clear()
+            self.downLinks.clear()
+            self.streamLengths.clear()
+            self.streamSlopes.clear()
+            self.reachesData.clear()
+            self.basinAreas.clear()
         self.basinToSWATBasin.clear()
         self.SWATBasinToBasin.clear()
-        self.downLinks.clear()
         self.emptyBasins.clear()
         # do not clear centroids unless existing and not using grid model: 
         if existing and not useGridModel:
             self.basinCentroids.clear()
-        self.streamLengths.clear()
-        self.streamSlopes.clear()
-        self.reachesData.clear()
-        self.basinAreas.clear()
         self.outletLinks.clear()
         self.reservoirLinks.clear()
         self.inletLinks.clear()
@@ -339,7 +359,6 @@ class QSWATTopology:
                 QSWATUtils.loginfo('No SUBBASIN field in extra outlets layer')
                 return False
         self.demNodata = demLayer.dataProvider().sourceNoDataValue(1)
-        time1 = time.process_time()
         maxLink = 0
         manyBasins = streamLayer.featureCount() > 950  # set smaller than Python recursion depth limit, which is 1000
         # drainAreas is a mapping from link number (used as index to array) of grid cell areas in sq m
@@ -354,40 +373,48 @@ class QSWATTopology:
             link = attrs[self.linkIndex]
             dsLink = attrs[self.dsLinkIndex]
             wsno = attrs[self.wsnoIndex]
-            if lengthIndex < 0 or recalculate:
-                length = reach.geometry().length()
-            else:
-                length = attrs[lengthIndex]
-            data = self.getReachData(reach, demLayer)
-            self.reachesData[link] = data
-            if length == 0:
-                drop = 0
-                slope = 0
+            if usePatch:
+                patchedLinks.add(link)
+            if usePatch and self.linkToBasin.get(link, -1) == wsno and self.downLinks.get(link, -1) == dsLink and \
+                link in self.reachesData:
+                # link unchanged or patched by merging
+                length = self.streamLengths[link]
             else:
-                # don't use TauDEM for drop - affected by burn-in and pit filling
-                # if data and (dropIndex < 0 or recalculate):
-                #     drop = data.upperZ - data.lowerZ
-                # elif dropIndex >= 0:
-                #     drop = attrs[dropIndex]
-                # else:
-                #     drop = 0
-                if data:
-                    drop = data.upperZ - data.lowerZ
+                drainAreasPatched = False
+                if lengthIndex < 0 or recalculate:
+                    length = reach.geometry().length()
                 else:
+                    length = attrs[lengthIndex]
+                data = self.getReachData(reach, demLayer)
+                self.reachesData[link] = data
+                if length == 0:
                     drop = 0
-                slope = 0 if drop < 0 else float(drop) / length
+                    slope = 0
+                else:
+                    # don't use TauDEM for drop - affected by burn-in and pit filling
+                    # if data and (dropIndex < 0 or recalculate):
+                    #     drop = data.upperZ - data.lowerZ
+                    # elif dropIndex >= 0:
+                    #     drop = attrs[dropIndex]
+                    # else:
+                    #     drop = 0
+                    if data:
+                        drop = data.upperZ - data.lowerZ
+                    else:
+                        drop = 0
+                    slope = 0 if drop < 0 else float(drop) / length
+                self.linkToBasin[link] = wsno
+                self.basinToLink[wsno] = link
+                self.downLinks[link] = dsLink
+                self.streamLengths[link] = length
+                self.streamSlopes[link] = slope
             dsNode = attrs[dsNodeIndex] if dsNodeIndex >= 0 else -1
-            self.linkToBasin[link] = wsno
-            self.basinToLink[wsno] = link
             maxLink = max(maxLink, link)
             # if the length is zero there will not (for TauDEM) be an entry in the wshed shapefile
             # unless the zero length is caused by something in the inlets/outlets file
             # but with HUC models there are empty basins for the zero length links inserted for inlets, and these have positive DSNODEIDs
             if not useGridModel and length == 0 and (dsNode < 0 or self.isHUC or self.isHAWQS):
                 self.emptyBasins.add(wsno)
-            self.downLinks[link] = dsLink
-            self.streamLengths[link] = length
-            self.streamSlopes[link] = slope
             if dsNode >= 0:
                 dsNodeToLink[dsNode] = link
             if dsLink >= 0 and not ((self.isHUC or self.isHAWQS) and link >= QSWATTopology._HUCPointId):  # keep HUC links out of us map
@@ -404,11 +431,21 @@ class QSWATTopology:
                             us[dsLink].remove(link)
             if totDAIndex >= 0:
                 self.drainAreas[link] = attrs[totDAIndex] * 1E6  # sq km to sq m
+        if usePatch:
+            # remove any links not in the stream reaches layer
+            for link in [link for link in self.linkToBasin if link not in patchedLinks]:
+                drainAreasPatched = False
+                self.basinToLink.pop(self.linkToBasin.pop(link), None)
+                self.downLinks.pop(link, None)
+                self.streamLengths.pop(link, None)
+                self.streamSlopes.pop(link, None)
+                self.reachesData.pop(link, None)
+        # patched drainage areas are kept only if no link has changed, and there is no stale link beyond maxLink
+        drainAreasPatched = drainAreasPatched and totDAIndex < 0 and self.drainAreas is not None and \
+            not isinstance(self.drainAreas, dict) and len(self.drainAreas) == maxLink + 1
         # create drainAreas here for non-HUC models as we now have maxLink value to size the numpy array
-        if totDAIndex < 0:
+        if totDAIndex < 0 and not drainAreasPatched:
             self.drainAreas = zeros((maxLink + 1), dtype=float)
-        time2 = time.process_time()
-        QSWATUtils.loginfo('Topology setup took {0} seconds'.format(int(time2 - time1)))
         #QSWATUtils.loginfo('Finished setting tables from streams shapefile')
         if wshedOutletIndex >= 0:
             self.catchmentOutlets.clear()
@@ -417,7 +454,10 @@ class QSWATTopology:
             basin = attrs[polyIndex]
             if wshedOutletIndex >= 0:
                 self.catchmentOutlets[basin] = attrs[wshedOutletIndex]
-            if areaIndex < 0 or recalculate:
+            if usePatch and basin in self.basinAreas:
+                # unchanged or patched by merging
+                area = self.basinAreas[basin]
+            elif areaIndex < 0 or recalculate:
                 area = polygon.geometry().area()
             else:
                 area = attrs[areaIndex]
@@ -427,7 +467,7 @@ class QSWATTopology:
                 self.gridRows = round(polygon.geometry().length() / (4 * self.dy))
                 QSWATUtils.loginfo('Using {0!s} DEM grid rows per grid cell'.format(self.gridRows))
             self.basinAreas[basin] = area
-            if manyBasins:
+            if manyBasins and not drainAreasPatched:
                 # initialise drainAreas
                 link = self.basinToLink[basin]
                 self.drainAreas[link] = area
@@ -509,17 +549,16 @@ class QSWATTopology:
             QSWATUtils.loginfo('Reservoir links: {0!s}'.format(self.reservoirLinks))
             QSWATUtils.loginfo('Point source links: {0!s}'.format(self.ptSrcLinks))
             QSWATUtils.loginfo('Empty basins: {0!s}'.format(self.emptyBasins))
-        time4 = time.process_time()
         # set drainAreas
-        if totDAIndex < 0:
-            if useGridModel:
-                self.setGridDrainageAreas(streamLayer, wshedLayer, maxLink)
-            elif manyBasins:
-                self.setManyDrainageAreas(maxLink)
-            else:
-                self.setDrainageAreas(us)
-        time5 = time.process_time()
-        QSWATUtils.loginfo(u'Topology drainage took {0} seconds'.format(int(time5 - time4)))
+        if totDAIndex < 0 and not drainAreasPatched:
+            with Profiler.span('QSWATTopology.setDrainageAreas', log=True) as span:
+                span.count = len(self.linkToBasin)
+                if useGridModel:
+                    self.setGridDrainageAreas(streamLayer, wshedLayer, maxLink)
+                elif manyBasins:
+                    self.setManyDrainageAreas(maxLink)
+                else:
+                    self.setDrainageAreas(us)
         
         if useGridModel:
             # lower limit on drainage area for outlets to be included
@@ -573,8 +612,64 @@ class QSWATTopology:
         wshedLayer.commitChanges()
         wshedLayer.setLabelsEnabled(True)
         wshedLayer.triggerRepaint()
+        self.isPatchable = not useGridModel
         return True
     
+    def mergeBasins(self, linkA: int, linkD: int, zeroLinks: List[int]) -> None:
+        """
+        Patch topology after the subbasin of linkA is merged with the subbasin of linkD downstream from it.
+        
+        zeroLinks are the zero length links between them, which are removed with linkA.
+        The merged reach keeps linkD and the basin of linkD.  
+        Only the affected links and basins are changed: the drain area of linkD is unchanged, 
+        since it already included the area of the basin of linkA.
+        Does nothing unless the topology was set up from the layers being merged.
+        """
+        if not self.isPatchable:
+            return
+        basinD = self.linkToBasin.get(linkD, -1)
+        if linkA not in self.linkToBasin or basinD < 0:
+            # not the network we set up: setUp will rebuild everything
+            self.discardPatch()
+            return
+        removedLinks = set([linkA] + zeroLinks)
+        for link, dsLink in self.downLinks.items():
+            if dsLink in removedLinks:
+                self.downLinks[link] = linkD
+        dataA = self.reachesData.get(linkA, None)
+        dataD = self.reachesData.get(linkD, None)
+        length = self.streamLengths.get(linkD, 0)
+        for link in removedLinks:
+            basin = self.linkToBasin.pop(link, -1)
+            self.downLinks.pop(link, None)
+            length += self.streamLengths.pop(link, 0)
+            self.streamSlopes.pop(link, None)
+            self.reachesData.pop(link, None)
+            if isinstance(self.drainAreas, dict):
+                self.drainAreas.pop(link, None)
+            elif self.drainAreas is not None and link < len(self.drainAreas):
+                self.drainAreas[link] = 0
+            if basin >= 0:
+                self.basinToLink.pop(basin, None)
+                self.basinAreas[basinD] = self.basinAreas.get(basinD, 0) + self.basinAreas.pop(basin, 0)
+                self.emptyBasins.discard(basin)
+                self.basinCentroids.pop(basin, None)
+        self.streamLengths[linkD] = length
+        if dataA is not None and dataD is not None:
+            # merged reach runs from upper end of A to lower end of D
+            data = ReachData(dataA.upperX, dataA.upperY, dataA.upperZ, dataD.lowerX, dataD.lowerY, dataD.lowerZ)
+            self.reachesData[linkD] = data
+            drop = data.upperZ - data.lowerZ
+            self.streamSlopes[linkD] = 0 if length == 0 or drop < 0 else float(drop) / length
+        else:
+            self.reachesData.pop(linkD, None)
+        self.isPatched = True
+    
+    def discardPatch(self) -> None:
+        """Make the next setUp rebuild the topology in full, since layers may no longer match it."""
+        self.isPatchable = False
+        self.isPatched = False
+    
     def catchmentLargeEnoughForTNC(self, basin: int) -> bool:
         """If not for TNC, return True.  Else return True if catchment size (drain area at outlet) no less than TNCCatchmentThreshold (in sq km)."""
         if not self.forTNC:
@@ -985,6 +1080,7 @@ class QSWATTopology:
         dy = p1.y() - p2.y()
         return dx * dx + dy * dy
                     
+    @Profiler.timed('QSWATTopology.writeMonitoringPointTable', log=True)
     def writeMonitoringPointTable(self, demLayer: QgsRasterLayer, streamLayer: QgsVectorLayer) -> None:
         """Write the monitoring point table in the project database."""
         with self.db.connect() as conn:
@@ -1001,7 +1097,8 @@ class QSWATTopology:
                 clearSQL = 'DELETE FROM ' + table
                 curs.execute(clearSQL)
             self.MonitoringPointFid = 1
-            time1 = time.process_time()
+            # collect (link, reach data, point id, type) for each point, then make rows and insert them together
+            points: List[Tuple[int, ReachData, int, str]] = []
             # Add outlets from subbasins
             for link in self.linkToBasin:
                 if link in self.outletLinks:
@@ -1012,7 +1109,7 @@ class QSWATTopology:
                 if basin not in self.basinToSWATBasin:
                     continue
                 data = self.reachesData[link]
-                self.addMonitoringPoint(curs, demLayer, streamLayer, link, data, 0, 'L')
+                points.append((link, data, 0, 'L'))
             # Add outlets
             for link in self.outletLinks:
                 # omit basins upstream from inlets
@@ -1022,26 +1119,26 @@ class QSWATTopology:
                 if basin not in self.basinToSWATBasin:
                     continue
                 data = self.reachesData[link]
-                self.addMonitoringPoint(curs, demLayer, streamLayer, link, data, 0, 'T')
+                points.append((link, data, 0, 'T'))
             # Add inlets
             for link in self.inletLinks:
                 if link in self.upstreamFromInlets: 
                 # shouldn't happen, but users can be stupid
                     continue
                 data = self.reachesData[link]
-                self.addMonitoringPoint(curs, demLayer, streamLayer, link, data, 0, 'W')
+                points.append((link, data, 0, 'W'))
             # Add point sources
             for link, pointId in self.ptSrcLinks.items():
                 if link in self.upstreamFromInlets:
                     continue
                 data = self.reachesData[link]
-                self.addMonitoringPoint(curs, demLayer, streamLayer, link, data, pointId, 'P')
+                points.append((link, data, pointId, 'P'))
             # Add reservoirs
             for link, pointId in self.reservoirLinks.items():
                 if link in self.upstreamFromInlets:
                     continue
                 data = self.reachesData[link]
-                self.addMonitoringPoint(curs, demLayer, streamLayer, link, data, pointId, 'R')
+                points.append((link, data, pointId, 'R'))
             # for TNC projects (marked by forTNC True) there should be a CCdams.shp file in the sources directory
             # and we add these to reservoirLinks and to MonitoringPoint table
             if self.forTNC:
@@ -1080,47 +1177,57 @@ class QSWATTopology:
                             link = cell[polyIndex]  # polygonid = wsno = link for GRASS delineated models
                             self.reservoirLinks[link] = resId
                             data = self.reachesData[link]
-                            self.addMonitoringPoint(curs, demLayer, streamLayer, link, data, resId, 'R')
-            time2 = time.process_time()
-            QSWATUtils.loginfo('Writing MonitoringPoint table took {0} seconds'.format(int(time2 - time1)))
+                            points.append((link, data, resId, 'R'))
+            rows = self.monitoringPointRows(points)
+            sql = "INSERT INTO " + table + " VALUES(?,0,?,?,?,?,?,?,?,?,?,?,?,?)"
+            if len(rows) > 0:
+                curs.executemany(sql, rows)
+            Profiler.setCount(len(rows))
             if self.isHUC or self.useSQLite or self.forTNC:
                 conn.commit()
             else:
                 self.db.hashDbTable(conn, table)
     
-    def addMonitoringPoint(self, cursor: Any, demLayer: QgsRasterLayer, streamLayer: QgsVectorLayer,  # @UnusedVariable
-                           link: int, data: ReachData, pointId: int, typ: str) -> None:
-        """Add a point to the MonitoringPoint table."""
-        table = 'MonitoringPoint'
-        POINTID = pointId 
-        HydroID = self.MonitoringPointFid + 400000
-        OutletID = self.MonitoringPointFid + 100000
-        if (self.isHUC or self.isHAWQS) and typ == 'W':
-            # point is associated with zero length link added for it, which has an empty basin
-            # so need to use downstream basin
-            dsLink = self.downLinks[link]
-            basin = self.linkToBasin[dsLink]
-        else:
-            basin = self.linkToBasin[link]
-        # guard against empty basins (included for outlet points)
-        SWATBasin = self.basinToSWATBasin.get(basin, 0)
-        GRID_CODE = SWATBasin
-        # inlets will be located at the upstream ends of their links
-        # since they are attached to their downstream basins
-        isUp = ((typ == 'W') or (type == 'I'))
-        if not data:
-            return
-        if isUp:
-            pt = QgsPointXY(data.upperX, data.upperY)
-        else:
-            pt = QgsPointXY(data.lowerX, data.lowerY)
-        ptll = self.pointToLatLong(pt)
-        elev = 0 # only used for weather gauges
-        name = '' # only used for weather gauges
-        sql = "INSERT INTO " + table + " VALUES(?,0,?,?,?,?,?,?,?,?,?,?,?,?)"
-        cursor.execute(sql, (self.MonitoringPointFid, POINTID, GRID_CODE, \
-                           float(pt.x()), float(pt.y()), float(ptll.y()), float(ptll.x()), float(elev), name, typ, SWATBasin, HydroID, OutletID))
-        self.MonitoringPointFid += 1;
+    def monitoringPointRows(self, points: List[Tuple[int, ReachData, int, str]]) -> List[Tuple[Any, ...]]:
+        """Return MonitoringPoint table rows for points, each a tuple of link, reach data, point id and type.
+        
+        Points with no reach data are omitted."""
+        rows: List[List[Any]] = []
+        pts: List[QgsPointXY] = []
+        for link, data, pointId, typ in points:
+            POINTID = pointId 
+            HydroID = self.MonitoringPointFid + 400000
+            OutletID = self.MonitoringPointFid + 100000
+            if (self.isHUC or self.isHAWQS) and typ == 'W':
+                # point is associated with zero length link added for it, which has an empty basin
+                # so need to use downstream basin
+                dsLink = self.downLinks[link]
+                basin = self.linkToBasin[dsLink]
+            else:
+                basin = self.linkToBasin[link]
+            # guard against empty basins (included for outlet points)
+            SWATBasin = self.basinToSWATBasin.get(basin, 0)
+            GRID_CODE = SWATBasin
+            # inlets will be located at the upstream ends of their links
+            # since they are attached to their downstream basins
+            isUp = ((typ == 'W') or (type == 'I'))
+            if not data:
+                continue
+            if isUp:
+                pt = QgsPointXY(data.upperX, data.upperY)
+            else:
+                pt = QgsPointXY(data.lowerX, data.lowerY)
+            elev = 0 # only used for weather gauges
+            name = '' # only used for weather gauges
+            # latitude and longitude filled in below
+            rows.append([self.MonitoringPointFid, POINTID, GRID_CODE, \
+                         float(pt.x()), float(pt.y()), 0.0, 0.0, float(elev), name, typ, SWATBasin, HydroID, OutletID])
+            pts.append(pt)
+            self.MonitoringPointFid += 1
+        for row, ptll in zip(rows, self.pointsToLatLong(pts)):
+            row[5] = float(ptll.y())
+            row[6] = float(ptll.x())
+        return [tuple(row) for row in rows]
             
     def makeRivsShapefile(self, gv):
         """For HAWQS projects, when starting in case going straight to editor, running SWAT and visualise.
@@ -1175,6 +1282,7 @@ class QSWATTopology:
         self.removeFields(provider, [QSWATTopology._SUBBASIN], subsFile, self.isBatch)
         
     
+    @Profiler.timed('QSWATTopology.writeReachTable', log=True)
     def writeReachTable(self, streamLayer: QgsVectorLayer, gv: Any) -> Optional[QgsVectorLayer]:  # setting type of gv to GlobalVars prevents plugin loading
         """
         Write the Reach table in the project database, make riv1.shp in shapes directory, and copy as results template to TablesOut directory.
@@ -1271,6 +1379,11 @@ class QSWATTopology:
             hydroIdIdx = self.getIndex(riv1Layer, 'HydroID')
             OutletIdIdx = self.getIndex(riv1Layer, 'OutletID')
             mmap = dict()
+            # map subbasin -> first feature for it, read once rather than searching the layer for each subbasin
+            subToFid: Dict[int, int] = dict()
+            request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([subIdx])
+            for feature in riv1Layer.getFeatures(request):
+                subToFid.setdefault(feature.attributes()[subIdx], feature.id())
         with self.db.connect() as conn:
             if not conn:
                 return None
@@ -1297,10 +1410,10 @@ class QSWATTopology:
                 clearSQL = 'DELETE FROM ' + table
                 curs.execute(clearSQL)
             oid = 0
-            time1 = time.process_time()
             wid2Data = dict()
             subsToDelete = set()
             fidsToDelete = []
+            rows: List[Tuple[Any, ...]] = []
             for link, basin in self.linkToBasin.items():
                 SWATBasin = self.basinToSWATBasin.get(basin, 0)
                 if SWATBasin == 0:
@@ -1333,12 +1446,7 @@ class QSWATTopology:
                 maxEl = float(reachData.upperZ)
                 if addToRiv1:
                     # find the feature for this subbasin
-                    fid1 = -1
-                    request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([subIdx])
-                    for feature in riv1Layer.getFeatures(request):
-                        if feature.attributes()[subIdx]  == SWATBasin:
-                            fid1 = feature.id()
-                            break
+                    fid1 = subToFid.get(SWATBasin, -1)
                     if fid1 < 0:
                         QSWATUtils.error('Cannot find subbasin {0!s} in {1}'.format(SWATBasin, riv1File), self.isBatch)
                         return None
@@ -1355,18 +1463,19 @@ class QSWATTopology:
                     mmap[fid1][hydroIdIdx] = SWATBasin + 200000
                     mmap[fid1][OutletIdIdx] = SWATBasin + 100000
                 oid += 1
+                rows.append((oid, SWATBasin, SWATBasin, SWATBasin, downSWATBasin, SWATBasin, downSWATBasin, \
+                             drainAreaHa, length, slopePercent, channelWidth, channelDepth, minEl, maxEl, \
+                             length, SWATBasin + 200000, SWATBasin + 100000))
+            if len(rows) > 0:
                 sql = "INSERT INTO " + table + " VALUES(?,0,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
-                curs.execute(sql, (oid, SWATBasin, SWATBasin, SWATBasin, downSWATBasin, SWATBasin, downSWATBasin, \
-                                 drainAreaHa, length, slopePercent, channelWidth, channelDepth, minEl, maxEl, \
-                                 length, SWATBasin + 200000, SWATBasin + 100000))
-            for SWATBasin in subsToDelete:
-                request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([subIdx])
-                for feature in riv1Layer.getFeatures(request):
-                    if feature.attributes()[subIdx]  == SWATBasin:
-                        fidsToDelete.append(feature.id())
-                        break
-            time2 = time.process_time()
-            QSWATUtils.loginfo('Writing Reach table took {0} seconds'.format(int(time2 - time1)))
+                curs.executemany(sql, rows)
+            if addToRiv1:
+                # features are only deleted from riv1 when fields are added to it
+                for SWATBasin in subsToDelete:
+                    fid1 = subToFid.get(SWATBasin, -1)
+                    if fid1 >= 0:
+                        fidsToDelete.append(fid1)
+            Profiler.setCount(oid)
             if self.isHUC or self.useSQLite or self.forTNC:
                 conn.commit()
             else:
@@ -1491,6 +1600,7 @@ class QSWATTopology:
         return threshold
       
     @staticmethod      
+    @Profiler.timed('QSWATTopology.burnStream', log=True)
     def burnStream(streamFile: str, demFile: str, burnFile: str, verticalFactor: float, burnDepth: float, isBatch: bool) -> None:
         """Create as burnFile a copy of demFile with points on lines streamFile reduced in height by nurnDepth metres."""
         # use vertical factor to convert from metres to vertical units of DEM
@@ -1508,7 +1618,6 @@ class QSWATTopology:
         nodata = band.GetNoDataValue()
         burnTransform = burnDs.GetGeoTransform()
         streamLayer = QgsVectorLayer(streamFile, 'Burn in streams', 'ogr')
-        start = time.process_time()
         countHits = 0
         countPoints = 0
         countChanges = 0
@@ -1578,8 +1687,8 @@ class QSWATTopology:
                             continue
                         y += ystep
                         err -= deltax
-        finish = time.process_time()
-        QSWATUtils.loginfo('Created burned-in DEM {0} in {1!s} milliseconds; {2!s} points; {3!s} hits; {4!s} changes'.format(burnFile, int((finish - start)*1000), countPoints, countHits, countChanges))
+        Profiler.setCount(countPoints)
+        QSWATUtils.loginfo('Created burned-in DEM {0}; {1!s} points; {2!s} hits; {3!s} changes'.format(burnFile, countPoints, countHits, countChanges))
         
     @staticmethod
     def addPointToChanged(changed: Dict[int, List[int]], col: int, row: int) -> bool:
@@ -1619,6 +1728,16 @@ class QSWATTopology:
         geom.transform(crsTransform)
         return geom.asPoint()
     
+    def pointsToLatLong(self, points: List[QgsPointXY]) -> List[QgsPointXY]: 
+        """Convert QgsPointXY points to latlong coordinates, using one transform, and return them."""
+        crsTransform = QgsCoordinateTransform(self.crsProject, self.crsLatLong, QgsProject.instance())
+        result = []
+        for point in points:
+            geom = QgsGeometry().fromPointXY(point)
+            geom.transform(crsTransform)
+            result.append(geom.asPoint())
+        return result
+    
     def pointFromLatLong(self, point: QgsPointXY) -> QgsPointXY: 
         """Convert a QgsPointXY from latlong coordinates and return it."""
         crsTransform = QgsCoordinateTransform(self.crsLatLong, self.crsProject, QgsProject.instance())
@@ -76,6 +76,7 @@ import sys
 from osgeo import gdal, ogr  # type: ignore
 import traceback
 import time
+import numpy
 import processing
 from processing.core.Processing import Processing
 from packaging.version import parse
@@ -1297,7 +1298,51 @@ class fileWriter:
     def __exit__(self, typ: Any, value: Any, traceback: Any) -> None:  # @UnusedVariable
         """Close."""
         self.writer.close()
-        
+
+class bufferedFileWriter:
+
+    """
+    Writer with the same methods as fileWriter, for large reports.
+    Strings are collected in memory and written in large blocks.
+    """
+
+    ## number of strings collected before they are written
+    _BLOCKSIZE = 50000
+
+    def __init__(self, path: str) -> None:
+        """Initialise class variables."""
+        ## writer
+        self.writer = open(path, 'w', buffering=1 << 20)
+        ## strings not yet written
+        self.parts: List[str] = []
+        ## append to unwritten strings
+        self.write = self.parts.append
+
+    def writeLine(self, string: str) -> None:
+        """Write string plus end-of-line."""
+        self.parts.append(string)
+        self.parts.append('\n')
+        if len(self.parts) >= bufferedFileWriter._BLOCKSIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write collected strings."""
+        self.writer.write(''.join(self.parts))
+        self.parts.clear()
+
+    def close(self) -> None:
+        """Write collected strings and close."""
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self): # type: ignore
+        """Return self."""
+        return self
+
+    def __exit__(self, typ: Any, value: Any, traceback: Any) -> None:  # @UnusedVariable
+        """Close."""
+        self.close()
+
 class FileTypes:
     
     """File types for various kinds of file that will be loaded, 
@@ -1523,8 +1568,10 @@ class FileTypes:
         # allow for duplicated landuses while using same colour for same landuse
         colourMap: Dict[str, QColor] = dict()
         #QSWATUtils.loginfo('Landuse values: {0}'.format(db.landuseVals))
-        for i in db.landuseVals:
-            luse: str = db.getLanduseCode(i)
+        # landuseVals is sorted, so one less than the first is not a landuse value
+        noData = db.landuseVals[0] - 1 if numColours > 0 else -1
+        luses = db.landuseCodeArray(numpy.array(db.landuseVals, dtype=numpy.int64), noData)
+        for i, luse in zip(db.landuseVals, luses):
             # partial fix for mistake in HAWQS landuse lookup tables assigning 21 as WATR
             colour = colourMap.setdefault(luse, colours[index])
             item = QgsPalettedRasterRenderer.Class(int(i), colour, luse)
@@ -1540,29 +1587,15 @@ class FileTypes:
         This is used without running QSWAT, so fills landusevals by anlysing landuse raster,
         and landuseCodes and colours from standard NLCD names and colours table.
         """
+        # import here to avoid circular import
+        from .raster import ValueCounts  # type: ignore
         # collect landusevals from landuse layer
-        Processing.initialize()
-        if 'native' not in [p.id() for p in QgsApplication.processingRegistry().providers()]:
-            QgsApplication.processingRegistry().addProvider(QgsNativeAlgorithms())
-        context = QgsProcessingContext()
         layer = treeLayer.layer()
         filename = QSWATUtils.layerFilename(layer)
-        # have to load result to get actual memory table in result
-        processing.runAndLoadResults("native:rasterlayeruniquevaluesreport", 
-                   { 'BAND' : 1, 
-                    'INPUT' : filename, 
-                    'OUTPUT_HTML_FILE' : '', 
-                    'OUTPUT_TABLE' : 'memory:' }, context=context)
         proj = QgsProject.instance()
-        root = proj.layerTreeRoot()
-        outTreeLayer = QSWATUtils.getLayerByLegend('Unique values table', root.findLayers())
-        outLayer = outTreeLayer.layer()
         gv.db.landuseVals = []
-        for feature in outLayer.getFeatures():
-            val = int(feature[0])
-            ListFuns.insertIntoSortedList(val, gv.db.landuseVals, True)
-        # remove unique values table layer
-        proj.removeMapLayer(outTreeLayer.layerId())
+        for val in ValueCounts.counts(filename, gv.gridDir).keys():
+            ListFuns.insertIntoSortedList(int(val), gv.db.landuseVals, True)
         # # make landuseCodes table from lookup table if NLCD_CDL_color_scheme not available
         if not gv.db.connTableExists('NLCD_CDL_color_scheme', gv.db.connRef):
             gv.db.landuseCodes.clear()
@@ -1627,29 +1660,14 @@ class FileTypes:
         This is used without running QSWAT, so fills soilvals by anlysing soil raster,
         and soilCodes from lookup table.
         """
+        # import here to avoid circular import
+        from .raster import ValueCounts  # type: ignore
         # collect soilvals from soil layer
-        # Processing.initialize()
-        # if 'native' not in [p.id() for p in QgsApplication.processingRegistry().providers()]:
-        #     QgsApplication.processingRegistry().addProvider(QgsNativeAlgorithms())
-        context = QgsProcessingContext()
         layer = treeLayer.layer()
         filename = QSWATUtils.layerFilename(layer)
-        # have to load result to get actual memory table in result
-        processing.runAndLoadResults("native:rasterlayeruniquevaluesreport", 
-                   { 'BAND' : 1, 
-                    'INPUT' : filename, 
-                    'OUTPUT_HTML_FILE' : '', 
-                    'OUTPUT_TABLE' : 'memory:' }, context=context)
-        proj = QgsProject.instance()
-        root = proj.layerTreeRoot()
-        outTreeLayer = QSWATUtils.getLayerByLegend('Unique values table', root.findLayers())
-        outLayer = outTreeLayer.layer()
-        soilVals = []
-        for feature in outLayer.getFeatures():
-            val = int(feature[0])
-            ListFuns.insertIntoSortedList(val, soilVals, True)
-        # remove unique values table layer
-        proj.removeMapLayer(outTreeLayer.layerId())
+        soilVals: List[int] = []
+        for val in ValueCounts.counts(filename, gv.gridDir).keys():
+            ListFuns.insertIntoSortedList(int(val), soilVals, True)
         index = 0
         items: List[QgsPalettedRasterRenderer.Class] = []
         colours = QgsLimitedRandomColorRamp.randomColors(len(soilVals))
@@ -32,6 +32,7 @@ import subprocess
 
 from .QSWATUtils import QSWATUtils
 from .parameters import Parameters
+from .profiling import Profiler
     
 
 class TauDEMUtils:
@@ -225,11 +226,13 @@ class TauDEMUtils:
         if True:   # Parameters._ISWIN:
             os.environ['PROJ_LIB'] = os.getenv('PROJ_DATA')
             os.environ['GDAL_DRIVER_PATH'] = tauDEMDir + '/gdalplugins'
-        proc = subprocess.run(commands, 
-                              shell=True, 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE, 
-                              universal_newlines=True)
+        # CPU time of the TauDEM processes is not included in the span
+        with Profiler.span('TauDEM.' + command):
+            proc = subprocess.run(commands, 
+                                  shell=True, 
+                                  stdout=subprocess.PIPE, 
+                                  stderr=subprocess.PIPE, 
+                                  universal_newlines=True)
         if hasQGIS:
             assert output is not None
             output.append(proc.stdout)
@@ -31,6 +31,7 @@ import traceback
 from arc_convertdialog import ConvertDialog  # @UnresolvedImport
 from QSWATUtils import QSWATUtils  # @UnresolvedImport
 from QSWATTopology import QSWATTopology  # @UnresolvedImport
+from raster import ValueCounts  # @UnresolvedImport
 from parameters import Parameters  # @UnresolvedImport
 
 class ConvertFromArc(QObject):
@@ -930,31 +931,8 @@ class ConvertFromArc(QObject):
             return result      
     
     def percentsFromRaster(self, raster):
-        """Return map of raster values to percents of raster cells with that value."""
-        counts = dict()
-        total = 0
-        ds = gdal.Open(raster, gdal.GA_ReadOnly)
-        numRows = ds.RasterYSize
-        numCols = ds.RasterXSize
-        band = ds.GetRasterBand(1)
-        noData = band.GetNoDataValue()
-        buff = numpy.empty([1, numCols], dtype=int)
-        for row in range(numRows):
-            buff = band.ReadAsArray(0, row, numCols, 1)
-            for col in range(numCols):
-                val = buff[0, col]
-                if val == noData:
-                    continue
-                total += 1
-                if val in counts:
-                    counts[val] += 1
-                else:
-                    counts[val] = 1
-        # convert counts to percent
-        result = dict()
-        for val, count in counts.items():
-            result[val] = (float(count) / total) * 100
-        return result
+        """Return map of raster values to percents of raster cells with that value.  Counts are cached in the new project folder."""
+        return ValueCounts.percents(raster, self.qProjDir)
     
     def makeLookupCsv(self, percents, rasterPercents, landuseOrSoil):
         """
@@ -43,9 +43,9 @@ import glob
 import shutil
 import math
 import subprocess
-import time
 from osgeo import gdal, ogr  # type: ignore
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from packaging.version import parse
 
 # Import the code for the dialog
@@ -57,6 +57,8 @@ from .QSWATTopology import QSWATTopology  # type: ignore  # @UnresolvedImport
 from .outletsdialog import OutletsDialog  # type: ignore  # @UnresolvedImport
 from .selectsubs import SelectSubbasins  # type: ignore  # @UnresolvedImport
 from .parameters import Parameters  # type: ignore  # @UnresolvedImport
+from .profiling import Profiler  # type: ignore  # @UnresolvedImport
+from .raster import ValueCounts  # type: ignore  # @UnresolvedImport
     
     
 ## type for geotransform
@@ -293,6 +295,7 @@ class Delineation(QObject):
             else:
                 QSWATUtils.error('Cannot find executable mpiexec in the system or {0} in {1}: TauDEM functions will not run.  Install MPI or reinstall QSWAT.'.format(dll, self._gv.TauDEMDir), self._gv.isBatch)
             
+    @Profiler.timed('Delineation.finishDelineation', log=True)
     def finishDelineation(self) -> None:
         """
         Finish delineation.
@@ -411,6 +414,9 @@ class Delineation(QObject):
         or  wshedFile is newer than DEM.
         """
         if self._gv.existingWshed:
+            if self._gv.basinFile.startswith('/vsimem/'):
+                # in-memory basin file is made from the current watershed, in this session
+                return self._gv.useGridModel or gdal.VSIStatL(self._gv.basinFile) is not None
             return self._gv.useGridModel or QSWATUtils.isUpToDate(self._gv.wshedFile, self._gv.basinFile)
         if self._gv.useGridModel:
             return QSWATUtils.isUpToDate(self._gv.slopeFile, self._gv.wshedFile)
@@ -567,6 +573,7 @@ class Delineation(QObject):
             return # no change
         self._gv.existingWshed = (tab == 1)
     
+    @Profiler.timed('Delineation.runTauDEM', log=True)
     def runTauDEM(self, outletFile: Optional[str], makeWshed: bool) -> None:
         """Run TauDEM."""
         self.delineationFinishedOK = False
@@ -992,9 +999,10 @@ class Delineation(QObject):
         else:
             # generate watershed raster
             wFile = base + 'w' + suffix
-            if not (QSWATUtils.isUpToDate(demFile, wFile) and QSWATUtils.isUpToDate(wshedFile, wFile)):
+            inMemory = self._gv.isBatch and self._gv.basinGridInMemory
+            if inMemory or not (QSWATUtils.isUpToDate(demFile, wFile) and QSWATUtils.isUpToDate(wshedFile, wFile)):
                 self.progress('Generating watershed raster ...')
-                wFile = self.createBasinFile(wshedFile, demLayer, root)
+                wFile = self.createBasinFile(wshedFile, demLayer, root, inMemory)
                 if wFile == '':
                     return
             self._gv.basinFile = wFile
@@ -1761,34 +1769,83 @@ class Delineation(QObject):
         for f in selection:
             pid = f[polygonidField]
             pids.append(int(pid))
+        # read the layers once rather than searching them for each subbasin.
+        # All the selected subbasins are merged in one edit session of each layer, so features are read back 
+        # from the edit buffers as they change, and these maps are kept up to date
+        # map polygonid -> subbasin
+        wsheds: Dict[int, QgsFeature] = dict()
+        # map polygonid -> polygonids of subbasins with that DSWSID
+        wshedUps: Dict[int, List[int]] = dict()
+        for wshed in wshedLayer.getFeatures():
+            pid = wshed[polygonidField]
+            if pid not in wsheds:
+                wsheds[pid] = wshed
+            if dswsidField >= 0:
+                wshedUps.setdefault(wshed[dswsidField], []).append(pid)
+        # map linkno -> reach
+        reaches: Dict[int, QgsFeature] = dict()
+        # map wsno -> linkno
+        wsnoToLink: Dict[int, int] = dict()
+        # map linkno -> linknos of reaches draining into it
+        upLinks: Dict[int, List[int]] = dict()
+        for reach in streamLayer.getFeatures():
+            link = reach[linknoField]
+            if link not in reaches:
+                reaches[link] = reach
+            wsno = reach[wsnoField]
+            if wsno not in wsnoToLink:
+                wsnoToLink[wsno] = link
+            upLinks.setdefault(reach[dslinknoField], []).append(link)
+        # map point id -> attributes of inlets/outlets point
+        points: Dict[int, List[Any]] = dict()
+        if dsnodeidnField >= 0 and outletLayer and nodeidField >= 0:
+            assert isinstance(outletLayer, QgsVectorLayer)
+            for point in outletLayer.getFeatures():
+                nodeid = point[nodeidField]
+                if nodeid not in points:
+                    points[nodeid] = point.attributes()
         # in the following
         # suffix A refers to the subbasin being merged
         # suffix UAs refers to the subbasin(s) upstream from A
         # suffix D refers to the subbasin downstream from A
         # suffix B refers to the othe subbasin(s) upstream from D
         # suffix M refers to the merged basin
+        if not streamLayer.startEditing():
+            QSWATUtils.error(u'Cannot edit stream reaches shapefile', self._gv.isBatch)
+            return
+        if not wshedLayer.startEditing():
+            QSWATUtils.error('Cannot edit watershed shapefile', self._gv.isBatch)
+            streamLayer.rollBack()
+            return
         self._gv.writeMasterProgress(0, 0)
-        for polygonidA in pids:
-            wshedA = QSWATUtils.getFeatureByValue(wshedLayer, polygonidField, polygonidA)
-            assert wshedA is not None
-            wshedAattrs = wshedA.attributes()
-            reachA = QSWATUtils.getFeatureByValue(streamLayer, wsnoField, polygonidA)
-            if not reachA:
-                QSWATUtils.error('Cannot find reach with {0} value {1!s}'.format(QSWATTopology._WSNO, polygonidA), self._gv.isBatch)
-                continue
-            reachAattrs = reachA.attributes()
-            QSWATUtils.loginfo('A is reach {0!s} polygon {1!s}'.format(reachAattrs[linknoField], polygonidA))
-            AHasOutlet = False
-            AHasInlet = False
-            AHasReservoir = False
-            AHasSrc = False
-            if dsnodeidnField >= 0:
-                dsnodeidA = reachAattrs[dsnodeidnField]
-                if outletLayer:
-                    assert isinstance(outletLayer, QgsVectorLayer)
-                    pointFeature = QSWATUtils.getFeatureByValue(outletLayer, nodeidField, dsnodeidA)
-                    if pointFeature:
-                        attrs = pointFeature.attributes()
+        
+        def rollBack() -> None:
+            """Discard all the merges.  Topology is only patched after a successful commit, but set it up again in full to be safe."""
+            streamLayer.rollBack()
+            wshedLayer.rollBack()
+            self._gv.topo.discardPatch()
+            
+        # merges made, as (linkno of A, linkno of D, zero length links between them), to patch topology once they are committed
+        merges: List[Tuple[int, int, List[int]]] = []
+        try:
+            for polygonidA in pids:
+                wshedA = wsheds.get(polygonidA, None)
+                assert wshedA is not None
+                wshedAattrs = wshedA.attributes()
+                reachA = reaches.get(wsnoToLink.get(polygonidA, -1), None)
+                if not reachA:
+                    QSWATUtils.error('Cannot find reach with {0} value {1!s}'.format(QSWATTopology._WSNO, polygonidA), self._gv.isBatch)
+                    continue
+                reachAattrs = reachA.attributes()
+                QSWATUtils.loginfo('A is reach {0!s} polygon {1!s}'.format(reachAattrs[linknoField], polygonidA))
+                AHasOutlet = False
+                AHasInlet = False
+                AHasReservoir = False
+                AHasSrc = False
+                if dsnodeidnField >= 0:
+                    dsnodeidA = reachAattrs[dsnodeidnField]
+                    attrs = points.get(dsnodeidA, None)
+                    if attrs:
                         if inletField >= 0 and attrs[inletField] == 1:
                             if srcField >= 0 and attrs[srcField] == 1:
                                 AHasSrc = True
@@ -1798,79 +1855,70 @@ class Delineation(QObject):
                             AHasReservoir = True
                         else:
                             AHasOutlet = True
-            if AHasOutlet or AHasInlet or AHasReservoir or AHasSrc:
-                QSWATUtils.information('You cannot merge a subbasin which has an outlet, inlet, reservoir, or point source.  Not merging subbasin with {0} value {1!s}'.format(QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
-                continue
-            linknoA = reachAattrs[linknoField]
-            reachUAs = [reach for reach in streamLayer.getFeatures() if reach[dslinknoField] == linknoA]
-            # check whether a reach immediately upstream from A has an inlet
-            inletUpFromA = False
-            if dsnodeidnField >= 0 and outletLayer:
-                assert isinstance(outletLayer, QgsVectorLayer)
-                for reachUA in reachUAs:
-                    reachUAattrs = reachUA.attributes()
-                    dsnodeidUA = reachUAattrs[dsnodeidnField]
-                    pointFeature = QSWATUtils.getFeatureByValue(outletLayer, nodeidField, dsnodeidUA)
-                    if pointFeature:
-                        attrs = pointFeature.attributes()
-                        if inletField >= 0 and attrs[inletField] == 1 and (srcField < 0 or attrs[srcField] == 0):
-                            inletUpFromA = True
-                            break
-            linknoD = reachAattrs[dslinknoField]
-            reachD = QSWATUtils.getFeatureByValue(streamLayer, linknoField, linknoD)
-            if not reachD:
-                QSWATUtils.information('No downstream subbasin from subbasin with {0} value {1!s}: nothing to merge'.format(QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
-                continue
-            reachDattrs = reachD.attributes()
-            polygonidD = reachDattrs[wsnoField]
-            QSWATUtils.loginfo('D is reach {0!s} polygon {1!s}'.format(linknoD, polygonidD))
-            # reachD may be zero length, with no corresponding subbasin, so search downstream if necessary to find wshedD
-            # at the same time collect zero-length reaches for later disposal
-            wshedD = None
-            nextReach = reachD
-            zeroReaches: List[QgsFeature] = []
-            while not wshedD:
-                polygonidD = nextReach[wsnoField]
-                wshedD = QSWATUtils.getFeatureByValue(wshedLayer, polygonidField, polygonidD)
-                if wshedD:
-                    break
-                # nextReach has no subbasin (it is a zero length link); step downstream and try again
-                # first make a check
-                if lengthField >= 0 and nextReach[lengthField] > 0:
-                    QSWATUtils.error('Internal error: stream reach wsno {0!s} has positive length but no subbasin.  Not merging subbasin with {1} value {2!s}'.format(polygonidD, QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
+                if AHasOutlet or AHasInlet or AHasReservoir or AHasSrc:
+                    QSWATUtils.information('You cannot merge a subbasin which has an outlet, inlet, reservoir, or point source.  Not merging subbasin with {0} value {1!s}'.format(QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
                     continue
-                if zeroReaches:
+                linknoA = reachAattrs[linknoField]
+                reachUAs = [reaches[link] for link in upLinks.get(linknoA, [])]
+                # check whether a reach immediately upstream from A has an inlet
+                inletUpFromA = False
+                if dsnodeidnField >= 0:
+                    for reachUA in reachUAs:
+                        attrs = points.get(reachUA[dsnodeidnField], None)
+                        if attrs:
+                            if inletField >= 0 and attrs[inletField] == 1 and (srcField < 0 or attrs[srcField] == 0):
+                                inletUpFromA = True
+                                break
+                linknoD = reachAattrs[dslinknoField]
+                reachD = reaches.get(linknoD, None)
+                if not reachD:
+                    QSWATUtils.information('No downstream subbasin from subbasin with {0} value {1!s}: nothing to merge'.format(QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
+                    continue
+                reachDattrs = reachD.attributes()
+                polygonidD = reachDattrs[wsnoField]
+                QSWATUtils.loginfo('D is reach {0!s} polygon {1!s}'.format(linknoD, polygonidD))
+                # reachD may be zero length, with no corresponding subbasin, so search downstream if necessary to find wshedD
+                # at the same time collect zero-length reaches for later disposal
+                wshedD = None
+                nextReach = reachD
+                zeroReaches: List[QgsFeature] = []
+                internalError = False
+                while not wshedD:
+                    polygonidD = nextReach[wsnoField]
+                    wshedD = wsheds.get(polygonidD, None)
+                    if wshedD:
+                        break
+                    # nextReach has no subbasin (it is a zero length link); step downstream and try again
+                    # first make a check
+                    if lengthField >= 0 and nextReach[lengthField] > 0:
+                        QSWATUtils.error('Internal error: stream reach wsno {0!s} has positive length but no subbasin.  Not merging subbasin with {1} value {2!s}'.format(polygonidD, QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
+                        internalError = True
+                        break
                     zeroReaches.append(nextReach)
-                else:
-                    zeroReaches = [nextReach]
-                nextLink = nextReach[dslinknoField]
-                if nextLink < 0:
-                    # reached main outlet
-                    break
-                nextReach = QSWATUtils.getFeatureByValue(streamLayer, linknoField, nextLink)  # type: ignore
-            if not wshedD:
-                QSWATUtils.information('No downstream subbasin from subbasin with {0} value {1!s}: nothing to merge'.format(QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
-                continue
-            assert wshedD is not None
-            wshedDattrs = wshedD.attributes()
-            reachD = nextReach
-            reachDattrs = reachD.attributes()
-            linknoD = reachDattrs[linknoField]
-            zeroLinks = [reach[linknoField] for reach in zeroReaches]
-            if inletUpFromA:
-                DLinks = [linknoD] + zeroLinks if zeroLinks else [linknoD]
-                reachBs = [reach for reach in streamLayer.getFeatures() if reach[dslinknoField] in DLinks and reach.id() != reachA.id()]
-                if reachBs != []:
-                    QSWATUtils.information('Subbasin with {0} value {1!s} has an upstream inlet and the downstream one has another upstream subbasin: cannot merge.'.format(QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
+                    nextLink = nextReach[dslinknoField]
+                    if nextLink < 0:
+                        # reached main outlet
+                        break
+                    nextReach = reaches.get(nextLink, None)  # type: ignore
+                    if not nextReach:
+                        break
+                if not wshedD:
+                    if not internalError:
+                        QSWATUtils.information('No downstream subbasin from subbasin with {0} value {1!s}: nothing to merge'.format(QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
                     continue
-            # have reaches and watersheds A, UAs, D
-            # we are ready to start editing the streamLayer
-            OK = True
-            try:
-                OK = streamLayer.startEditing()
-                if not OK:
-                    QSWATUtils.error(u'Cannot edit stream reaches shapefile', self._gv.isBatch)
-                    return
+                assert wshedD is not None
+                wshedDattrs = wshedD.attributes()
+                reachD = nextReach
+                reachDattrs = reachD.attributes()
+                linknoD = reachDattrs[linknoField]
+                zeroLinks = [reach[linknoField] for reach in zeroReaches]
+                if inletUpFromA:
+                    DLinks = [linknoD] + zeroLinks
+                    if any(link != linknoA for DLink in DLinks for link in upLinks.get(DLink, [])):
+                        QSWATUtils.information('Subbasin with {0} value {1!s} has an upstream inlet and the downstream one has another upstream subbasin: cannot merge.'.format(QSWATTopology._POLYGONID, polygonidA), self._gv.isBatch)
+                        continue
+                # have reaches and watersheds A, UAs, D
+                # we are ready to edit the streamLayer
 #                 if reachUAs == []:
 #                     # A is a head reach (nothing upstream)
 #                     # change any dslinks to zeroLinks to D as the zeroReaches will be deleted
@@ -1934,7 +1982,7 @@ class Delineation(QObject):
                 OK = streamLayer.addFeature(reachM)
                 if not OK:
                     QSWATUtils.error('Cannot add shape to stream reaches shapefile', self._gv.isBatch)
-                    streamLayer.rollBack()
+                    rollBack()
                     return
                 idM = reachM.id()
                 streamLayer.changeAttributeValue(idM, linknoField, linknoD)
@@ -1943,10 +1991,9 @@ class Delineation(QObject):
                 for reach in reachUAs:
                     streamLayer.changeAttributeValue(reach.id(), dslinknoField, linknoD)
                 # change any dslinks to zeroLinks to D as the zeroReaches will be deleted
-                if zeroLinks:
-                    for reach in streamLayer.getFeatures():
-                        if reach[dslinknoField] in zeroLinks:
-                            streamLayer.changeAttributeValue(reach.id(), dslinknoField, linknoD)
+                for link in zeroLinks:
+                    for up in upLinks.get(link, []):
+                        streamLayer.changeAttributeValue(reaches[up].id(), dslinknoField, linknoD)
                 if uslinkno1Field >= 0:
                     Dup1 = reachDattrs[uslinkno1Field]
                     if Dup1 == linknoA or (zeroLinks and Dup1 in zeroLinks):
@@ -2025,28 +2072,29 @@ class Delineation(QObject):
                 if zeroReaches:
                     for reach in zeroReaches:
                         streamLayer.deleteFeature(reach.id())
-            except Exception:
-                QSWATUtils.error('Exception while updating stream reach shapefile: {0!s}'.format(traceback.format_exc()), self._gv.isBatch)
-                OK = False
-                streamLayer.rollBack()
-                return
-            else:
-                if streamLayer.isEditable():
-                    streamLayer.commitChanges()
-                    streamLayer.triggerRepaint()
-            if not OK:
-                return
-        
-            # New watershed shapefile will be inconsistent with watershed grid, so remove grid to be recreated later.
-            # Do not do it immediately because the user may remove several subbasins, so we wait until the 
-            # delineation form is closed.
-            # clear name as flag that it needs to be recreated
-            self._gv.basinFile = ''
-            try:
-                OK = wshedLayer.startEditing()
-                if not OK:
-                    QSWATUtils.error('Cannot edit watershed shapefile', self._gv.isBatch)
-                    return
+                # update maps for M, for reaches now draining into M, and for removed reaches
+                removedLinks = set([linknoA] + zeroLinks)
+                del reaches[linknoA]
+                for link in zeroLinks:
+                    del reaches[link]
+                reaches[linknoD] = streamLayer.getFeature(idM)
+                upLinksM: List[int] = []
+                for link in [linknoD, linknoA] + zeroLinks:
+                    upLinksM.extend([up for up in upLinks.pop(link, []) if up not in removedLinks])
+                upLinks[linknoD] = upLinksM
+                for link in upLinksM:
+                    reaches[link] = streamLayer.getFeature(reaches[link].id())
+                wsnoToLink.pop(polygonidA, None)
+                for reach in zeroReaches:
+                    if wsnoToLink.get(reach[wsnoField], -1) == reach[linknoField]:
+                        del wsnoToLink[reach[wsnoField]]
+                merges.append((linknoA, linknoD, zeroLinks))
+                
+                # New watershed shapefile will be inconsistent with watershed grid, so remove grid to be recreated later.
+                # Do not do it immediately because the user may remove several subbasins, so we wait until the 
+                # delineation form is closed.
+                # clear name as flag that it needs to be recreated
+                self._gv.basinFile = ''
                 # create new merged subbasin M from D and A and add it to wshed
                 # prepare reachM
                 wshedM = QgsFeature()
@@ -2061,7 +2109,7 @@ class Delineation(QObject):
                 OK = wshedLayer.addFeature(wshedM)
                 if not OK:
                     QSWATUtils.error('Cannot add shape to watershed shapefile', self._gv.isBatch)
-                    wshedLayer.rollBack()
+                    rollBack()
                     return
                 idM = wshedM.id()
                 wshedLayer.changeAttributeValue(idM, polygonidField, polygonidD) 
@@ -2080,9 +2128,8 @@ class Delineation(QObject):
                 if dswsidField >= 0:
                     wshedLayer.changeAttributeValue(idM, dswsidField, wshedDattrs[dswsidField])
                     # change downlinks upstream of A from A to D (= M)
-                    wshedUAs = [wshed for wshed in wshedLayer.getFeatures() if wshed[dswsidField] == polygonidA]
-                    for wshedUA in wshedUAs:
-                        wshedLayer.changeAttributeValue(wshedUA.id(), dswsidField, polygonidD) 
+                    for pid in wshedUps.get(polygonidA, []):
+                        wshedLayer.changeAttributeValue(wsheds[pid].id(), dswsidField, polygonidD)
                 if us1wsidField >= 0:
                     if wshedDattrs[us1wsidField] == polygonidA:
                         wshedLayer.changeAttributeValue(idM, us1wsidField, wshedAattrs[us1wsidField])
@@ -2098,15 +2145,32 @@ class Delineation(QObject):
                 # remove A and D subbasins
                 wshedLayer.deleteFeature(wshedA.id())
                 wshedLayer.deleteFeature(wshedD.id())
-            except Exception:
-                QSWATUtils.error('Exception while updating watershed shapefile: {0!s}'.format(traceback.format_exc()), self._gv.isBatch)
-                OK = False
-                wshedLayer.rollBack()
-                return
-            else:
-                if wshedLayer.isEditable():
-                    wshedLayer.commitChanges()
-                    wshedLayer.triggerRepaint()
+                # update maps for M and for subbasins now draining into M
+                del wsheds[polygonidA]
+                wsheds[polygonidD] = wshedLayer.getFeature(idM)
+                if dswsidField >= 0:
+                    wshedUAs = wshedUps.pop(polygonidA, [])
+                    wshedUps[polygonidD] = [pid for pid in wshedUps.get(polygonidD, []) if pid != polygonidA] + wshedUAs
+                    for pid in wshedUAs:
+                        wsheds[pid] = wshedLayer.getFeature(wsheds[pid].id())
+        except Exception:
+            QSWATUtils.error('Exception while merging subbasins: {0!s}'.format(traceback.format_exc()), self._gv.isBatch)
+            rollBack()
+            return
+        # commit all the merges together
+        streamOK = not streamLayer.isEditable() or streamLayer.commitChanges()
+        wshedOK = not wshedLayer.isEditable() or wshedLayer.commitChanges()
+        if not (streamOK and wshedOK):
+            QSWATUtils.error('Failed to save merged subbasins: {0}'.format('; '.join(streamLayer.commitErrors() + wshedLayer.commitErrors())), 
+                             self._gv.isBatch)
+            # discards whatever could not be committed
+            rollBack()
+            return
+        # layers now match the merges, so patch topology
+        for linknoA, linknoD, zeroLinks in merges:
+            self._gv.topo.mergeBasins(linknoA, linknoD, zeroLinks)
+        streamLayer.triggerRepaint()
+        wshedLayer.triggerRepaint()
           
     #==========no longer used=================================================================
     # @staticmethod      
@@ -2155,6 +2219,7 @@ class Delineation(QObject):
         self.progress('')
         return
      
+    @Profiler.timed('Delineation.createWatershedShapefile', log=True)
     def createWatershedShapefile(self, wFile: str, wshedFile: str, root: QgsLayerTree) -> None:
         """Create watershed shapefile wshedFile from watershed grid wFile."""
         if QSWATUtils.isUpToDate(wFile, wshedFile):
@@ -2166,8 +2231,10 @@ class Delineation(QObject):
         if QSWATUtils.shapefileExists(wshedFile):
             ds = driver.Open(wshedFile, 1)
             wshedLayer = ds.GetLayer()
+            wshedLayer.StartTransaction()
             for feature in wshedLayer:
                 wshedLayer.DeleteFeature(feature.GetFID())
+            wshedLayer.CommitTransaction()
         else:
             ok, path = QSWATUtils.removeLayerAndFiles(wshedFile, root)
             if not ok:
@@ -2216,11 +2283,61 @@ class Delineation(QObject):
             return
         band = sourceRaster.GetRasterBand(1)
         nodata = band.GetNoDataValue()
-        featuresToDelete = []
+        transform = sourceRaster.GetGeoTransform()
+        cellArea = abs(transform[1] * transform[5])
+        # polygonize into memory, since subbasins can be fragmented into many polygons which we combine
+        memDs = ogr.GetDriverByName('Memory').CreateDataSource('fragments')
+        memLayer = memDs.CreateLayer('fragments', geom_type=ogr.wkbPolygon)
+        memLayer.CreateField(ogr.FieldDefn(QSWATTopology._POLYGONID, ogr.OFTInteger))
         # We could use band as a mask, but that removes and subbasins with wsno 0
         # so we run with no mask, which produces an unwanted polygon with PolygonId
-        # set to the wFile's nodata value.  This we will remove later.
-        gdal.Polygonize(band, None, wshedLayer, 0, ['8CONNECTED=8'], callback=None)
+        # set to the wFile's nodata value.  This we ignore.
+        gdal.Polygonize(band, None, memLayer, 0, ['8CONNECTED=8'], callback=None)
+        # basin -> polygons of basin, in order of first appearance
+        fragments: Dict[int, List[Any]] = dict()
+        for feature in memLayer:
+            basin = feature.GetField(0)
+            if basin != nodata:
+                fragments.setdefault(basin, []).append(feature.GetGeometryRef().Clone())
+        memDs = None
+        sourceRaster = None
+        # subbasin areas from cell counts
+        basins, counts = ValueCounts.countArrays(wFile)
+        cellCounts = dict(zip(basins.tolist(), counts.tolist()))
+        
+        def dissolve(geoms: List[Any]) -> Any:
+            """Return union of polygons."""
+            multi = ogr.Geometry(ogr.wkbMultiPolygon)
+            for geom in geoms:
+                multi.AddGeometry(geom)
+            return multi.UnionCascaded()
+        
+        # one union for each fragmented basin: GDAL releases the GIL so unions can run in parallel
+        fragmented = [basin for basin, geoms in fragments.items() if len(geoms) > 1]
+        numThreads = min(8, os.cpu_count() or 1, len(fragmented))
+        if numThreads > 1:
+            with ThreadPoolExecutor(max_workers=numThreads) as pool:
+                unions = list(pool.map(lambda basin: dissolve(fragments[basin]), fragmented))
+        else:
+            unions = [dissolve(fragments[basin]) for basin in fragmented]
+        for basin, union in zip(fragmented, unions):
+            fragments[basin] = [union]
+        # write subbasins in one transaction, storing areas and centroids
+        self._gv.topo.basinCentroids.clear()
+        layerDefn = wshedLayer.GetLayerDefn()
+        basinIndex = layerDefn.GetFieldIndex(QSWATTopology._POLYGONID)
+        areaIndex = layerDefn.GetFieldIndex(QSWATTopology._AREA)
+        wshedLayer.StartTransaction()
+        for basin, geoms in fragments.items():
+            geom = geoms[0]
+            feature = ogr.Feature(layerDefn)
+            feature.SetField(basinIndex, basin)
+            feature.SetField(areaIndex, float(cellCounts.get(basin, 0) * cellArea))
+            feature.SetGeometry(geom)
+            wshedLayer.CreateFeature(feature)
+            centroid = geom.Centroid()
+            self._gv.topo.basinCentroids[basin] = (centroid.GetX(), centroid.GetY())
+        wshedLayer.CommitTransaction()
         ds = None  # closes data source
         QSWATUtils.copyPrj(wFile, wshedFile)
         # load it
@@ -2250,50 +2367,51 @@ class Delineation(QObject):
         # we turn back on when SWAT basin numbers are calculated and stored
         # in the Subbasin field
         wshedLayer.setLabelsEnabled(False)
-        # get areas and centroids of subbasins
-        self._gv.topo.basinCentroids.clear()
-        wshedLayer.startEditing()
-        basinIndex = self._gv.topo.getIndex(wshedLayer, QSWATTopology._POLYGONID)
-        areaIndex = self._gv.topo.getIndex(wshedLayer, QSWATTopology._AREA)
-        for feature in wshedLayer.getFeatures():
-            basin = feature[basinIndex]
-            if basin == nodata:
-                featuresToDelete.append(feature.id())
-            else:
-                area = float(feature.geometry().area())
-                wshedLayer.changeAttributeValue(feature.id(), areaIndex, area)
-                centroid = feature.geometry().centroid().asPoint()
-                self._gv.topo.basinCentroids[basin] = (centroid.x(), centroid.y())
-        # get rid of any basin corresponding to nodata in wFile
-        if len(featuresToDelete) > 0:
-            wshedLayer.dataProvider().deleteFeatures(featuresToDelete)
-        wshedLayer.commitChanges()
         wshedLayer.triggerRepaint()
         
-    def createBasinFile(self, wshedFile: str, demLayer: QgsRasterLayer, root: QgsLayerTree) -> str:
-        """Create basin file from watershed shapefile."""
+    def createBasinFile(self, wshedFile: str, demLayer: QgsRasterLayer, root: QgsLayerTree, inMemory: bool=False) -> str:
+        """
+        Create basin file from watershed shapefile.
+        
+        If inMemory the basin file is created in GDAL's in-memory file system (/vsimem/) 
+        and can only be opened by GDAL in this process.  HRU creation frees it after reading it.
+        """
         demPath = QSWATUtils.layerFileInfo(demLayer).canonicalFilePath()  # type: ignore
         wFile = os.path.splitext(demPath)[0] + 'w.tif'
         shapeBase = os.path.splitext(wshedFile)[0]
         # if basename of wFile is used rasterize fails
         baseName = os.path.basename(shapeBase)
-        ok, path = QSWATUtils.removeLayerAndFiles(wFile, root)
-        if not ok:
-            QSWATUtils.error('Failed to remove old {0}: try repeating last click, else remove manually.'.format(path), self._gv.isBatch)
-            self._dlg.setCursor(Qt.CursorShape.ArrowCursor)
-            return ''
-        assert not os.path.exists(wFile)
+        if inMemory:
+            wFile = '/vsimem/' + os.path.basename(wFile)
+            if gdal.VSIStatL(wFile) is not None:
+                gdal.Unlink(wFile)
+        else:
+            ok, path = QSWATUtils.removeLayerAndFiles(wFile, root)
+            if not ok:
+                QSWATUtils.error('Failed to remove old {0}: try repeating last click, else remove manually.'.format(path), self._gv.isBatch)
+                self._dlg.setCursor(Qt.CursorShape.ArrowCursor)
+                return ''
+            assert not os.path.exists(wFile)
         xSize = demLayer.rasterUnitsPerPixelX()
         ySize = demLayer.rasterUnitsPerPixelY()
         extent = demLayer.extent()
         # need to use extent to align basin raster cells with DEM
-        command = 'gdal_rasterize -a {0} -tr {1!s} {2!s} -te {6} {7} {8} {9} -a_nodata -9999 -ot Int32 -of GTiff -l "{3}" "{4}" "{5}"' \
-        .format(QSWATTopology._POLYGONID, xSize, ySize, baseName, wshedFile, wFile,
-                extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum())
-        QSWATUtils.loginfo(command)
-        os.system(command)
-        assert os.path.exists(wFile)
-        QSWATUtils.copyPrj(wshedFile, wFile)
+        options = gdal.RasterizeOptions(format='GTiff', outputType=gdal.GDT_Int32, layers=[baseName], 
+                                        attribute=QSWATTopology._POLYGONID, noData=-9999, xRes=xSize, yRes=ySize, 
+                                        outputBounds=[extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum()])
+        QSWATUtils.loginfo('Rasterizing {0} to {1}'.format(wshedFile, wFile))
+        try:
+            wDs = gdal.Rasterize(wFile, wshedFile, options=options)
+        except Exception:
+            QSWATUtils.error('Failed to create watershed grid {0} from {1}: {2}'.format(wFile, wshedFile, traceback.format_exc()), self._gv.isBatch)
+            return ''
+        if wDs is None:
+            QSWATUtils.error('Failed to create watershed grid {0} from {1}: {2}'.format(wFile, wshedFile, gdal.GetLastErrorMsg()), self._gv.isBatch)
+            return ''
+        # close dataset to flush it
+        wDs = None
+        if not inMemory:
+            QSWATUtils.copyPrj(wshedFile, wFile)
         return wFile
     
     def createGridShapefile(self, demLayer: QgsRasterLayer, pFile: str, ad8File: str, wFile: str) -> None:
@@ -2348,27 +2466,21 @@ class Delineation(QObject):
         self.progress('Creating grid ...')
         accFile = ad8File
         flowFile = pFile
-        time2 = time.process_time()
-        storeGrid, accTransform, minDrainArea, maxDrainArea = self.storeGridData(accFile, wFile, gridSize)
-        time3 = time.process_time()
-        QSWATUtils.loginfo('Storing grid data took {0} seconds'.format(int(time3 - time2)))
+        with Profiler.span('Delineation.storeGridData', log=True):
+            storeGrid, accTransform, minDrainArea, maxDrainArea = self.storeGridData(accFile, wFile, gridSize)
         if storeGrid:
             assert accTransform is not None
-            if self.addDownstreamData(storeGrid, flowFile, gridSize, accTransform):
-                time4 = time.process_time()
-                QSWATUtils.loginfo('Adding downstream data took {0} seconds'.format(int(time4 - time3)))
+            with Profiler.span('Delineation.addDownstreamData', log=True):
+                added = self.addDownstreamData(storeGrid, flowFile, gridSize, accTransform)
+            if added:
                 # inlets: Dict[int, Dict[int, int]] = dict()
                 # self.addGridOutletsAuto(storeGrid, inlets)  # moved to catchments.py
-                self.addGridOutlets(storeGrid, inlets)
-                time4a = time.process_time()
-                # QSWATUtils.loginfo('Adding outlets took {0} seconds'.format(int(time4a - time4)))
-                print('Adding outlets took {0} seconds'.format(time4a - time4))
-                self.writeGridShapefile(storeGrid, gridFile, flowFile, gridSize, accTransform, None)
-                time5 = time.process_time()
-                QSWATUtils.loginfo('Writing grid shapefile took {0} seconds'.format(int(time5 - time4a)))
-                numOutlets = self.writeGridStreamsShapefile(storeGrid, gridStreamsFile, flowFile, minDrainArea, maxDrainArea, accTransform)
-                time6 = time.process_time()
-                QSWATUtils.loginfo('Writing grid streams shapefile took {0} seconds'.format(int(time6 - time5)))
+                with Profiler.span('Delineation.addGridOutlets', log=True):
+                    self.addGridOutlets(storeGrid, inlets)
+                with Profiler.span('Delineation.writeGridShapefile', log=True):
+                    self.writeGridShapefile(storeGrid, gridFile, flowFile, gridSize, accTransform, None)
+                with Profiler.span('Delineation.writeGridStreamsShapefile', log=True):
+                    numOutlets = self.writeGridStreamsShapefile(storeGrid, gridStreamsFile, flowFile, minDrainArea, maxDrainArea, accTransform)
                 # if numOutlets >= 0:
                 #     msg = 'Grid processing done with delineation threshold {0} sq.km: {1} outlets'.format(self._dlg.area.text(), numOutlets)
                 #     QSWATUtils.loginfo(msg)
@@ -26,6 +26,9 @@ try:
     #from qgis.core import *
 except:
     from qgis.PyQt.QtCore import Qt
+import math
+import numpy
+from typing import List, Tuple
 # Import the code for the dialog
 from .elevationbandsdialog import ElevatioBandsDialog  # @UnresolvedImport
 from .QSWATUtils import QSWATUtils  # @UnresolvedImport
@@ -72,4 +75,38 @@ class ElevationBands:
             return
         self._gv.numElevBands = self._dlg.numElevBands.value()
         self._dlg.close()
-        
\ No newline at end of file
+        
+        
+    @staticmethod
+    def makeBands(freqs: numpy.ndarray, start: int, firstWidth: float, bandWidth: float, 
+                  totalFreq: int) -> List[Tuple[float, float, float]]:
+        """
+        Return list of (start, midpoint, percent of area) for elevation bands.
+        
+        freqs is the elevation histogram from elevation start to the maximum elevation, 
+        firstWidth the width of the first band and bandWidth the width of later bands, which is truncated at the maximum.
+        A band starts at the first elevation at or above its nominal start, and percentages are of totalFreq.
+        Only band boundaries are iterated over: percentages come from differences of the cumulative histogram.
+        """
+        top = start + len(freqs)  # maximum elevation plus 1
+        labels = [start]
+        mids = [start + (firstWidth - 1) / 2.0]
+        # indexes in freqs of first elevation of each band
+        indexes = [0]
+        nextBand = start + firstWidth
+        elev = start
+        while True:
+            elev = max(math.ceil(nextBand), elev + 1)
+            if elev >= top:
+                break
+            labels.append(nextBand)
+            mids.append(elev + (min(top - elev, bandWidth) - 1) / 2.0)
+            indexes.append(elev - start)
+            nextBand = min(nextBand + bandWidth, top)
+        cumFreqs = numpy.concatenate(([0], numpy.cumsum(freqs)))
+        counts = cumFreqs[indexes[1:] + [len(freqs)]] - cumFreqs[indexes]
+        if totalFreq > 0:
+            percents = (counts / totalFreq) * 100.0
+        else:
+            percents = numpy.zeros(len(counts))
+        return [(label, mid, float(percent)) for label, mid, percent in zip(labels, mids, percents)]
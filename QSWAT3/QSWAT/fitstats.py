@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+
+import csv
+import math
+import numpy as np
+from typing import Dict, List, Tuple, Optional
+
+class SeriesTable:
+    """Table of series read from a SWATGraph csv file: dates in the first column, one series in each other column.
+
+    Does not use Qt, so can be used headless."""
+
+    def __init__(self, headers: List[str], dates: List[str], values: np.ndarray) -> None:
+        """Initialise class variables."""
+        ## column headers, including the date column
+        self.headers = headers
+        ## date strings from first column
+        self.dates = dates
+        ## array of values, one row per date and one column per series, with nan for missing values
+        self.values = values
+
+    @staticmethod
+    def read(csvFile: str) -> 'SeriesTable':
+        """Read csv file.  Values that cannot be parsed as numbers are read as nan.
+
+        Raises ValueError if a line has fewer fields than the header line."""
+        with open(csvFile, 'r', newline='') as csvFil:
+            reader = csv.reader(csvFil)
+            headers = [h.strip() for h in next(reader, [])]
+            numCols = len(headers)
+            dates: List[str] = []
+            rows: List[List[str]] = []
+            for lineNum, line in enumerate(reader, 2):
+                if len(line) < numCols:
+                    raise ValueError('Line {0} of {1} has {2} values instead of {3}'.format(lineNum, csvFile, len(line), numCols))
+                dates.append(line[0].strip())
+                rows.append(line[1:numCols])
+        return SeriesTable.fromRows(headers, dates, rows)
+
+    @staticmethod
+    def fromRows(headers: List[str], dates: List[str], rows: List[List[str]]) -> 'SeriesTable':
+        """Make table from rows of value strings, excluding dates.  Values that cannot be parsed as numbers are nan."""
+        values = np.full((len(rows), max(0, len(headers) - 1)), np.nan)
+        for i, row in enumerate(rows):
+            for j, val in enumerate(row):
+                try:
+                    values[i, j] = float(val)
+                except ValueError:
+                    pass
+        return SeriesTable(headers, dates, values)
+
+    def series(self, col: int) -> np.ndarray:
+        """Values of column col, where column 0 is the dates column."""
+        return self.values[:, col - 1]
+
+    def header(self, col: int) -> str:
+        """Header of column col."""
+        return self.headers[col]
+
+class FitStatistics:
+    """Goodness of fit statistics for pairs of series, only using points where both values are numbers.
+
+    Each statistic returns None if it is undefined for the data, for example if the observed values are constant."""
+
+    ## names of statistics calculated by FitStatistics.all
+    _NAMES = ['NSE', 'R2', 'PBIAS', 'KGE', 'RSR']
+
+    @staticmethod
+    def paired(series1: np.ndarray, series2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the values of the two series at points where neither is nan."""
+        x = np.asarray(series1, dtype=np.float64)
+        y = np.asarray(series2, dtype=np.float64)
+        mask = ~(np.isnan(x) | np.isnan(y))
+        return x[mask], y[mask]
+
+    @staticmethod
+    def pearson(series1: np.ndarray, series2: np.ndarray) -> Tuple[Optional[float], int]:
+        """Return Pearson correlation coefficient and number of points used."""
+        x, y = FitStatistics.paired(series1, series2)
+        return FitStatistics.pairedPearson(x, y), len(x)
+
+    @staticmethod
+    def pairedPearson(x: np.ndarray, y: np.ndarray) -> Optional[float]:
+        """Pearson correlation coefficient of series without missing values."""
+        if len(x) == 0:
+            return None
+        dx = x - x.mean()
+        dy = y - y.mean()
+        deno = math.sqrt(float(np.dot(dx, dx)) * float(np.dot(dy, dy)))
+        if deno == 0:
+            return None
+        return float(np.dot(dx, dy)) / deno
+
+    @staticmethod
+    def nse(observed: np.ndarray, simulated: np.ndarray) -> Tuple[Optional[float], int]:
+        """Return Nash-Sutcliffe efficiency and number of points used."""
+        obs, sim = FitStatistics.paired(observed, simulated)
+        return FitStatistics.pairedNSE(obs, sim), len(obs)
+
+    @staticmethod
+    def pairedNSE(obs: np.ndarray, sim: np.ndarray) -> Optional[float]:
+        """Nash-Sutcliffe efficiency of series without missing values."""
+        if len(obs) == 0:
+            return None
+        diff = obs - sim
+        dev = obs - obs.mean()
+        deno = float(np.dot(dev, dev))
+        if deno == 0:
+            return None
+        return 1 - float(np.dot(diff, diff)) / deno
+
+    @staticmethod
+    def pairedPBIAS(obs: np.ndarray, sim: np.ndarray) -> Optional[float]:
+        """Percent bias of series without missing values.  Positive values indicate underestimation."""
+        total = float(obs.sum())
+        if len(obs) == 0 or total == 0:
+            return None
+        return 100 * float((obs - sim).sum()) / total
+
+    @staticmethod
+    def pairedKGE(obs: np.ndarray, sim: np.ndarray) -> Optional[float]:
+        """Kling-Gupta efficiency of series without missing values."""
+        r = FitStatistics.pairedPearson(obs, sim)
+        if r is None:
+            return None
+        obsMean = float(obs.mean())
+        obsStd = float(obs.std())
+        if obsMean == 0 or obsStd == 0:
+            return None
+        alpha = float(sim.std()) / obsStd
+        beta = float(sim.mean()) / obsMean
+        return 1 - math.sqrt((r - 1) ** 2 + (alpha - 1) ** 2 + (beta - 1) ** 2)
+
+    @staticmethod
+    def pairedRSR(obs: np.ndarray, sim: np.ndarray) -> Optional[float]:
+        """Ratio of root mean square error to standard deviation of observations, for series without missing values."""
+        if len(obs) == 0:
+            return None
+        diff = obs - sim
+        dev = obs - obs.mean()
+        deno = float(np.dot(dev, dev))
+        if deno == 0:
+            return None
+        return math.sqrt(float(np.dot(diff, diff)) / deno)
+
+    @staticmethod
+    def all(observed: np.ndarray, simulated: np.ndarray) -> Tuple[Dict[str, Optional[float]], int]:
+        """Return map of statistic name to value for all statistics, plus number of points used."""
+        obs, sim = FitStatistics.paired(observed, simulated)
+        r = FitStatistics.pairedPearson(obs, sim)
+        result: Dict[str, Optional[float]] = dict()
+        result['NSE'] = FitStatistics.pairedNSE(obs, sim)
+        result['R2'] = None if r is None else r * r
+        result['PBIAS'] = FitStatistics.pairedPBIAS(obs, sim)
+        result['KGE'] = FitStatistics.pairedKGE(obs, sim)
+        result['RSR'] = FitStatistics.pairedRSR(obs, sim)
+        return result, len(obs)
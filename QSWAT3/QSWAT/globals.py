@@ -109,6 +109,13 @@ class GlobalVars:
         self.useGridModel = False
         ## flag to show large grid - dominant landuse, soil and slope only
         self.isBig = False
+        ## flag to omit landuse/soil/slope and HRUs text reports in batch mode (hrus tables and hrus.csv are still written)
+        self.skipBatchReports = False
+        ## flag to leave landuse/soil/slope and HRUs text reports in batch mode until CreateHRUs.writeDeferredReports is called
+        self.deferBatchReports = False
+        ## flag to make the watershed grid from an existing watershed in memory in batch mode, instead of writing it to disk;
+        ## the grid is freed once HRU creation has read it
+        self.basinGridInMemory = False
         ## grid size (grid models only)
         self.gridSize = 0
         ## Directory containing QSWAT plugin
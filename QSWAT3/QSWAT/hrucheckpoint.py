@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+
+import os
+import pickle
+import hashlib
+import tempfile
+import traceback
+from typing import Dict, List, Tuple, Any, Optional
+
+from .QSWATUtils import QSWATUtils, ListFuns  # type: ignore
+from .QSWATData import BasinData, CellData  # type: ignore
+from .parameters import Parameters  # type: ignore
+from .refdata import ReferenceData  # type: ignore
+
+class HRUCheckpoint:
+
+    """Checkpoint of the basin data read from the rasters by CreateHRUs.generateBasins, before HRU thresholds are applied.
+
+    The checkpoint is keyed by an md5 hash of the contents of the DEM, watershed, landuse, soil, slope and distance rasters,
+    the watershed, stream, inlets/outlets and extra outlets shapefiles, the slope limits, the landuse and soil lookup tables,
+    the basins upstream from inlets and empty basins, and the settings used in reading the rasters.
+    It is pickled in the project's grid folder, with the sizes and modification times of the HRUs and slope bands rasters written with it,
+    so that rerunning HRU creation with unchanged inputs, for example to try other thresholds, does not read the rasters again.
+    The landuse and soil cover counts are stored with it, so the cover warnings are repeated when it is restored.
+    Not used for HUC, HAWQS or big grid projects, or when the FullHRUs shapefile is wanted.
+    """
+
+    ## Checkpoint format version.  Increase when the stored data or the key changes.
+    _VERSION = 4
+
+    ## checkpoint file name, in the grid folder
+    _FILENAME = 'hrus_checkpoint.pickle'
+
+    def __init__(self, gv: Any) -> None:
+        """Initialise class variables."""
+        self._gv = gv
+        ## checkpoint file
+        self.checkpointFile = QSWATUtils.join(gv.gridDir, HRUCheckpoint._FILENAME)
+        ## stored checkpoint, if any
+        self.state: Dict[str, Any] = self.readState()
+        ## map file path -> (size, modification time, md5 hash), carried over from the stored checkpoint so unchanged files are not read again
+        self.fileHashes: Dict[str, Tuple[int, int, str]] = dict(self.state.get('fileHashes', dict()))
+        ## landuse codes before rasters are read, so codes added while reading can be recorded
+        self.landuseCodes = dict(gv.db.landuseCodes)
+        ## checkpoint key, or empty string if a data file is missing
+        self.key = self.makeKey()
+
+    @staticmethod
+    def isApplicable(gv: Any, fullHRUsWanted: bool) -> bool:
+        """Return true if basin data for this project can be checkpointed."""
+        return not (gv.isHUC or gv.isHAWQS or gv.isBig or gv.forTNC or fullHRUsWanted or gv.gridDir == '' or
+                    gv.basinFile.startswith('/vsimem/'))
+
+    def readState(self) -> Dict[str, Any]:
+        """Return stored checkpoint, or empty map if there is none of the current version."""
+        if not os.path.isfile(self.checkpointFile):
+            return dict()
+        try:
+            with open(self.checkpointFile, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version', 0) == HRUCheckpoint._VERSION:
+                return state
+        except Exception:
+            QSWATUtils.loginfo('Cannot read HRU checkpoint {0}: {1}'.format(self.checkpointFile, traceback.format_exc()))
+        return dict()
+
+    def dataFiles(self) -> List[str]:
+        """Files read when generating basin data, in a fixed order."""
+        gv = self._gv
+        rasters = [gv.demFile, gv.basinFile, gv.landuseFile, gv.soilFile, gv.slopeFile]
+        if not gv.existingWshed and not gv.useGridModel:
+            rasters.append(gv.distFile)
+        files: List[str] = []
+        for raster in rasters:
+            if raster.lower().endswith('.adf'):
+                # ESRI grid: all the files in the folder
+                folder = os.path.dirname(raster)
+                files.extend(QSWATUtils.join(folder, name) for name in sorted(os.listdir(folder)))
+            else:
+                files.append(raster)
+        # inlets/outlets and extra outlets determine which basins are upstream from inlets or have reservoirs and point sources
+        for shapefile in [gv.wshedFile, gv.streamFile, gv.outletFile, gv.extraOutletFile]:
+            if shapefile == '':
+                continue
+            base = os.path.splitext(shapefile)[0]
+            files.extend([base + '.shp', base + '.dbf'])
+        return files
+
+    def hashFile(self, path: str) -> str:
+        """Return md5 hash of file contents, reusing the stored hash if the file's size and modification time are unchanged."""
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        stored = self.fileHashes.get(path, None)
+        if stored is not None and stored[0] == stat.st_size and stored[1] == stat.st_mtime_ns:
+            return stored[2]
+        result = ReferenceData.hashFile(path)
+        self.fileHashes[path] = (stat.st_size, stat.st_mtime_ns, result)
+        return result
+
+    def makeKey(self) -> str:
+        """Return md5 hash of the data files' contents, lookup tables and settings, or empty string if a data file is missing."""
+        gv = self._gv
+        db = gv.db
+        m = hashlib.md5()
+        try:
+            for path in self.dataFiles():
+                m.update(self.hashFile(path).encode())
+        except Exception:
+            QSWATUtils.loginfo('Cannot make HRU checkpoint key: {0}'.format(traceback.format_exc()))
+            return ''
+        settings = (HRUCheckpoint._VERSION, list(db.slopeLimits),
+                    sorted(db.landuseCodes.items()), sorted(db._landuseTranslate.items()),
+                    sorted(db.soilNames.items()), sorted(db.soilTranslate.items()), db.useSTATSGO, db.useSSURGO,
+                    gv.verticalFactor, gv.fromGRASS, gv.useGridModel, gv.existingWshed, gv.isHUC, gv.isHAWQS,
+                    sorted(gv.topo.upstreamFromInlets), sorted(gv.topo.emptyBasins))
+        m.update(repr(settings).encode())
+        return m.hexdigest()
+
+    def outputFiles(self) -> List[str]:
+        """Rasters written when generating basin data, which must be unchanged for the checkpoint to be used."""
+        gv = self._gv
+        files: List[str] = []
+        if not gv.useGridModel:
+            files.append(QSWATUtils.join(gv.gridDir, Parameters._HRUSRASTER))
+            if len(gv.db.slopeLimits) > 0:
+                files.append(os.path.splitext(gv.slopeFile)[0] + '_bands.tif')
+        return files
+
+    @staticmethod
+    def fileStamp(path: str) -> Optional[Tuple[int, int]]:
+        """Return size and modification time of file, or None if it does not exist."""
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def restore(self, createHRUs: Any) -> bool:
+        """If the stored checkpoint matches the current key, restore basin data in createHRUs from it and return true."""
+        state = self.state
+        if self.key == '' or state.get('key', '') != self.key:
+            return False
+        outputs: Dict[str, Optional[Tuple[int, int]]] = state['outputs']
+        if sorted(outputs.keys()) != sorted(self.outputFiles()) or \
+            any(HRUCheckpoint.fileStamp(path) != stamp for path, stamp in outputs.items()):
+            QSWATUtils.loginfo('HRU checkpoint not used: HRUs or slope bands raster has changed')
+            return False
+        gv = self._gv
+        db = gv.db
+        # landuses added while reading the rasters, such as WATR and RICE, must get the same categories
+        for cat, code in state['addedLanduses']:
+            if db.getLanduseCat(code) != cat:
+                QSWATUtils.loginfo('HRU checkpoint not used: landuse {0} category changed'.format(code))
+                return False
+        basins: Dict[int, BasinData] = dict()
+        for basin, (attrs, hruMap) in state['basins'].items():
+            basinData = BasinData.__new__(BasinData)
+            basinData.__dict__.update(attrs)
+            basinData.hruMap = {hru: CellData(*cellData) for hru, cellData in hruMap.items()}
+            basins[basin] = basinData
+        createHRUs.basins = basins
+        createHRUs.basinElevMap = state['basinElevMap']
+        createHRUs.elevMap = state['elevMap']
+        createHRUs.minElev = state['minElev']
+        for name, val in state['gv'].items():
+            setattr(gv, name, val)
+        for lid in state['landuseVals']:
+            ListFuns.insertIntoSortedList(lid, db.landuseVals, True)
+        for sid in state['soilVals']:
+            ListFuns.insertIntoSortedList(sid, db.soilVals, True)
+        if gv.useGridModel:
+            gv.topo.basinCentroids.update(state['basinCentroids'])
+        return True
+
+    def coverage(self) -> Tuple[int, int, int, int, int]:
+        """Return counts of cells with landuse, no landuse, defined soil, undefined soil, and no soil stored in the checkpoint."""
+        return self.state['coverage']
+
+    def save(self, createHRUs: Any, coverage: Tuple[int, int, int, int, int]) -> None:
+        """Store basin data from createHRUs and landuse and soil cover counts as the checkpoint for the current key.  
+        Failure is not an error: the rasters are just read again next time."""
+        if self.key == '':
+            return
+        gv = self._gv
+        db = gv.db
+        basins: Dict[int, Tuple[Dict[str, Any], Dict[int, Tuple[int, float, float, int]]]] = dict()
+        for basin, basinData in createHRUs.basins.items():
+            # pickle only builtin types and numpy arrays, so the checkpoint does not depend on the package name (plugin or batch)
+            attrs = {name: val for name, val in basinData.__dict__.items() if name != 'hruMap'}
+            hruMap = {hru: (cellData.cellCount, cellData.area, cellData.totalSlope, cellData.crop) for hru, cellData in basinData.hruMap.items()}
+            basins[basin] = (attrs, hruMap)
+        gvNames = ['cellArea', 'distNoData', 'cropNoData', 'soilNoData', 'slopeNoData', 'elevationNoData', 'slopeBandsFile']
+        if not gv.useGridModel:
+            gvNames.append('basinNoData')
+        state = {'version': HRUCheckpoint._VERSION,
+                 'key': self.key,
+                 'fileHashes': self.fileHashes,
+                 'outputs': {path: HRUCheckpoint.fileStamp(path) for path in self.outputFiles()},
+                 'addedLanduses': sorted((cat, code) for cat, code in db.landuseCodes.items() if cat not in self.landuseCodes),
+                 'basins': basins,
+                 'basinElevMap': createHRUs.basinElevMap,
+                 'elevMap': createHRUs.elevMap,
+                 'minElev': createHRUs.minElev,
+                 'gv': {name: getattr(gv, name) for name in gvNames},
+                 'landuseVals': list(db.landuseVals),
+                 'soilVals': list(db.soilVals),
+                 'coverage': tuple(int(count) for count in coverage),
+                 'basinCentroids': dict(gv.topo.basinCentroids) if gv.useGridModel else dict()}
+        try:
+            # write to a temporary file and rename so that an interrupted run never leaves a partial checkpoint
+            fd, tmpFile = tempfile.mkstemp(suffix='.tmp', dir=gv.gridDir)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpFile, self.checkpointFile)
+        except Exception:
+            QSWATUtils.loginfo('Cannot write HRU checkpoint {0}: {1}'.format(self.checkpointFile, traceback.format_exc()))
+
+    def remove(self) -> None:
+        """Remove stored checkpoint, since the rasters it depends on are about to be rewritten."""
+        try:
+            if os.path.isfile(self.checkpointFile):
+                os.remove(self.checkpointFile)
+        except Exception:
+            QSWATUtils.loginfo('Cannot remove HRU checkpoint {0}: {1}'.format(self.checkpointFile, traceback.format_exc()))
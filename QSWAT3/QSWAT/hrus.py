@@ -49,10 +49,16 @@ import processing
     
 
 from .hrusdialog import HrusDialog  # type: ignore
-from .QSWATUtils import QSWATUtils, FileTypes, ListFuns, fileWriter  # type: ignore
+from .QSWATUtils import QSWATUtils, FileTypes, ListFuns, fileWriter, bufferedFileWriter  # type: ignore
 from .QSWATData import BasinData, HRUData, CellData  # type: ignore
+from .hrutable import HRUTable, HRUPreview  # type: ignore
+from .hrucheckpoint import HRUCheckpoint  # type: ignore
+from .whutables import WHUTableWriter, WHURows  # type: ignore
+from .waterbodies import WaterBodies  # type: ignore
+from .waterbodiesindex import WaterBodiesIndex  # type: ignore
 from .QSWATTopology import QSWATTopology  # type: ignore
 from .parameters import Parameters  # type: ignore
+from .profiling import Profiler  # type: ignore
 from .exempt import Exempt  # type: ignore
 from .split import Split  # type: ignore
 from .elevationbands import ElevationBands  # type: ignore
@@ -197,6 +203,10 @@ class HRUs(QObject):
                 # first check subsFile is up to date
                 subsFile = QSWATUtils.join(self._gv.tablesOutDir, Parameters._SUBS + '.shp')
                 basinFile = basinFile if self._gv.forTNC else self._gv.basinFile
+                if basinFile == '':
+                    # watershed grid was in memory and has been freed, or is to be recreated after merging: 
+                    # it is made from the watershed shapefile, so compare with that
+                    basinFile = self._gv.wshedFile
                 #===================================================================
                 # return QSWATUtils.isUpToDate(self._gv.wshedFile, subsFile) and \
                 #         self._gv.db.tableIsUpToDate(self._gv.wshedFile, 'Watershed') and \
@@ -293,11 +303,12 @@ class HRUs(QObject):
     #         return False
     #===========================================================================
 
+    @Profiler.timed('HRUs.rewriteWHUTables', log=True)
     def rewriteWHUTables(self) -> None:
         """Recreate Watershed, hrus and uncomb tables from basins map.  Used with grid model."""
-        with self._gv.db.connect() as conn:
-            cursor = conn.cursor()
-            (sql1, sql2, sql3, sql4) = self._gv.db.initWHUTables(cursor)
+        writer = WHUTableWriter(self._gv.db)
+        writer.start()
+        try:
             oid = 0
             elevBandId = 0
             for basin, basinData in self.CreateHRUs.basins.items():
@@ -306,7 +317,20 @@ class HRUs(QObject):
                     continue
                 centreX, centreY = self._gv.topo.basinCentroids[basin]
                 centroidll = self._gv.topo.pointToLatLong(QgsPointXY(centreX, centreY))
-                oid, elevBandId = self.writeWHUTables(oid, elevBandId, SWATBasin, basin, basinData, cursor, sql1, sql2, sql3, sql4, centroidll)
+                # elevation histograms are not stored in the project database, so may not be available
+                mapp = self.CreateHRUs.basinElevMap.get(basin, None)
+                elevs = numpy.flatnonzero(mapp) if mapp is not None else numpy.zeros(0, dtype=numpy.int64)
+                if len(elevs) > 0:
+                    minElev = int(self.CreateHRUs.minElev) + int(elevs[0])
+                    maxElev = int(self.CreateHRUs.minElev) + int(elevs[-1])
+                else:
+                    mapp = self.CreateHRUs.newElevMap()
+                    minElev = maxElev = 0
+                oid, elevBandId = self.CreateHRUs.writeWHUTables(oid, elevBandId, SWATBasin, basin, basinData, writer, centroidll, mapp, minElev, maxElev)
+            writer.finish()
+        finally:
+            # stops the writer thread if finish was not reached
+            writer.abort()
     
     def readFiles(self) -> bool:
         """Read landuse and soil data from files 
@@ -397,10 +421,14 @@ class HRUs(QObject):
                         assert actHRUsLayer is not None
                         actHRUsFile = QSWATUtils.layerFileInfo(actHRUsLayer).absoluteFilePath()  # type: ignore
                         QSWATUtils.removeLayer(actHRUsFile, root)
-            time1 = time.process_time()
-            OK = self.CreateHRUs.generateBasins(self._dlg.progressBar, self._dlg.progressLabel, root)
-            time2 = time.process_time()
-            QSWATUtils.loginfo('Generating basins took {0} seconds'.format(int(time2 - time1)))
+            try:
+                OK = self.CreateHRUs.generateBasins(self._dlg.progressBar, self._dlg.progressLabel, root)
+            finally:
+                if self._gv.basinFile.startswith('/vsimem/'):
+                    # in-memory watershed grid is only needed while reading the grids: free it
+                    # and clear name as flag that it needs to be recreated
+                    gdal.Unlink(self._gv.basinFile)
+                    self._gv.basinFile = ''
             self.progress('')
             if not OK:
                 self._dlg.progressBar.setVisible(False)
@@ -434,6 +462,9 @@ class HRUs(QObject):
                     QSWATUtils.information('Writing landuse and soil report ...', True)
                 self.CreateHRUs.printBasins(False, None)
             self._dlg.progressBar.setVisible(False)
+        if not (self._gv.useGridModel and self._gv.isBig):
+            # index potential HRUs now so threshold changes can show their effect immediately
+            self.CreateHRUs.hruPreview()
         self._dlg.fullHRUsLabel.setText('Full HRUs count: {0}'.format(self.CreateHRUs.countFullHRUs()))
         self._dlg.hruChoiceGroup.setEnabled(True)
         self._dlg.areaPercentChoiceGroup.setEnabled(True)
@@ -1019,6 +1050,7 @@ class HRUs(QObject):
             self._gv.setTNCUsersoil()
         return self._gv.db.populateSoilNames(self._gv.soilTable, checkSoils)
     
+    @Profiler.timed('HRUs.calcHRUs', log=True)
     def calcHRUs(self) -> None:
         """Create HRUs."""
         self._gv.writeMasterProgress(-1, 0)
@@ -1061,16 +1093,10 @@ class HRUs(QObject):
             if self._gv.isBatch:
                 QSWATUtils.information('Writing HRUs report ...', True)
             if self._gv.useGridModel and self._gv.isBig:
-                time1 = time.process_time()
                 self.CreateHRUs.writeHRUsAndUncombTables()
-                time2 = time.process_time()
-                QSWATUtils.loginfo('Writing hrus and uncomb tables took {0} seconds'.format(int(time2 - time1)))
             else:
                 self.CreateHRUs.printBasins(True, fullHRUsLayer)  # type: ignore
-            time1 = time.process_time()
             self.CreateHRUs.writeWatershedTable()
-            time2 = time.process_time()
-            QSWATUtils.loginfo('Writing Watershed table took {0} seconds'.format(int(time2 - time1)))
             self._gv.writeMasterProgress(-1, 1)
             msg = 'HRUs done: {0!s} HRUs formed in {1!s} subbasins.'.format(len(self.CreateHRUs.hrus), len(self._gv.topo.basinToSWATBasin))
             self._iface.messageBar().pushMessage(msg, level=Qgis.Info, duration=10)
@@ -1229,6 +1255,25 @@ class HRUs(QObject):
             self._dlg.landuseSlider.setMaximum(minCropVal)
             if 0 <= self.CreateHRUs.landuseVal <= minCropVal:
                 self._dlg.landuseSlider.setValue(int(self.CreateHRUs.landuseVal))
+        self.showPreview()
+        
+    def showPreview(self) -> None:
+        """Show the number of HRUs the current thresholds would give, and the area they would redistribute."""
+        if len(self.CreateHRUs.basins) == 0 or (self._gv.useGridModel and self._gv.isBig):
+            return
+        text = 'Full HRUs count: {0}'.format(self.CreateHRUs.countFullHRUs())
+        if self.CreateHRUs.isMultiple and not self._gv.forTNC:
+            preview = self.CreateHRUs.hruPreview()
+            useArea = self.CreateHRUs.useArea
+            if self.CreateHRUs.isArea:
+                count, removedArea = preview.areaCount(self.CreateHRUs.areaVal, useArea)
+            elif self.CreateHRUs.isTarget:
+                count, removedArea = preview.targetCount(self.CreateHRUs.targetVal, useArea)
+            else:
+                slopeVal = self.CreateHRUs.slopeVal if len(self._gv.db.slopeLimits) > 0 else 0
+                count, removedArea = preview.thresholdCount(self.CreateHRUs.landuseVal, self.CreateHRUs.soilVal, slopeVal, useArea)
+            text += '    Thresholds give {0} HRUs, redistributing {1:.1F} ha'.format(count, removedArea)
+        self._dlg.fullHRUsLabel.setText(text)
             
     def getLanduseFile(self) -> None:
         """Load landuse file."""
@@ -1286,6 +1331,7 @@ class HRUs(QObject):
         except Exception:
             return
         self._dlg.createButton.setEnabled(True)
+        self.showPreview()
         
     def changeAreaThreshold(self) -> None:
         """Change area threshold and slider."""
@@ -1308,6 +1354,7 @@ class HRUs(QObject):
             self._dlg.landuseVal.moveCursor(QTextCursor.MoveOperation.End)
         except Exception:
             return
+        self.showPreview()
         
     def changeLanduseThreshold(self) -> None:
         """Change landuse value and slider."""
@@ -1329,6 +1376,7 @@ class HRUs(QObject):
             self._dlg.soilVal.moveCursor(QTextCursor.MoveOperation.End)
         except Exception:
             return
+        self.showPreview()
         
     def changeSoilThreshold(self) -> None:
         """Change soil value and slider."""
@@ -1350,6 +1398,7 @@ class HRUs(QObject):
             self._dlg.slopeVal.moveCursor(QTextCursor.MoveOperation.End)
         except Exception:
             return
+        self.showPreview()
         
     def changeSlopeThreshold(self) -> None:
         """Change slope value and slider."""
@@ -1369,6 +1418,7 @@ class HRUs(QObject):
             self._dlg.targetVal.moveCursor(QTextCursor.MoveOperation.End)
         except Exception:
             return
+        self.showPreview()
         
     def changeTargetThreshold(self) -> None:
         """Change slope value and slider."""
@@ -1689,18 +1739,24 @@ class CreateHRUs(QObject):
         self.basins: Dict[int, BasinData] = dict()
         ## Map of hru number to hru data
         self.hrus: Dict[int, HRUData] = dict()
+        ## columnar table of potential HRUs, built when first needed and discarded when basins change
+        self._hruTable: Optional[HRUTable] = None
+        ## threshold preview index for _hruTable
+        self._hruPreview: Optional[HRUPreview] = None
         self._gv = gv
         self._reportsCombo = reportsCombo
+        ## reports deferred in batch mode: True for HRUs report, False for landuse/soil/slope report
+        self.deferredReports: List[bool] = []
         ## Minimum elevation in watershed
         self.minElev = 0.0
         ## Array of elevation frequencies for whole watershed
         # Index i in array corresponds to elevation elevationGrid.Minimum + i.
         # Used to generate elevation report.
-        self.elevMap: List[int] = []
+        self.elevMap: numpy.ndarray = numpy.zeros(0, dtype=numpy.int64)
         ## Map from basin number to array of elevation frequencies.
         # Index i in array corresponds to elevation minElev + i.
         # Used to generate elevation report.
-        self.basinElevMap: Dict[int, List[int]] = dict()
+        self.basinElevMap: Dict[int, numpy.ndarray] = dict()
         ## Map from SWAT basin number to list of (start of band elevation, mid point, percent of subbasin area) pairs.
         # List is None if bands not wanted or maximum elevation of subbasin below threshold.
         self.basinElevBands: Dict[int, Optional[List[Tuple[float, float, float]]]] = dict()
@@ -1737,10 +1793,23 @@ class CreateHRUs(QObject):
     ## Signal for progress messages       
     progress_signal = pyqtSignal(str)
         
+    @Profiler.timed('CreateHRUs.generateBasins', log=True)
     def generateBasins(self, progressBar: QProgressBar, progressLabel: QLabel, root: QgsLayerTree) -> bool:
         """Generate basin data from watershed, landuse, soil and slope grids."""
         # in case this is a rerun
         self.basins.clear()
+        checkpoint: Optional[HRUCheckpoint] = None
+        if HRUCheckpoint.isApplicable(self._gv, self.fullHRUsWanted):
+            checkpoint = HRUCheckpoint(self._gv)
+            if checkpoint.restore(self):
+                QSWATUtils.loginfo('Basin data restored from {0}'.format(checkpoint.checkpointFile))
+                # repeat the landuse and soil cover warnings given when the rasters were read
+                OK, under95 = self.reportCoverage(checkpoint.coverage())
+                if not OK:
+                    return False
+                return self.writeBasins(progressLabel, dict(), under95)
+            # rasters it checks are about to be rewritten
+            checkpoint.remove()
         elevationDs = gdal.Open(self._gv.demFile, gdal.GA_ReadOnly)
         if not elevationDs:
             QSWATUtils.error('Cannot open DEM {0}'.format(self._gv.demFile), self._gv.isBatch)
@@ -1751,6 +1820,7 @@ class CreateHRUs(QObject):
             return False
         basinNumberRows = basinDs.RasterYSize
         basinNumberCols = basinDs.RasterXSize
+        Profiler.setCount(basinNumberRows * basinNumberCols)
         fivePercent = int(basinNumberRows / 20)
         basinTransform = basinDs.GetGeoTransform()
         basinBand = basinDs.GetRasterBand(1)
@@ -1959,8 +2029,7 @@ class CreateHRUs(QObject):
             maxElev = globalMaxElev
         else:
             maxElev = int(maxElev)
-        elevMapSize = 1 + maxElev - self.minElev
-        self.elevMap = [0] * elevMapSize
+        self.elevMap = numpy.zeros(1 + maxElev - self.minElev, dtype=numpy.int64)
         
         # We read raster data in complete rows, using several rows for the grid model if necessary.
         # Complete rows should be reasonably efficient, and for the grid model
@@ -2037,237 +2106,237 @@ class CreateHRUs(QObject):
             else:
                 waterSoil = -1
                 waterSoils = set()
+            # landuse and soil columns are the same for every row, so calculate them once
+            cropCols, cropColsOK = CreateHRUs.mappedCols(cropColFun, elevationTransform, elevationNumberCols, cropNumberCols)
+            soilCols, soilColsOK = CreateHRUs.mappedCols(soilColFun, elevationTransform, elevationNumberCols, soilNumberCols)
+            writer: Optional[WHUTableWriter] = None
             if self._gv.isBig:
-                conn = self._gv.db.connect()
-                cursor = conn.cursor()
-                (sql1, sql2, sql3, sql4) = self._gv.db.initWHUTables(cursor)
+                writer = WHUTableWriter(self._gv.db)
+                writer.start()
                 oid = 0
                 elevBandId = 0
-            fivePercent = int(len(self._gv.topo.basinToSWATBasin) / 20)
-            gridCount = 0
-            for link, basin in self._gv.topo.linkToBasin.items():
-                self.basinElevMap[basin] = [0] * elevMapSize
-                SWATBasin = self._gv.topo.basinToSWATBasin.get(basin, 0)
-                if SWATBasin == 0:
-                    continue
-                if progressCount == fivePercent:
-                    progressBar.setValue(progressBar.value() + 5)
-                    if self._gv.forTNC:
-                        print('Percentage of rasters read: {0} at {1}'.format(progressBar.value(), str(datetime.now())))
-                    progressCount = 1
-                else:
-                    progressCount += 1
-                gridCount += 1
-                reachData = self._gv.topo.reachesData[link]
-                # centroid was taken from accumulation grid, but does not matter since in projected units
-                centreX, centreY = self._gv.topo.basinCentroids[basin]
-                centroidll = self._gv.topo.pointToLatLong(QgsPointXY(centreX, centreY))
-                n = elevationReadRows
-                # each grid subbasin contains n x n DEM cells
-                if n % 2 == 0:
-                    # even number of rows and columns - start half a row and column NW of centre
-                    (centreCol, centreRow) = QSWATTopology.projToCell(centreX - elevationTransform[1] / 2.0, centreY - elevationTransform[5] / 2.0, elevationTransform)
-                    elevationTopRow = centreRow - (n - 2) // 2
-                    # beware of rows or columns not dividing by n:
-                    # last grid row or column may be short
-                    rowRange = range(elevationTopRow, min(centreRow + (n + 2) // 2, elevationNumberRows))
-                    colRange = range(centreCol - (n - 2) // 2, min(centreCol + (n + 2) // 2, elevationNumberCols))
-                else:
-                    # odd number of rows and columns
-                    (centreCol, centreRow) = QSWATTopology.projToCell(centreX, centreY, elevationTransform)
-                    elevationTopRow = centreRow - (n - 1) // 2
-                    # beware of rows or columns not dividing by n:
-                    # last grid row or column may be short
-                    rowRange = range(elevationTopRow, min(centreRow + (n + 1) // 2, elevationNumberRows))
-                    colRange = range(centreCol - (n - 1) // 2, min(centreCol + (n + 1) // 2, elevationNumberCols))
-                (outletCol, outletRow) = QSWATTopology.projToCell(reachData.lowerX, reachData.lowerY, elevationTransform)
-                (sourceCol, sourceRow) = QSWATTopology.projToCell(reachData.upperX, reachData.upperY, elevationTransform)
-                # QSWATUtils.loginfo('Outlet at ({0:.0F},{1:.0F}) for source at ({2:.0F},{3:.0F})'.format(reachData.lowerX, reachData.lowerY, reachData.upperX, reachData.upperY))
-                outletElev = reachData.lowerZ
-                # allow for upper < lower in case unfilled dem is used
-                drop = 0 if reachData.upperZ < outletElev else reachData.upperZ - outletElev
-                length = self._gv.topo.streamLengths[link]
-                if length == 0: # is zero for outlet grid cells
-                    length = elevationTransform[1] # x-size of DEM cell
-                data = BasinData(outletCol, outletRow, outletElev, sourceCol, sourceRow, length, drop, minDist, self._gv.isBatch)
-                # add drainage areas
-                data.drainArea = self._gv.topo.drainAreas[link]
-                maxGridElev = -419
-                minGridElev = 8849
-                # read data if necessary
-                if elevationTopRow != elevationCurrentRow:
-                    if self.fullHRUsWanted and lastHru > 0: # something has been written to hruRows
-                        for rowNum in range(n):
-                            shapes.addRow(hruRows[rowNum], elevationCurrentRow + rowNum)
-                        hruRows.fill(-1)
-                    elevationData = elevationBand.ReadAsArray(0, elevationTopRow, elevationNumberCols, min(elevationReadRows, elevationNumberRows - elevationTopRow))
-                    elevationCurrentRow = elevationTopRow
-                topY = QSWATTopology.rowToY(elevationTopRow, elevationTransform)
-                cropTopRow = cropRowFun(elevationTopRow, topY)
-                if cropTopRow != cropCurrentRow:
-                    if 0 <= cropTopRow <= cropNumberRows - cropReadRows:
-                        cropData = cropBand.ReadAsArray(0, cropTopRow, cropNumberCols, cropReadRows)
-                        cropActReadRows = cropReadRows
-                        cropCurrentRow = cropTopRow
-                    elif cropNumberRows - cropTopRow < cropReadRows:
-                        # runnning off the bottom of crop map
-                        cropActReadRows = cropNumberRows - cropTopRow
-                        if cropActReadRows >= 1:
-                            cropData = cropBand.ReadAsArray(0, cropTopRow, cropNumberCols, cropActReadRows)
-                            cropCurrentRow = cropTopRow
-                    else:
-                        cropActReadRows = 0
-                soilTopRow = soilRowFun(elevationTopRow, topY)
-                if soilTopRow != soilCurrentRow:
-                    if 0 <= soilTopRow <= soilNumberRows - soilReadRows:
-                        soilData = soilBand.ReadAsArray(0, soilTopRow, soilNumberCols, soilReadRows)
-                        soilActReadRows = soilReadRows
-                        soilCurrentRow = soilTopRow
-                    elif soilNumberRows - soilTopRow < soilReadRows:
-                        # runnning off the bottom of soil map
-                        soilActReadRows = soilNumberRows - soilTopRow
-                        if soilActReadRows >= 1:
-                            soilData = soilBand.ReadAsArray(0, soilTopRow, soilNumberCols, soilActReadRows)
-                            soilCurrentRow = soilTopRow
+            try:
+                fivePercent = int(len(self._gv.topo.basinToSWATBasin) / 20)
+                gridCount = 0
+                for link, basin in self._gv.topo.linkToBasin.items():
+                    self.basinElevMap[basin] = self.newElevMap()
+                    SWATBasin = self._gv.topo.basinToSWATBasin.get(basin, 0)
+                    if SWATBasin == 0:
+                        continue
+                    if progressCount == fivePercent:
+                        progressBar.setValue(progressBar.value() + 5)
+                        if self._gv.forTNC:
+                            print('Percentage of rasters read: {0} at {1}'.format(progressBar.value(), str(datetime.now())))
+                        progressCount = 1
                     else:
-                        soilActReadRows = 0
-                slopeTopRow = slopeRowFun(elevationTopRow, topY)
-                if slopeTopRow != slopeCurrentRow:
-                    if 0 <= slopeTopRow <= slopeNumberRows - slopeReadRows:
-                        slopeData = slopeBand.ReadAsArray(0, slopeTopRow, slopeNumberCols, slopeReadRows)
-                        slopeActReadRows = slopeReadRows
-                        slopeCurrentRow = slopeTopRow
-                    elif slopeNumberRows - slopeTopRow < slopeReadRows:
-                        # runnning off the bottom of slope map
-                        slopeActReadRows = slopeNumberRows - slopeTopRow
-                        if slopeActReadRows >= 1:
-                            slopeData = slopeBand.ReadAsArray(0, slopeTopRow, slopeNumberCols, slopeActReadRows)
-                            slopeCurrentRow = slopeTopRow
+                        progressCount += 1
+                    gridCount += 1
+                    reachData = self._gv.topo.reachesData[link]
+                    # centroid was taken from accumulation grid, but does not matter since in projected units
+                    centreX, centreY = self._gv.topo.basinCentroids[basin]
+                    centroidll = self._gv.topo.pointToLatLong(QgsPointXY(centreX, centreY))
+                    n = elevationReadRows
+                    # each grid subbasin contains n x n DEM cells
+                    if n % 2 == 0:
+                        # even number of rows and columns - start half a row and column NW of centre
+                        (centreCol, centreRow) = QSWATTopology.projToCell(centreX - elevationTransform[1] / 2.0, centreY - elevationTransform[5] / 2.0, elevationTransform)
+                        elevationTopRow = centreRow - (n - 2) // 2
+                        # beware of rows or columns not dividing by n:
+                        # last grid row or column may be short
+                        rowRange = range(elevationTopRow, min(centreRow + (n + 2) // 2, elevationNumberRows))
+                        colRange = range(centreCol - (n - 2) // 2, min(centreCol + (n + 2) // 2, elevationNumberCols))
                     else:
-                        slopeActReadRows = 0
-                for row in rowRange:
-                    y = QSWATTopology.rowToY(row, elevationTransform)
-                    cropRow = cropRowFun(row, y)
-                    soilRow = soilRowFun(row, y)
-                    slopeRow = slopeRowFun(row, y)
-                    for col in colRange:
-                        elevation = cast(float, elevationData[row - elevationTopRow, col])
-                        if elevation != elevationNoData:
-                            elevation = int(elevation * self._gv.verticalFactor)
-                            maxGridElev = max(maxGridElev, elevation)
-                            minGridElev = min(minGridElev, elevation)
-                            index = elevation - self.minElev
-                            # can have index too large because max not calculated properly by gdal
-                            if index >= elevMapSize:
-                                extra = 1 + index - elevMapSize
-                                self.elevMap += [0] * extra
-                                elevMapSize += extra
-                            self.elevMap[index] += 1
-                            self.basinElevMap[basin][index] += 1
-                        if self.fullHRUsWanted:
-                            if basin in basinCropSoilSlopeNumbers:
-                                cropSoilSlopeNumbers = basinCropSoilSlopeNumbers[basin]
-                            else:
-                                cropSoilSlopeNumbers = dict()
-                                basinCropSoilSlopeNumbers[basin] = cropSoilSlopeNumbers
-                        x = QSWATTopology.colToX(col, elevationTransform)
-                        dist = distNoData
-                        if 0 <= cropRow - cropTopRow < cropActReadRows:
-                            cropCol = cropColFun(col, x)
-                            if 0 <= cropCol < cropNumberCols:
-                                crop = cast(int, cropData[cropRow - cropTopRow, cropCol])
-                                if crop is None or math.isnan(crop):
-                                    crop = cropNoData
-                            else:
-                                crop = cropNoData 
-                        else:
-                            crop = cropNoData
-                        if cropIsNoDataFun(crop):
-                            landuseNoDataCount += 1
-                            # when using grid model small amounts of
-                            # no data for crop, soil or slope could lose subbasin
-                            crop = self._gv.db.defaultLanduse
-                        else:
-                            landuseCount += 1
-                        # use an equivalent landuse if any
-                        crop = self._gv.db.translateLanduse(int(crop))
-                        if 0 <= soilRow - soilTopRow < soilActReadRows:
-                            soilCol = soilColFun(col, x)
-                            if 0 <= soilCol < soilNumberCols:
-                                soil = cast(int, soilData[soilRow - soilTopRow, soilCol])
-                                if soil is None or math.isnan(soil):
-                                    soil = soilNoData
-                            else:
-                                soil = soilNoData 
+                        # odd number of rows and columns
+                        (centreCol, centreRow) = QSWATTopology.projToCell(centreX, centreY, elevationTransform)
+                        elevationTopRow = centreRow - (n - 1) // 2
+                        # beware of rows or columns not dividing by n:
+                        # last grid row or column may be short
+                        rowRange = range(elevationTopRow, min(centreRow + (n + 1) // 2, elevationNumberRows))
+                        colRange = range(centreCol - (n - 1) // 2, min(centreCol + (n + 1) // 2, elevationNumberCols))
+                    (outletCol, outletRow) = QSWATTopology.projToCell(reachData.lowerX, reachData.lowerY, elevationTransform)
+                    (sourceCol, sourceRow) = QSWATTopology.projToCell(reachData.upperX, reachData.upperY, elevationTransform)
+                    # QSWATUtils.loginfo('Outlet at ({0:.0F},{1:.0F}) for source at ({2:.0F},{3:.0F})'.format(reachData.lowerX, reachData.lowerY, reachData.upperX, reachData.upperY))
+                    outletElev = reachData.lowerZ
+                    # allow for upper < lower in case unfilled dem is used
+                    drop = 0 if reachData.upperZ < outletElev else reachData.upperZ - outletElev
+                    length = self._gv.topo.streamLengths[link]
+                    if length == 0: # is zero for outlet grid cells
+                        length = elevationTransform[1] # x-size of DEM cell
+                    data = BasinData(outletCol, outletRow, outletElev, sourceCol, sourceRow, length, drop, minDist, self._gv.isBatch)
+                    # add drainage areas
+                    data.drainArea = self._gv.topo.drainAreas[link]
+                    maxGridElev = -419
+                    minGridElev = 8849
+                    # read data if necessary
+                    if elevationTopRow != elevationCurrentRow:
+                        if self.fullHRUsWanted and lastHru > 0: # something has been written to hruRows
+                            for rowNum in range(n):
+                                shapes.addRow(hruRows[rowNum], elevationCurrentRow + rowNum)
+                            hruRows.fill(-1)
+                        elevationData = elevationBand.ReadAsArray(0, elevationTopRow, elevationNumberCols, min(elevationReadRows, elevationNumberRows - elevationTopRow))
+                        elevationCurrentRow = elevationTopRow
+                    # elevation histogram for the grid cell
+                    elevationBlock = elevationData[numpy.ix_(numpy.arange(rowRange.start, rowRange.stop) - elevationTopRow, 
+                                                             numpy.arange(colRange.start, colRange.stop))]
+                    gridElevations = (elevationBlock[elevationBlock != elevationNoData] * self._gv.verticalFactor).astype(numpy.int64)
+                    if gridElevations.size > 0:
+                        maxGridElev = max(maxGridElev, int(gridElevations.max()))
+                        minGridElev = min(minGridElev, int(gridElevations.min()))
+                        self.addBasinElevations(basin, gridElevations)
+                    topY = QSWATTopology.rowToY(elevationTopRow, elevationTransform)
+                    cropTopRow = cropRowFun(elevationTopRow, topY)
+                    if cropTopRow != cropCurrentRow:
+                        if 0 <= cropTopRow <= cropNumberRows - cropReadRows:
+                            cropData = cropBand.ReadAsArray(0, cropTopRow, cropNumberCols, cropReadRows)
+                            cropActReadRows = cropReadRows
+                            cropCurrentRow = cropTopRow
+                        elif cropNumberRows - cropTopRow < cropReadRows:
+                            # runnning off the bottom of crop map
+                            cropActReadRows = cropNumberRows - cropTopRow
+                            if cropActReadRows >= 1:
+                                cropData = cropBand.ReadAsArray(0, cropTopRow, cropNumberCols, cropActReadRows)
+                                cropCurrentRow = cropTopRow
                         else:
-                            soil = soilNoData
-                        if soilIsNoDataFun(soil):
-                            soilIsNoData = True
-                            # when using grid model small amounts of
-                            # no data for crop, soil or slope could lose subbasin
-                            soil = self._gv.db.defaultSoil
+                            cropActReadRows = 0
+                    soilTopRow = soilRowFun(elevationTopRow, topY)
+                    if soilTopRow != soilCurrentRow:
+                        if 0 <= soilTopRow <= soilNumberRows - soilReadRows:
+                            soilData = soilBand.ReadAsArray(0, soilTopRow, soilNumberCols, soilReadRows)
+                            soilActReadRows = soilReadRows
+                            soilCurrentRow = soilTopRow
+                        elif soilNumberRows - soilTopRow < soilReadRows:
+                            # runnning off the bottom of soil map
+                            soilActReadRows = soilNumberRows - soilTopRow
+                            if soilActReadRows >= 1:
+                                soilData = soilBand.ReadAsArray(0, soilTopRow, soilNumberCols, soilActReadRows)
+                                soilCurrentRow = soilTopRow
                         else:
-                            soilIsNoData = False
-                        # use an equivalent soil if any
-                        soil, OK = self._gv.db.translateSoil(int(soil))
-                        if soilIsNoData:
-                            soilNoDataCount += 1
-                        elif OK:
-                            soilDefinedCount += 1
+                            soilActReadRows = 0
+                    slopeTopRow = slopeRowFun(elevationTopRow, topY)
+                    if slopeTopRow != slopeCurrentRow:
+                        if 0 <= slopeTopRow <= slopeNumberRows - slopeReadRows:
+                            slopeData = slopeBand.ReadAsArray(0, slopeTopRow, slopeNumberCols, slopeReadRows)
+                            slopeActReadRows = slopeReadRows
+                            slopeCurrentRow = slopeTopRow
+                        elif slopeNumberRows - slopeTopRow < slopeReadRows:
+                            # runnning off the bottom of slope map
+                            slopeActReadRows = slopeNumberRows - slopeTopRow
+                            if slopeActReadRows >= 1:
+                                slopeData = slopeBand.ReadAsArray(0, slopeTopRow, slopeNumberCols, slopeActReadRows)
+                                slopeCurrentRow = slopeTopRow
                         else:
-                            soilUndefinedCount += 1
-                        isWater = False
-                        if crop != cropNoData:
-                            cropCode = self._gv.db.getLanduseCode(crop)
-                            isWater = cropCode == 'WATR' 
-                        if waterSoil > 0:
-                            if isWater:
-                                soil = waterSoil
-                            elif soil in waterSoils:
-                                isWater = True 
-                                soil = waterSoil
-                                if crop == cropNoData or cropCode not in Parameters._TNCWATERLANDUSES:
-                                    crop = self._gv.db.getLanduseCat('WATR')
-                        if 0 <= slopeRow - slopeTopRow < slopeActReadRows:
-                            slopeCol = slopeColFun(col, x)
-                            if 0 <= slopeCol < slopeNumberCols:
-                                slopeValue = cast(float, slopeData[slopeRow - slopeTopRow, slopeCol])
+                            slopeActReadRows = 0
+                    colIndexes = numpy.array(colRange, dtype=numpy.int64)
+                    for row in rowRange:
+                        y = QSWATTopology.rowToY(row, elevationTransform)
+                        cropRow = cropRowFun(row, y)
+                        soilRow = soilRowFun(row, y)
+                        slopeRow = slopeRowFun(row, y)
+                        # translate the landuses and soils of the row, once for each distinct value
+                        # when using grid model small amounts of
+                        # no data for crop, soil or slope could lose subbasin, so use defaults
+                        rowCrops = CreateHRUs.rowValues(cropData, cropRow - cropTopRow, cropActReadRows, 
+                                                        cropCols[colIndexes], cropColsOK[colIndexes], cropNoData, cropIsNoDataFun)
+                        rowCropsNoData = rowCrops == cropNoData
+                        rowCrops = self._gv.db.translateLanduseArray(numpy.where(rowCropsNoData, self._gv.db.defaultLanduse, rowCrops), cropNoData)
+                        rowCropCodes = self._gv.db.landuseCodeArray(rowCrops, cropNoData)
+                        rowSoils = CreateHRUs.rowValues(soilData, soilRow - soilTopRow, soilActReadRows, 
+                                                        soilCols[colIndexes], soilColsOK[colIndexes], soilNoData, soilIsNoDataFun)
+                        rowSoilsNoData = rowSoils == soilNoData
+                        rowSoils, rowSoilsOK = self._gv.db.translateSoilArray(numpy.where(rowSoilsNoData, self._gv.db.defaultSoil, rowSoils), soilNoData)
+                        for i, col in enumerate(colRange):
+                            elevation = cast(float, elevationData[row - elevationTopRow, col])
+                            if elevation != elevationNoData:
+                                elevation = int(elevation * self._gv.verticalFactor)
+                            if self.fullHRUsWanted:
+                                if basin in basinCropSoilSlopeNumbers:
+                                    cropSoilSlopeNumbers = basinCropSoilSlopeNumbers[basin]
+                                else:
+                                    cropSoilSlopeNumbers = dict()
+                                    basinCropSoilSlopeNumbers[basin] = cropSoilSlopeNumbers
+                            x = QSWATTopology.colToX(col, elevationTransform)
+                            dist = distNoData
+                            if rowCropsNoData[i]:
+                                landuseNoDataCount += 1
                             else:
-                                slopeValue = slopeNoData 
-                        else:
-                            slopeValue = slopeNoData
-                        if slopeValue == slopeNoData:
-                            # slopes will be nodata in pits
-                            slopeValue = Parameters._DEFAULTSLOPE
-                        elif self._gv.fromGRASS:
-                            # GRASS slopes are percentages
-                            slopeValue /= 100
-                        if crop == self._gv.db.getLanduseCat('RICE'):
-                            slopeValue = min(slopeValue, Parameters._RICEMAXSLOPE)
-                        slope = self._gv.db.slopeIndex(slopeValue * 100)
-                        # set water or wetland pixels to have slope at most WATERMAXSLOPE
-                        if isWater or cropCode in Parameters._TNCWATERLANDUSES:
-                            slopeValue = min(slopeValue, Parameters._WATERMAXSLOPE)
-                            slope = 0
-                        data.addCell(crop, soil, slope, self._gv.cellArea, elevation, slopeValue, dist, self._gv)
-                        if not self._gv.isBig:
-                            self.basins[basin] = data
-                        if self.fullHRUsWanted:
-                            if crop != cropNoData and soil != soilNoData and slope != slopeNoData:
-                                hru = BasinData.getHruNumber(cropSoilSlopeNumbers, lastHru, crop, soil, slope)
-                                if hru > lastHru:
-                                    # new HRU number: store it
-                                    lastHru = hru
-                                hruRows[row - elevationTopRow, col] = hru
-                data.setAreas(True)
+                                landuseCount += 1
+                            # landuse already translated to an equivalent landuse if any
+                            crop = int(rowCrops[i])
+                            soilIsNoData = bool(rowSoilsNoData[i])
+                            # soil already translated to an equivalent soil if any
+                            soil, OK = int(rowSoils[i]), bool(rowSoilsOK[i])
+                            if soilIsNoData:
+                                soilNoDataCount += 1
+                            elif OK:
+                                soilDefinedCount += 1
+                            else:
+                                soilUndefinedCount += 1
+                            isWater = False
+                            if crop != cropNoData:
+                                cropCode = rowCropCodes[i]
+                                isWater = cropCode == 'WATR' 
+                            if waterSoil > 0:
+                                if isWater:
+                                    soil = waterSoil
+                                elif soil in waterSoils:
+                                    isWater = True 
+                                    soil = waterSoil
+                                    if crop == cropNoData or cropCode not in Parameters._TNCWATERLANDUSES:
+                                        crop = self._gv.db.getLanduseCat('WATR')
+                            if 0 <= slopeRow - slopeTopRow < slopeActReadRows:
+                                slopeCol = slopeColFun(col, x)
+                                if 0 <= slopeCol < slopeNumberCols:
+                                    slopeValue = cast(float, slopeData[slopeRow - slopeTopRow, slopeCol])
+                                else:
+                                    slopeValue = slopeNoData 
+                            else:
+                                slopeValue = slopeNoData
+                            if slopeValue == slopeNoData:
+                                # slopes will be nodata in pits
+                                slopeValue = Parameters._DEFAULTSLOPE
+                            elif self._gv.fromGRASS:
+                                # GRASS slopes are percentages
+                                slopeValue /= 100
+                            if crop == self._gv.db.getLanduseCat('RICE'):
+                                slopeValue = min(slopeValue, Parameters._RICEMAXSLOPE)
+                            slope = self._gv.db.slopeIndex(slopeValue * 100)
+                            # set water or wetland pixels to have slope at most WATERMAXSLOPE
+                            if isWater or cropCode in Parameters._TNCWATERLANDUSES:
+                                slopeValue = min(slopeValue, Parameters._WATERMAXSLOPE)
+                                slope = 0
+                            data.addCell(crop, soil, slope, self._gv.cellArea, elevation, slopeValue, dist, self._gv)
+                            if not self._gv.isBig:
+                                self.basins[basin] = data
+                            if self.fullHRUsWanted:
+                                if crop != cropNoData and soil != soilNoData and slope != slopeNoData:
+                                    hru = BasinData.getHruNumber(cropSoilSlopeNumbers, lastHru, crop, soil, slope)
+                                    if hru > lastHru:
+                                        # new HRU number: store it
+                                        lastHru = hru
+                                    hruRows[row - elevationTopRow, col] = hru
+                    data.setAreas(True)
+                    if self._gv.isBig:
+                        assert writer is not None
+                        oid, elevBandId = self.writeWHUTables(oid, elevBandId, SWATBasin, basin, data, writer, centroidll, self.basinElevMap[basin], minGridElev, maxGridElev)
                 if self._gv.isBig:
-                    oid, elevBandId = self.writeWHUTables(oid, elevBandId, SWATBasin, basin, data, cursor, sql1, sql2, sql3, sql4, centroidll, self.basinElevMap[basin], minGridElev, maxGridElev)
-            if self._gv.isBig:
-                conn.commit()
-                del cursor
-                del conn
-                self.writeGridSubsFile()
+                    assert writer is not None
+                    writer.finish()
+                    self.writeGridSubsFile()
+            finally:
+                if writer is not None:
+                    # stops the writer thread if finish was not reached
+                    writer.abort()
         else:  # not grid model  
+            # elevation, landuse and soil columns are the same for every row, so calculate them once
+            elevationCols, elevationColsOK = CreateHRUs.mappedCols(elevationColFun, basinTransform, basinNumberCols, elevationNumberCols)
+            cropCols, cropColsOK = CreateHRUs.mappedCols(cropColFun, basinTransform, basinNumberCols, cropNumberCols)
+            soilCols, soilColsOK = CreateHRUs.mappedCols(soilColFun, basinTransform, basinNumberCols, soilNumberCols)
+            waterLanduses = list(Parameters._WATERLANDUSES)
+            upstreamBasins = numpy.array([basin for basin, link in self._gv.topo.basinToLink.items() if link in self._gv.topo.upstreamFromInlets])
+            # (basin, elevation) pairs accumulated over blocks of rows before adding to elevation histograms
+            blockBasins: List[numpy.ndarray] = []
+            blockElevations: List[numpy.ndarray] = []
+            blockSize = 0
             # tic = time.perf_counter()            
             for row in range(basinNumberRows):
                 if progressCount == fivePercent:
@@ -2298,19 +2367,33 @@ class CreateHRUs(QObject):
                 if 0 <= slopeRow < slopeNumberRows and slopeRow != slopeCurrentRow:
                     if len(self._gv.db.slopeLimits) > 0 and 0 <= slopeCurrentRow < slopeNumberRows:
                         # generate slope bands data and write it before reading next row
-                        for i in range(slopeNumberCols):
-                            slopeValue = cast(float, slopeData[0, i])
-                            # slopes will be nodata in pits
-                            if slopeValue == slopeNoData:
-                                slopeValue = Parameters._DEFAULTSLOPE
-                            slopeData[0, i] = self._gv.db.slopeIndex(slopeValue * 100)
-                        slopeBandsBand.WriteArray(slopeData, 0, slopeCurrentRow)
+                        # slopes will be nodata in pits
+                        slopeValues = numpy.where(slopeData == slopeNoData, Parameters._DEFAULTSLOPE, slopeData)
+                        slopeBandsBand.WriteArray(self._gv.db.slopeIndexArray(slopeValues * 100), 0, slopeCurrentRow)
                     slopeCurrentRow = slopeRow
                     slopeData = slopeBand.ReadAsArray(0, slopeRow, slopeNumberCols, 1)
                 elevationRow = elevationRowFun(row, y)
                 if 0 <= elevationRow < elevationNumberRows and elevationRow != elevationCurrentRow:
                     elevationCurrentRow = elevationRow
                     elevationData = elevationBand.ReadAsArray(0, elevationRow, elevationNumberCols, 1)
+                # translate the landuses and soils of the row's cells in the watershed, once for each distinct value
+                inWatershed = (basinData[0] != basinNoData) & ~numpy.isin(basinData[0], upstreamBasins)
+                rowCrops = CreateHRUs.rowValues(cropData, 0 if 0 <= cropRow < cropNumberRows else -1, 1, 
+                                                cropCols, cropColsOK, cropNoData, cropIsNoDataFun)
+                # landuse maps used for HUC models have 0 in Canada
+                # so to prevent messages about 0 not recognised as a landuse
+                if self._gv.isHUC or self._gv.isHAWQS:
+                    rowCrops[rowCrops == 0] = cropNoData
+                rowCrops = self._gv.db.translateLanduseArray(numpy.where(inWatershed, rowCrops, cropNoData), cropNoData)
+                rowCropCodes = self._gv.db.landuseCodeArray(rowCrops, cropNoData)
+                rowSoils = CreateHRUs.rowValues(soilData, 0 if 0 <= soilRow < soilNumberRows else -1, 1, 
+                                                soilCols, soilColsOK, soilNoData, soilIsNoDataFun)
+                rowSoils = numpy.where(inWatershed, rowSoils, soilNoData)
+                # water soils, and with SSURGO soils of water landuses, are not translated
+                untranslated = rowSoils == Parameters._SSURGOWater
+                if self._gv.db.useSSURGO:
+                    untranslated |= numpy.isin(rowCropCodes.astype(str), waterLanduses)
+                rowTranslatedSoils, rowSoilsOK = self._gv.db.translateSoilArray(numpy.where(untranslated, soilNoData, rowSoils), soilNoData)
                 for col in range(basinNumberCols):
                     basin = basinData[0, col]
                     if basin != basinNoData and not self._gv.topo.isUpstreamBasin(basin):
@@ -2331,34 +2414,17 @@ class CreateHRUs(QObject):
                                 dist = distNoData
                         else:
                             dist = distNoData
-                        cropCol = cropColFun(col, x)
-                        if 0 <= cropCol < cropNumberCols and 0 <= cropRow < cropNumberRows:
-                            crop = cast(int, cropData[0, cropCol])
-                            if cropIsNoDataFun(crop):
-                                crop = cropNoData
-                        else:
-                            crop = cropNoData
-                        # landuse maps used for HUC models have 0 in Canada
-                        # so to prevent messages about 0 not recognised as a landuse
-                        if (self._gv.isHUC or self._gv.isHAWQS) and crop == 0:
-                            crop = cropNoData
+                        # landuse already translated to an equivalent landuse if any
+                        crop = int(rowCrops[col])
                         if crop == cropNoData:
                             landuseNoDataCount += 1
                         else:
                             landuseCount += 1
-                            # use an equivalent landuse if any
-                            crop = self._gv.db.translateLanduse(int(crop))
                         isWet = False
                         if crop != cropNoData:
-                            cropCode = self._gv.db.getLanduseCode(crop)
+                            cropCode = rowCropCodes[col]
                             isWet = cropCode in Parameters._WATERLANDUSES 
-                        soilCol = soilColFun(col, x)
-                        if 0 <= soilCol < soilNumberCols and 0 <= soilRow < soilNumberRows:
-                            soil = cast(int, soilData[0, soilCol])
-                            if soilIsNoDataFun(soil):
-                                soil = soilNoData
-                        else:
-                            soil = soilNoData
+                        soil = int(rowSoils[col])
                         # make sure crop and soil do not conflict about water
                         if self._gv.db.useSSURGO:
                             if isWet:
@@ -2375,8 +2441,8 @@ class CreateHRUs(QObject):
                             if soil == Parameters._SSURGOWater:
                                 OK = True 
                             else:   
-                                # use an equivalent soil if any
-                                soil, OK = self._gv.db.translateSoil(int(soil))
+                                # equivalent soil if any
+                                soil, OK = int(rowTranslatedSoils[col]), bool(rowSoilsOK[col])
                         if soilIsNoData:
                             soilNoDataCount += 1
                         elif OK:
@@ -2416,7 +2482,7 @@ class CreateHRUs(QObject):
                             data = self.basins[basin]
                         else:
                             # new basin
-                            self.basinElevMap[basin] = [0] * elevMapSize
+                            self.basinElevMap[basin] = self.newElevMap()
                             link = self._gv.topo.basinToLink[basin]
                             reachData = self._gv.topo.reachesData[link]
                             if reachData is None:   # could, eg, be outside DEM.  Invent some default values
@@ -2454,21 +2520,6 @@ class CreateHRUs(QObject):
                             if streamBuffer is not None and streamBuffer.contains(pt):
                                 WATRInStreamArea += self._gv.cellArea
                                 basinStreamWaterData[basin] = (streamBuffer, streamArea, WATRInStreamArea)
-                        if elevation != elevationNoData:
-                            index = int(elevation) - self.minElev
-                            # can have index too large because max not calculated properly by gdal
-                            if index >= elevMapSize:
-                                extra = 1 + index - elevMapSize
-                                for b in list(self.basinElevMap.keys()):
-                                    self.basinElevMap[b] += [0] * extra
-                                self.elevMap += [0] * extra
-                                elevMapSize += extra
-                            try:
-                                self.basinElevMap[basin][index] += 1
-                            except Exception:
-                                QSWATUtils.error('Problem in basin {0!s} reading elevation {1!s} at ({5!s}, {6!s}).  Minimum: {2!s}, maximum: {3!s}, index: {4!s}'.format(basin, elevation, self.minElev, maxElev, index, x, y), self._gv.isBatch)
-                                break
-                            self.elevMap[index] += 1
                         if self.fullHRUsWanted or hrusRasterWanted:
                             if crop != cropNoData and soil != soilNoData and slope != slopeNoData:
                                 hru = BasinData.getHruNumber(cropSoilSlopeNumbers, lastHru, crop, soil, slope)
@@ -2487,12 +2538,27 @@ class CreateHRUs(QObject):
                     shapes.addRow(hruRow, row)
                 if  hrusRasterWanted:   
                     hrusRasterBand.WriteArray(hrusData, 0, row)
+                # collect basins and elevations for the row
+                if 0 <= elevationRow < elevationNumberRows:
+                    rowBasins = basinData[0]
+                    rowElevations = elevationData[0, elevationCols]
+                    rowMask = elevationColsOK & (rowBasins != basinNoData) & (rowElevations != elevationNoData)
+                    if upstreamBasins.size > 0:
+                        rowMask &= ~numpy.isin(rowBasins, upstreamBasins)
+                    blockBasins.append(rowBasins[rowMask].astype(numpy.int64))
+                    blockElevations.append((rowElevations[rowMask] * self._gv.verticalFactor).astype(numpy.int64))
+                    blockSize += len(blockBasins[-1])
+                    if blockSize >= CreateHRUs._ELEVBLOCKSIZE:
+                        self.addElevations(numpy.concatenate(blockBasins), numpy.concatenate(blockElevations))
+                        blockBasins = []
+                        blockElevations = []
+                        blockSize = 0
+            if blockSize > 0:
+                self.addElevations(numpy.concatenate(blockBasins), numpy.concatenate(blockElevations))
             if not self._gv.useGridModel and len(self._gv.db.slopeLimits) > 0 and 0 <= slopeCurrentRow < slopeNumberRows:
                 # write final slope bands row
-                for i in range(slopeNumberCols):
-                    slopeValue = cast(float, slopeData[0, i])
-                    slopeData[0, i] = self._gv.db.slopeIndex(slopeValue * 100) if slopeValue != slopeNoData else slopeBandsNoData
-                slopeBandsBand.WriteArray(slopeData, 0, slopeCurrentRow)
+                slopeBands = numpy.where(slopeData == slopeNoData, slopeBandsNoData, self._gv.db.slopeIndexArray(slopeData * 100))
+                slopeBandsBand.WriteArray(slopeBands, 0, slopeCurrentRow)
                 # flush and release memory
                 slopeBandsDs = None
         if hrusRasterWanted:
@@ -2505,46 +2571,10 @@ class CreateHRUs(QObject):
         soilDs = None
         cropDs = None
         # check landuse and soil overlaps
-        if landuseCount + landuseNoDataCount == 0:
-            landusePercent = 0.0
-        else:
-            landusePercent = (float(landuseCount) / (landuseCount + landuseNoDataCount)) * 100
-        QSWATUtils.loginfo('Landuse cover percent: {:.1F}'.format(landusePercent))
-        if landusePercent < 95:
-            QSWATUtils.information('WARNING: only {:.1F} percent of the watershed has defined landuse values.\n If this percentage is zero check your landuse map has the same projection as your DEM.'.format(landusePercent), self._gv.isBatch)
-        soilMapPercent = (float(soilDefinedCount + soilUndefinedCount) / (soilDefinedCount + soilUndefinedCount + soilNoDataCount)) * 100
-        QSWATUtils.loginfo('Soil cover percent: {:.1F}'.format(soilMapPercent))
-        if self._gv.isHUC or self._gv.isHAWQS:  # always 100% for other, since undefined mapped to default
-            if soilDefinedCount + soilUndefinedCount > 0:
-                soilDefinedPercent = (float(soilDefinedCount) / (soilDefinedCount + soilUndefinedCount)) * 100
-            else:
-                soilDefinedPercent = 0
-            QSWATUtils.loginfo('Soil defined percent: {:.1F}'.format(soilDefinedPercent))
-        under95 = False
-        if self._gv.isHUC:
-            huc12 = self._gv.projName[3:]
-            logFile = self._gv.logFile
-            if soilMapPercent < 1:
-                # start of message is key phrase for HUC12Models
-                QSWATUtils.information(u'EMPTY PROJECT: only {0:.4F} percent of the watershed in project huc{1} is inside the soil map'.format(soilMapPercent, huc12), self._gv.isBatch, logFile=logFile)
-                self.emptyHUCProject = True 
-                return False
-            elif soilMapPercent < 95:
-                # start of message is key phrase for HUC12Models
-                QSWATUtils.information('UNDER95 WARNING: only {0:.1F} percent of the watershed in project huc{1} is inside the soil map.'
-                                       .format(soilMapPercent, huc12), self._gv.isBatch, logFile=logFile)
-                under95 = True
-            elif soilMapPercent < 99.95: # always give statistic for HUC models; avoid saying 100.0 when rounded to 1dp
-                # start of message is key word for HUC12Models
-                QSWATUtils.information('WARNING: only {0:.1F} percent of the watershed in project huc{1} is inside the soil map.'.format(soilMapPercent, huc12), self._gv.isBatch, logFile=logFile)
-            if soilDefinedPercent < 80:
-                # start of message is key word for HUC12Models
-                QSWATUtils.information('WARNING: only {0:.1F} percent of the watershed in project huc{1} has defined soil.'
-                                       .format(soilDefinedPercent, huc12), self._gv.isBatch, logFile=logFile)
-        else:
-            if soilMapPercent < 95:
-                QSWATUtils.information('WARNING: only {:.1F} percent of the watershed has defined soil values.\n If this percentage is zero check your soil map has the same projection as your DEM.'.format(soilMapPercent), self._gv.isBatch)
-                under95 = True
+        coverage = (landuseCount, landuseNoDataCount, soilDefinedCount, soilUndefinedCount, soilNoDataCount)
+        OK, under95 = self.reportCoverage(coverage)
+        if not OK:
+            return False
         if self.fullHRUsWanted:
             # for TestingFullHRUs add these instead of addRow few lines above
             # shapes.addRow([1,1,1], 0, 3, -1)
@@ -2591,6 +2621,60 @@ class CreateHRUs(QObject):
         # clear memory
         if not self._gv.useGridModel:
             basinDs = None
+        if checkpoint is not None:
+            checkpoint.save(self, coverage)
+        return self.writeBasins(progressLabel, basinStreamWaterData if self._gv.isHUC or self._gv.isHAWQS else dict(), under95)
+    
+    def reportCoverage(self, coverage: Tuple[int, int, int, int, int]) -> Tuple[bool, bool]:
+        """Report the percentages of the watershed with landuse and soil values, 
+        from counts of cells with landuse, no landuse, defined soil, undefined soil, and no soil.
+        
+        Return false if the project is empty, and whether soil cover is under 95 percent."""
+        landuseCount, landuseNoDataCount, soilDefinedCount, soilUndefinedCount, soilNoDataCount = coverage
+        if landuseCount + landuseNoDataCount == 0:
+            landusePercent = 0.0
+        else:
+            landusePercent = (float(landuseCount) / (landuseCount + landuseNoDataCount)) * 100
+        QSWATUtils.loginfo('Landuse cover percent: {:.1F}'.format(landusePercent))
+        if landusePercent < 95:
+            QSWATUtils.information('WARNING: only {:.1F} percent of the watershed has defined landuse values.\n If this percentage is zero check your landuse map has the same projection as your DEM.'.format(landusePercent), self._gv.isBatch)
+        soilMapPercent = (float(soilDefinedCount + soilUndefinedCount) / (soilDefinedCount + soilUndefinedCount + soilNoDataCount)) * 100
+        QSWATUtils.loginfo('Soil cover percent: {:.1F}'.format(soilMapPercent))
+        if self._gv.isHUC or self._gv.isHAWQS:  # always 100% for other, since undefined mapped to default
+            if soilDefinedCount + soilUndefinedCount > 0:
+                soilDefinedPercent = (float(soilDefinedCount) / (soilDefinedCount + soilUndefinedCount)) * 100
+            else:
+                soilDefinedPercent = 0
+            QSWATUtils.loginfo('Soil defined percent: {:.1F}'.format(soilDefinedPercent))
+        under95 = False
+        if self._gv.isHUC:
+            huc12 = self._gv.projName[3:]
+            logFile = self._gv.logFile
+            if soilMapPercent < 1:
+                # start of message is key phrase for HUC12Models
+                QSWATUtils.information(u'EMPTY PROJECT: only {0:.4F} percent of the watershed in project huc{1} is inside the soil map'.format(soilMapPercent, huc12), self._gv.isBatch, logFile=logFile)
+                self.emptyHUCProject = True 
+                return False, False
+            elif soilMapPercent < 95:
+                # start of message is key phrase for HUC12Models
+                QSWATUtils.information('UNDER95 WARNING: only {0:.1F} percent of the watershed in project huc{1} is inside the soil map.'
+                                       .format(soilMapPercent, huc12), self._gv.isBatch, logFile=logFile)
+                under95 = True
+            elif soilMapPercent < 99.95: # always give statistic for HUC models; avoid saying 100.0 when rounded to 1dp
+                # start of message is key word for HUC12Models
+                QSWATUtils.information('WARNING: only {0:.1F} percent of the watershed in project huc{1} is inside the soil map.'.format(soilMapPercent, huc12), self._gv.isBatch, logFile=logFile)
+            if soilDefinedPercent < 80:
+                # start of message is key word for HUC12Models
+                QSWATUtils.information('WARNING: only {0:.1F} percent of the watershed in project huc{1} has defined soil.'
+                                       .format(soilDefinedPercent, huc12), self._gv.isBatch, logFile=logFile)
+        else:
+            if soilMapPercent < 95:
+                QSWATUtils.information('WARNING: only {:.1F} percent of the watershed has defined soil values.\n If this percentage is zero check your soil map has the same projection as your DEM.'.format(soilMapPercent), self._gv.isBatch)
+                under95 = True
+        return True, under95
+    
+    def writeBasins(self, progressLabel: QLabel, basinStreamWaterData: Dict[int, Tuple[Optional[QgsGeometry], float, float]], under95: bool) -> bool:
+        """Write basin data generated from grids to project database, with areas and topographic report."""
         if not self._gv.isBig > 0:
             QSWATUtils.progress('Writing HRU data to database ...', progressLabel)
             self.progress_signal.emit('Writing HRU data to database ...')
@@ -2661,6 +2745,33 @@ class CreateHRUs(QObject):
             QSWATUtils.loginfo('hucs: {0}'.format(hucs))
             QSWATUtils.loginfo('polyMap: {0}'.format(polyMap))
         logFile = self._gv.logFile
+        # use indexed copy of water bodies database if available
+        waterIndex = WaterBodiesIndex.openIndex(self._gv.db.waterBodiesFile)
+        hucField = 'HUC12_10_8_6' if self._gv.isHUC else 'HUC14_12_10_8'
+        hucList = [huc12_10_8_6] if self._gv.isHUC else [str(huc) for huc in polyMap.keys()]
+        
+        def waterRows(table: str, selection: str) -> Iterable[Any]:
+            """Return rows of water bodies table for this project."""
+            if waterIndex is not None and waterIndex.hasTable(table):
+                return waterIndex.rows(table, selection, hucField, hucList)
+            QSWATUtils.loginfo('No current index for {0} table of water bodies file: run buildWaterBodiesIndex to make one'.format(table))
+            return waterConn.execute(self._gv.db.sqlSelect(table, selection, '', where))
+        
+        waterPolygonsFile = QSWATUtils.join(self._gv.HUCDataDir, 'NHDLake5070Fixed.shp')
+        # water polygons file -> water bodies, or None if file missing
+        waterBodiesMap: Dict[str, Optional[WaterBodies]] = dict()
+        
+        def waterBodies() -> Optional[WaterBodies]:
+            """Return intersections of water polygons with subbasins, reading the polygons on first use, 
+            so that they are only read, or reported missing, if there is a reservoir or lake."""
+            if waterPolygonsFile not in waterBodiesMap:
+                if os.path.isfile(waterPolygonsFile):
+                    waterBodiesMap[waterPolygonsFile] = WaterBodies(self._gv.wshedFile, waterPolygonsFile)
+                else:
+                    QSWATUtils.error('Cannot find NHDLake5070Fixed.shp in {0}'.format(self._gv.HUCDataDir), self._gv.isBatch)
+                    waterBodiesMap[waterPolygonsFile] = None
+            return waterBodiesMap[waterPolygonsFile]
+        
         with self._gv.db.connect() as conn, sqlite3.connect(self._gv.db.waterBodiesFile) as waterConn:
             # first two may not exist in old projects: added November 2012
             if self._gv.isHUC:
@@ -2675,12 +2786,12 @@ class CreateHRUs(QObject):
             conn.execute('DELETE FROM res')
             conn.execute('DELETE FROM lake')
             conn.execute('DELETE FROM playa')
-            sql0 = self._gv.db.sqlSelect('reservoirs', 'SUBBASIN, IYRES, RES_ESA, RES_EVOL, RES_PSA, RES_PVOL, RES_VOL, RES_DRAIN, RES_NAME, OBJECTID, HUC12_10_8_6, HUC14_12_10_8, RES_LAT, RES_LONG', '', where)
+            select0 = 'SUBBASIN, IYRES, RES_ESA, RES_EVOL, RES_PSA, RES_PVOL, RES_VOL, RES_DRAIN, RES_NAME, OBJECTID, HUC12_10_8_6, HUC14_12_10_8, RES_LAT, RES_LONG'
             sql1 = 'INSERT INTO res (OID, SUBBASIN, IYRES, RES_ESA, RES_EVOL, RES_PSA, RES_PVOL, RES_VOL) VALUES(?,?,?,?,?,?,?,?);'
-            sql2 = self._gv.db.sqlSelect('ponds', 'SUBBASIN, PND_ESA, PND_EVOL, PND_PSA, PND_PVOL, PND_VOL, PND_DRAIN, PND_NAME, HUC12_10_8_6, HUC14_12_10_8', '', where)
-            sql3 = self._gv.db.sqlSelect('wetlands', 'SUBBASIN, WET_AREA, HUC14_12_10_8', '', where)
-            sql4 = self._gv.db.sqlSelect('playas', 'SUBBASIN, PLA_AREA, HUC12_10_8_6, HUC14_12_10_8', '', where)
-            sql6 = self._gv.db.sqlSelect('lakes', 'SUBBASIN, LAKE_AREA, LAKE_NAME, OBJECTID, HUC12_10_8_6, HUC14_12_10_8', '', where)
+            select2 = 'SUBBASIN, PND_ESA, PND_EVOL, PND_PSA, PND_PVOL, PND_VOL, PND_DRAIN, PND_NAME, HUC12_10_8_6, HUC14_12_10_8'
+            select3 = 'SUBBASIN, WET_AREA, HUC14_12_10_8'
+            select4 = 'SUBBASIN, PLA_AREA, HUC12_10_8_6, HUC14_12_10_8'
+            select6 = 'SUBBASIN, LAKE_AREA, LAKE_NAME, OBJECTID, HUC12_10_8_6, HUC14_12_10_8'
             sql5 = 'INSERT INTO pnd (OID, SUBBASIN, PND_FR, PND_PSA, PND_PVOL, PND_ESA, PND_EVOL, PND_VOL) VALUES(?,?,?,?,?,?,?,?);'
             sql7 = 'INSERT INTO lake (OID, SUBBASIN, LAKE_AREA) VALUES(?,?,?);'
             sql8 = 'INSERT INTO playa (OID, SUBBASIN, PLAYA_AREA) VALUES(?,?,?);'
@@ -2689,11 +2800,17 @@ class CreateHRUs(QObject):
             freeAreas: Dict[int, float] = dict()
             for basin, basinData in self.basins.items():
                 freeAreas[basin] = basinData.area
+            downBasins: Dict[int, int] = dict()
+            for basin in self.basins:
+                dsChannel = self._gv.topo.downLinks.get(self._gv.topo.basinToLink[basin], -1)
+                downBasins[basin] = -1 if dsChannel == -1 else self._gv.topo.linkToBasin[dsChannel]
+            sortedBasins = WaterBodies.topoSort(self.basins.keys(), downBasins)
+            QSWATUtils.loginfo('Sorted basins: {0}'.format(sortedBasins))
             oid = 0
-            for row in waterConn.execute(sql0):
-                oids = [int(strng) for strng in row[9].split(',')]
+            for row in waterRows('reservoirs', select0):
+                oids = WaterBodiesIndex.objectIdList(row[9])
                 areaHa = float(row[4])
-                reduction, usedBasin = self.distributeWaterPolygons(oids, areaHa * 1E4, freeAreas, True)
+                reduction, usedBasin = self.distributeWaterPolygons(oids, areaHa * 1E4, freeAreas, True, waterBodies(), sortedBasins)
                 if row[10] == row[11][:-2]:
                     huc = row[11]
                     basin = polyMap[huc]
@@ -2720,7 +2837,7 @@ class CreateHRUs(QObject):
                                    float(pt.x()), float(pt.y()), float(ptll.y()), float(ptll.x()), float(elev), name, 'R', SWATBasin, HydroID, OutletID))
                 self._gv.topo.MonitoringPointFid += 1;
             oid = 0
-            for row in waterConn.execute(sql2):
+            for row in waterRows('ponds', select2):
                 huc = row[9]
                 basin = polyMap[huc]
                 SWATBasin = self._gv.topo.basinToSWATBasin[basin]
@@ -2737,10 +2854,10 @@ class CreateHRUs(QObject):
                 oid += 1 
                 conn.execute(sql5, (oid, SWATBasin, pnd_fr, row[3], row[4], row[1], row[2], row[5]))
             oid = 0
-            for row in waterConn.execute(sql6):
-                oids = [int(strng) for strng in row[3].split(',')]
+            for row in waterRows('lakes', select6):
+                oids = WaterBodiesIndex.objectIdList(row[3])
                 areaHa = float(row[1])
-                reduction, usedBasin = self.distributeWaterPolygons(oids, areaHa * 1E4, freeAreas, False)
+                reduction, usedBasin = self.distributeWaterPolygons(oids, areaHa * 1E4, freeAreas, False, waterBodies(), sortedBasins)
                 if row[4] == row[5][:-2]:
                     huc = row[5]
                     basin = polyMap[huc]
@@ -2754,14 +2871,14 @@ class CreateHRUs(QObject):
                                            format(row[4], SWATBasin, areaHa, areaHa - reduction / 1E4, row[2]), self._gv.isBatch, logFile=logFile)
                 oid += 1 
                 conn.execute(sql7, (oid, SWATBasin, row[1]))
-            for row in waterConn.execute(sql3):
+            for row in waterRows('wetlands', select3):
                 huc = row[2]
                 basin = polyMap[huc]
                 basinData = self.basins[basin]
                 # area is in hectares
                 basinData.wetlandArea = float(row[1]) * 1E4
             oid = 0
-            for row in waterConn.execute(sql4):
+            for row in waterRows('playas', select4):
                 huc = row[9]
                 basin = polyMap[huc]
                 SWATBasin = self._gv.topo.basinToSWATBasin[basin]
@@ -2795,31 +2912,15 @@ class CreateHRUs(QObject):
                 percent = totalWaterReduction * 100 / totalArea
                 QSWATUtils.information('WARNING: Water area reduction of {0:.1F} sq km ({1:.1F}%)'.format(totalWaterReduction / 1E6, percent), self._gv.isBatch, logFile=logFile)
             conn.commit()
+        if waterIndex is not None:
+            waterIndex.close()
             
-    def distributeWaterPolygons(self, objectIds: List[int], waterArea: float, freeAreas: Dict[int, float], isReservoir: bool) -> Tuple[float, int]:
+    def distributeWaterPolygons(self, objectIds: List[int], waterArea: float, freeAreas: Dict[int, float], isReservoir: bool, 
+                                waterBodies: Optional[WaterBodies], sortedBasins: List[int]) -> Tuple[float, int]:
         """Assign area of water polygon(s), either reservoirs or lakes, to the subbasin they intersect with, as far as possible.
+        sortedBasins lists basins so that a basin always drains to a basin earlier in the list.
         Return unassigned area (or zero) and smallest used basin number."""
         
-        def topoSort(basins: Set[int]) -> List[int]:
-            """Make sorted list of basins so that a basin always drains to a basin earlier in the list, if any.
-            Algorithm assumes the set of basins is complete: if a basin has one downstream it will be in the set."""
-            result: List[int] = []
-            todo = list(basins)[:]
-            while len(todo) > 0:
-                basin = todo.pop(0)
-                channel = self._gv.topo.basinToLink[basin]
-                dsChannel = self._gv.topo.downLinks.get(channel, -1)
-                if dsChannel == -1:
-                    result.insert(0, basin)
-                else:
-                    dsBasin = self._gv.topo.linkToBasin[dsChannel]
-                    try:
-                        pos = result.index(dsBasin)
-                        result.insert(pos+1, basin)
-                    except:
-                        todo.append(basin)
-            return result
-        
         def firstBasin(sortedBasins: List[int], basins: Iterable[int]) -> int:
             """Return basin in basins that occurs first in sortedBasins.  
             Assumes at least one of basins is in sortedbasins."""
@@ -2828,28 +2929,10 @@ class CreateHRUs(QObject):
                     return basin
             return -1 # for typecheck
             
-        subbasinsFile = self._gv.wshedFile
-        waterPolygonsFile = QSWATUtils.join(self._gv.HUCDataDir, 'NHDLake5070Fixed.shp')
-        if not os.path.isfile(waterPolygonsFile):
-            QSWATUtils.error('Cannot find NHDLake5070Fixed.shp in {0}'.format(self._gv.HUCDataDir), self._gv.isBatch)
+        if waterBodies is None:
+            # no water polygons file
             return 0, -1
-        subbasinsLayer = QgsVectorLayer(subbasinsFile, 'subbasins', 'ogr')
-        polyIndex = subbasinsLayer.fields().lookupField('PolygonId')
-        waterbodyLayer = QgsVectorLayer(waterPolygonsFile, 'water', 'ogr')
-        interAreas: Dict[int, float] = dict()
-        for oid in objectIds:
-            exp = QgsExpression('"OBJECTID" = {0}'.format(oid))
-            waterBody = next(feature for feature in  waterbodyLayer.getFeatures(QgsFeatureRequest(exp)))
-            waterGeom = waterBody.geometry()
-            for subbasin in subbasinsLayer.getFeatures():
-                basin = subbasin[polyIndex]
-                intersect = subbasin.geometry().intersection(waterGeom)
-                if not QgsGeometry.isEmpty(intersect):
-                    interArea = intersect.area()
-                    if interArea >= 50:  # otherwise will round to 0.00 ha
-                        interAreas[basin] = interAreas.get(basin, 0) + interArea
-        sortedBasins = topoSort(self.basins.keys())  # type: ignore
-        QSWATUtils.loginfo('Sorted basins: {0}'.format(sortedBasins))
+        interAreas = waterBodies.intersectionAreas(objectIds)
         totalInterArea = 0.0
         OK = True
         for basin, interArea in interAreas.items():
@@ -3060,6 +3143,7 @@ class CreateHRUs(QObject):
             count += len(data.hruMap)
         return count
     
+    @Profiler.timed('CreateHRUs.saveAreas', log=True)
     def saveAreas(self, isOriginal: bool, redistributeNodata=True) -> None:
         """Create area maps for each subbasin."""
         
@@ -3095,6 +3179,7 @@ class CreateHRUs(QObject):
                     conn.execute(sql3, (newSub, oldSub))
                     conn.execute(sql4, (oldSub, newSub))
             
+        self._hruTable = None
         for data in self.basins.values():
             data.setAreas(isOriginal, redistributeNodata=redistributeNodata)
         if (self._gv.isHUC or self._gv.isHAWQS) and isOriginal:
@@ -3174,6 +3259,7 @@ class CreateHRUs(QObject):
                     channelDepth = float(0.13 * drainAreaKm ** 0.4)
                     conn.execute(sql, (basinData.drainArea / 1E4, channelWidth, channelDepth, SWATBasin))
     
+    @Profiler.timed('CreateHRUs.basinsToHRUs')
     def basinsToHRUs(self) -> None:
         """Convert basin data to HRU data."""
         # First clear in case this is a rerun
@@ -3275,20 +3361,7 @@ class CreateHRUs(QObject):
         least one subbasin would have no HRU.
         This figure is only advisory since limits are checked during removal.
         """
-        minMax = float('inf') if useArea else 100.0
-        for (basin, basinData) in self.basins.items():
-            cropAreas = basinData.originalCropAreas
-            crop = BasinData.dominantKey(cropAreas)
-            if crop < 0:
-                if self._gv.isHUC or self._gv.isHAWQS:
-                    val = 0.0
-                else:
-                    raise ValueError('No landuse data for basin {0!s}'.format(basin))
-            else:
-                val = float(cropAreas[crop]) / 10000 if useArea else (float(cropAreas[crop]) / basinData.cropSoilSlopeArea) * 100
-            # QSWATUtils.loginfo('Max crop value {0} for basin {1}'.format(int(val), self._gv.topo.basinToSWATBasin[basin]))
-            if val < minMax: minMax = val
-        return minMax
+        return self.hruTable().minMaxCropVal(useArea, self._gv.isHUC or self._gv.isHAWQS)
     
     def minMaxSoilArea(self) -> float:
         """
@@ -3302,16 +3375,7 @@ class CreateHRUs(QObject):
         least one subbasin would have no HRU.
         This figure is only advisory since limits are checked during removal.
         """
-        minMax = float('inf')
-        for (basin, basinData) in self.basins.items():
-            soilAreas = basinData.originalSoilAreas
-            soil = BasinData.dominantKey(soilAreas)
-            if soil < 0:
-                raise ValueError('No soil data for basin {0!s}'.format(basin))
-            val = float(soilAreas[soil]) / 10000
-            # QSWATUtils.loginfo('Max soil area {0} for basin {1}'.format(int(val), self._gv.topo.basinToSWATBasin[basin]))
-            if val < minMax: minMax = val
-        return minMax
+        return self.hruTable().minMaxSoilArea()
     
     def minMaxSlopeArea(self) -> float:
         """
@@ -3325,16 +3389,7 @@ class CreateHRUs(QObject):
         least one subbasin would have no HRU.
         This figure is only advisory since limits are checked during removal.
         """
-        minMax = float('inf')
-        for (basin, basinData) in self.basins.items():
-            slopeAreas = basinData.originalSlopeAreas
-            slope = BasinData.dominantKey(slopeAreas)
-            if slope < 0:
-                raise ValueError('No slope data for basin {0!s}'.format(basin))
-            val = float(slopeAreas[slope]) / 10000
-            # QSWATUtils.loginfo('Max slope area {0} for basin {1}'.format(int(val), self._gv.topo.basinToSWATBasin[basin]))
-            if val < minMax: minMax = val
-        return minMax        
+        return self.hruTable().minMaxSlopeArea()
 
     def minMaxSoilPercent(self, minCropVal: float) -> float:
         """
@@ -3349,24 +3404,7 @@ class CreateHRUs(QObject):
         at least one soil in one subbasin would have no HRU.
         This figure is only advisory since limits are checked during removal.
         """
-        minMax = 100.0
-        for basinData in self.basins.values():
-            cropAreas = basinData.originalCropAreas
-            for (crop, cropArea) in cropAreas.items():
-                cropVal = (float(cropArea) / basinData.cropSoilSlopeArea) * 100
-                if cropVal >= minCropVal:
-                    # crop will be included.  Find the maximum area or percentage for soils for this crop.
-                    maximum = 0.0
-                    soilSlopeNumbers = basinData.cropSoilSlopeNumbers[crop]
-                    for slopeNumbers in soilSlopeNumbers.values():
-                        area = 0.0
-                        for hru in slopeNumbers.values():
-                            cellData = basinData.hruMap[hru]
-                            area += cellData.area
-                        soilVal = (float(area) / cropArea) * 100
-                        if soilVal > maximum: maximum = soilVal
-                    if maximum < minMax: minMax = maximum
-        return minMax
+        return self.hruTable().minMaxSoilPercent(minCropVal)
 
     def minMaxSlopePercent(self, minCropVal: float, minSoilVal: float) -> float:
         """
@@ -3383,31 +3421,7 @@ class CreateHRUs(QObject):
         at least one slope in one subbasin would have no HRU.
         This figure is only advisory since limits are checked during removal.
         """
-        minMax = 100.0
-        for basinData in self.basins.values():
-            cropAreas = basinData.originalCropAreas
-            for (crop, cropArea) in cropAreas.items():
-                cropVal = (float(cropArea) / basinData.cropSoilSlopeArea) * 100
-                if cropVal >= minCropVal:
-                    # crop will be included.
-                    soilSlopeNumbers = basinData.cropSoilSlopeNumbers[crop]
-                    for slopeNumbers in soilSlopeNumbers.values():
-                        # first find if this soil is to be included
-                        soilArea = 0.0
-                        for hru in slopeNumbers.values():
-                            cellData = basinData.hruMap[hru]
-                            soilArea += cellData.area
-                        soilVal = (float(soilArea) / cropArea) * 100
-                        if soilVal >= minSoilVal:
-                            # soil will be included.
-                            # Find the maximum percentage area for slopes for this soil.
-                            maximum = 0.0
-                            for hru in slopeNumbers.values():
-                                cellData = basinData.hruMap[hru]
-                                slopeVal = (float(cellData.area) / soilArea) * 100
-                                if slopeVal > maximum: maximum = slopeVal
-                            if maximum < minMax: minMax = maximum
-        return minMax
+        return self.hruTable().minMaxSlopePercent(minCropVal, minSoilVal)
 
 # beware = this function is no longer used and is also out of date because 
 # it has not been revised to allow for both area and percentages as thresholds
@@ -3458,6 +3472,7 @@ class CreateHRUs(QObject):
 #         return True
 #===============================================================================
     
+    @Profiler.timed('CreateHRUs.removeSmallHRUsByArea')
     def removeSmallHRUsByArea(self) -> None:
         """
         Remove from basins data HRUs that are below the minimum area or minumum percent.
@@ -3479,52 +3494,11 @@ class CreateHRUs(QObject):
         The area of the whole subbasin can be below the minimum area, 
         in which case the dominant HRU will finally be left.
         """
-            
-        for (basin, basinData) in self.basins.items():
-            count = len(basinData.hruMap)
-            # self.areaVal is either an area in hectares or a percentage of the subbasin
-            # in either case convert to square metres
-            basinThreshold = self.areaVal * 10000 if self.useArea else float(basinData.cropSoilSlopeArea * self.areaVal) / 100
-            areaToRedistribute = 0.0
-            unfinished = True
-            while unfinished:
-                # find smallest non-exempt HRU
-                minCrop = 0
-                minSoil = 0
-                minSlope = 0
-                minHru = 0
-                minArea = basinThreshold
-                for (crop, soilSlopeNumbers) in basinData.cropSoilSlopeNumbers.items():
-                    if not self._gv.isExempt(crop):
-                        for (soil, slopeNumbers) in soilSlopeNumbers.items():
-                            for (slope, hru) in slopeNumbers.items():
-                                cellData = basinData.hruMap[hru]
-                                hruArea = cellData.area
-                                if hruArea < minArea:
-                                    minArea = hruArea
-                                    minHru = hru
-                                    minCrop = crop
-                                    minSoil = soil
-                                    minSlope = slope
-                if minArea < basinThreshold:
-                    # Don't remove last hru.
-                    # This happens when the subbasin area is below the area threshold
-                    if count > 1:
-                        basinData.removeHRU(minHru, minCrop, minSoil, minSlope)
-                        count -= 1
-                        areaToRedistribute += minArea
-                    else: # count is 1; ensure termination after redistributing
-                        unfinished = False
-                    if areaToRedistribute > 0:
-                        # make sure we don't divide by zero
-                        if basinData.cropSoilSlopeArea - areaToRedistribute == 0:
-                            raise ValueError('No HRUs for basin {0!s}'.format(basin))
-                        redistributeFactor = float(basinData.cropSoilSlopeArea) / (basinData.cropSoilSlopeArea - areaToRedistribute)
-                        basinData.redistribute(redistributeFactor)
-                        areaToRedistribute = 0
-                else:
-                    unfinished = False
+        table = self.hruTable().copy()
+        table.removeByArea(table.exemptCropGroups(self._gv.isExempt), self.areaVal, self.useArea)
+        self.updateBasins(table)
         
+    @Profiler.timed('CreateHRUs.removeSmallHRUsByThresholdPercent')
     def removeSmallHRUsByThresholdPercent(self) -> None:
         """
         Remove HRUs that are below the minCropVal, minSoilVal, 
@@ -3537,101 +3511,11 @@ class CreateHRUs(QObject):
         so the total area of the retained HRUs should eventually be the total
         area of the subbasin.
         """
+        table = self.hruTable().copy()
+        table.removeByThresholdPercent(table.exemptCropGroups(self._gv.isExempt), self.landuseVal, self.soilVal, self.slopeVal)
+        self.updateBasins(table)
         
-        minCropPercent = self.landuseVal
-        minSoilPercent = self.soilVal
-        minSlopePercent = self.slopeVal
-
-        for (basin, basinData) in self.basins.items():
-            cropAreas = basinData.originalCropAreas
-            areaToRedistribute = 0.0
-            minCropArea = float(basinData.cropSoilSlopeArea * minCropPercent) / 100
-            # reduce area if necessary to avoid removing all crops
-            if not self.hasExemptCrop(basinData):
-                minCropArea = min(minCropArea, self.maxValue(cropAreas))
-            for (crop, area) in cropAreas.items():
-                if not self._gv.isExempt(crop):
-                    if area < minCropArea:
-                        areaToRedistribute += area
-                        # remove this crop
-                        # going to change maps so use lists
-                        soilSlopeNumbers = basinData.cropSoilSlopeNumbers[crop]
-                        for (soil, slopeNumbers) in list(soilSlopeNumbers.items()):
-                            for (slope, hru) in list(slopeNumbers.items()):
-                                basinData.removeHRU(hru, crop, soil, slope)
-            if areaToRedistribute > 0:
-                # just to make sure we don't divide by zero
-                if basinData.cropSoilSlopeArea - areaToRedistribute == 0:
-                    raise ValueError('No landuse data for basin {0!s}'.format(basin))
-                redistributeFactor = float(basinData.cropSoilSlopeArea) / (basinData.cropSoilSlopeArea - areaToRedistribute)
-                basinData.redistribute(redistributeFactor)
-            # Now have to remove soil areas within each crop area that are
-            # less than minSoilVal for that crop.
-            # First create crop areas map (not overwriting the original)
-            basinData.setCropAreas(False)
-            cropAreas = basinData.cropAreas
-            for (crop, soilSlopeNumbers) in basinData.cropSoilSlopeNumbers.items():
-                cropArea = cropAreas[crop]
-                minArea = float(cropArea * minSoilPercent) / 100
-                soilAreas = basinData.cropSoilAreas(crop)
-                # reduce area if necessary to avoid removing all soils for this crop
-                minArea = min(minArea, self.maxValue(soilAreas))
-                soilAreaToRedistribute = 0.0
-                # Cannot use original soilSlopeNumbers as we will remove domain elements, so iterate with items()
-                for (soil, slopeNumbersCopy) in list(soilSlopeNumbers.items()):
-                    # first calculate area for this soil
-                    soilArea = soilAreas[soil]
-                    if soilArea < minArea:
-                        # add to area to redistribute
-                        soilAreaToRedistribute += soilArea
-                        # remove hrus
-                        for (slope, hru) in list(slopeNumbersCopy.items()):
-                            basinData.removeHRU(hru, crop, soil, slope)
-                if soilAreaToRedistribute > 0:
-                    # now redistribute
-                    # just to make sure we don't divide by zero
-                    if cropArea - soilAreaToRedistribute == 0:
-                        raise ValueError('No soil data for landuse {1!s} in basin {0!s}'.format(basin, crop))
-                    soilRedistributeFactor = float(cropArea) / (cropArea - soilAreaToRedistribute)
-                    for slopeNumbers in soilSlopeNumbers.values():
-                        for hru in slopeNumbers.values():
-                            cellData = basinData.hruMap[hru]
-                            cellData.multiply(soilRedistributeFactor)
-                            basinData.hruMap[hru] = cellData
-            # Now we remove the slopes for each remaining crop/soil combination
-            # that fall below minSlopePercent.
-            for (crop, soilSlopeNumbers) in basinData.cropSoilSlopeNumbers.items():
-                for (soil, slopeNumbers) in soilSlopeNumbers.items():
-                    # first calculate area for the soil
-                    soilArea = 0
-                    for hru in slopeNumbers.values():
-                        cellData = basinData.hruMap[hru]
-                        soilArea += cellData.area
-                    minArea = float(soilArea * minSlopePercent) / 100
-                    slopeAreas = basinData.cropSoilSlopeAreas(crop, soil)
-                    # reduce minArea if necessary to avoid removing all slopes for this crop and soil
-                    minArea = min(minArea, self.maxValue(slopeAreas))
-                    slopeAreaToRedistribute = 0.0
-                    # Use list as we will remove domain elements from original
-                    for (slope, hru) in list(slopeNumbers.items()):
-                        # first calculate the area for this slope
-                        slopeArea = slopeAreas[slope]
-                        if slopeArea < minArea:
-                            # add to area to redistribute
-                            slopeAreaToRedistribute += slopeArea
-                            # remove hru
-                            basinData.removeHRU(hru, crop, soil, slope)
-                    if slopeAreaToRedistribute > 0:
-                        # Now redistribute removed slope areas
-                        # just to make sure we don't divide by zero
-                        if soilArea - slopeAreaToRedistribute == 0:
-                            raise ValueError('No slope data for landuse {1!s} and soil {2!s} in basin {0!s}'.format(basin, crop, soil))
-                        slopeRedistributeFactor = float(soilArea) / (soilArea - slopeAreaToRedistribute)
-                        for hru in slopeNumbers.values():
-                            cellData = basinData.hruMap[hru]
-                            cellData.multiply(slopeRedistributeFactor)
-                            basinData.hruMap[hru] = cellData
-        
+    @Profiler.timed('CreateHRUs.removeSmallHRUsByThresholdArea')
     def removeSmallHRUsByThresholdArea(self) -> None:
         """
         Remove HRUs that are below the minCropVal, minSoilVal, 
@@ -3644,83 +3528,11 @@ class CreateHRUs(QObject):
         so the total area of the retained HRUs should eventually be the total
         area of the subbasin.
         """
-        # convert threshold areas to square metres
-        minCropAreaBasin = self.landuseVal * 10000
-        minSoilAreaBasin = self.soilVal * 10000
-        minSlopeAreaBasin = self.slopeVal * 10000
-
-        for (basin, basinData) in self.basins.items():
-            cropAreas = basinData.originalCropAreas
-            # reduce area if necessary to avoid removing all crops
-            if not self.hasExemptCrop(basinData):
-                minCropArea = min(minCropAreaBasin, self.maxValue(cropAreas))
-            else:
-                minCropArea = minCropAreaBasin
-            areaToRedistribute = 0.0
-            for (crop, area) in cropAreas.items():
-                if not self._gv.isExempt(crop):
-                    if area < minCropArea:
-                        # remove this crop
-                        # going to change maps so use lists
-                        soilSlopeNumbers = basinData.cropSoilSlopeNumbers[crop]
-                        for (soil, slopeNumbers) in list(soilSlopeNumbers.items()):
-                            for (slope, hru) in list(slopeNumbers.items()):
-                                areaToRedistribute += basinData.hruMap[hru].area
-                                basinData.removeHRU(hru, crop, soil, slope)
-            # Now have to remove soil areas that are
-            # less than minSoilArea
-            soilAreas = basinData.originalSoilAreas
-            # reduce area if necessary to avoid removing all soils
-            minSoilArea = min(minSoilAreaBasin, self.maxValue(soilAreas))
-            for (soil, area) in soilAreas.items():
-                if area < minSoilArea:
-                    # remove this soil
-                    # going to change maps so use lists
-                    for (crop, soilSlopeNumbers) in list(basinData.cropSoilSlopeNumbers.items()):
-                        # possible that soil has been removed
-                        slopeNumbers2: Optional[Dict[int, int]] = soilSlopeNumbers.get(soil, None)
-                        if slopeNumbers2 is not None:
-                            for (slope, hru) in list(slopeNumbers2.items()):
-                                areaToRedistribute += basinData.hruMap[hru].area
-                                basinData.removeHRU(hru, crop, soil, slope)
-            # Now we remove the slopes that are less than minSlopeArea
-            slopeAreas = basinData.originalSlopeAreas
-            # reduce area if necessary to avoid removing all slopes
-            minSlopeArea = min(minSlopeAreaBasin, self.maxValue(slopeAreas))
-            for (slope, area) in slopeAreas.items():
-                if area < minSlopeArea:
-                    # remove this slope
-                    # going to change maps so use lists
-                    for (crop, soilSlopeNumbers) in list(basinData.cropSoilSlopeNumbers.items()):
-                        for (soil, slopeNumbers) in list(soilSlopeNumbers.items()):
-                            # possible that slope has been removed
-                            hru = slopeNumbers.get(slope, -1)
-                            if hru != -1:
-                                areaToRedistribute += basinData.hruMap[hru].area
-                                basinData.removeHRU(hru, crop, soil, slope)
-            if areaToRedistribute > 0:
-                # Now redistribute removed slope areas
-                # just to make sure we don't divide by zero
-                if basinData.cropSoilSlopeArea - areaToRedistribute == 0:
-                    raise ValueError('Cannot redistribute {1:.2F} ha for basin {0!s}'.format(basin, (areaToRedistribute / 10000)))
-                redistributeFactor = float(basinData.cropSoilSlopeArea) / (basinData.cropSoilSlopeArea - areaToRedistribute)
-                basinData.redistribute(redistributeFactor)
+        table = self.hruTable().copy()
+        table.removeByThresholdArea(table.exemptCropGroups(self._gv.isExempt), self.landuseVal, self.soilVal, self.slopeVal)
+        self.updateBasins(table)
                 
-    def hasExemptCrop(self, basinData: BasinData) -> bool:
-        """Return true if basindata has an exempt crop."""
-        for crop in basinData.cropSoilSlopeNumbers.keys():
-            if self._gv.isExempt(crop):
-                return True
-        return False
-    
-    @staticmethod
-    def maxValue(mapv: Dict[Any, float]) -> float:
-        """Return maximum value in map."""
-        maxm = 0.0
-        for val in mapv.values():
-            if val > maxm: maxm = val
-        return maxm
-                            
+    @Profiler.timed('CreateHRUs.removeSmallHRUsbyTarget')
     def removeSmallHRUsbyTarget(self) -> None:
         """Try to reduce the number of HRUs to targetVal, 
         removing them in increasing order of size.
@@ -3733,34 +3545,39 @@ class CreateHRUs(QObject):
         for which the landuses are not exempt, sort this list by increasing size, 
         and remove HRUs according to this list until the target is met.
         """
-        # first make a list of (basin, crop, soil, slope, size) tuples
-        removals = []
-        for basin, basinData in self.basins.items():
-            basinArea = basinData.cropSoilSlopeArea
-            for crop, soilSlopeNumbers in basinData.cropSoilSlopeNumbers.items():
-                if not self._gv.isExempt(crop):
-                    for soil, slopeNumbers in soilSlopeNumbers.items():
-                        for slope, hru in slopeNumbers.items():
-                            hruArea = basinData.hruMap[hru].area
-                            size = hruArea if self.useArea else float(hruArea) / basinArea
-                            removals.append((basin, hru, crop, soil, slope, size))
-        # sort by increasing size
-        sortFun = lambda item: item[5]
-        removals.sort(key=sortFun)
-        # remove HRUs
-        # if some are exempt and target is small, can try to remove more than all in removals, so check for this
-        numToRemove = min(self.countFullHRUs() - self.targetVal, len(removals))
-        for i in range(numToRemove):
-            nextItem = removals[i]
-            basinData = self.basins[nextItem[0]]
-            self.removeHru(nextItem[0], basinData, nextItem[1], nextItem[2], nextItem[3], nextItem[4])
+        table = self.hruTable().copy()
+        table.removeByTarget(table.exemptCropGroups(self._gv.isExempt), self.targetVal, self.useArea)
+        self.updateBasins(table)
             
+    @Profiler.timed('CreateHRUs.removeSmallHRUsbySubbasinTarget')
     def removeSmallHRUsbySubbasinTarget(self) -> None:
         """Only used for TNC projects (forTNC is true).
         Impose maximum number of HRUs per subbasin (which is grid cell).
         """
-        for basin, basinData in self.basins.items():
-            self.makeSubbasinTargetHRUs(basin, basinData)
+        table = self.hruTable().copy()
+        table.removeBySubbasinTarget(table.exemptCropGroups(self._gv.isExempt), self.targetVal)
+        self.updateBasins(table)
+            
+    def hruTable(self) -> HRUTable:
+        """Return columnar table of the current potential HRUs, building it if necessary."""
+        if self._hruTable is None:
+            self._hruTable = HRUTable(self.basins)
+        return self._hruTable
+    
+    def hruPreview(self) -> HRUPreview:
+        """Return threshold preview index for the current potential HRUs and exempt landuses, building it if necessary."""
+        table = self.hruTable()
+        cropExempt = table.exemptCropGroups(self._gv.isExempt)
+        preview = self._hruPreview
+        if preview is None or preview.table is not table or not numpy.array_equal(preview.cropExempt, cropExempt):
+            preview = HRUPreview(table, cropExempt)
+            self._hruPreview = preview
+        return preview
+    
+    def updateBasins(self, table: HRUTable) -> None:
+        """Apply HRU removals and redistributions made in table to basins."""
+        table.writeBack(self.basins)
+        self._hruTable = None
             
     def makeSubbasinTargetHRUs(self, basin: int, basinData: BasinData):
         """Only used for TNC projects, which use grids.
@@ -3804,13 +3621,14 @@ class CreateHRUs(QObject):
             basinData.redistribute(redistributeFactor)
     
     def writeWHUTables(self, oid: int, elevBandId: int, SWATBasin: int, basin: int, basinData: BasinData, 
-                       cursor: Any, sql1: str, sql2: str, sql3: str, sql4: str,
-                       centroidll: QgsPointXY, mapp: List[int], minElev: int, maxElev: int) -> int:
+                       writer: WHUTableWriter, centroidll: QgsPointXY, mapp: numpy.ndarray, minElev: int, maxElev: int) -> Tuple[int, int]:
         """
         Write basin data to Watershed, hrus and uncomb tables.  Also write ElevationBand entry if max elevation above threshold.
         
         This is used when using grid model.  Makes at most self.targetVal HRUs in each grid cell.
+        Rows are made here, with OIDs and elevation band ids following on from oid and elevBandId, and inserted by writer.
         """
+        rows = WHURows()
         areaKm = float(basinData.area) / 1E6  # area in square km.
         areaHa = areaKm * 100
         meanSlope = float(basinData.totalSlope) / (1 if basinData.cellCount == 0 else basinData.cellCount)
@@ -3830,7 +3648,7 @@ class CreateHRUs(QObject):
         meanElevation = float(basinData.totalElevation) / basinData.cellCount
         elevMin = basinData.outletElevation
         elevMax = basinData.maxElevation
-        cursor.execute(sql1, (SWATBasin, 0, SWATBasin, SWATBasin, float(areaHa), float(meanSlopePercent), \
+        rows.watershed.append((SWATBasin, 0, SWATBasin, SWATBasin, float(areaHa), float(meanSlopePercent), \
                        float(farDistance), float(slsubbsn), float(farSlopePercent), float(tribChannelWidth), float(tribChannelDepth), \
                        float(lat), float(lon), float(meanElevation), float(elevMin), float(elevMax), '', 0, float(basinData.polyArea), \
                        float(basinData.definedArea), float(basinData.totalHRUAreas()), SWATBasin + 300000, SWATBasin + 100000, SWATOutletBasin))
@@ -3839,22 +3657,9 @@ class CreateHRUs(QObject):
             bandWidth = 500
             self._gv.numElevBands = int(1 + (maxElev - minElev) / bandWidth)
             thisWidth = min(maxElev + 1 - minElev, bandWidth)  # guard against first band < 500 wide
-            midPoint = minElev + (thisWidth - 1) / 2.0
-            bands = [(minElev, midPoint, 0.0)]
-            nextBand = minElev + thisWidth
-            totalFreq = sum(mapp)
-            for elev in range(minElev, maxElev+1):
-                i = elev - self.minElev
-                freq = mapp[i]
-                percent = (freq / totalFreq) * 100.0
-                if elev >= nextBand: # start a new band
-                    nextWidth = min(maxElev + 1 - elev, bandWidth)
-                    nextMidPoint = elev + (nextWidth -1) / 2.0
-                    bands.append((nextBand, nextMidPoint, percent))
-                    nextBand = min(nextBand + bandWidth, maxElev + 1)
-                else: 
-                    el, mid, frac = bands[-1]
-                    bands[-1] = (el, mid, frac + percent)
+            totalFreq = int(mapp.sum())
+            lowIndex = int(minElev - self.minElev)
+            bands = ElevationBands.makeBands(mapp[lowIndex:lowIndex + maxElev + 1 - minElev], minElev, thisWidth, bandWidth, totalFreq)
             elevBandId += 1
             row = [elevBandId, SWATBasin]
             for i in range(10):
@@ -3867,7 +3672,7 @@ class CreateHRUs(QObject):
                     row.append(bands[i][2] / 100) # fractions were percentages
                 else:
                     row.append(0)
-            cursor.execute(sql4, tuple(row))    
+            rows.elevationBand.append(tuple(row))
         
         #=======================================================================
         # # original code for 1 HRU per grid cell
@@ -3927,10 +3732,11 @@ class CreateHRUs(QObject):
                     oid += 1
                     relHRU += 1
                     filebase = QSWATUtils.fileBase(SWATBasin, hru, forTNC=self._gv.forTNC)
-                    cursor.execute(sql2, (oid, SWATBasin, areaHa, lu, arlu, soilName, arso, slp, \
+                    rows.hrus.append((oid, SWATBasin, areaHa, lu, arlu, soilName, arso, slp, \
                                    hruha, slopePercent, uc, oid, filebase))
-                    cursor.execute(sql3, (oid, SWATBasin, crop, lu, soil, soilName, slope, slp, \
+                    rows.uncomb.append((oid, SWATBasin, crop, lu, soil, soilName, slope, slp, \
                                    slopePercent, hruha, uc))
+        writer.put(rows)
         return oid, elevBandId
             
     def writeGridSubsFile(self):
@@ -3969,98 +3775,99 @@ class CreateHRUs(QObject):
         if numDeleted > 0:
             QSWATUtils.loginfo('{0} subbasins removed from subs.shp'.format(numDeleted))
             
+    @Profiler.timed('CreateHRUs.splitHRUs')
     def splitHRUs(self) -> bool:
         """Split HRUs according to split landuses."""
         for (landuse, split) in self._gv.splitLanduses.items():
             crop = self._gv.db.getLanduseCat(landuse)
             if crop < 0: # error already reported
                 return False
-            for basinData in self.basins.values():
-                nextHruNo = basinData.relHru + 1
-                if crop in basinData.cropSoilSlopeNumbers:
-                    # have some hrus to split
-                    soilSlopeNumbers = basinData.cropSoilSlopeNumbers[crop]
-                    # Make a new cropSoilSlopeNumbers map for the new crops
-                    newcssn: Dict[int, Dict[int, Dict[int, int]]] = dict()
-                    for lu in split.keys():
-                        newssn: Dict[int, Dict[int, int]] = dict()
-                        crop1 = self._gv.db.getLanduseCat(lu)
-                        if crop1 < 0: # error already reported
-                            return False
-                        newcssn[crop1] = newssn
-                    for (soil, slopeNumbers) in soilSlopeNumbers.items():
-                        # add soils to new dictionary
-                        for newssn in newcssn.values():
-                            newsn: Dict[int, int] = dict()
-                            newssn[soil] = newsn
-                        for (slope, hru) in slopeNumbers.items():
-                            cd = basinData.hruMap[hru]
-                            # remove hru from hruMap
-                            del basinData.hruMap[hru]
-                            # first new hru can reuse removed hru number
-                            first = True
-                            for (sublu, percent) in split.items():
-                                subcrop = self._gv.db.getLanduseCat(sublu)
-                                oldhru = -1
-                                if subcrop != crop and subcrop in basinData.cropSoilSlopeNumbers:
-                                    # add to an existing crop
-                                    # if have HRU with same soil and slope, add to it
-                                    oldssn = basinData.cropSoilSlopeNumbers[subcrop]
-                                    if soil in oldssn:
-                                        if slope in oldssn[soil]:
-                                            oldhru = oldssn[soil][slope]
-                                            oldcd = basinData.hruMap[oldhru]
-                                            cd1 = CellData(cd.cellCount, cd.area, cd.totalSlope, crop)
-                                            cd1.multiply(float(percent)/100)
-                                            oldcd.addCells(cd1)
-                                    if oldhru < 0:
-                                        # have to add new HRU to existing crop
-                                        # keep original crop number in cell data
-                                        cd1 = CellData(cd.cellCount, cd.area, cd.totalSlope, crop)
-                                        cd1.multiply(float(percent)/100)
-                                        if first:
-                                            newhru = hru
-                                            first = False
-                                        else:
-                                            newhru = nextHruNo
-                                            basinData.relHru = newhru
-                                            nextHruNo += 1
-                                        # add the new hru to hruMap
-                                        basinData.hruMap[newhru] = cd1
-                                        # add hru to existing data for this crop
-                                        if soil in oldssn:
-                                            oldsn = oldssn[soil]
-                                        else:
-                                            oldsn = dict()
-                                            oldssn[soil] = oldsn
-                                        oldsn[slope] = newhru
-                                else:
-                                    # the subcrop is new to the basin
-                                    # keep original crop number in cell data
-                                    cd1 = CellData(cd.cellCount, cd.area, cd.totalSlope, crop)
-                                    cd1.multiply(float(percent)/100)
-                                    if first:
-                                        newhru = hru
-                                        first = False
-                                    else:
-                                        newhru = nextHruNo
-                                        basinData.relHru = newhru
-                                        nextHruNo += 1
-                                    # add the new hru to hruMap
-                                    basinData.hruMap[newhru] = cd1
-                                    # add slope and hru number to new dictionary
-                                    newssn = newcssn[subcrop]
-                                    newsn = newssn[soil]
-                                    newsn[slope] = newhru
-                    # remove crop from cropSoilSlopeNumbers
-                    del basinData.cropSoilSlopeNumbers[crop]
-                    # add new cropSoilSlopeNumbers to original
-                    for (newcrop, newssn) in newcssn.items():
-                        # existing subcrops already dealt with
-                        if not newcrop in basinData.cropSoilSlopeNumbers:
-                            basinData.cropSoilSlopeNumbers[newcrop] = newssn
+            if not any(crop in basinData.cropSoilSlopeNumbers for basinData in self.basins.values()):
+                # no hrus to split
+                continue
+            # look up the new crops once, rather than for every hru
+            subcrops: List[int] = []
+            for lu in split.keys():
+                crop1 = self._gv.db.getLanduseCat(lu)
+                if crop1 < 0: # error already reported
+                    return False
+                subcrops.append(crop1)
+            HRUTable.splitCrop(self.basins, crop, subcrops, list(split.values()), CellData)
         return True
             
+    ## Number of (basin, elevation) pairs collected before adding them to elevation histograms
+    _ELEVBLOCKSIZE = 1 << 20
+    
+    def newElevMap(self) -> numpy.ndarray:
+        """Return empty elevation histogram the same size as elevMap."""
+        return numpy.zeros(len(self.elevMap), dtype=self.elevMap.dtype)
+    
+    def extendElevMaps(self, size: int) -> None:
+        """Make sure elevMap and all elevation histograms in basinElevMap have at least size entries."""
+        extra = size - len(self.elevMap)
+        if extra > 0:
+            self.elevMap = numpy.concatenate((self.elevMap, numpy.zeros(extra, dtype=self.elevMap.dtype)))
+            for basin, mapp in self.basinElevMap.items():
+                self.basinElevMap[basin] = numpy.concatenate((mapp, numpy.zeros(extra, dtype=mapp.dtype)))
+    
+    @staticmethod
+    def mappedCols(colFun: Callable[[int, float], int], transform: Any, numCols: int, numberCols: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Return columns given by colFun of the numCols columns of a raster with transform, 
+        with 0 for those outside the range 0 to numberCols - 1, and mask of those inside it."""
+        cols = numpy.array([colFun(col, QSWATTopology.colToX(col, transform)) for col in range(numCols)], dtype=numpy.int64)
+        colsOK = (cols >= 0) & (cols < numberCols)
+        return numpy.where(colsOK, cols, 0), colsOK
+    
+    @staticmethod
+    def rowValues(data: numpy.ndarray, index: int, numRows: int, cols: numpy.ndarray, colsOK: numpy.ndarray, 
+                  noData: int, isNoDataFun: Callable[[Any], bool]) -> numpy.ndarray:
+        """Return integer values at cols of row index of data, which has numRows rows read, 
+        with noData where the row or column is outside the data or isNoDataFun holds for the value."""
+        if not 0 <= index < numRows:
+            return numpy.full(len(cols), noData, dtype=numpy.int64)
+        vals = data[index, cols]
+        # test each distinct value once
+        uniques, inverse = numpy.unique(vals, return_inverse=True)
+        isNoData = numpy.array([isNoDataFun(val) for val in uniques.tolist()], dtype=bool)[inverse.reshape(-1)]
+        return numpy.where(colsOK & ~isNoData, vals, noData).astype(numpy.int64)
+    
+    def elevIndexes(self, elevations: numpy.ndarray) -> numpy.ndarray:
+        """Convert elevations in metres to indexes in elevation histograms, extending the histograms if necessary."""
+        # can have elevations below minimum or above maximum because min and max not calculated properly by gdal
+        indexes = numpy.maximum(elevations - int(self.minElev), 0)
+        self.extendElevMaps(int(indexes.max()) + 1)
+        return indexes
+    
+    def addBasinElevations(self, basin: int, elevations: numpy.ndarray) -> None:
+        """Add elevations in metres of cells in basin to elevMap and basinElevMap."""
+        indexes, counts = numpy.unique(self.elevIndexes(elevations), return_counts=True)
+        self.elevMap[indexes] += counts
+        mapp = self.basinElevMap.get(basin, None)
+        if mapp is None:
+            mapp = self.newElevMap()
+            self.basinElevMap[basin] = mapp
+        mapp[indexes] += counts
+        
+    def addElevations(self, basins: numpy.ndarray, elevations: numpy.ndarray) -> None:
+        """Add elevations in metres of cells to elevMap and basinElevMap, where basins are the corresponding basin numbers."""
+        if elevations.size == 0:
+            return
+        indexes = self.elevIndexes(elevations)
+        size = len(self.elevMap)
+        self.elevMap += numpy.bincount(indexes, minlength=size)
+        # count distinct (basin, index) pairs, which are sorted by basin
+        keys, counts = numpy.unique(basins * size + indexes, return_counts=True)
+        keyBasins = keys // size
+        starts = numpy.flatnonzero(numpy.diff(keyBasins)) + 1
+        for basinKeys, basinCounts in zip(numpy.split(keys, starts), numpy.split(counts, starts)):
+            basin = int(basinKeys[0] // size)
+            mapp = self.basinElevMap.get(basin, None)
+            if mapp is None:
+                mapp = self.newElevMap()
+                self.basinElevMap[basin] = mapp
+            mapp[basinKeys % size] += basinCounts
+            
+    @Profiler.timed('CreateHRUs.writeTopoReport')
     def writeTopoReport(self) -> None:
         """Write topographic report file."""
         topoPath = QSWATUtils.join(self._gv.textDir, Parameters._TOPOREPORT)
@@ -4096,7 +3903,7 @@ class CreateHRUs(QObject):
             self._reportsCombo.addItem(Parameters._TOPOITEM)
         self._gv.db.writeElevationBands(self.basinElevBands)
                 
-    def writeTopoReportSection(self, mapp: List[int], fw: fileWriter, string: str) -> Optional[List[Tuple[float, float, float]]]:
+    def writeTopoReportSection(self, mapp: numpy.ndarray, fw: fileWriter, string: str) -> Optional[List[Tuple[float, float, float]]]:
         """Write topographic report file section for 1 subbasin.
         
         Returns list of (start, midpoint, percent of subbasin at start)"""
@@ -4105,6 +3912,10 @@ class CreateHRUs(QObject):
         fw.writeLine('-----------')
         fw.writeLine('')
         (minimum, maximum, totalFreq, mean, stdDev) = self.analyseElevMap(mapp)
+        if totalFreq == 0:
+            fw.writeLine(QSWATUtils.trans('No elevation data'))
+            fw.writeLine('')
+            return None
         fw.writeLine(QSWATUtils.trans('Minimum elevation: ').rjust(21) + str(minimum+self.minElev))
         fw.writeLine(QSWATUtils.trans('Maximum elevation: ').rjust(21) + str(maximum+self.minElev))
         fw.writeLine(QSWATUtils.trans('Mean elevation: ').rjust(21) + '{:.2F}'.format(mean))
@@ -4114,95 +3925,144 @@ class CreateHRUs(QObject):
         fw.write(QSWATUtils.trans('% area up to elevation').rjust(32))
         fw.write(QSWATUtils.trans('% area of ').rjust(14) + string)
         fw.writeLine('')
-        summ = 0.0
+        # percentages of area up to and at each elevation from minimum to maximum
+        freqs = mapp[minimum:maximum+1]
+        uptos = (numpy.cumsum(freqs) / totalFreq) * 100.0
+        percents = (freqs / totalFreq) * 100.0
         if string == 'subbasin' and self._gv.elevBandsThreshold > 0  and \
         self._gv.numElevBands > 0 and maximum + self.minElev > self._gv.elevBandsThreshold:
             if self._gv.isHUC or self._gv.isHAWQS:
                 # HUC models use fixed bandwidth of 500m
-                bandWidth = 500
+                bandWidth: float = 500
                 self._gv.numElevBands = int(1 + (maximum - minimum) / bandWidth)
                 thisWidth = min(maximum + 1 - minimum, bandWidth)  # guard against first band < 500 wide
-                midPoint = minimum + self.minElev + (thisWidth - 1) / 2.0
-                bands = [(minimum + self.minElev, midPoint, 0.0)]
-                nextBand = minimum + self.minElev + thisWidth 
             else:
                 bandWidth = float(maximum + 1 - minimum) / self._gv.numElevBands
-                bands = [(minimum + self.minElev, minimum + self.minElev + (bandWidth - 1) / 2.0, 0.0)]
-                nextBand = minimum + self.minElev + bandWidth
+                thisWidth = bandWidth
+            bands: Optional[List[Tuple[float, float, float]]] = \
+                ElevationBands.makeBands(mapp[minimum:maximum+1], minimum + self.minElev, thisWidth, bandWidth, totalFreq)
         else:
-            bands = None  # type: ignore
+            bands = None
         for i in range(minimum, maximum+1):
-            freq = mapp[i]
-            summ += freq
             elev = i + self.minElev
-            upto = (summ / totalFreq) * 100.0
-            percent = (freq / totalFreq) * 100.0
-            if bands:
-                if elev >= nextBand: # start a new band
-                    nextWidth = min(maximum + 1 + self.minElev - elev, bandWidth)
-                    nextMidPoint = elev + (nextWidth -1) / 2.0
-                    bands.append((nextBand, nextMidPoint, percent))
-                    nextBand = min(nextBand + bandWidth, maximum + 1 + self.minElev)
-                else: 
-                    el, mid, frac = bands[-1]
-                    bands[-1] = (el, mid, frac + percent)
+            upto = uptos[i - minimum]
+            percent = percents[i - minimum]
             fw.write(str(elev).rjust(20))
             fw.write(('{:.2F}'.format(upto)).rjust(25))
             fw.writeLine(('{:.2F}'.format(percent)).rjust(25))
         fw.writeLine('')
         return bands 
                
-    def analyseElevMap(self, mapp: List[int]) -> Tuple[int, int, int, float, float]:
-        if len(mapp) == 0:
+    def analyseElevMap(self, mapp: numpy.ndarray) -> Tuple[int, int, int, float, float]:
+        """Calculate statistics from map elevation -> frequency.  All are zero if the map has no elevations."""
+        nonZero = numpy.flatnonzero(mapp)
+        if nonZero.size == 0:
             return (0, 0, 0, 0, 0)
-        """Calculate statistics from map elevation -> frequency."""
-        # find index of first non-zero frequency
-        minimum = 0
-        while minimum < len(mapp) and mapp[minimum] == 0:
-            minimum += 1  # if mapp is all zeroes, minimum is finally len(mapp)
-        # find index of last non-zero frequency
-        maximum = len(mapp) - 1
-        while maximum >= 0 and mapp[maximum] == 0:
-            maximum -= 1  # if mapp is all zeroes, maximum is finally 0
-        # calculate mean elevation and total of frequencies
-        summ = 0.0
-        totalFreq = 0
-        for i in range(minimum, maximum + 1):  # if mapp is all zeroes, we get range(len(mapp), 1) which is empty since len(mapp) > 0 after initial check
-            freq = mapp[i]
-            summ += i * freq
-            totalFreq += freq
-        # just to avoid dvision by zero
-        if totalFreq == 0:
-            return (minimum, maximum, 0, 0, 0)
-        mapMean = summ / totalFreq
+        # indexes of first and last non-zero frequencies
+        minimum = int(nonZero[0])
+        maximum = int(nonZero[-1])
+        freqs = mapp[minimum:maximum+1].astype(numpy.float64)
+        indexes = numpy.arange(minimum, maximum + 1, dtype=numpy.float64)
+        totalFreq = int(mapp[minimum:maximum+1].sum())
+        mapMean = float(numpy.dot(indexes, freqs)) / totalFreq
         mean = mapMean + self.minElev
-        variance = 0.0
-        for i in range(minimum, maximum + 1):
-            diff = i - mapMean
-            variance += diff * diff * mapp[i]
-        stdDev = math.sqrt(variance/totalFreq)
+        diffs = indexes - mapMean
+        stdDev = math.sqrt(float(numpy.dot(diffs * diffs, freqs)) / totalFreq)
         return (minimum, maximum, totalFreq, mean, stdDev)
     
 
     
+    @Profiler.timed('CreateHRUs.printBasins', log=True)
     def printBasins(self, withHRUs: bool, fullHRUsLayer: Optional[QgsVectorLayer]) -> None:
         """
         Print report on crops, soils, and slopes for watershed.
         
-        Also writes hrus and uncomb tables if withHRUs.
+        Also writes hrus and uncomb tables and hrus.csv if withHRUs.
+        In batch mode the report is not written if gv.skipBatchReports is set,
+        and is left until writeDeferredReports is called if gv.deferBatchReports is set.
+        """
+        writeReport = True
+        if self._gv.isBatch and (self._gv.skipBatchReports or self._gv.deferBatchReports):
+            writeReport = False
+            if not self._gv.skipBatchReports and withHRUs not in self.deferredReports:
+                self.deferredReports.append(withHRUs)
+        if withHRUs:
+            with self._gv.db.connect() as conn:
+                if not conn:
+                    return
+                curs = conn.cursor()
+                if self._gv.isHUC or self._gv.useSQLite:
+                    sql0 = 'DROP TABLE IF EXISTS hrus'
+                    curs.execute(sql0)
+                    sql0a = 'DROP TABLE IF EXISTS uncomb'
+                    curs.execute(sql0a)
+                    sql0b = 'DROP TABLE IF EXISTS hru'
+                    curs.execute(sql0b)
+                    sql1 = DBUtils._HRUSCREATESQL
+                    curs.execute(sql1)
+                    sql1a = DBUtils._UNCOMBCREATESQL
+                    curs.execute(sql1a)
+                    sql1b = DBUtils._HRUCREATESQL
+                    curs.execute(sql1b)
+                else:
+                    table = 'hrus'
+                    clearSQL = 'DELETE FROM ' + table
+                    curs.execute(clearSQL)
+                    table = 'uncomb'
+                    clearSQL = 'DELETE FROM ' + table
+                    curs.execute(clearSQL)
+                hrusCsvFile = QSWATUtils.join(self._gv.gridDir, Parameters._HRUSCSV)
+                rows: Tuple[List[Any], List[Any], List[Any]] = ([], [], [])
+                with bufferedFileWriter(hrusCsvFile) as hrusCsv:
+                    hrusCsv.writeLine('hru, area_ha')
+                    self.printReport(True, writeReport, hrusCsv, rows, fullHRUsLayer)
+                hrusRows, uncombRows, hruRows = rows
+                # pyodbc rejects executemany with no rows
+                if len(hrusRows) > 0:
+                    sql2 = 'INSERT INTO hrus VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?)'
+                    curs.executemany(sql2, hrusRows)
+                if len(uncombRows) > 0:
+                    sql2a = 'INSERT INTO uncomb VALUES(?,?,?,?,?,?,?,?,?,?,?)'
+                    curs.executemany(sql2a, uncombRows)
+                if len(hruRows) > 0:
+                    sql2b = 'INSERT INTO hru (OID, SUBBASIN, HRU, LANDUSE, SOIL, SLOPE_CD, HRU_FR, SLSUBBSN, HRU_SLP, OV_N, POT_FR) VALUES(?,?,?,?,?,?,?,?,?,?,?);'
+                    curs.executemany(sql2b, hruRows)
+                if self._gv.isHUC or self._gv.useSQLite:
+                    conn.commit()
+                else:
+                    self._gv.db.hashDbTable(conn, 'hrus')
+                    self._gv.db.hashDbTable(conn, 'uncomb')
+        elif writeReport:
+            self.printReport(False, True, None, None, None)
+        
+    def writeDeferredReports(self) -> None:
+        """Write reports deferred in batch mode, from the current subbasin and HRU data."""
+        for withHRUs in self.deferredReports:
+            self.printReport(withHRUs, True, None, None, None)
+        self.deferredReports = []
+        
+    def printReport(self, withHRUs: bool, writeReport: bool, hrusCsv: Optional[bufferedFileWriter], 
+                    rows: Optional[Tuple[List[Any], List[Any], List[Any]]], fullHRUsLayer: Optional[QgsVectorLayer]) -> None:
+        """
+        Print report on crops, soils, and slopes for watershed if writeReport.
+        
+        If withHRUs, hrusCsv is not None and rows is not None, also write hrus.csv lines and collect rows for the hrus, uncomb and hru tables.
         """
         fileName = Parameters._HRUSREPORT if withHRUs else Parameters._BASINREPORT
+        if withHRUs:
+            horizLine = '---------------------------------------------------------------------------------------------------------'
+        else:
+            horizLine = '---------------------------------------------------------------------------'
+        basinHa = self.totalBasinsArea() / 10000
+        if not writeReport:
+            self.printBasinsDetails(basinHa, withHRUs, None, hrusCsv, rows, fullHRUsLayer, horizLine)
+            return
         path = QSWATUtils.join(self._gv.textDir, fileName)
-        hrusCsvFile = QSWATUtils.join(self._gv.gridDir, Parameters._HRUSCSV)
-
-        with fileWriter(path) as fw, fileWriter(hrusCsvFile) as hrusCsv:
+        with bufferedFileWriter(path) as fw:
             if withHRUs:
-                horizLine = '---------------------------------------------------------------------------------------------------------'
                 fw.writeLine('Landuse/Soil/Slope and HRU Distribution'.ljust(47) + \
                              QSWATUtils.date() + ' ' + QSWATUtils.time())
-                hrusCsv.writeLine('hru, area_ha')
             else:
-                horizLine = '---------------------------------------------------------------------------'
                 fw.writeLine('Landuse/Soil/Slope Distribution'.ljust(47) + \
                              QSWATUtils.date() + ' ' + QSWATUtils.time())
             fw.writeLine('')
@@ -4275,21 +4135,18 @@ class CreateHRUs(QObject):
             st2 = '%Watershed'
             col2just = 33 if withHRUs else 18
             fw.writeLine(st1.rjust(45))
-            basinHa = self.totalBasinsArea() / 10000
             fw.writeLine('Watershed' +  '{:.2F}'.format(basinHa).rjust(36))
             fw.writeLine(horizLine)
             fw.writeLine(st1.rjust(45) + st2.rjust(col2just))
             fw.writeLine('')
             fw.writeLine('Landuse')
-            cropAreas, originalCropAreas = self.totalCropAreas(withHRUs)
+            cropAreas, originalCropAreas, soilAreas, originalSoilAreas, slopeAreas, originalSlopeAreas = self.totalAreas(withHRUs)
             self.printCropAreas(cropAreas, originalCropAreas, basinHa, 0, fw)
             fw.writeLine('')
             fw.writeLine('Soil')
-            soilAreas, originalSoilAreas = self.totalSoilAreas(withHRUs)
             self.printSoilAreas(soilAreas, originalSoilAreas, basinHa, 0, fw)
             fw.writeLine('')
             fw.writeLine('Slope')
-            slopeAreas, originalSlopeAreas = self.totalSlopeAreas(withHRUs)
             self.printSlopeAreas(slopeAreas, originalSlopeAreas, basinHa, 0, fw)
             if self._gv.isHUC or self._gv.isHAWQS:
                 totalReservoirsArea = self.totalReservoirsArea()
@@ -4326,40 +4183,7 @@ class CreateHRUs(QObject):
                                  '{:.2F}'.format(wPercent).rjust(col2just-3))
             fw.writeLine(horizLine)
             fw.writeLine(horizLine)
-                
-            if withHRUs:
-                with self._gv.db.connect() as conn:
-                    if not conn:
-                        return
-                    curs = conn.cursor()
-                    if self._gv.isHUC or self._gv.useSQLite:
-                        sql0 = 'DROP TABLE IF EXISTS hrus'
-                        curs.execute(sql0)
-                        sql0a = 'DROP TABLE IF EXISTS uncomb'
-                        curs.execute(sql0a)
-                        sql0b = 'DROP TABLE IF EXISTS hru'
-                        curs.execute(sql0b)
-                        sql1 = DBUtils._HRUSCREATESQL
-                        curs.execute(sql1)
-                        sql1a = DBUtils._UNCOMBCREATESQL
-                        curs.execute(sql1a)
-                        sql1b = DBUtils._HRUCREATESQL
-                        curs.execute(sql1b)
-                    else:
-                        table = 'hrus'
-                        clearSQL = 'DELETE FROM ' + table
-                        curs.execute(clearSQL)
-                        table = 'uncomb'
-                        clearSQL = 'DELETE FROM ' + table
-                        curs.execute(clearSQL)
-                    self.printBasinsDetails(basinHa, True, fw, hrusCsv, conn, fullHRUsLayer, horizLine)
-                    if self._gv.isHUC or self._gv.useSQLite:
-                        conn.commit()
-                    else:
-                        self._gv.db.hashDbTable(conn, 'hrus')
-                        self._gv.db.hashDbTable(conn, 'uncomb')
-            else:
-                self.printBasinsDetails(basinHa, False, fw, hrusCsv, None, fullHRUsLayer, horizLine)
+            self.printBasinsDetails(basinHa, withHRUs, fw, hrusCsv, rows, fullHRUsLayer, horizLine)
         self._reportsCombo.setVisible(True)
         if withHRUs:
             if self._reportsCombo.findText(Parameters._HRUSITEM) < 0:
@@ -4368,10 +4192,15 @@ class CreateHRUs(QObject):
             if self._reportsCombo.findText(Parameters._BASINITEM) < 0:
                 self._reportsCombo.addItem(Parameters._BASINITEM)
                
-    def printBasinsDetails(self, basinHa: float, withHRUs: bool, fw: fileWriter, hrusCsv: fileWriter, conn: Any, 
-                           fullHRUsLayer: Optional[QgsVectorLayer], horizLine: str) -> None:
-        """Print report on crops, soils, and slopes for subbasin."""
-        setHRUGIS = withHRUs and fullHRUsLayer
+    def printBasinsDetails(self, basinHa: float, withHRUs: bool, fw: Optional[bufferedFileWriter], hrusCsv: Optional[bufferedFileWriter], 
+                           rows: Optional[Tuple[List[Any], List[Any], List[Any]]], fullHRUsLayer: Optional[QgsVectorLayer], horizLine: str) -> None:
+        """
+        Print report on crops, soils, and slopes for each subbasin, if fw is not None.
+        
+        If withHRUs, add the HRUs of each subbasin, and if rows is not None also 
+        write hrus.csv lines, collect table rows, and set HRUGIS values in fullHRUsLayer.
+        """
+        setHRUGIS = withHRUs and rows is not None and fullHRUsLayer
         if setHRUGIS:
             subIndx = self._gv.topo.getIndex(fullHRUsLayer, QSWATTopology._SUBBASIN)
             if subIndx < 0: setHRUGIS = False
@@ -4394,8 +4223,12 @@ class CreateHRUs(QObject):
             if setHRUGIS: 
                 assert fullHRUsLayer is not None
                 self.clearHRUGISNums(fullHRUsLayer, hrugisIndx)
+                fullHRUsIndex = self.fullHRUsIndex(fullHRUsLayer, subIndx, luseIndx, soilIndx, slopeIndx)
+                # HRUGIS values set so far, by feature id: all others are NA
+                hrugisValues: Dict[int, str] = dict()
                 
         oid = 0 # index for hrus table
+        basinHRUs = self.hrusByBasin() if withHRUs else dict()
         if self._gv.useGridModel:
             iterator: Callable[[], Iterable[int]] = lambda: self.basins.keys()
         else:
@@ -4413,73 +4246,76 @@ class CreateHRUs(QObject):
                 QSWATUtils.error('No data for SWATBasin {0} (polygon {1})'.format(SWATBasin, basin), self._gv.isBatch)
                 return
             subHa = float(basinData.area) / 10000
-            percent = (subHa / basinHa) * 100
-            st1 = 'Area [ha]'
-            st2 = '%Watershed'
-            st3 = '%Subbasin'
-            col2just = 33 if withHRUs else 18
-            col3just = 23 if withHRUs else 15
-            fw.writeLine(st1.rjust(45) + st2.rjust(col2just) + st3.rjust(col3just))
-            fw.writeLine('')
-            fw.writeLine('Subbasin {0!s}'.format(SWATBasin).ljust(30) + \
-                         '{:.2F}'.format(subHa).rjust(15) + \
-                         '{:.2F}'.format(percent).rjust(col2just-3))
-            fw.writeLine('')
-            fw.writeLine('Landuse')
-            self.printCropAreas(basinData.cropAreas, basinData.originalCropAreas, basinHa, subHa, fw)
-            fw.writeLine('')
-            fw.writeLine('Soil')
-            self.printSoilAreas(basinData.soilAreas, basinData.originalSoilAreas, basinHa, subHa, fw)
-            fw.writeLine('')
-            fw.writeLine('Slope')
-            self.printSlopeAreas(basinData.slopeAreas, basinData.originalSlopeAreas, basinHa, subHa, fw)
-            fw.writeLine('')
-            if basinData.reservoirArea > 0:
-                resHa = basinData.reservoirArea / 1E4
-                wPercent = (resHa / basinHa) * 100
-                bPercent = (resHa / subHa) * 100
-                fw.writeLine('Reservoir'.ljust(30) + 
-                             '{:.2F}'.format(resHa).rjust(15) +
-                             '{:.2F}'.format(wPercent).rjust(col2just-3) + 
-                             '{:.2F}'.format(bPercent).rjust(col3just))
+            if fw is not None:
+                percent = (subHa / basinHa) * 100
+                st1 = 'Area [ha]'
+                st2 = '%Watershed'
+                st3 = '%Subbasin'
+                col2just = 33 if withHRUs else 18
+                col3just = 23 if withHRUs else 15
+                fw.writeLine(st1.rjust(45) + st2.rjust(col2just) + st3.rjust(col3just))
                 fw.writeLine('')
-            if basinData.pondArea > 0:
-                pndHa = basinData.pondArea / 1E4
-                wPercent = (pndHa / basinHa) * 100
-                bPercent = (pndHa / subHa) * 100
-                fw.writeLine('Pond'.ljust(30) + 
-                             '{:.2F}'.format(pndHa).rjust(15) +
-                             '{:.2F}'.format(wPercent).rjust(col2just-3) + 
-                             '{:.2F}'.format(bPercent).rjust(col3just))
+                fw.writeLine('Subbasin {0!s}'.format(SWATBasin).ljust(30) + \
+                             '{:.2F}'.format(subHa).rjust(15) + \
+                             '{:.2F}'.format(percent).rjust(col2just-3))
                 fw.writeLine('')
-            if basinData.lakeArea > 0:
-                lakeHa = basinData.lakeArea / 1E4
-                wPercent = (lakeHa / basinHa) * 100
-                bPercent = (lakeHa / subHa) * 100
-                fw.writeLine('Lake'.ljust(30) + 
-                             '{:.2F}'.format(lakeHa).rjust(15) +
-                             '{:.2F}'.format(wPercent).rjust(col2just-3) + 
-                             '{:.2F}'.format(bPercent).rjust(col3just))
+                fw.writeLine('Landuse')
+                self.printCropAreas(basinData.cropAreas, basinData.originalCropAreas, basinHa, subHa, fw)
                 fw.writeLine('')
-            if basinData.playaArea > 0:
-                playaHa = basinData.playaArea / 1E4
-                wPercent = (playaHa / basinHa) * 100
-                bPercent = (playaHa / subHa) * 100
-                fw.writeLine('Playa'.ljust(30) + 
-                             '{:.2F}'.format(playaHa).rjust(15) +
-                             '{:.2F}'.format(wPercent).rjust(col2just-3) + 
-                             '{:.2F}'.format(bPercent).rjust(col3just))
+                fw.writeLine('Soil')
+                self.printSoilAreas(basinData.soilAreas, basinData.originalSoilAreas, basinHa, subHa, fw)
+                fw.writeLine('')
+                fw.writeLine('Slope')
+                self.printSlopeAreas(basinData.slopeAreas, basinData.originalSlopeAreas, basinHa, subHa, fw)
                 fw.writeLine('')
+                if basinData.reservoirArea > 0:
+                    resHa = basinData.reservoirArea / 1E4
+                    wPercent = (resHa / basinHa) * 100
+                    bPercent = (resHa / subHa) * 100
+                    fw.writeLine('Reservoir'.ljust(30) + 
+                                 '{:.2F}'.format(resHa).rjust(15) +
+                                 '{:.2F}'.format(wPercent).rjust(col2just-3) + 
+                                 '{:.2F}'.format(bPercent).rjust(col3just))
+                    fw.writeLine('')
+                if basinData.pondArea > 0:
+                    pndHa = basinData.pondArea / 1E4
+                    wPercent = (pndHa / basinHa) * 100
+                    bPercent = (pndHa / subHa) * 100
+                    fw.writeLine('Pond'.ljust(30) + 
+                                 '{:.2F}'.format(pndHa).rjust(15) +
+                                 '{:.2F}'.format(wPercent).rjust(col2just-3) + 
+                                 '{:.2F}'.format(bPercent).rjust(col3just))
+                    fw.writeLine('')
+                if basinData.lakeArea > 0:
+                    lakeHa = basinData.lakeArea / 1E4
+                    wPercent = (lakeHa / basinHa) * 100
+                    bPercent = (lakeHa / subHa) * 100
+                    fw.writeLine('Lake'.ljust(30) + 
+                                 '{:.2F}'.format(lakeHa).rjust(15) +
+                                 '{:.2F}'.format(wPercent).rjust(col2just-3) + 
+                                 '{:.2F}'.format(bPercent).rjust(col3just))
+                    fw.writeLine('')
+                if basinData.playaArea > 0:
+                    playaHa = basinData.playaArea / 1E4
+                    wPercent = (playaHa / basinHa) * 100
+                    bPercent = (playaHa / subHa) * 100
+                    fw.writeLine('Playa'.ljust(30) + 
+                                 '{:.2F}'.format(playaHa).rjust(15) +
+                                 '{:.2F}'.format(wPercent).rjust(col2just-3) + 
+                                 '{:.2F}'.format(bPercent).rjust(col3just))
+                    fw.writeLine('')
             if withHRUs:
-                if self.isMultiple:
-                    fw.writeLine('HRUs:')
-                else:
-                    fw.writeLine('HRU:')
-                oid = self.printbasinHRUs(basin, basinData, basinHa, subHa, fw, hrusCsv, conn, oid)
+                if fw is not None:
+                    if self.isMultiple:
+                        fw.writeLine('HRUs:')
+                    else:
+                        fw.writeLine('HRU:')
+                oid = self.printbasinHRUs(basin, basinData, basinHRUs.get(basin, []), basinHa, subHa, fw, hrusCsv, rows, oid)
                 if setHRUGIS:
                     assert fullHRUsLayer is not None
-                    self.addHRUGISNums(basin, fullHRUsLayer, subIndx, luseIndx, soilIndx, slopeIndx, hrugisIndx)
-            fw.writeLine(horizLine)
+                    self.addHRUGISNums(basin, basinHRUs.get(basin, []), fullHRUsLayer, fullHRUsIndex, hrugisValues, hrugisIndx)
+            if fw is not None:
+                fw.writeLine(horizLine)
         if setHRUGIS:
             assert fullHRUsLayer is not None
             OK = fullHRUsLayer.commitChanges()
@@ -4487,57 +4323,65 @@ class CreateHRUs(QObject):
                 QSWATUtils.error('Cannot commit changes to FullHRUs shapefile', self._gv.isBatch)
             self.writeActHRUs(fullHRUsLayer, hrugisIndx)
 
-    def printbasinHRUs(self, basin: int, basinData: BasinData, wshedArea: float, subArea: float, 
-                       fw: fileWriter, hrusCsv: fileWriter, conn: Any, oid: int) -> int:
-        '''Print HRUs for a subbasin.'''
-        for (hru, hrudata) in self.hrus.items():
-            if hrudata.basin == basin:
-                # ignore basins not mapping to SWAT basin (empty, or edge when using grid model)
-                if basin in self._gv.topo.basinToSWATBasin:
-                    lu = self._gv.db.getLanduseCode(hrudata.crop)
-                    soil, _ = self._gv.db.getSoilName(hrudata.soil)
-                    slp = self._gv.db.slopeRange(hrudata.slope)
-                    cropSoilSlope = lu + '/' + soil + '/' + slp
-                    meanSlopePercent = float(hrudata.meanSlope) * 100
-                    hruha = float(hrudata.area) / 10000
-                    arlu = float(basinData.cropAreas[hrudata.crop]) / 10000 if self.isMultiple else hruha
-                    arso = basinData.cropSoilArea(hrudata.crop, hrudata.soil) / 10000 if self.isMultiple else hruha
-                    arslp = hruha
-                    uc = lu + '_' + soil + '_' + slp
-                    SWATBasin = self._gv.topo.basinToSWATBasin[basin]
-                    fw.write(str(hru).ljust(5) + cropSoilSlope.rjust(25) + \
-                                 '{:.2F}'.format(hruha).rjust(15))
-                    if wshedArea > 0:
-                        percent1 = (hruha / wshedArea) * 100
-                        fw.write('{:.2F}'.format(percent1).rjust(30))
-                    if subArea > 0:
-                        percent2 = (hruha / subArea) * 100
-                        fw.write('{:.2F}'.format(percent2).rjust(23))
-                    hrusArea = subArea - (basinData.reservoirArea + basinData.pondArea + basinData.lakeArea) / 1E4
-                    if self._gv.isHUC or self._gv.isHAWQS:
-                        # allow for extra 1 ha WATR hru inserted if all water body
-                        hrusArea = max(1, hrusArea)
-                    fw.writeLine('')
-                    filebase = QSWATUtils.fileBase(SWATBasin, hrudata.relHru, forTNC=self._gv.forTNC)
-                    oid += 1
-                    table = 'hrus'
-                    sql = 'INSERT INTO ' + table + ' VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?)'
-                    conn.cursor().execute(sql, (oid, float(SWATBasin), float(hrusArea), lu, float(arlu), soil, float(arso), slp, \
-                                                float(arslp), float(meanSlopePercent), uc, hru, filebase))
-                    table = 'uncomb'
-                    sql = 'INSERT INTO ' + table + ' VALUES(?,?,?,?,?,?,?,?,?,?,?)'
-                    conn.cursor().execute(sql, (oid, float(SWATBasin), hrudata.crop, lu, hrudata.soil, soil, hrudata.slope, slp, \
-                                              float(meanSlopePercent), float(hruha), uc))
-                    if self._gv.isHUC or self._gv.isHAWQS:
-                        table = 'hru'
-                        sql = 'INSERT INTO {0} (OID, SUBBASIN, HRU, LANDUSE, SOIL, SLOPE_CD, HRU_FR, SLSUBBSN, HRU_SLP, OV_N, POT_FR) VALUES(?,?,?,?,?,?,?,?,?,?,?);'.format(table)
-                        # assume that if, say, 10% of subbasin is pothole (playa) then 10% of each HRU drains into it.
-                        pot_fr = basinData.playaArea / basinData.area
-                        conn.cursor().execute(sql, (oid, SWATBasin, hru, lu, soil, slp, hrudata.area / basinData.area,
-                                                    QSWATUtils.getSlsubbsn(hrudata.meanSlope), hrudata.meanSlope, self._gv.db.landuseOVN.get(hrudata.crop, 0), pot_fr))
-                    hrusCsv.writeLine('{0},{1}'.format(hru, hruha))
+    def printbasinHRUs(self, basin: int, basinData: BasinData, hrus: List[int], wshedArea: float, subArea: float, 
+                       fw: Optional[bufferedFileWriter], hrusCsv: Optional[bufferedFileWriter], 
+                       rows: Optional[Tuple[List[Any], List[Any], List[Any]]], oid: int) -> int:
+        '''Print HRUs for a subbasin if fw is not None.  If rows is not None, write hrus.csv lines and collect hrus, uncomb and hru table rows.'''
+        # ignore basins not mapping to SWAT basin (empty, or edge when using grid model)
+        if basin not in self._gv.topo.basinToSWATBasin:
+            return oid
+        SWATBasin = self._gv.topo.basinToSWATBasin[basin]
+        hrusArea = subArea - (basinData.reservoirArea + basinData.pondArea + basinData.lakeArea) / 1E4
+        if self._gv.isHUC or self._gv.isHAWQS:
+            # allow for extra 1 ha WATR hru inserted if all water body
+            hrusArea = max(1, hrusArea)
+        for hru in hrus:
+            hrudata = self.hrus[hru]
+            lu = self._gv.db.getLanduseCode(hrudata.crop)
+            soil, _ = self._gv.db.getSoilName(hrudata.soil)
+            slp = self._gv.db.slopeRange(hrudata.slope)
+            hruha = float(hrudata.area) / 10000
+            if fw is not None:
+                cropSoilSlope = lu + '/' + soil + '/' + slp
+                fw.write(str(hru).ljust(5) + cropSoilSlope.rjust(25) + \
+                             '{:.2F}'.format(hruha).rjust(15))
+                if wshedArea > 0:
+                    percent1 = (hruha / wshedArea) * 100
+                    fw.write('{:.2F}'.format(percent1).rjust(30))
+                if subArea > 0:
+                    percent2 = (hruha / subArea) * 100
+                    fw.write('{:.2F}'.format(percent2).rjust(23))
+                fw.writeLine('')
+            if rows is None:
+                continue
+            hrusRows, uncombRows, hruRows = rows
+            meanSlopePercent = float(hrudata.meanSlope) * 100
+            arlu = float(basinData.cropAreas[hrudata.crop]) / 10000 if self.isMultiple else hruha
+            arso = basinData.cropSoilArea(hrudata.crop, hrudata.soil) / 10000 if self.isMultiple else hruha
+            arslp = hruha
+            uc = lu + '_' + soil + '_' + slp
+            filebase = QSWATUtils.fileBase(SWATBasin, hrudata.relHru, forTNC=self._gv.forTNC)
+            oid += 1
+            hrusRows.append((oid, float(SWATBasin), float(hrusArea), lu, float(arlu), soil, float(arso), slp, \
+                             float(arslp), float(meanSlopePercent), uc, hru, filebase))
+            uncombRows.append((oid, float(SWATBasin), hrudata.crop, lu, hrudata.soil, soil, hrudata.slope, slp, \
+                               float(meanSlopePercent), float(hruha), uc))
+            if self._gv.isHUC or self._gv.isHAWQS:
+                # assume that if, say, 10% of subbasin is pothole (playa) then 10% of each HRU drains into it.
+                pot_fr = basinData.playaArea / basinData.area
+                hruRows.append((oid, SWATBasin, hru, lu, soil, slp, hrudata.area / basinData.area,
+                                QSWATUtils.getSlsubbsn(hrudata.meanSlope), hrudata.meanSlope, self._gv.db.landuseOVN.get(hrudata.crop, 0), pot_fr))
+            assert hrusCsv is not None
+            hrusCsv.writeLine('{0},{1}'.format(hru, hruha))
         return oid
     
+    def hrusByBasin(self) -> Dict[int, List[int]]:
+        """Return map of basin to list of its HRU numbers, in increasing order."""
+        result: Dict[int, List[int]] = dict()
+        for (hru, hrudata) in self.hrus.items():
+            result.setdefault(hrudata.basin, []).append(hru)
+        return result
+    
     def writeWaterStats1(self) -> Dict[int, Tuple[str, float, float, float, float, float, float, float, float, float, float]]:
         """Write water statistics for HUC and HAWQS projects.  Write bodyStats file and return stats data so WATR reduction stats can be added."""
 #         NHDWaterFile = QSWATUtils.join(self._gv.HUCDataDir, 'NHDPlusNationalData/NHDWaterBody5070.sqlite')
@@ -4634,6 +4478,7 @@ class CreateHRUs(QObject):
                 stats.write("'{0}', {1:.2F}, {2:.2F}, {3:.2F}, {4:.2F}, {5:.2F}, {6:.2F}, {7:.2F}, {8:.2F}, {9:.2F}, {10:.2F}, {11:.2F}, {12:.2F}\n".
                             format(basinHUC, areaHa, reservoirHa, pondHa, lakeHa, WATRHa, WATRInStreamHa, streamAreaHa, swampMarshHa, wetLanduseHa, playaHa, reduction, percent)) 
                 
+    @Profiler.timed('CreateHRUs.writeHRUsAndUncombTables', log=True)
     def writeHRUsAndUncombTables(self) -> None:
         """Write hrus table."""
         oid = 0
@@ -4697,38 +4542,41 @@ class CreateHRUs(QObject):
             QSWATUtils.error('Cannot edit FullHRUs attribute table', self._gv.isBatch)
         
         
-    def addHRUGISNums(self, basin: int, fullHRUsLayer: QgsVectorLayer, 
-                      subIndx: int, luseIndx: int, soilIndx: int, 
-                      slopeIndx: int, hrugisIndx: int) -> None:
-        """Add HRUGIS values for actual HRUs."""
+    def fullHRUsIndex(self, fullHRUsLayer: QgsVectorLayer, subIndx: int, luseIndx: int, soilIndx: int, slopeIndx: int) -> Dict[Tuple[Any, Any, Any, Any], int]:
+        """Return map of (subbasin, landuse, soil, slope range) to id of first FullHRUs feature with those attributes."""
+        result: Dict[Tuple[Any, Any, Any, Any], int] = dict()
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([subIndx, luseIndx, soilIndx, slopeIndx])
+        for feature in fullHRUsLayer.getFeatures(request):
+            attrs = feature.attributes()
+            result.setdefault((attrs[subIndx], attrs[luseIndx], attrs[soilIndx], attrs[slopeIndx]), feature.id())
+        return result
+        
+    def addHRUGISNums(self, basin: int, hrus: List[int], fullHRUsLayer: QgsVectorLayer, 
+                      fullHRUsIndex: Dict[Tuple[Any, Any, Any, Any], int], hrugisValues: Dict[int, str], hrugisIndx: int) -> None:
+        """Add HRUGIS values for actual HRUs of basin, finding FullHRUs features with fullHRUsIndex and recording values in hrugisValues."""
         # ignore empty basins
         if basin in self._gv.topo.basinToSWATBasin:
             SWATBasin = self._gv.topo.basinToSWATBasin[basin]
-            for hruData in self.hrus.values():
-                if hruData.basin == basin:
-                    found = False
-                    cropCode = self._gv.db.getLanduseCode(hruData.crop)
-                    origCropCode = self._gv.db.getLanduseCode(hruData.origCrop)
-                    soilName, _ = self._gv.db.getSoilName(hruData.soil)
-                    slopeRange = self._gv.db.slopeRange(hruData.slope)
-                    for feature in fullHRUsLayer.getFeatures():
-                        attrs = feature.attributes()
-                        if SWATBasin == attrs[subIndx] and origCropCode == attrs[luseIndx] \
-                        and soilName == attrs[soilIndx] and slopeRange == attrs[slopeIndx]:
-                            found = True
-                            oldgis = attrs[hrugisIndx]
-                            if oldgis == 'NA':
-                                hrugis = QSWATUtils.fileBase(SWATBasin, hruData.relHru, forTNC=self._gv.forTNC)
-                            else:
-                                hrugis = oldgis + ', {0}'.format(hruData.relHru)
-                            OK = fullHRUsLayer.changeAttributeValue(feature.id(), hrugisIndx, hrugis)
-                            if not OK:
-                                QSWATUtils.error('Cannot write to FullHRUs attribute table', self._gv.isBatch)
-                                return
-                            break
-                    if not found:
-                        QSWATUtils.error('Cannot find FullHRUs feature for basin {0}, landuse {1}, soil {2}, slope range {3}'.format(SWATBasin, cropCode, soilName, slopeRange), self._gv.isBatch)
-                        return
+            for hru in hrus:
+                hruData = self.hrus[hru]
+                cropCode = self._gv.db.getLanduseCode(hruData.crop)
+                origCropCode = self._gv.db.getLanduseCode(hruData.origCrop)
+                soilName, _ = self._gv.db.getSoilName(hruData.soil)
+                slopeRange = self._gv.db.slopeRange(hruData.slope)
+                fid = fullHRUsIndex.get((SWATBasin, origCropCode, soilName, slopeRange), None)
+                if fid is None:
+                    QSWATUtils.error('Cannot find FullHRUs feature for basin {0}, landuse {1}, soil {2}, slope range {3}'.format(SWATBasin, cropCode, soilName, slopeRange), self._gv.isBatch)
+                    return
+                oldgis = hrugisValues.get(fid, 'NA')
+                if oldgis == 'NA':
+                    hrugis = QSWATUtils.fileBase(SWATBasin, hruData.relHru, forTNC=self._gv.forTNC)
+                else:
+                    hrugis = oldgis + ', {0}'.format(hruData.relHru)
+                hrugisValues[fid] = hrugis
+                OK = fullHRUsLayer.changeAttributeValue(fid, hrugisIndx, hrugis)
+                if not OK:
+                    QSWATUtils.error('Cannot write to FullHRUs attribute table', self._gv.isBatch)
+                    return
                     
     def writeActHRUs(self, fullHRUsLayer: QgsVectorLayer, hrugisIndx: int) -> None:
         """Create and load the actual HRUs file."""
@@ -4773,6 +4621,7 @@ class CreateHRUs(QObject):
             return False
         return True
     
+    @Profiler.timed('CreateHRUs.writeWatershedTable', log=True)
     def writeWatershedTable(self) -> None:
         """Write Watershed table in project database, make subs1.shp in shapes directory, and copy as results template to TablesOut directory."""
         QSWATUtils.copyShapefile(self._gv.wshedFile, Parameters._SUBS1, self._gv.shapesDir)
@@ -5028,87 +4877,31 @@ class CreateHRUs(QObject):
             total += bd.playaArea
         return total
     
-    def totalCropAreas(self, withHRUs: bool) -> Tuple[Optional[Dict[int, float]], Dict[int, float]]:
-        """
-        Return maps of crop -> area in square metres across all subbasins.
-        
-        If withHRUs, return updated and original values.
-        Otherise return the original values, and first map is None
-        
+    def totalAreas(self, withHRUs: bool) -> Tuple[Optional[Dict[int, float]], Dict[int, float], 
+                                                  Optional[Dict[int, float]], Dict[int, float], 
+                                                  Optional[Dict[int, float]], Dict[int, float]]:
         """
-        result1: Optional[Dict[int, float]] = dict() if withHRUs else None
-        result2: Dict[int, float] = dict()
-        for bd in self.basins.values():
-            map1 = bd.cropAreas if withHRUs else None
-            map2 = bd.originalCropAreas
-            if map1:
-                assert result1 is not None
-                for (crop, area) in map1.items():
-                    if crop in result1:
-                        result1[crop] += area
-                    else:
-                        result1[crop] = area
-            for (crop, area) in map2.items():
-                if crop in result2:
-                    result2[crop] += area
-                else:
-                    result2[crop] = area
-        return (result1, result2)
-    
-    def totalSoilAreas(self, withHRUs: bool) -> Tuple[Optional[Dict[int, float]], Dict[int, float]]:
-        """Return map of soil -> area in square metres across all subbasins.
-        
-        If withHRUs, return updated and original values.
-        Otherise return the original values, and first map is None
+        Return maps of crop, soil and slope -> area in square metres across all subbasins, collected in one pass.
         
+        For each of crop, soil and slope, if withHRUs, return updated and original values.
+        Otherise return the original values, and first map is None.
         """
-        result1: Optional[Dict[int, float]]  = dict() if withHRUs else None
-        result2: Dict[int, float] = dict()
+        totals: List[Optional[Dict[int, float]]] = [dict() if withHRUs else None, dict(), 
+                                                    dict() if withHRUs else None, dict(), 
+                                                    dict() if withHRUs else None, dict()]
         for bd in self.basins.values():
-            map1 = bd.soilAreas if withHRUs else None
-            map2 = bd.originalSoilAreas
-            if map1:
-                assert result1 is not None
-                for (soil, area) in map1.items():
-                    if soil in result1:
-                        result1[soil] += area
-                    else:
-                        result1[soil] = area
-            for (soil, area) in map2.items():
-                if soil in result2:
-                    result2[soil] += area
-                else:
-                    result2[soil] = area
-        return (result1, result2)
+            maps = [bd.cropAreas if withHRUs else None, bd.originalCropAreas, 
+                    bd.soilAreas if withHRUs else None, bd.originalSoilAreas, 
+                    bd.slopeAreas if withHRUs else None, bd.originalSlopeAreas]
+            for mapp, result in zip(maps, totals):
+                if mapp and result is not None:
+                    for (key, area) in mapp.items():
+                        result[key] = result.get(key, 0) + area
+        return (totals[0], cast(Dict[int, float], totals[1]), totals[2], cast(Dict[int, float], totals[3]), 
+                totals[4], cast(Dict[int, float], totals[5]))
     
-    def totalSlopeAreas(self, withHRUs: bool) -> Tuple[Optional[Dict[int, float]], Dict[int, float]]:
-        """Return map of slope -> area in square metres across all subbasins.
-        
-        If withHRUs, return updated and original values.
-        Otherise return the original values, and first map is None
-        
-        """
-        result1: Optional[Dict[int, float]] = dict() if withHRUs else None
-        result2: Dict[int, float] = dict()
-        for bd in self.basins.values():
-            map1 = bd.slopeAreas if withHRUs else None
-            map2 = bd.originalSlopeAreas
-            if map1:
-                assert result1 is not None
-                for (slope, area) in map1.items():
-                    if slope in result1:
-                        result1[slope] += area
-                    else:
-                        result1[slope] = area
-            for (slope, area) in map2.items():
-                if slope in result2:
-                    result2[slope] += area
-                else:
-                    result2[slope] = area
-        return (result1, result2)
-
     def printCropAreas(self, cropAreas: Optional[Dict[int, float]], originalCropAreas: Dict[int, float], 
-                       total1: float, total2: float, fw: fileWriter) -> None:
+                       total1: float, total2: float, fw: bufferedFileWriter) -> None:
         """ Print a line containing crop, area in hectares, 
         percent of total1, percent of total2.
         
@@ -5160,7 +4953,7 @@ class CreateHRUs(QObject):
                     fw.writeLine('')
        
     def printSoilAreas(self, soilAreas: Optional[Dict[int, float]], originalSoilAreas: Dict[int, float], 
-                       total1: float, total2: float, fw: fileWriter) -> None:
+                       total1: float, total2: float, fw: bufferedFileWriter) -> None:
         """ Print a line containing soil, area in hectares, 
         percent of total1, percent of total2.
         
@@ -5211,7 +5004,7 @@ class CreateHRUs(QObject):
                     fw.writeLine('')
         
     def printSlopeAreas(self, slopeAreas: Optional[Dict[int, float]], originalSlopeAreas: Dict[int, float], 
-                        total1: float, total2: float, fw: fileWriter) -> None:
+                        total1: float, total2: float, fw: bufferedFileWriter) -> None:
         """ Print a line containing slope, area in hectares, 
         percent of total1, percent of total2.
         
@@ -0,0 +1,788 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+
+import numpy as np
+from typing import Dict, List, Tuple, Optional, Callable, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .QSWATData import BasinData  # type: ignore  # @UnusedImport
+
+class HRUTable:
+    """Columnar copy of the potential HRUs of all subbasins, used to apply the HRU thresholds with array operations.
+
+    There is one row per HRU, in the order of iteration of the subbasins and their cropSoilSlopeNumbers maps.
+    Rows are grouped by subbasin, by landuse within subbasin, and by soil within landuse.
+    Sums over groups are accumulated in row order, and redistributions multiply areas, cell counts and slope totals
+    in the same sequence as the BasinData methods they replace,
+    so the HRUs selected and their final values are identical to those of the loops over the basin maps.
+    Does not use Qt, so can be used headless."""
+
+    def __init__(self, basins: Dict[int, 'BasinData']) -> None:
+        """Build table from basins map."""
+        basinNums: List[int] = []
+        basinAreas: List[float] = []
+        hruCounts: List[int] = []
+        maxCropAreas: List[float] = []
+        maxSoilAreas: List[float] = []
+        maxSlopeAreas: List[float] = []
+        cropGroupBasins: List[int] = []
+        cropGroupCrops: List[int] = []
+        cropGroupAreas: List[float] = []
+        soilGroupCropGroups: List[int] = []
+        soilGroupSoils: List[int] = []
+        rowBasins: List[int] = []
+        rowCropGroups: List[int] = []
+        rowSoilGroups: List[int] = []
+        rowSlopes: List[int] = []
+        rowHrus: List[int] = []
+        rowCounts: List[int] = []
+        rowAreas: List[float] = []
+        rowSlopeTotals: List[float] = []
+        rowSoilAreas: List[float] = []
+        rowSoilRanks: List[int] = []
+        rowSlopeAreas: List[float] = []
+        rowSlopeRanks: List[int] = []
+        nan = float('nan')
+        for basinIndex, (basin, basinData) in enumerate(basins.items()):
+            basinNums.append(basin)
+            basinAreas.append(basinData.cropSoilSlopeArea)
+            hruCounts.append(len(basinData.hruMap))
+            originalCropAreas = basinData.originalCropAreas
+            originalSoilAreas = basinData.originalSoilAreas
+            originalSlopeAreas = basinData.originalSlopeAreas
+            maxCropAreas.append(max([0.0] + list(originalCropAreas.values())))
+            maxSoilAreas.append(max([0.0] + list(originalSoilAreas.values())))
+            maxSlopeAreas.append(max([0.0] + list(originalSlopeAreas.values())))
+            # ranks give the order in which the original soil and slope maps are iterated
+            soilRanks = {soil: rank for rank, soil in enumerate(originalSoilAreas)}
+            slopeRanks = {slope: rank for rank, slope in enumerate(originalSlopeAreas)}
+            for crop, soilSlopeNumbers in basinData.cropSoilSlopeNumbers.items():
+                cropGroup = len(cropGroupBasins)
+                cropGroupBasins.append(basinIndex)
+                cropGroupCrops.append(crop)
+                cropGroupAreas.append(originalCropAreas.get(crop, nan))
+                for soil, slopeNumbers in soilSlopeNumbers.items():
+                    soilGroup = len(soilGroupCropGroups)
+                    soilGroupCropGroups.append(cropGroup)
+                    soilGroupSoils.append(soil)
+                    soilArea = originalSoilAreas.get(soil, nan)
+                    soilRank = soilRanks.get(soil, 0)
+                    for slope, hru in slopeNumbers.items():
+                        cellData = basinData.hruMap[hru]
+                        rowBasins.append(basinIndex)
+                        rowCropGroups.append(cropGroup)
+                        rowSoilGroups.append(soilGroup)
+                        rowSlopes.append(slope)
+                        rowHrus.append(hru)
+                        rowCounts.append(cellData.cellCount)
+                        rowAreas.append(cellData.area)
+                        rowSlopeTotals.append(cellData.totalSlope)
+                        rowSoilAreas.append(soilArea)
+                        rowSoilRanks.append(soilRank)
+                        rowSlopeAreas.append(originalSlopeAreas.get(slope, nan))
+                        rowSlopeRanks.append(slopeRanks.get(slope, 0))
+        ## basin numbers, indexed by subbasin index
+        self.basinNums = basinNums
+        ## cropSoilSlopeArea of each subbasin
+        self.basinArea = np.array(basinAreas, dtype=np.float64)
+        ## number of HRUs remaining in each subbasin
+        self.hruCounts = np.array(hruCounts, dtype=np.int64)
+        ## largest original landuse area in each subbasin
+        self.maxCropArea = np.array(maxCropAreas, dtype=np.float64)
+        ## largest original soil area in each subbasin
+        self.maxSoilArea = np.array(maxSoilAreas, dtype=np.float64)
+        ## largest original slope area in each subbasin
+        self.maxSlopeArea = np.array(maxSlopeAreas, dtype=np.float64)
+        ## subbasin index of each landuse group
+        self.cropGroupBasin = np.array(cropGroupBasins, dtype=np.int64)
+        ## landuse of each landuse group
+        self.cropGroupCrop = np.array(cropGroupCrops, dtype=np.int64)
+        ## original area of each landuse group, nan if missing from originalCropAreas
+        self.cropGroupArea = np.array(cropGroupAreas, dtype=np.float64)
+        ## landuse group of each soil group
+        self.soilGroupCropGroup = np.array(soilGroupCropGroups, dtype=np.int64)
+        ## soil of each soil group
+        self.soilGroupSoil = np.array(soilGroupSoils, dtype=np.int64)
+        ## subbasin index of each row
+        self.rowBasin = np.array(rowBasins, dtype=np.int64)
+        ## landuse group of each row
+        self.rowCropGroup = np.array(rowCropGroups, dtype=np.int64)
+        ## soil group of each row
+        self.rowSoilGroup = np.array(rowSoilGroups, dtype=np.int64)
+        ## slope of each row
+        self.rowSlope = np.array(rowSlopes, dtype=np.int64)
+        ## HRU number (relative to subbasin) of each row
+        self.rowHru = np.array(rowHrus, dtype=np.int64)
+        ## original area of soil of each row within its subbasin, nan if missing from originalSoilAreas
+        self.rowSoilArea = np.array(rowSoilAreas, dtype=np.float64)
+        ## position of soil of each row in originalSoilAreas
+        self.rowSoilRank = np.array(rowSoilRanks, dtype=np.int64)
+        ## original area of slope of each row within its subbasin, nan if missing from originalSlopeAreas
+        self.rowSlopeArea = np.array(rowSlopeAreas, dtype=np.float64)
+        ## position of slope of each row in originalSlopeAreas
+        self.rowSlopeRank = np.array(rowSlopeRanks, dtype=np.int64)
+        ## cell count of each row.  Held as floats but always integral
+        self.cellCount = np.array(rowCounts, dtype=np.float64)
+        ## area of each row in square metres
+        self.area = np.array(rowAreas, dtype=np.float64)
+        ## total slope of each row
+        self.totalSlope = np.array(rowSlopeTotals, dtype=np.float64)
+        ## true for rows not removed
+        self.alive = np.ones(len(rowHrus), dtype=bool)
+        ## true for rows whose values have been redistributed
+        self.changed = np.zeros(len(rowHrus), dtype=bool)
+
+    def copy(self) -> 'HRUTable':
+        """Return copy of table, sharing the fixed arrays, to which thresholds can be applied."""
+        result = HRUTable.__new__(HRUTable)
+        result.__dict__.update(self.__dict__)
+        for name in ['hruCounts', 'cellCount', 'area', 'totalSlope', 'alive', 'changed']:
+            setattr(result, name, getattr(self, name).copy())
+        return result
+
+    def countHRUs(self) -> int:
+        """Number of HRUs remaining."""
+        return int(np.count_nonzero(self.alive))
+
+    def exemptCropGroups(self, isExempt: Callable[[int], bool]) -> np.ndarray:
+        """Return array with true for landuse groups whose landuse is exempt."""
+        exemptCrops = {crop: isExempt(crop) for crop in set(self.cropGroupCrop.tolist())}
+        return np.array([exemptCrops[crop] for crop in self.cropGroupCrop.tolist()], dtype=bool)
+
+    def writeBack(self, basins: Dict[int, 'BasinData']) -> None:
+        """Remove the removed HRUs from basins, and copy redistributed values to the remaining ones."""
+        for row in np.flatnonzero(~self.alive).tolist():
+            basinData = basins[self.basinNums[self.rowBasin[row]]]
+            soilGroup = self.rowSoilGroup[row]
+            cropGroup = self.soilGroupCropGroup[soilGroup]
+            basinData.removeHRU(int(self.rowHru[row]), int(self.cropGroupCrop[cropGroup]),
+                                int(self.soilGroupSoil[soilGroup]), int(self.rowSlope[row]))
+        rows = np.flatnonzero(self.alive & self.changed)
+        for basinIndex, hru, cellCount, area, totalSlope in zip(self.rowBasin[rows].tolist(), self.rowHru[rows].tolist(),
+                                                                 self.cellCount[rows].tolist(), self.area[rows].tolist(),
+                                                                 self.totalSlope[rows].tolist()):
+            cellData = basins[self.basinNums[basinIndex]].hruMap[hru]
+            cellData.cellCount = int(cellCount)
+            cellData.area = area
+            cellData.totalSlope = totalSlope
+
+    def _multiply(self, rows: np.ndarray, factors: np.ndarray) -> None:
+        """Multiply values of rows by factors, as CellData.multiply."""
+        self.cellCount[rows] = np.rint(self.cellCount[rows] * factors)
+        self.area[rows] *= factors
+        self.totalSlope[rows] *= factors
+        self.changed[rows] = True
+
+    def _redistribute(self, rowGroups: np.ndarray, groupAreas: np.ndarray, removedAreas: np.ndarray) -> np.ndarray:
+        """Redistribute removedAreas of groups to their remaining rows, where rowGroups gives the group of each row.
+
+        Return mask of groups left unchanged because all their area was removed."""
+        positive = removedAreas > 0
+        remaining = groupAreas - removedAreas
+        failed = positive & (remaining == 0)
+        redistributing = positive & ~failed
+        factors = np.ones(len(groupAreas), dtype=np.float64)
+        factors[redistributing] = groupAreas[redistributing] / remaining[redistributing]
+        rows = np.flatnonzero(self.alive & redistributing[rowGroups])
+        self._multiply(rows, factors[rowGroups[rows]])
+        return failed
+
+    def _removeAndRedistribute(self, rows: np.ndarray, activeRows: np.ndarray) -> np.ndarray:
+        """Remove rows, at most one in each subbasin, and redistribute the area of each to the remaining rows of its subbasin,
+        where activeRows includes all remaining rows of those subbasins.
+
+        Return mask of rows whose subbasin had no area remaining, and so was left unchanged."""
+        basinIndexes = self.rowBasin[rows]
+        removedAreas = self.area[rows]
+        self.alive[rows] = False
+        self.hruCounts[basinIndexes] -= 1
+        basinAreas = self.basinArea[basinIndexes]
+        remaining = basinAreas - removedAreas
+        positive = removedAreas > 0
+        failed = positive & (remaining == 0)
+        redistributing = positive & ~failed
+        factors = np.ones(len(self.basinNums), dtype=np.float64)
+        factors[basinIndexes[redistributing]] = basinAreas[redistributing] / remaining[redistributing]
+        basinRedistributing = np.zeros(len(self.basinNums), dtype=bool)
+        basinRedistributing[basinIndexes[redistributing]] = True
+        activeBasins = self.rowBasin[activeRows]
+        selected = activeRows[self.alive[activeRows] & basinRedistributing[activeBasins]]
+        self._multiply(selected, factors[self.rowBasin[selected]])
+        return failed
+
+    def _removeInOrder(self, rows: np.ndarray) -> None:
+        """Remove rows in order, redistributing the area of each within its subbasin, but never removing the last HRU of a subbasin.
+
+        Subbasins are independent, so the nth removals of all subbasins are made together."""
+        basinIndexes = self.rowBasin[rows]
+        byBasin = np.argsort(basinIndexes, kind='stable')
+        sortedBasins = basinIndexes[byBasin]
+        ranks = np.empty(len(rows), dtype=np.int64)
+        ranks[byBasin] = np.arange(len(rows)) - np.searchsorted(sortedBasins, sortedBasins, side='left')
+        keep = ranks < self.hruCounts[basinIndexes] - 1
+        keys = np.flatnonzero(keep)
+        rows = rows[keep]
+        ranks = ranks[keep]
+        basinIndexes = basinIndexes[keep]
+        lastRanks = np.full(len(self.basinNums), -1, dtype=np.int64)
+        np.maximum.at(lastRanks, basinIndexes, ranks)
+        byRank = np.argsort(ranks, kind='stable')
+        bounds = np.cumsum(np.bincount(ranks, minlength=1))
+        activeRows = np.flatnonzero(self.alive & (lastRanks[self.rowBasin] >= 0))
+        failures: List[Tuple[int, str]] = []
+        start = 0
+        for rank, finish in enumerate(bounds.tolist()):
+            activeRows = activeRows[lastRanks[self.rowBasin[activeRows]] >= rank]
+            selected = byRank[start:finish]
+            start = finish
+            failed = self._removeAndRedistribute(rows[selected], activeRows)
+            for key, basinIndex in zip(keys[selected[failed]].tolist(), basinIndexes[selected[failed]].tolist()):
+                failures.append((key, 'No HRUs for basin {0!s}'.format(self.basinNums[basinIndex])))
+            activeRows = activeRows[self.alive[activeRows]]
+        HRUTable._raiseFirst(failures)
+
+    @staticmethod
+    def _raiseFirst(failures: List[Tuple[Any, str]]) -> None:
+        """Raise ValueError for the failure with least key, which is the one the sequential algorithm would meet first."""
+        if len(failures) > 0:
+            raise ValueError(min(failures)[1])
+
+    def removeByArea(self, cropExempt: np.ndarray, areaVal: float, useArea: bool, removalAreas: Optional[np.ndarray]=None) -> None:
+        """Repeatedly remove the smallest non-exempt HRU of each subbasin while it is below areaVal, as CreateHRUs.removeSmallHRUsByArea.
+
+        areaVal is in hectares if useArea, else is a percentage of the subbasin.
+        If removalAreas is given, the area of each row removed when it is removed is stored in it."""
+        if useArea:
+            thresholds = np.full(len(self.basinNums), areaVal * 10000, dtype=np.float64)
+        else:
+            thresholds = self.basinArea * areaVal / 100
+        candidates = ~cropExempt[self.rowCropGroup]
+        failures: List[Tuple[int, str]] = []
+        activeRows = np.flatnonzero(self.alive)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            while len(activeRows) > 0:
+                activeBasins = self.rowBasin[activeRows]
+                starts = np.flatnonzero(np.concatenate(([True], activeBasins[1:] != activeBasins[:-1])))
+                areas = np.where(candidates[activeRows], self.area[activeRows], np.inf)
+                minAreas = np.minimum.reduceat(areas, starts)
+                # first smallest in each subbasin, as found by scanning the basin maps
+                hits = np.flatnonzero(areas == np.repeat(minAreas, np.diff(np.append(starts, len(activeRows)))))
+                smallest = hits[np.searchsorted(hits, starts)]
+                basinIndexes = activeBasins[starts]
+                removing = (minAreas < thresholds[basinIndexes]) & (self.hruCounts[basinIndexes] > 1)
+                if removalAreas is not None:
+                    removalAreas[activeRows[smallest[removing]]] = minAreas[removing]
+                failed = self._removeAndRedistribute(activeRows[smallest[removing]], activeRows)
+                continuing = np.zeros(len(self.basinNums), dtype=bool)
+                continuing[basinIndexes[removing]] = True
+                for basinIndex in basinIndexes[removing][failed].tolist():
+                    continuing[basinIndex] = False
+                    failures.append((basinIndex, 'No HRUs for basin {0!s}'.format(self.basinNums[basinIndex])))
+                activeRows = activeRows[self.alive[activeRows] & continuing[activeBasins]]
+        HRUTable._raiseFirst(failures)
+
+    def removeByTarget(self, cropExempt: np.ndarray, targetVal: int, useArea: bool) -> None:
+        """Remove non-exempt HRUs in increasing order of size until targetVal is reached, as CreateHRUs.removeSmallHRUsbyTarget.
+
+        Size is area if useArea, else fraction of subbasin."""
+        candidates = np.flatnonzero(self.alive & ~cropExempt[self.rowCropGroup])
+        areas = self.area[candidates]
+        sizes = areas if useArea else areas / self.basinArea[self.rowBasin[candidates]]
+        ordered = candidates[np.argsort(sizes, kind='stable')]
+        numToRemove = min(self.countHRUs() - targetVal, len(ordered))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._removeInOrder(ordered[:max(0, numToRemove)])
+
+    def removeBySubbasinTarget(self, cropExempt: np.ndarray, targetVal: int) -> None:
+        """Remove non-exempt HRUs of each subbasin in increasing order of area until the subbasin has targetVal HRUs,
+        as CreateHRUs.removeSmallHRUsbySubbasinTarget."""
+        candidates = np.flatnonzero(self.alive & ~cropExempt[self.rowCropGroup])
+        basinIndexes = self.rowBasin[candidates]
+        ordered = candidates[np.lexsort((self.area[candidates], basinIndexes))]
+        sortedBasins = self.rowBasin[ordered]
+        ranks = np.arange(len(ordered)) - np.searchsorted(sortedBasins, sortedBasins, side='left')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._removeInOrder(ordered[ranks < self.hruCounts[sortedBasins] - targetVal])
+
+    def removeByThresholdPercent(self, cropExempt: np.ndarray, cropPercent: float, soilPercent: float, slopePercent: float) -> None:
+        """Remove landuses, soils within landuses, and slopes within soils below the percentage thresholds,
+        redistributing after each stage, as CreateHRUs.removeSmallHRUsByThresholdPercent."""
+        numBasins = len(self.basinNums)
+        numCropGroups = len(self.cropGroupBasin)
+        numSoilGroups = len(self.soilGroupCropGroup)
+        failures: List[Tuple[Tuple[int, int, int], str]] = []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # landuses below threshold, with threshold reduced if necessary to keep dominant landuse
+            aliveRows = np.flatnonzero(self.alive)
+            cropAlive = np.bincount(self.rowCropGroup[aliveRows], minlength=numCropGroups) > 0
+            hasExempt = np.zeros(numBasins, dtype=bool)
+            hasExempt[self.cropGroupBasin[cropAlive & cropExempt]] = True
+            minCropAreas = self.basinArea * cropPercent / 100
+            minCropAreas = np.where(hasExempt, minCropAreas, np.minimum(minCropAreas, self.maxCropArea))
+            removedCrops = cropAlive & ~cropExempt & (self.cropGroupArea < minCropAreas[self.cropGroupBasin])
+            self.alive &= ~removedCrops[self.rowCropGroup]
+            removedAreas = np.bincount(self.cropGroupBasin[removedCrops], weights=self.cropGroupArea[removedCrops], minlength=numBasins)
+            for basinIndex in np.flatnonzero(self._redistribute(self.rowBasin, self.basinArea, removedAreas)).tolist():
+                failures.append(((basinIndex, 0, 0), 'No landuse data for basin {0!s}'.format(self.basinNums[basinIndex])))
+            # soils below threshold within each landuse
+            aliveRows = np.flatnonzero(self.alive)
+            rowAreas = self.area[aliveRows]
+            cropAreas = np.bincount(self.rowCropGroup[aliveRows], weights=rowAreas, minlength=numCropGroups)
+            soilAreas = np.bincount(self.rowSoilGroup[aliveRows], weights=rowAreas, minlength=numSoilGroups)
+            soilAlive = np.bincount(self.rowSoilGroup[aliveRows], minlength=numSoilGroups) > 0
+            maxSoilAreas = np.zeros(numCropGroups, dtype=np.float64)
+            np.maximum.at(maxSoilAreas, self.soilGroupCropGroup[soilAlive], soilAreas[soilAlive])
+            minSoilAreas = np.minimum(cropAreas * soilPercent / 100, maxSoilAreas)
+            removedSoils = soilAlive & (soilAreas < minSoilAreas[self.soilGroupCropGroup])
+            self.alive &= ~removedSoils[self.rowSoilGroup]
+            removedAreas = np.bincount(self.soilGroupCropGroup[removedSoils], weights=soilAreas[removedSoils], minlength=numCropGroups)
+            for cropGroup in np.flatnonzero(self._redistribute(self.rowCropGroup, cropAreas, removedAreas)).tolist():
+                basinIndex = self.cropGroupBasin[cropGroup]
+                failures.append(((basinIndex, 1, cropGroup), 'No soil data for landuse {1!s} in basin {0!s}'.
+                                 format(self.basinNums[basinIndex], self.cropGroupCrop[cropGroup])))
+            # slopes below threshold within each landuse and soil
+            aliveRows = np.flatnonzero(self.alive)
+            rowAreas = self.area[aliveRows]
+            soilAreas = np.bincount(self.rowSoilGroup[aliveRows], weights=rowAreas, minlength=numSoilGroups)
+            maxSlopeAreas = np.zeros(numSoilGroups, dtype=np.float64)
+            np.maximum.at(maxSlopeAreas, self.rowSoilGroup[aliveRows], rowAreas)
+            minSlopeAreas = np.minimum(soilAreas * slopePercent / 100, maxSlopeAreas)
+            removedRows = self.alive & (self.area < minSlopeAreas[self.rowSoilGroup])
+            self.alive &= ~removedRows
+            removedAreas = np.bincount(self.rowSoilGroup[removedRows], weights=self.area[removedRows], minlength=numSoilGroups)
+            for soilGroup in np.flatnonzero(self._redistribute(self.rowSoilGroup, soilAreas, removedAreas)).tolist():
+                cropGroup = self.soilGroupCropGroup[soilGroup]
+                basinIndex = self.cropGroupBasin[cropGroup]
+                failures.append(((basinIndex, 2, soilGroup), 'No slope data for landuse {1!s} and soil {2!s} in basin {0!s}'.
+                                 format(self.basinNums[basinIndex], self.cropGroupCrop[cropGroup], self.soilGroupSoil[soilGroup])))
+        HRUTable._raiseFirst(failures)
+
+    def removeByThresholdArea(self, cropExempt: np.ndarray, cropArea: float, soilArea: float, slopeArea: float) -> None:
+        """Remove landuses, soils and slopes whose original areas in each subbasin are below the thresholds in hectares,
+        redistributing once, as CreateHRUs.removeSmallHRUsByThresholdArea."""
+        numBasins = len(self.basinNums)
+        numCropGroups = len(self.cropGroupBasin)
+        aliveRows = np.flatnonzero(self.alive)
+        cropAlive = np.bincount(self.rowCropGroup[aliveRows], minlength=numCropGroups) > 0
+        hasExempt = np.zeros(numBasins, dtype=bool)
+        hasExempt[self.cropGroupBasin[cropAlive & cropExempt]] = True
+        # thresholds are reduced if necessary to keep the dominant landuse, soil and slope
+        minCropAreas = np.full(numBasins, cropArea * 10000, dtype=np.float64)
+        minCropAreas = np.where(hasExempt, minCropAreas, np.minimum(minCropAreas, self.maxCropArea))
+        minSoilAreas = np.minimum(soilArea * 10000, self.maxSoilArea)
+        minSlopeAreas = np.minimum(slopeArea * 10000, self.maxSlopeArea)
+        removedCrops = ~cropExempt & (self.cropGroupArea < minCropAreas[self.cropGroupBasin])
+        cropRemoved = self.alive & removedCrops[self.rowCropGroup]
+        soilRemoved = self.alive & ~cropRemoved & (self.rowSoilArea < minSoilAreas[self.rowBasin])
+        slopeRemoved = self.alive & ~cropRemoved & ~soilRemoved & (self.rowSlopeArea < minSlopeAreas[self.rowBasin])
+        # sum removed areas in the order the HRUs are removed: by landuse, then by soil, then by slope
+        removedRows = np.flatnonzero(cropRemoved | soilRemoved | slopeRemoved)
+        stages = np.where(cropRemoved[removedRows], 0, np.where(soilRemoved[removedRows], 1, 2))
+        ranks = np.where(stages == 1, self.rowSoilRank[removedRows], np.where(stages == 2, self.rowSlopeRank[removedRows], 0))
+        removedRows = removedRows[np.lexsort((removedRows, ranks, stages, self.rowBasin[removedRows]))]
+        removedAreas = np.bincount(self.rowBasin[removedRows], weights=self.area[removedRows], minlength=numBasins)
+        self.alive[removedRows] = False
+        failures: List[Tuple[int, str]] = []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for basinIndex in np.flatnonzero(self._redistribute(self.rowBasin, self.basinArea, removedAreas)).tolist():
+                failures.append((basinIndex, 'Cannot redistribute {1:.2F} ha for basin {0!s}'.
+                                 format(self.basinNums[basinIndex], (removedAreas[basinIndex] / 10000))))
+        HRUTable._raiseFirst(failures)
+
+    def minMaxCropVal(self, useArea: bool, allowEmpty: bool) -> float:
+        """Return the minimum across subbasins of the area in hectares (if useArea) or percentage of the dominant landuse,
+        as CreateHRUs.minMaxCropVal.  Subbasins with no landuse data count as zero if allowEmpty, else raise ValueError."""
+        empty = np.flatnonzero(self.maxCropArea <= 0)
+        if len(empty) > 0 and not allowEmpty:
+            raise ValueError('No landuse data for basin {0!s}'.format(self.basinNums[empty[0]]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vals = self.maxCropArea / 10000 if useArea else (self.maxCropArea / self.basinArea) * 100
+        vals[empty] = 0.0
+        return float(min([float('inf') if useArea else 100.0] + vals.tolist()))
+
+    def minMaxSoilArea(self) -> float:
+        """Return the minimum across subbasins of the area in hectares of the dominant soil, as CreateHRUs.minMaxSoilArea."""
+        empty = np.flatnonzero(self.maxSoilArea <= 0)
+        if len(empty) > 0:
+            raise ValueError('No soil data for basin {0!s}'.format(self.basinNums[empty[0]]))
+        return float(min([float('inf')] + (self.maxSoilArea / 10000).tolist()))
+
+    def minMaxSlopeArea(self) -> float:
+        """Return the minimum across subbasins of the area in hectares of the dominant slope, as CreateHRUs.minMaxSlopeArea."""
+        empty = np.flatnonzero(self.maxSlopeArea <= 0)
+        if len(empty) > 0:
+            raise ValueError('No slope data for basin {0!s}'.format(self.basinNums[empty[0]]))
+        return float(min([float('inf')] + (self.maxSlopeArea / 10000).tolist()))
+
+    def _includedGroups(self, minCropVal: float, minSoilVal: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return mask of landuse groups at least minCropVal percent of their subbasin,
+        mask of soil groups at least minSoilVal percent of their landuse within included landuses,
+        and soil group areas."""
+        aliveRows = np.flatnonzero(self.alive)
+        soilAreas = np.bincount(self.rowSoilGroup[aliveRows], weights=self.area[aliveRows], minlength=len(self.soilGroupCropGroup))
+        cropVals = (self.cropGroupArea / self.basinArea[self.cropGroupBasin]) * 100
+        includedCrops = cropVals >= minCropVal
+        soilVals = (soilAreas / self.cropGroupArea[self.soilGroupCropGroup]) * 100
+        includedSoils = includedCrops[self.soilGroupCropGroup] & (soilVals >= minSoilVal)
+        return includedCrops, includedSoils, soilAreas
+
+    def minMaxSoilPercent(self, minCropVal: float) -> float:
+        """Return the minimum of the percentages of the dominant soil in the landuses included by minCropVal,
+        as CreateHRUs.minMaxSoilPercent."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            includedCrops, _, soilAreas = self._includedGroups(minCropVal, 0)
+            soilVals = (soilAreas / self.cropGroupArea[self.soilGroupCropGroup]) * 100
+        maxima = np.zeros(len(self.cropGroupBasin), dtype=np.float64)
+        np.maximum.at(maxima, self.soilGroupCropGroup, soilVals)
+        return float(min([100.0] + maxima[includedCrops].tolist()))
+
+    def minMaxSlopePercent(self, minCropVal: float, minSoilVal: float) -> float:
+        """Return the minimum of the percentages of the dominant slope in the landuses and soils included by minCropVal and minSoilVal,
+        as CreateHRUs.minMaxSlopePercent."""
+        aliveRows = np.flatnonzero(self.alive)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _, includedSoils, soilAreas = self._includedGroups(minCropVal, minSoilVal)
+            slopeVals = (self.area[aliveRows] / soilAreas[self.rowSoilGroup[aliveRows]]) * 100
+        maxima = np.zeros(len(self.soilGroupCropGroup), dtype=np.float64)
+        np.maximum.at(maxima, self.rowSoilGroup[aliveRows], slopeVals)
+        return float(min([100.0] + maxima[includedSoils].tolist()))
+
+    @staticmethod
+    def splitCrop(basins: Dict[int, 'BasinData'], crop: int, subcrops: List[int], percents: List[int],
+                  makeCellData: Callable[[int, float, float, int], Any]) -> None:
+        """Replace the HRUs of landuse crop by HRUs of subcrops taking percents of their cells, as CreateHRUs.splitHRUs.
+
+        All the HRUs of crop are expanded by the split fractions at once.
+        A part whose subcrop is already in the subbasin, and is not crop, is added to the HRU of that subcrop with the same soil and slope, if any.
+        Other parts become new HRUs, made by makeCellData from cell count, area, total slope and original landuse:
+        the first reuses the number of the split HRU and the rest are numbered on from the subbasin's relHru.
+        Map orders, HRU numbers and values are the same as when splitting one HRU at a time."""
+        splitBasins = [basinData for basinData in basins.values() if crop in basinData.cropSoilSlopeNumbers]
+        rowBasins: List[int] = []
+        rowSoils: List[int] = []
+        rowSlopes: List[int] = []
+        rowHrus: List[int] = []
+        rowCounts: List[int] = []
+        rowAreas: List[float] = []
+        rowSlopeTotals: List[float] = []
+        # for each subbasin, list of (part, soilSlopeNumbers) for the subcrops the subbasin already has
+        existing: List[List[Tuple[int, Dict[int, Dict[int, int]]]]] = []
+        for basinIndex, basinData in enumerate(splitBasins):
+            cropSoilSlopeNumbers = basinData.cropSoilSlopeNumbers
+            existing.append([(part, cropSoilSlopeNumbers[subcrop]) for part, subcrop in enumerate(subcrops) 
+                             if subcrop != crop and subcrop in cropSoilSlopeNumbers])
+            for soil, slopeNumbers in cropSoilSlopeNumbers[crop].items():
+                for slope, hru in slopeNumbers.items():
+                    cellData = basinData.hruMap[hru]
+                    rowBasins.append(basinIndex)
+                    rowSoils.append(soil)
+                    rowSlopes.append(slope)
+                    rowHrus.append(hru)
+                    rowCounts.append(cellData.cellCount)
+                    rowAreas.append(cellData.area)
+                    rowSlopeTotals.append(cellData.totalSlope)
+        numParts = len(subcrops)
+        # parts in order of HRU, then of subcrop
+        partRows = np.repeat(np.arange(len(rowHrus)), numParts)
+        partSubcrops = np.tile(np.arange(numParts), len(rowHrus))
+        factors = (np.array(percents, dtype=np.float64) / 100)[partSubcrops]
+        partCounts = np.rint(np.array(rowCounts, dtype=np.float64)[partRows] * factors)
+        partAreas = np.array(rowAreas, dtype=np.float64)[partRows] * factors
+        partSlopeTotals = np.array(rowSlopeTotals, dtype=np.float64)[partRows] * factors
+        # HRUs of existing subcrops that parts are added to
+        targetHrus = np.full(len(partRows), -1, dtype=np.int64)
+        for row, (basinIndex, soil, slope) in enumerate(zip(rowBasins, rowSoils, rowSlopes)):
+            for part, soilSlopeNumbers in existing[basinIndex]:
+                targetHrus[row * numParts + part] = soilSlopeNumbers.get(soil, dict()).get(slope, -1)
+        # number the new HRUs
+        newParts = np.flatnonzero(targetHrus < 0)
+        newRows = partRows[newParts]
+        first = np.ones(len(newParts), dtype=bool)
+        first[1:] = newRows[1:] != newRows[:-1]
+        partHrus = np.full(len(partRows), -1, dtype=np.int64)
+        partHrus[newParts[first]] = np.array(rowHrus, dtype=np.int64)[newRows[first]]
+        extraParts = newParts[~first]
+        extraBasins = np.array(rowBasins, dtype=np.int64)[partRows[extraParts]]
+        ranks = np.arange(len(extraParts)) - np.searchsorted(extraBasins, extraBasins, side='left')
+        relHrus = np.array([basinData.relHru for basinData in splitBasins], dtype=np.int64)
+        partHrus[extraParts] = relHrus[extraBasins] + ranks + 1
+        lastHrus = relHrus.copy()
+        np.maximum.at(lastHrus, extraBasins, partHrus[extraParts])
+        # write back to the subbasin maps, in the order the HRUs were split
+        partCountList = partCounts.astype(np.int64).tolist()
+        partAreaList = partAreas.tolist()
+        partSlopeTotalList = partSlopeTotals.tolist()
+        partHruList = partHrus.tolist()
+        targetHruList = targetHrus.tolist()
+        row = 0
+        for basinIndex, basinData in enumerate(splitBasins):
+            hruMap = basinData.hruMap
+            cropSoilSlopeNumbers = basinData.cropSoilSlopeNumbers
+            existingParts = dict(existing[basinIndex])
+            newcssn: List[Dict[int, Dict[int, int]]] = [dict() for _ in subcrops]
+            for soil, slopeNumbers in cropSoilSlopeNumbers[crop].items():
+                for newssn in newcssn:
+                    newssn[soil] = dict()
+                for slope, hru in slopeNumbers.items():
+                    del hruMap[hru]
+                    for part in range(numParts):
+                        index = row * numParts + part
+                        oldhru = targetHruList[index]
+                        if oldhru >= 0:
+                            oldcd = hruMap[oldhru]
+                            oldcd.cellCount += partCountList[index]
+                            oldcd.area += partAreaList[index]
+                            oldcd.totalSlope += partSlopeTotalList[index]
+                            continue
+                        newhru = partHruList[index]
+                        hruMap[newhru] = makeCellData(partCountList[index], partAreaList[index], partSlopeTotalList[index], crop)
+                        oldssn = existingParts.get(part, None)
+                        if oldssn is None:
+                            newcssn[part][soil][slope] = newhru
+                        elif soil in oldssn:
+                            oldssn[soil][slope] = newhru
+                        else:
+                            oldssn[soil] = {slope: newhru}
+                    row += 1
+            basinData.relHru = int(lastHrus[basinIndex])
+            del cropSoilSlopeNumbers[crop]
+            for part, subcrop in enumerate(subcrops):
+                # existing subcrops already dealt with
+                if subcrop not in cropSoilSlopeNumbers:
+                    cropSoilSlopeNumbers[subcrop] = newcssn[part]
+
+class HRUPreview:
+    """Index of the potential HRUs for previewing the HRU count and area removed by thresholds without applying them.
+
+    Built from a fresh HRUTable and the exempt status of its landuse groups.
+    For the area threshold, the HRUs of each subbasin are removed smallest first,
+    and the kth is removed if its area, scaled up by the redistribution of the k-1 smaller ones, is below the threshold.
+    So each candidate has a threshold value (in square metres, or percent of its subbasin) above which it is removed,
+    and these are sorted across the watershed.
+    For landuse, soil and slope thresholds each HRU has three key values, and survives if all three are at least the thresholds.
+    Percentages are fractions of subbasins, landuses or soils, which redistribution leaves unchanged.
+    Percentage keys within rounding error of a threshold are decided by comparing areas, as HRUTable does.
+    Area threshold counts agree with HRUTable.  Landuse, soil and slope percentage counts agree except for
+    soil and slope thresholds within rounding error of a key after redistribution.
+    Areas removed are original HRU areas in hectares, before redistribution.
+    Inverse searches find threshold values giving a required number of HRUs, for use in batch runs."""
+
+    ## relative difference of a percentage key from a threshold within which they are compared as areas
+    _ROUNDING = 1E-9
+
+    def __init__(self, table: HRUTable, cropExempt: np.ndarray) -> None:
+        """Build index."""
+        ## table indexed
+        self.table = table
+        ## exempt status of landuse groups of table
+        self.cropExempt = cropExempt
+        ## number of HRUs before thresholds are applied
+        self.numHRUs = table.countHRUs()
+        rows = np.flatnonzero(table.alive)
+        areas = table.area[rows]
+        ## total area of HRUs in square metres
+        self.totalArea = float(areas.sum())
+        candidates = rows[~cropExempt[table.rowCropGroup[rows]]]
+        # area threshold: candidates of each subbasin in order of removal
+        ordered = candidates[np.lexsort((table.area[candidates], table.rowBasin[candidates]))]
+        basinIndexes = table.rowBasin[ordered]
+        basinStarts = np.searchsorted(basinIndexes, basinIndexes, side='left')
+        ranks = np.arange(len(ordered)) - basinStarts
+        keep = ranks < table.hruCounts[basinIndexes] - 1
+        ordered = ordered[keep]
+        basinIndexes = basinIndexes[keep]
+        ranks = ranks[keep]
+        orderedAreas = table.area[ordered]
+        basinAreas = table.basinArea[basinIndexes]
+        # areas of candidates when removed, scaled up by the redistribution of smaller ones,
+        # found by removing all of them from a copy of the table, so rounded as when the threshold is applied
+        removalAreas = np.full(len(table.area), np.inf, dtype=np.float64)
+        try:
+            table.copy().removeByArea(cropExempt, np.inf, True, removalAreas)
+        except ValueError:
+            pass  # subbasins with no area keep infinite keys
+        scaled = removalAreas[ordered]
+        # a candidate is only removed if all smaller ones are, so use the running maximum within the subbasin
+        byRank = np.argsort(ranks, kind='stable')
+        bounds = np.cumsum(np.bincount(ranks, minlength=1)).tolist()
+        for start, finish in zip(bounds[:-1], bounds[1:]):
+            atRank = byRank[start:finish]
+            scaled[atRank] = np.maximum(scaled[atRank], scaled[atRank - 1])
+        ## area threshold keys (square metres or percentages), sorted, and cumulative areas removed, indexed by useArea
+        self.areaIndex: Dict[bool, Tuple[np.ndarray, np.ndarray]] = dict()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for useArea, keys in [(True, scaled), (False, (scaled / basinAreas) * 100)]:
+                byKey = np.argsort(keys, kind='stable')
+                self.areaIndex[useArea] = (keys[byKey], np.concatenate(([0.0], np.cumsum(orderedAreas[byKey]))))
+        ## percentage area threshold: areas when removed and subbasin areas, in the order of areaIndex[False]
+        self.areaPercentAreas = (scaled[byKey], basinAreas[byKey])
+        ## target threshold: cumulative counts and areas of HRUs removed, indexed by useArea
+        self.targetIndex: Dict[bool, Tuple[np.ndarray, np.ndarray]] = dict()
+        candidateAreas = table.area[candidates]
+        for useArea in [True, False]:
+            sizes = candidateAreas if useArea else candidateAreas / table.basinArea[table.rowBasin[candidates]]
+            byKey = candidates[np.argsort(sizes, kind='stable')]
+            basinIndexes = table.rowBasin[byKey]
+            byBasin = np.argsort(basinIndexes, kind='stable')
+            sortedBasins = basinIndexes[byBasin]
+            ranks = np.empty(len(byKey), dtype=np.int64)
+            ranks[byBasin] = np.arange(len(byKey)) - np.searchsorted(sortedBasins, sortedBasins, side='left')
+            removable = ranks < table.hruCounts[basinIndexes] - 1
+            self.targetIndex[useArea] = (np.concatenate(([0], np.cumsum(removable))),
+                                         np.concatenate(([0.0], np.cumsum(np.where(removable, table.area[byKey], 0.0)))))
+        ## landuse, soil and slope thresholds: keys of rows (square metres or percentages), and row areas, in increasing order of landuse key, indexed by useArea
+        self.thresholdIndex: Dict[bool, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = dict()
+        numBasins = len(table.basinNums)
+        hasExempt = np.zeros(numBasins, dtype=bool)
+        hasExempt[table.cropGroupBasin[cropExempt]] = True
+        rowCropGroups = table.rowCropGroup[rows]
+        rowSoilGroups = table.rowSoilGroup[rows]
+        rowBasins = table.rowBasin[rows]
+        rowExempt = cropExempt[rowCropGroups]
+        # keys are infinite for landuses, soils and slopes the thresholds can never remove
+        def capped(keys: np.ndarray, values: np.ndarray, maxima: np.ndarray) -> np.ndarray:
+            return np.where(np.isnan(values) | (values >= maxima), np.inf, keys)
+        cropAreas = table.cropGroupArea[rowCropGroups]
+        cropKeepers = rowExempt | (~hasExempt[rowBasins] & (cropAreas >= table.maxCropArea[rowBasins]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # areas
+            cropKeys = np.where(cropKeepers | np.isnan(cropAreas), np.inf, cropAreas)
+            soilKeys = capped(table.rowSoilArea[rows], table.rowSoilArea[rows], table.maxSoilArea[rowBasins])
+            slopeKeys = capped(table.rowSlopeArea[rows], table.rowSlopeArea[rows], table.maxSlopeArea[rowBasins])
+            self.thresholdIndex[True] = self.sortedByFirst(cropKeys, soilKeys, slopeKeys, areas)[0]
+            # percentages of subbasin, landuse and soil
+            rowBasinAreas = table.basinArea[rowBasins]
+            cropKeys = np.where(cropKeepers | np.isnan(cropAreas), np.inf, (cropAreas / rowBasinAreas) * 100)
+            numSoilGroups = len(table.soilGroupCropGroup)
+            soilAreas = np.bincount(rowSoilGroups, weights=areas, minlength=numSoilGroups)
+            cropTotals = np.bincount(rowCropGroups, weights=areas, minlength=len(table.cropGroupBasin))
+            maxSoilAreas = np.zeros(len(table.cropGroupBasin), dtype=np.float64)
+            np.maximum.at(maxSoilAreas, table.soilGroupCropGroup, soilAreas)
+            maxSlopeAreas = np.zeros(numSoilGroups, dtype=np.float64)
+            np.maximum.at(maxSlopeAreas, rowSoilGroups, areas)
+            rowSoilAreas = soilAreas[rowSoilGroups]
+            rowCropTotals = cropTotals[rowCropGroups]
+            soilKeys = capped((rowSoilAreas / rowCropTotals) * 100, rowSoilAreas, maxSoilAreas[rowCropGroups])
+            slopeKeys = capped((areas / rowSoilAreas) * 100, areas, maxSlopeAreas[rowSoilGroups])
+            self.thresholdIndex[False], order = self.sortedByFirst(cropKeys, soilKeys, slopeKeys, areas)
+        ## percentage landuse, soil and slope thresholds: areas compared and the areas they are percentages of, in the order of thresholdIndex[False]
+        self.thresholdPercentAreas = tuple(vals[order] for vals in [cropAreas, rowBasinAreas, rowSoilAreas, rowCropTotals, areas, rowSoilAreas])
+
+    @staticmethod
+    def sortedByFirst(keys1: np.ndarray, keys2: np.ndarray, keys3: np.ndarray, areas: np.ndarray) -> \
+            Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]:
+        """Return arrays ordered by increasing keys1, and the ordering."""
+        order = np.argsort(keys1, kind='stable')
+        return (keys1[order], keys2[order], keys3[order], areas[order]), order
+
+    @staticmethod
+    def percentBelow(keys: np.ndarray, percent: float, areas: np.ndarray, totals: np.ndarray) -> np.ndarray:
+        """Return mask of percentage keys below percent, where keys are areas as percentages of totals.
+
+        Keys within rounding error of percent are decided by comparing areas with percent of totals, as HRUTable does."""
+        below = keys < percent
+        near = np.abs(keys - percent) <= abs(percent) * HRUPreview._ROUNDING
+        below[near] = areas[near] < totals[near] * percent / 100
+        return below
+
+    @staticmethod
+    def above(key: float) -> float:
+        """Least value treated as distinct from key and larger, allowing for rounding."""
+        return key + abs(key) * HRUPreview._ROUNDING
+
+    @staticmethod
+    def between(lower: float, upper: float) -> float:
+        """Threshold above lower and below upper, which may be infinite."""
+        return (lower + upper) / 2 if np.isfinite(upper) else lower + 1
+
+    def areaCount(self, areaVal: float, useArea: bool) -> Tuple[int, float]:
+        """Return number of HRUs and area in hectares removed by CreateHRUs.removeSmallHRUsByArea with areaVal."""
+        keys, cumAreas = self.areaIndex[useArea]
+        if useArea:
+            removed = int(np.searchsorted(keys, areaVal * 10000, side='left'))
+            return self.numHRUs - removed, float(cumAreas[removed]) / 10000
+        # keys below the rounding window are removed, and those in it are decided by area
+        lower = int(np.searchsorted(keys, areaVal - abs(areaVal) * HRUPreview._ROUNDING, side='left'))
+        upper = int(np.searchsorted(keys, HRUPreview.above(areaVal), side='right'))
+        scaled, basinAreas = self.areaPercentAreas
+        near = HRUPreview.percentBelow(keys[lower:upper], areaVal, scaled[lower:upper], basinAreas[lower:upper])
+        removedAreas = np.diff(cumAreas[lower:upper + 1])
+        return self.numHRUs - lower - int(np.count_nonzero(near)), (float(cumAreas[lower]) + float(removedAreas[near].sum())) / 10000
+
+    def areaValForCount(self, count: int, useArea: bool) -> Optional[float]:
+        """Return an area threshold (hectares if useArea, else percent) just above the least giving at most count HRUs,
+        or None if no area threshold gives so few."""
+        keys, _ = self.areaIndex[useArea]
+        needed = self.numHRUs - count
+        if needed <= 0:
+            return 0.0
+        if needed > len(keys):
+            return None
+        lower = float(keys[needed - 1])
+        upperIndex = int(np.searchsorted(keys, HRUPreview.above(lower), side='right'))
+        upper = float(keys[upperIndex]) if upperIndex < len(keys) else np.inf
+        if useArea:
+            lower /= 10000
+            upper /= 10000
+        return HRUPreview.between(lower, upper)
+
+    def targetCount(self, targetVal: int, useArea: bool) -> Tuple[int, float]:
+        """Return number of HRUs and area in hectares removed by CreateHRUs.removeSmallHRUsbyTarget with targetVal."""
+        counts, cumAreas = self.targetIndex[useArea]
+        numToRemove = max(0, min(self.numHRUs - targetVal, len(counts) - 1))
+        return self.numHRUs - int(counts[numToRemove]), float(cumAreas[numToRemove]) / 10000
+
+    def thresholdCount(self, landuseVal: float, soilVal: float, slopeVal: float, useArea: bool) -> Tuple[int, float]:
+        """Return number of HRUs and area in hectares removed by the landuse, soil and slope thresholds,
+        in hectares if useArea else percentages."""
+        cropKeys, soilKeys, slopeKeys, areas = self.thresholdIndex[useArea]
+        if useArea:
+            start = int(np.searchsorted(cropKeys, landuseVal * 10000, side='left'))
+            kept = (soilKeys[start:] >= soilVal * 10000) & (slopeKeys[start:] >= slopeVal * 10000)
+        else:
+            # landuse keys below the rounding window are removed, and those in it are decided by area
+            start = int(np.searchsorted(cropKeys, landuseVal - abs(landuseVal) * HRUPreview._ROUNDING, side='left'))
+            cropAreas, basinAreas, soilAreas, cropTotals, slopeAreas, soilTotals = (vals[start:] for vals in self.thresholdPercentAreas)
+            kept = ~HRUPreview.percentBelow(cropKeys[start:], landuseVal, cropAreas, basinAreas) & \
+                   ~HRUPreview.percentBelow(soilKeys[start:], soilVal, soilAreas, cropTotals) & \
+                   ~HRUPreview.percentBelow(slopeKeys[start:], slopeVal, slopeAreas, soilTotals)
+        return int(np.count_nonzero(kept)), (self.totalArea - float(areas[start:][kept].sum())) / 10000
+
+    def thresholdValForCount(self, count: int, index: int, landuseVal: float, soilVal: float, slopeVal: float, useArea: bool) -> Optional[float]:
+        """Return a value for the landuse (index 0), soil (1) or slope (2) threshold, just above the least
+        which with the other two thresholds gives at most count HRUs, or None if no value gives so few."""
+        cropKeys, soilKeys, slopeKeys, _ = self.thresholdIndex[useArea]
+        allKeys = [cropKeys, soilKeys, slopeKeys]
+        scale = 10000 if useArea else 1
+        vals = [landuseVal * scale, soilVal * scale, slopeVal * scale]
+        passing = np.ones(len(cropKeys), dtype=bool)
+        for i in range(3):
+            if i != index:
+                passing &= allKeys[i] >= vals[i]
+        keys = -np.sort(-allKeys[index][passing])
+        if count >= len(keys):
+            return 0.0
+        lower = float(keys[count])
+        if not np.isfinite(lower):
+            return None
+        larger = keys[keys > HRUPreview.above(lower)]
+        return HRUPreview.between(lower / scale, float(larger[-1]) / scale if len(larger) > 0 else np.inf)
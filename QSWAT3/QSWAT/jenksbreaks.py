@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+
+import hashlib
+import numpy
+from typing import Dict, List, Tuple, Optional, Any
+
+from .QSWATUtils import QSWATUtils  # type: ignore
+
+class JenksBreaks:
+
+    """Jenks natural breaks classification.
+
+    Breaks are calculated by Fisher's dynamic program on the distinct values, weighted by their counts,
+    using prefix sums so that the cost of each candidate class is found in constant time.
+    This gives the same optimal classes as the full Jenks algorithm.
+    When there are too many distinct values the breaks of a seeded random sample are calculated instead,
+    and then refined on the full set of values.
+    Breaks are cached by caller supplied key, and only reused if the values are unchanged."""
+
+    ## maximum number of distinct values for which breaks are calculated exactly
+    _EXACTLIMIT = 20000
+    ## size of sample used when there are more distinct values
+    _SAMPLESIZE = 20000
+    ## number of smallest and of largest distinct values always included in sample
+    _TAILSIZE = 200
+    ## seed for sampling, so that classification is repeatable
+    _SEED = 20140718
+    ## maximum number of refinement steps on full set of values
+    _MAXREFINE = 100
+    ## maximum number of cells in a block of the dynamic program cost matrix
+    _BLOCKCELLS = 1 << 22
+    ## maximum number of cached classifications
+    _CACHESIZE = 64
+
+    def __init__(self) -> None:
+        """Initialise class variables."""
+        ## map of key to (fingerprint of values, breaks)
+        self.cache: Dict[Any, Tuple[str, List[float]]] = dict()
+
+    def cachedBreaks(self, key: Any, vals: Any, numClasses: int) -> Optional[List[float]]:
+        """Return breaks for vals, reusing those previously calculated for key if vals are unchanged."""
+        data = numpy.asarray(vals, dtype=numpy.float64).ravel()
+        fingerprint = '{0}:{1}:{2}'.format(numClasses, len(data), hashlib.md5(data.tobytes()).hexdigest())
+        entry = self.cache.get(key, None)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+        result = JenksBreaks.breaks(data, numClasses)
+        if result is not None:
+            if len(self.cache) >= JenksBreaks._CACHESIZE:
+                # dictionaries keep insertion order: remove oldest
+                del self.cache[next(iter(self.cache))]
+            self.cache[key] = (fingerprint, result)
+        return result
+
+    def clear(self) -> None:
+        """Clear cache."""
+        self.cache = dict()
+
+    @staticmethod
+    def breaks(vals: Any, numClasses: int) -> Optional[List[float]]:
+        """Return list of numClasses + 1 values: the minimum, the upper limit of each class but the last, and the maximum.
+
+        Returns None if there are fewer values than classes."""
+        data = numpy.asarray(vals, dtype=numpy.float64).ravel()
+        data = data[~numpy.isnan(data)]
+        if numClasses < 1 or numClasses > len(data):
+            return None
+        values, counts = numpy.unique(data, return_counts=True)
+        n = len(values)
+        if n <= numClasses:
+            # each distinct value is a class; remaining classes are empty
+            return [float(values[0])] + [float(v) for v in values] + [float(values[-1])] * (numClasses - n)
+        if n <= JenksBreaks._EXACTLIMIT:
+            starts = JenksBreaks.fisher(values, counts, numClasses)
+        else:
+            # sample consists of the extreme distinct values, which often form classes, with their counts,
+            # plus a seeded random sample of the other values, with counts scaled to represent all of them
+            tail = JenksBreaks._TAILSIZE
+            middle = data[(data > values[tail - 1]) & (data < values[-tail])]
+            rng = numpy.random.RandomState(JenksBreaks._SEED)
+            sampleSize = min(JenksBreaks._SAMPLESIZE, len(middle))
+            middleValues, middleCounts = numpy.unique(middle[rng.choice(len(middle), sampleSize, replace=False)], return_counts=True)
+            sampleValues = numpy.concatenate((values[:tail], middleValues, values[-tail:]))
+            sampleCounts = numpy.concatenate((counts[:tail], middleCounts * (len(middle) / max(1, sampleSize)), counts[-tail:]))
+            sampleStarts = JenksBreaks.fisher(sampleValues, sampleCounts, numClasses)
+            # transfer class boundaries to full set of distinct values
+            starts = [0] + [int(numpy.searchsorted(values, sampleValues[start - 1], side='right')) for start in sampleStarts[1:]]
+            starts = JenksBreaks.refine(values, counts, JenksBreaks.separate(starts, n))
+            QSWATUtils.loginfo('Jenks breaks: used a sample of {0} distinct values from {1}'.format(len(sampleValues), n))
+        return [float(values[0])] + [float(values[start - 1]) for start in starts[1:]] + [float(values[-1])]
+
+    @staticmethod
+    def prefixSums(values: numpy.ndarray, weights: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Return prefix sums of weights, weighted values and weighted squares, each starting with zero.
+
+        Values are shifted by their mean to reduce rounding errors in variances."""
+        shifted = values - numpy.average(values, weights=weights)
+        w = numpy.concatenate(([0.0], numpy.cumsum(weights, dtype=numpy.float64)))
+        s = numpy.concatenate(([0.0], numpy.cumsum(weights * shifted)))
+        ss = numpy.concatenate(([0.0], numpy.cumsum(weights * shifted * shifted)))
+        return w, s, ss
+
+    @staticmethod
+    def fisher(values: numpy.ndarray, weights: numpy.ndarray, numClasses: int) -> List[int]:
+        """Return indexes of first values of optimal classes of sorted distinct values with weights.
+
+        Requires len(values) > numClasses.  First index is always 0.
+
+        The optimal start of the last class never decreases as the range of values is extended,
+        so each step of the dynamic program first solves a coarse subset of range ends against all class starts,
+        and then the remaining ends against only the starts between the optimal starts of their coarse neighbours."""
+        n = len(values)
+        w, s, ss = JenksBreaks.prefixSums(values, weights)
+        # cost of class values[0:b]
+        costs = ss - numpy.divide(s * s, w, out=numpy.zeros(n + 1), where=w > 0)
+        # choices[j][b] is start of last of j+1 classes covering values[0:b]
+        choices = numpy.zeros((numClasses, n + 1), dtype=numpy.int32)
+        stride = max(1, int(numpy.sqrt(n)))
+        for j in range(1, numClasses):
+            prev = costs
+            costs = numpy.full(n + 1, numpy.inf)
+
+            def solve(lo: int, hi: int, step: int, aLo: int, aHi: int) -> None:
+                """Find best class starts a in aLo .. aHi for ends b in range(lo, hi, step)."""
+                a = numpy.arange(aLo, aHi + 1)
+                blockSize = max(1, JenksBreaks._BLOCKCELLS // len(a))
+                ends = numpy.arange(lo, hi, step)
+                for first in range(0, len(ends), blockSize):
+                    b = ends[first:first + blockSize][:, numpy.newaxis]
+                    width = w[b] - w[a]
+                    sums = s[b] - s[a]
+                    with numpy.errstate(divide='ignore', invalid='ignore'):
+                        total = prev[a] + (ss[b] - ss[a]) - sums * sums / width
+                    # last class must be non-empty
+                    total[a >= b] = numpy.inf
+                    best = numpy.argmin(total, axis=1)
+                    rows = b[:, 0]
+                    choices[j, rows] = a[best]
+                    costs[rows] = total[numpy.arange(len(best)), best]
+
+            # need at least j+1 values for j+1 classes, and previous j classes need at least j values
+            coarse = list(range(j + 1, n + 1, stride))
+            if coarse[-1] != n:
+                coarse.append(n)
+            solve(j + 1, n + 1, stride, j, n - 1)
+            solve(n, n + 1, 1, j, n - 1)
+            for b0, b1 in zip(coarse[:-1], coarse[1:]):
+                if b1 > b0 + 1:
+                    solve(b0 + 1, b1, 1, int(choices[j, b0]), min(int(choices[j, b1]), b1 - 2))
+        starts = [0] * numClasses
+        b = n
+        for j in range(numClasses - 1, 0, -1):
+            b = int(choices[j, b])
+            starts[j] = b
+        return starts
+
+    @staticmethod
+    def separate(starts: List[int], n: int) -> List[int]:
+        """Adjust class starts so that no class of n values is empty.  Requires n >= len(starts)."""
+        k = len(starts)
+        result = [0] * k
+        for i in range(1, k):
+            result[i] = min(max(starts[i], result[i - 1] + 1), n - (k - i))
+        return result
+
+    @staticmethod
+    def variance(w: numpy.ndarray, s: numpy.ndarray, ss: numpy.ndarray, starts: List[int]) -> float:
+        """Return total within-class sum of squared deviations for classes with starts, from prefix sums."""
+        total = 0.0
+        bounds = starts + [len(w) - 1]
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            width = w[hi] - w[lo]
+            if width > 0:
+                total += (ss[hi] - ss[lo]) - (s[hi] - s[lo]) ** 2 / width
+        return total
+
+    @staticmethod
+    def refine(values: numpy.ndarray, weights: numpy.ndarray, starts: List[int]) -> List[int]:
+        """Improve classes of sorted distinct values with weights by moving each boundary to the midpoint of
+        the means of the adjacent classes, until there is no further reduction in within-class variance."""
+        n = len(values)
+        w, s, ss = JenksBreaks.prefixSums(values, weights)
+        shift = numpy.average(values, weights=weights)
+        current = JenksBreaks.variance(w, s, ss, starts)
+        for _ in range(JenksBreaks._MAXREFINE):
+            bounds = numpy.array(starts + [n])
+            means = (s[bounds[1:]] - s[bounds[:-1]]) / (w[bounds[1:]] - w[bounds[:-1]]) + shift
+            mids = (means[:-1] + means[1:]) / 2
+            newStarts = [0] + [int(i) for i in numpy.searchsorted(values, mids, side='right')]
+            if newStarts == starts or any(x >= y for x, y in zip(newStarts, newStarts[1:] + [n])):
+                break
+            newVariance = JenksBreaks.variance(w, s, ss, newStarts)
+            if newVariance >= current:
+                break
+            starts, current = newStarts, newVariance
+        return starts
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+
+import numpy
+from datetime import date, timedelta
+from typing import Any, List, Optional, Tuple
+
+class Period:
+    """Period of a SWAT run read from its file.cio, optionally restricted to requested start and finish dates.
+
+    Follows the period logic of Visualise, but does not use Qt, so can be used headless.
+    The MON field of output tables is a julian day if the output is daily, a year if it is annual, else a month.
+    Tables such as wql are always daily, so methods that depend on the output frequency take an isDaily argument
+    which may override the frequency of the run."""
+
+    def __init__(self) -> None:
+        """Initialise class variables."""
+        ## true if output is daily
+        self.isDaily = False
+        ## true if output is annual
+        self.isAnnual = False
+        ## number of years of output, excluding skipped years
+        self.numYears = 0
+        ## start year of period
+        self.startYear = 0
+        ## start month of period
+        self.startMonth = 0
+        ## start day of period
+        self.startDay = 0
+        ## finish year of period
+        self.finishYear = 0
+        ## finish month of period
+        self.finishMonth = 0
+        ## finish day of period
+        self.finishDay = 0
+        ## julian start day
+        self.julianStartDay = 0
+        ## julian finish day
+        self.julianFinishDay = 0
+
+    @staticmethod
+    def fromCio(cioFile: str) -> 'Period':
+        """Return period of run and print frequency from file.cio."""
+        period = Period()
+        with open(cioFile, 'r') as cio:
+            # skip 7 lines
+            for _ in range(7): next(cio)
+            nbyrLine = cio.readline()
+            cioNumYears = int(nbyrLine[:20])
+            iyrLine = cio.readline()
+            cioStartYear = int(iyrLine[:20])
+            idafLine = cio.readline()
+            julianStartDay = int(idafLine[:20])
+            idalLine = cio.readline()
+            julianFinishDay = int(idalLine[:20])
+            # skip 47 lines
+            for _ in range(47): next(cio)
+            iprintLine = cio.readline()
+            iprint = int(iprintLine[:20])
+            period.isDaily = iprint == 1
+            period.isAnnual = iprint == 2
+            nyskipLine = cio.readline()
+            nyskip = int(nyskipLine[:20])
+        startYear = cioStartYear + nyskip
+        period.numYears = cioNumYears - nyskip
+        finishYear = startYear + period.numYears - 1
+        # SWAT treats zero start and finish days as first and last day of year
+        if julianStartDay == 0:
+            julianStartDay = 1
+        if julianFinishDay == 0:
+            julianFinishDay = 366 if Period.isLeap(finishYear) else 365
+        period.setDates(Period.julianToDate(julianStartDay, startYear), Period.julianToDate(julianFinishDay, finishYear))
+        return period
+
+    def setDates(self, startDate: date, finishDate: date) -> None:
+        """Set start and finish dates."""
+        self.startDay = startDate.day
+        self.startMonth = startDate.month
+        self.startYear = startDate.year
+        self.finishDay = finishDate.day
+        self.finishMonth = finishDate.month
+        self.finishYear = finishDate.year
+        self.julianStartDay = int(startDate.strftime('%j'))
+        self.julianFinishDay = int(finishDate.strftime('%j'))
+
+    def startDate(self) -> date:
+        """Start date of period."""
+        return date(self.startYear, self.startMonth, self.startDay)
+
+    def finishDate(self) -> date:
+        """Finish date of period."""
+        return date(self.finishYear, self.finishMonth, self.finishDay)
+
+    def restrict(self, requestedStartDate: Optional[date], requestedFinishDate: Optional[date]) -> bool:
+        """Restrict period to requested dates, ignoring requests outside the period.  Return False if period would be empty."""
+        startDate = self.startDate()
+        finishDate = self.finishDate()
+        if requestedStartDate is not None and requestedStartDate > startDate:
+            startDate = requestedStartDate
+        if requestedFinishDate is not None and requestedFinishDate < finishDate:
+            finishDate = requestedFinishDate
+        if finishDate <= startDate:
+            return False
+        self.setDates(startDate, finishDate)
+        return True
+
+    def inPeriod(self, year: int, mon: int, isDaily: bool) -> bool:
+        """Return true if year and mon are within period."""
+        if year < self.startYear or year > self.finishYear:
+            return False
+        if self.isAnnual and not isDaily:
+            return True
+        if isDaily:
+            if year == self.startYear:
+                return mon >= self.julianStartDay
+            if year == self.finishYear:
+                return mon <= self.julianFinishDay
+            return True
+        # monthly
+        if year == self.startYear:
+            return mon >= self.startMonth
+        if year == self.finishYear:
+            return mon <= self.finishMonth
+        return True
+
+    def steps(self, isDaily: bool) -> List[Tuple[int, int]]:
+        """Return list of (year, mon) pairs from start to finish of period."""
+        return DateIndex(self, isDaily).steps()
+
+    def label(self, year: int, mon: int, isDaily: bool) -> str:
+        """Return date label for year and mon, as written to plot csv files."""
+        if isDaily:
+            return str(year * 1000 + mon)
+        elif self.isAnnual:
+            return str(year)
+        else:
+            return str(year) + '/' + str(mon)
+
+    @staticmethod
+    def julianToDate(day: int, year: int) -> date:
+        """
+        Return datetime.date from year and number of days.
+
+        The day may exceed the length of year, in which case a later year
+        will be returned.
+        """
+        return date(year, 1, 1) + timedelta(days=day - 1)
+
+    @staticmethod
+    def isLeap(year: int) -> bool:
+        """Return true if year is a leap year."""
+        if year % 4 == 0:
+            if year % 100 == 0:
+                return year % 400 == 0
+            else:
+                return True
+        else:
+            return False
+
+class DateIndex:
+    """Positions of (year, mon) pairs in the sequence of output steps of a period.
+
+    Built once for a period and output frequency, so that the (year, mon) values of all the rows of a table
+    can be checked against the period and placed in order with a few array operations."""
+
+    def __init__(self, period: Period, isDaily: bool) -> None:
+        """Initialise class variables."""
+        ## true if steps are days
+        self.isDaily = isDaily
+        ## true if steps are years
+        self.isAnnual = period.isAnnual and not isDaily
+        ## first year of period
+        self.startYear = period.startYear
+        ## last year of period
+        self.finishYear = period.finishYear
+        numYears = period.finishYear - period.startYear + 1
+        if isDaily:
+            ## number of days in each year of period
+            self.yearLengths = numpy.array([366 if Period.isLeap(year) else 365
+                                            for year in range(period.startYear, period.finishYear + 1)], dtype=numpy.int64)
+            ## position of first day of each year of period, negative for first year unless period starts on 1st January
+            self.yearStarts = numpy.concatenate(([0], numpy.cumsum(self.yearLengths)[:-1])) - (period.julianStartDay - 1)
+            ## number of steps in period
+            self.length = int(self.yearStarts[-1]) + period.julianFinishDay
+            years = numpy.repeat(numpy.arange(period.startYear, period.finishYear + 1), self.yearLengths)
+            mons = numpy.concatenate([numpy.arange(1, length + 1) for length in self.yearLengths])
+            first = period.julianStartDay - 1
+            ## year of each step
+            self.years = years[first:first + self.length]
+            ## MON value of each step
+            self.mons = mons[first:first + self.length]
+            ## date number of each step, as used by Visualise
+            self.dates = self.years * 1000 + self.mons
+        elif self.isAnnual:
+            self.length = numYears
+            self.years = numpy.arange(period.startYear, period.finishYear + 1, dtype=numpy.int64)
+            self.mons = self.years.copy()
+            self.dates = self.years.copy()
+        else:
+            ## first month of period
+            self.startMonth = period.startMonth
+            self.length = (numYears - 1) * 12 + period.finishMonth - period.startMonth + 1
+            months = numpy.arange(self.length, dtype=numpy.int64) + (period.startMonth - 1)
+            self.years = months // 12 + period.startYear
+            self.mons = months % 12 + 1
+            self.dates = self.years * 100 + self.mons
+
+    def positions(self, years: Any, mons: Any) -> numpy.ndarray:
+        """Return array of positions in period of (year, mon) pairs from arrays years and mons, with -1 for pairs outside period."""
+        years = numpy.asarray(years, dtype=numpy.int64)
+        mons = numpy.asarray(mons, dtype=numpy.int64)
+        yearNums = years - self.startYear
+        if self.isDaily:
+            valid = (yearNums >= 0) & (yearNums < len(self.yearLengths))
+            clipped = numpy.where(valid, yearNums, 0)
+            valid &= (mons >= 1) & (mons <= self.yearLengths[clipped])
+            result = self.yearStarts[clipped] + mons - 1
+        elif self.isAnnual:
+            valid = numpy.ones(len(years), dtype=bool)
+            result = yearNums
+        else:
+            valid = (mons >= 1) & (mons <= 12)
+            result = yearNums * 12 + mons - self.startMonth
+        valid &= (result >= 0) & (result < self.length)
+        return numpy.where(valid, result, -1)
+
+    def position(self, year: int, mon: int) -> int:
+        """Return position in period of (year, mon), or -1 if outside period."""
+        return int(self.positions([year], [mon])[0])
+
+    def steps(self) -> List[Tuple[int, int]]:
+        """Return list of (year, mon) pairs from start to finish of period."""
+        return list(zip(self.years.tolist(), self.mons.tolist()))
@@ -29,6 +29,7 @@ except:
 # from multiprocessing import Pool
 import time
 from .QSWATUtils import QSWATUtils  # @UnresolvedImport
+from .profiling import Profiler  # @UnresolvedImport
     
     ## Convert grids to rectilinear polygons.
     #
@@ -593,6 +594,7 @@ class Polygonize:
     #===========================================================================
         
         # Sequential version
+    @Profiler.timed('Polygonize.finishShapes', log=True)
     def finishShapes(self, progressBar=None):
                  
         """
@@ -601,7 +603,6 @@ class Polygonize:
         progressBar may be None for batch runs and testing.
         """
         if progressBar is not None:
-            start = time.process_time()
             fivePercent = len(self.shapesTable) // 20
             progressCount = 0
             progressBar.setVisible(True)
@@ -614,8 +615,6 @@ class Polygonize:
                     progressCount += 1
                 data.finish()
             progressBar.setVisible(False)
-            finish = time.process_time()
-            QSWATUtils.loginfo('Made FullHRUs shapes in {0!s} seconds'.format(int(finish - start)))
         else:
             for data in self.shapesTable.values():
                 data.finish()
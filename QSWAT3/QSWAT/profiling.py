@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+
+import os
+import sys
+import json
+import time
+import cProfile
+import tempfile
+import threading
+import traceback
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Set, Any, Optional, Iterator, Callable
+
+try:
+    import psutil  # type: ignore
+except ImportError:
+    psutil = None
+try:
+    import resource  # @UnresolvedImport
+except ImportError:
+    resource = None  # type: ignore
+
+try:
+    from .QSWATUtils import QSWATUtils  # type: ignore
+except ImportError:
+    # for convert from Arc and to plus
+    from QSWATUtils import QSWATUtils  # type: ignore
+
+class Span:
+
+    """Timing of one pipeline stage or step."""
+
+    def __init__(self, spanId: int, parent: int, name: str) -> None:
+        """Initialise class variables."""
+        ## span id, unique in run
+        self.spanId = spanId
+        ## id of enclosing span in the same thread, or 0
+        self.parent = parent
+        ## span name, usually Class.method
+        self.name = name
+        ## number of rows or cells processed, if set by the caller
+        self.count: Optional[int] = None
+        ## flag set if span ended with an exception
+        self.failed = False
+        ## wall clock start, from time.perf_counter
+        self.startWall = time.perf_counter()
+        ## process CPU start, from time.process_time
+        self.startCPU = time.process_time()
+
+    def record(self, runStart: float) -> Dict[str, Any]:
+        """Return span as a trace record, with times relative to runStart."""
+        result = {'id': self.spanId,
+                  'parent': self.parent,
+                  'name': self.name,
+                  'thread': threading.current_thread().name,
+                  'start': round(self.startWall - runStart, 6),
+                  'wall': round(time.perf_counter() - self.startWall, 6),
+                  'cpu': round(time.process_time() - self.startCPU, 6),
+                  'peakRSS': Profiler.peakRSS()}
+        if self.count is not None:
+            result['count'] = self.count
+        if self.failed:
+            result['failed'] = True
+        return result
+
+class Profiler:
+
+    """
+    Span based timers for delineation, TauDEM, HRU creation, database writes and visualisation.
+
+    Each span records wall time, process CPU time, peak resident set size of the process at the end of the span,
+    and optionally a count of rows or cells processed.  Spans nest within a thread.
+    Spans of a project run are written as JSON to profile.json in the project's Text folder whenever an outermost span ends.
+    A span can also be run under cProfile by adding its name (or * for all outermost spans) to profileStages,
+    directly from batch scripts or via the QSWAT_PROFILE environment variable (comma separated),
+    and its statistics are then written next to the trace as <name>.prof.
+    """
+
+    ## trace file name, in the project's Text folder
+    _TRACEFILE = 'profile.json'
+
+    ## environment variable listing stages to run under cProfile
+    _PROFILEVAR = 'QSWAT_PROFILE'
+
+    ## stages to run under cProfile; * means every outermost span
+    profileStages: Set[str] = set(name.strip() for name in os.getenv(_PROFILEVAR, '').split(',') if name.strip() != '')
+
+    ## trace file of current run, or empty if no project has been set up
+    traceFile = ''
+
+    ## project name of current run
+    projName = ''
+
+    ## wall clock start of current run, from time.perf_counter
+    runStart = time.perf_counter()
+
+    ## date and time current run started
+    runStarted = datetime.now().isoformat(timespec='seconds')
+
+    ## finished spans of current run
+    spans: List[Dict[str, Any]] = []
+
+    ## last span id allocated
+    _lastId = 0
+
+    ## guards spans and span ids, since spans may end in worker threads
+    _lock = threading.Lock()
+
+    ## per thread stack of open spans
+    _local = threading.local()
+
+    ## flag set while a stage is running under cProfile: only one profiler can be active
+    _profiling = False
+
+    @staticmethod
+    def startRun(textDir: str, projName: str) -> None:
+        """Start a new trace for project run, written to textDir."""
+        with Profiler._lock:
+            Profiler.traceFile = QSWATUtils.join(textDir, Profiler._TRACEFILE) if textDir != '' else ''
+            Profiler.projName = projName
+            Profiler.runStart = time.perf_counter()
+            Profiler.runStarted = datetime.now().isoformat(timespec='seconds')
+            Profiler.spans = []
+            Profiler._lastId = 0
+
+    @staticmethod
+    def peakRSS() -> int:
+        """Return peak resident set size of this process in bytes, or 0 if not available."""
+        if resource is not None:
+            maxRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS, kilobytes on Linux and other POSIX systems
+            return maxRSS if sys.platform == 'darwin' else maxRSS * 1024
+        if psutil is not None and sys.platform == 'win32':
+            # peak working set: resource is not available on Windows
+            return getattr(psutil.Process().memory_info(), 'peak_wset', 0)
+        return 0
+
+    @staticmethod
+    @contextmanager
+    def span(name: str, log: bool=False) -> Iterator[Span]:
+        """
+        Context manager timing the enclosed code as span name.
+
+        The caller may set the count field of the span returned.  If log is true the times are also logged.
+        """
+        stack: List[Span] = getattr(Profiler._local, 'stack', None)
+        if stack is None:
+            stack = []
+            Profiler._local.stack = stack
+        with Profiler._lock:
+            Profiler._lastId += 1
+            span = Span(Profiler._lastId, stack[-1].spanId if len(stack) > 0 else 0, name)
+        profiler: Optional[cProfile.Profile] = None
+        if not Profiler._profiling and Profiler.traceFile != '' and \
+            (name in Profiler.profileStages or ('*' in Profiler.profileStages and len(stack) == 0)):
+            Profiler._profiling = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+        stack.append(span)
+        try:
+            yield span
+        except BaseException:
+            span.failed = True
+            raise
+        finally:
+            stack.pop()
+            if profiler is not None:
+                profiler.disable()
+                Profiler._profiling = False
+                Profiler.writeProfile(profiler, name)
+            record = span.record(Profiler.runStart)
+            with Profiler._lock:
+                Profiler.spans.append(record)
+            if log:
+                QSWATUtils.loginfo('{0} took {1:.3f} seconds ({2:.3f} seconds CPU){3}'.
+                                   format(name, record['wall'], record['cpu'], '' if span.count is None else '; count {0}'.format(span.count)))
+            if len(stack) == 0:
+                Profiler.writeTrace()
+
+    @staticmethod
+    def timed(name: str, log: bool=False) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator timing each call of a function as span name."""
+        def decorator(fun: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(fun)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with Profiler.span(name, log=log):
+                    return fun(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def setCount(count: int) -> None:
+        """Set number of rows or cells processed by the innermost open span in this thread, if any."""
+        stack: Optional[List[Span]] = getattr(Profiler._local, 'stack', None)
+        if stack:
+            stack[-1].count = count
+
+    @staticmethod
+    def writeTrace() -> None:
+        """Write trace of current run.  Failure is only logged: tracing must never stop a run."""
+        if Profiler.traceFile == '':
+            return
+        with Profiler._lock:
+            trace = {'project': Profiler.projName,
+                     'started': Profiler.runStarted,
+                     'spans': sorted(Profiler.spans, key=lambda record: record['start'])}
+        try:
+            # write to a temporary file and rename so that the trace is never left partly written
+            fd, tmpFile = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(Profiler.traceFile))
+            with os.fdopen(fd, 'w') as f:
+                json.dump(trace, f, indent=1)
+            os.replace(tmpFile, Profiler.traceFile)
+        except Exception:
+            QSWATUtils.loginfo('Cannot write profile trace {0}: {1}'.format(Profiler.traceFile, traceback.format_exc()))
+
+    @staticmethod
+    def writeProfile(profiler: cProfile.Profile, name: str) -> None:
+        """Write cProfile statistics for stage name next to the trace file."""
+        profileFile = QSWATUtils.join(os.path.dirname(Profiler.traceFile), name + '.prof')
+        try:
+            profiler.dump_stats(profileFile)
+            QSWATUtils.loginfo('Profile of {0} written to {1}'.format(name, profileFile))
+        except Exception:
+            QSWATUtils.loginfo('Cannot write profile {0}: {1}'.format(profileFile, traceback.format_exc()))
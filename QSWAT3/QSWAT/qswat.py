@@ -55,23 +55,22 @@ from typing import Dict, List, Set, Tuple, Optional, Union, Any, TYPE_CHECKING,
 # QSWATUtils should have no further dependencies, especially in Cython modules
 from .QSWATUtils import QSWATUtils, FileTypes  # type: ignore  # @UnresolvedImport
 from .parameters import Parameters  # type: ignore  # @UnresolvedImport
+from .profiling import Profiler  # type: ignore  # @UnresolvedImport
 try:
     txt = 'QSwatDialog'
     from .qswatdialog import QSwatDialog  # type: ignore  # @UnresolvedImport
-    txt = 'HRUs'
-    from .hrus import HRUs  # type: ignore  # @UnresolvedImport
     txt = 'QSWATTopology'
     from .QSWATTopology import QSWATTopology  # type: ignore  # @UnresolvedImport
     txt = 'GlobalVars'
     from .globals import GlobalVars  # type: ignore  # @UnresolvedImport
-    txt = 'Delineation'
-    from .delineation import Delineation  # type: ignore  # @UnresolvedImport
-    txt = 'Visualise'
-    from .visualise import Visualise  # type: ignore  # @UnresolvedImport
-    txt = 'AboutQSWAT'
-    from .about import AboutQSWAT  # type: ignore  # @UnresolvedImport
 except Exception:
     QSWATUtils.loginfo('QSWAT failed to import {0}: {1}'.format(txt, traceback.format_exc()))
+# stage modules are imported when first used, so starting QGIS does not load delineation, HRU or visualisation code,
+# and batch runs, which drive the main dialog through delineation and HRU creation, do not load visualisation code (and matplotlib)
+if TYPE_CHECKING:
+    from .hrus import HRUs  # @UnusedImport
+    from .delineation import Delineation  # @UnusedImport
+    from .visualise import Visualise  # @UnusedImport
 
 
 
@@ -227,6 +226,7 @@ class QSwat(QObject):
 
     def about(self) -> None:
         """Show information about QSWAT."""
+        from .about import AboutQSWAT  # type: ignore  # @UnresolvedImport
         form = AboutQSWAT(self._gv)
         form.run(QSwat.__version__)
         
@@ -419,6 +419,7 @@ class QSwat(QObject):
         # if we do this earlier we cannot for example find the project database
         self._gv = GlobalVars(self._iface, isBatch, isHUC, isHAWQS, useSQLite, logFile, fromGRASS, TNCDir)
         assert self._gv is not None
+        Profiler.startRun(self._gv.textDir, self._gv.projName)
         self._gv.plugin_dir = self.plugin_dir
         self._odlg.projPath.repaint()
         self.checkReports()
@@ -438,6 +439,7 @@ class QSwat(QObject):
         if (isHAWQS and isBatch) or self.demProcessed():
             self._demIsProcessed = True
             self.allowCreateHRU()
+            from .hrus import HRUs  # type: ignore  # @UnresolvedImport
             hrus = HRUs(self._gv, self._odlg.reportsBox)
             #result = hrus.tryRun()
             #if result == 1:
@@ -574,6 +576,7 @@ class QSwat(QObject):
         # avoid getting second window
         if self.delin is not None and self.delin._dlg.isEnabled():
             self.delin._dlg.close()
+        from .delineation import Delineation  # type: ignore  # @UnresolvedImport
         self.delin = Delineation(self._gv, self._demIsProcessed)
         assert self.delin is not None
         result = self.delin.run()
@@ -602,6 +605,7 @@ class QSwat(QObject):
         # avoid getting second window
         if self.hrus is not None and self.hrus._dlg.isEnabled():
             self.hrus._dlg.close()
+        from .hrus import HRUs  # type: ignore  # @UnresolvedImport
         self.hrus = HRUs(self._gv, self._odlg.reportsBox)
         assert self.hrus is not None
         result = self.hrus.run()
@@ -651,6 +655,7 @@ class QSwat(QObject):
             return False
         self._gv.cellArea = demLayer.rasterUnitsPerPixelX() * demLayer.rasterUnitsPerPixelY() * factor * factor
         # hillshade
+        from .delineation import Delineation  # type: ignore  # @UnresolvedImport
         Delineation.addHillshade(demFile, root, demLayer, self._gv)
         outletFile, found = proj.readEntry(self._gv.attTitle, 'delin/outlets', '')
         if found and outletFile != '':
@@ -744,6 +749,7 @@ class QSwat(QObject):
         if self._gv.existingWshed:
             if not self._gv.useGridModel:
                 if not os.path.exists(self._gv.basinFile):
+                    # batch HUC runs keep the basins raster in memory and do not write it: rerunning delineation recreates it
                     QSWATUtils.loginfo('demProcessed failed: no basins raster')
                     return False
                 # following checks that basins raster created after shapefile, since this is what TauDEM does
@@ -864,6 +870,7 @@ class QSwat(QObject):
         # avoid getting second window
         if self.vis is not None and self.vis._dlg.isEnabled():
             self.vis._dlg.close()
+        from .visualise import Visualise  # type: ignore  # @UnresolvedImport
         self.vis = Visualise(self._gv)
         assert self.vis is not None
         self.vis.run()
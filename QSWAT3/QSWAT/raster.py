@@ -23,8 +23,11 @@ from qgis.core import QgsCoordinateReferenceSystem, QgsRasterLayer
 from osgeo import gdal  # type: ignore
 import numpy as np
 import os
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from distutils.version import LooseVersion
-from typing import Any, Dict, Union, Optional, cast
+from typing import Any, Dict, List, Tuple, Union, Optional, cast
 
 try:
     from .QSWATUtils import QSWATUtils # type: ignore 
@@ -279,3 +282,133 @@ class Chunk():
         ## row offset
         self.rowOffset = rowOffset
         
+        
+class ValueCounts():
+    
+    """
+    Frequencies of the distinct values in band 1 of a raster.
+    
+    The raster is read in windows of complete rows aligned with its blocks, in a pool of threads 
+    (GDAL releases the GIL while reading), each thread using its own dataset.
+    If a cache folder (in the project) is given, results are cached there and reused while the sizes and modification times 
+    of all the files making up the raster, such as all the files of an ESRI grid, are unchanged.
+    """
+    
+    ## suffix of cache file names
+    _CACHESUFFIX = '.counts.npz'
+    
+    ## target number of cells in each window read
+    _WINDOWCELLS = 1 << 22
+    
+    @staticmethod
+    def counts(fileName: str, cacheDir: str='', numThreads: int=0) -> Dict[Union[int, float], int]:
+        """Return map of values in band 1 of raster to number of cells with that value, excluding nodata."""
+        vals, cnts = ValueCounts.countArrays(fileName, cacheDir, numThreads)
+        return dict(zip(vals.tolist(), cnts.tolist()))
+    
+    @staticmethod
+    def percents(fileName: str, cacheDir: str='', numThreads: int=0) -> Dict[Union[int, float], float]:
+        """Return map of values in band 1 of raster to percent of cells (excluding nodata) with that value."""
+        vals, cnts = ValueCounts.countArrays(fileName, cacheDir, numThreads)
+        total = int(cnts.sum())
+        if total == 0:
+            return dict()
+        return dict(zip(vals.tolist(), ((cnts / total) * 100).tolist()))
+    
+    @staticmethod
+    def countArrays(fileName: str, cacheDir: str='', numThreads: int=0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return sorted array of distinct values in band 1 of raster, excluding nodata, and array of their counts.
+        
+        Results are cached in cacheDir unless it is empty.
+        """
+        ds = gdal.Open(fileName, gdal.GA_ReadOnly)
+        if ds is None:
+            raise ValueError('Cannot open raster {0}'.format(fileName))
+        useCache = cacheDir != '' and os.path.isdir(cacheDir)
+        if useCache:
+            stamp = ValueCounts.stamp(ds)
+            cacheFile = ValueCounts.cacheFile(fileName, cacheDir)
+            if os.path.isfile(cacheFile):
+                try:
+                    with np.load(cacheFile) as cached:
+                        if np.array_equal(cached['stamp'], stamp):
+                            return cached['values'], cached['counts']
+                except Exception:
+                    pass  # unreadable cache: recalculate
+        numRows = ds.RasterYSize
+        numCols = ds.RasterXSize
+        band = ds.GetRasterBand(1)
+        noData = band.GetNoDataValue()
+        _, yBlockSize = band.GetBlockSize()
+        ds = None
+        # windows of complete rows, a multiple of the block height
+        yBlockSize = max(1, yBlockSize)
+        windowRows = max(1, ValueCounts._WINDOWCELLS // max(1, numCols * yBlockSize)) * yBlockSize
+        windows = [(row, min(windowRows, numRows - row)) for row in range(0, numRows, windowRows)]
+        if numThreads <= 0:
+            numThreads = min(8, os.cpu_count() or 1)
+        
+        def countWindows(windowList: List[Tuple[int, int]]) -> List[Tuple[np.ndarray, np.ndarray]]:
+            # GDAL datasets must not be shared between threads
+            threadDs = gdal.Open(fileName, gdal.GA_ReadOnly)
+            threadBand = threadDs.GetRasterBand(1)
+            results = []
+            for (top, rows) in windowList:
+                data = threadBand.ReadAsArray(0, top, numCols, rows).ravel()
+                if noData is not None:
+                    data = data[data != noData]
+                if np.issubdtype(data.dtype, np.floating):
+                    data = data[~np.isnan(data)]
+                results.append(np.unique(data, return_counts=True))
+            threadDs = None
+            return results
+        
+        # give each thread every numThreads'th window
+        groups = [windows[i::numThreads] for i in range(numThreads) if i < len(windows)]
+        parts: List[Tuple[np.ndarray, np.ndarray]] = []
+        if len(groups) <= 1:
+            for group in groups:
+                parts.extend(countWindows(group))
+        else:
+            with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+                for result in pool.map(countWindows, groups):
+                    parts.extend(result)
+        if len(parts) == 0:
+            vals = np.zeros(0)
+            cnts = np.zeros(0, dtype=np.int64)
+        else:
+            # merge counts from windows
+            vals, inverse = np.unique(np.concatenate([part[0] for part in parts]), return_inverse=True)
+            cnts = np.bincount(inverse.ravel(), weights=np.concatenate([part[1] for part in parts]), minlength=len(vals)).astype(np.int64)
+        if useCache:
+            tmpFile = ''
+            try:
+                fd, tmpFile = tempfile.mkstemp(suffix='.tmp', dir=cacheDir)
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(f, stamp=stamp, values=vals, counts=cnts)
+                os.replace(tmpFile, cacheFile)
+            except Exception:
+                # no cache, eg if folder not writable
+                if os.path.exists(tmpFile):
+                    os.remove(tmpFile)
+        return vals, cnts
+    
+    @staticmethod
+    def stamp(ds: Any) -> np.ndarray:
+        """Return sizes and modification times of all the files GDAL uses for dataset ds, such as all the files of an ESRI grid."""
+        stamps: List[int] = []
+        for path in sorted(ds.GetFileList() or []):
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                stamps.extend([stat.st_size, stat.st_mtime_ns])
+        return np.array(stamps, dtype=np.int64)
+    
+    @staticmethod
+    def cacheFile(fileName: str, cacheDir: str) -> str:
+        """Return cache file in cacheDir for raster fileName: the raster's name (or its folder's name for an ESRI grid) and a hash of its path."""
+        path = os.path.abspath(fileName)
+        base, suffix = os.path.splitext(os.path.basename(path))
+        if suffix.lower() == '.adf' or os.path.isdir(path):
+            base = os.path.basename(path if os.path.isdir(path) else os.path.dirname(path))
+        return os.path.join(cacheDir, base + '_' + hashlib.md5(path.encode()).hexdigest()[:12] + ValueCounts._CACHESUFFIX)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+
+import os.path
+import pickle
+import hashlib
+import tempfile
+import traceback
+from typing import Dict, Set, Tuple, Any, Optional
+
+from .QSWATUtils import QSWATUtils  # type: ignore
+
+class ReferenceData:
+
+    """Read-only snapshot of the reference database lookup tables used when setting up a project.
+
+    Snapshots are keyed by the path, size and modification time of the reference database,
+    so the database is not reread when a project is opened, and by the case sensitivity of lookups.
+    They are pickled into a cache folder and shared by all projects (and worker processes) that use the same reference database.
+    """
+
+    ## Snapshot format version.  Increase when the stored tables change.
+    _VERSION = 2
+
+    ## Environment variable that can be used to choose the cache folder
+    _CACHEDIRVAR = 'QSWAT_REFCACHE'
+
+    ## snapshots already loaded in this process, keyed by reference database stamp and case sensitivity
+    _snapshots: Dict[Tuple[str, bool], Any] = dict()
+
+    ## reference database hashes already calculated in this process, keyed by (path, size, modification time)
+    _hashes: Dict[Tuple[str, int, int], str] = dict()
+
+    def __init__(self, refStamp: str, caseSensitive: bool) -> None:
+        """Initialise class variables."""
+        ## snapshot version
+        self.version = ReferenceData._VERSION
+        ## stamp of reference database
+        self.refStamp = refStamp
+        ## flag indicating if string keys are compared case sensitively (true for SQLite, false for Access)
+        self.caseSensitive = caseSensitive
+        ## map of URBNAME to (IUNUM, OV_N) from urban table
+        self.urban: Dict[str, Tuple[int, float]] = dict()
+        ## map of CPNM to (ICNUM, IDC, OV_N) from crop table
+        self.crop: Dict[str, Tuple[int, int, float]] = dict()
+        ## map of usersoil table name to set of SNAM values in that table
+        self.usersoilNames: Dict[str, Set[str]] = dict()
+
+    def key(self, name: str) -> str:
+        """Normalise a name for lookup."""
+        return name if self.caseSensitive else name.upper()
+
+    def urbanData(self, code: str) -> Optional[Tuple[int, float]]:
+        """Return (IUNUM, OV_N) for urban code, or None if not in urban table."""
+        return self.urban.get(self.key(code), None)
+
+    def cropData(self, code: str) -> Optional[Tuple[int, int, float]]:
+        """Return (ICNUM, IDC, OV_N) for landuse code, or None if not in crop table."""
+        return self.crop.get(self.key(code), None)
+
+    def hasSoil(self, usersoil: str, soilName: str) -> bool:
+        """Return true if soilName is an SNAM value in usersoil table, which must already be loaded."""
+        return self.key(soilName) in self.usersoilNames[usersoil]
+
+    def readTables(self, connRef: Any) -> None:
+        """Read urban and crop tables from reference database."""
+        for row in connRef.cursor().execute('SELECT URBNAME, IUNUM, OV_N FROM urban'):
+            if row[0] is not None:
+                self.urban.setdefault(self.key(row[0]), (row[1], row[2]))
+        for row in connRef.cursor().execute('SELECT CPNM, ICNUM, IDC, OV_N FROM crop'):
+            if row[0] is not None:
+                self.crop.setdefault(self.key(row[0]), (row[1], row[2], row[3]))
+
+    def readUsersoil(self, connRef: Any, usersoil: str) -> None:
+        """Read SNAM values from usersoil table in reference database."""
+        names: Set[str] = set()
+        for row in connRef.cursor().execute('SELECT SNAM FROM ' + usersoil):
+            if row[0] is not None:
+                names.add(self.key(row[0]))
+        self.usersoilNames[usersoil] = names
+
+    @staticmethod
+    def cacheDir() -> str:
+        """Folder for cached snapshots."""
+        return os.environ.get(ReferenceData._CACHEDIRVAR,
+                              QSWATUtils.join(QSWATUtils.join(os.path.expanduser('~'), '.qswat'), 'refcache'))
+
+    @staticmethod
+    def hashFile(path: str) -> str:
+        """Return md5 hash of file contents, only reading the file if not already hashed in this process."""
+        stat = os.stat(path)
+        statKey = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        result = ReferenceData._hashes.get(statKey, None)
+        if result is None:
+            m = hashlib.md5()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    m.update(chunk)
+            result = m.hexdigest()
+            ReferenceData._hashes[statKey] = result
+        return result
+
+    @staticmethod
+    def stampFile(path: str) -> str:
+        """Return md5 hash of the absolute path, size and modification time of file, which change when it is edited or replaced."""
+        stat = os.stat(path)
+        return hashlib.md5(repr((os.path.abspath(path), stat.st_size, stat.st_mtime_ns)).encode()).hexdigest()
+
+    @staticmethod
+    def snapshotFile(refStamp: str, caseSensitive: bool) -> str:
+        """Path of pickled snapshot for reference database stamp and case sensitivity."""
+        return QSWATUtils.join(ReferenceData.cacheDir(), 'ref_{0}_{1}_v{2}.pickle'.
+                               format(refStamp, 'cs' if caseSensitive else 'ci', ReferenceData._VERSION))
+
+    @staticmethod
+    def load(dbRefFile: str, connRef: Any, caseSensitive: bool) -> Optional[Any]:
+        """Return snapshot for reference database, reading it from the cache if possible,
+        else from connRef, in which case it is saved in the cache.
+
+        Returns None if the reference database cannot be read."""
+        try:
+            refStamp = ReferenceData.stampFile(dbRefFile)
+        except Exception:
+            QSWATUtils.loginfo('Cannot stamp reference database {0}: {1}'.format(dbRefFile, traceback.format_exc()))
+            return None
+        snapshotKey = (refStamp, caseSensitive)
+        snapshot = ReferenceData._snapshots.get(snapshotKey, None)
+        if snapshot is not None:
+            return snapshot
+        snapshotFile = ReferenceData.snapshotFile(refStamp, caseSensitive)
+        if os.path.isfile(snapshotFile):
+            try:
+                with open(snapshotFile, 'rb') as f:
+                    state = pickle.load(f)
+                if state.get('version', 0) == ReferenceData._VERSION and \
+                    state.get('refStamp', '') == refStamp and state.get('caseSensitive', None) == caseSensitive:
+                    snapshot = ReferenceData(refStamp, caseSensitive)
+                    snapshot.urban = state['urban']
+                    snapshot.crop = state['crop']
+                    snapshot.usersoilNames = state['usersoilNames']
+                    ReferenceData._snapshots[snapshotKey] = snapshot
+                    QSWATUtils.loginfo('Reference data read from {0}'.format(snapshotFile))
+                    return snapshot
+            except Exception:
+                QSWATUtils.loginfo('Cannot read reference data snapshot {0}: {1}'.format(snapshotFile, traceback.format_exc()))
+        if connRef is None:
+            return None
+        snapshot = ReferenceData(refStamp, caseSensitive)
+        try:
+            snapshot.readTables(connRef)
+        except Exception:
+            QSWATUtils.loginfo('Cannot read reference data from {0}: {1}'.format(dbRefFile, traceback.format_exc()))
+            return None
+        ReferenceData._snapshots[snapshotKey] = snapshot
+        snapshot.save()
+        return snapshot
+
+    def usersoilLoaded(self, connRef: Any, usersoil: str) -> bool:
+        """Make sure usersoil table is in snapshot, reading it from connRef and updating the cache if necessary.
+
+        Returns false if the table cannot be read."""
+        if usersoil in self.usersoilNames:
+            return True
+        if connRef is None:
+            return False
+        try:
+            self.readUsersoil(connRef, usersoil)
+        except Exception:
+            QSWATUtils.loginfo('Cannot read {0} table from reference database: {1}'.format(usersoil, traceback.format_exc()))
+            return False
+        self.save()
+        return True
+
+    def save(self) -> None:
+        """Write snapshot to cache.  Failure is not an error: the snapshot is just not shared."""
+        snapshotFile = ReferenceData.snapshotFile(self.refStamp, self.caseSensitive)
+        try:
+            cacheDir = os.path.dirname(snapshotFile)
+            os.makedirs(cacheDir, exist_ok=True)
+            # write to a temporary file and rename so that concurrent processes never see a partial snapshot
+            fd, tmpFile = tempfile.mkstemp(suffix='.tmp', dir=cacheDir)
+            with os.fdopen(fd, 'wb') as f:
+                # pickle only builtin types, so the snapshot does not depend on the package name (plugin or batch)
+                pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpFile, snapshotFile)
+        except Exception:
+            QSWATUtils.loginfo('Cannot write reference data snapshot {0}: {1}'.format(snapshotFile, traceback.format_exc()))
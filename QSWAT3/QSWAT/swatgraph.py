@@ -41,6 +41,11 @@ try:
 except:
     # stand alone version
     from graphdialog1 import GraphDialog  # @UnresolvedImport @Reimport
+try:
+    from .fitstats import SeriesTable, FitStatistics  # @UnresolvedImport @UnusedImport
+except:
+    # stand alone version
+    from fitstats import SeriesTable, FitStatistics  # @UnresolvedImport @Reimport
 
 # basic matplotlib colours
 colours = ['b', 'g', 'r', 'm', 'y', 'c', 'k'] 
@@ -68,6 +73,8 @@ class SWATGraph(QObject):
         self.ax1 = None
         ## matplotlib figure
         self.fig = None
+        ## dates and values read from csv file
+        self.data = None
         
     def run(self):
         """Initialise form and run on initial csv file."""
@@ -168,6 +175,9 @@ class SWATGraph(QObject):
         self._dlg.table.setRowCount(0)
         row = 0
         numCols = 0
+        headers = []
+        dates = []
+        rows = []
         with open(self.csvFile, 'r', newline='') as csvFil:
             reader = csv.reader(csvFil)
             for line in reader:
@@ -178,6 +188,7 @@ class SWATGraph(QObject):
                         for i in range(numCols):
                             self._dlg.table.insertColumn(i)
                         self._dlg.table.setHorizontalHeaderLabels(line)
+                        headers = [h.strip() for h in line]
                     else:
                         self._dlg.table.insertRow(row-1)
                         for i in range(numCols):
@@ -188,6 +199,8 @@ class SWATGraph(QObject):
                                 return
                             item = QTableWidgetItem(val)
                             self._dlg.table.setItem(row-1, i, item)
+                        dates.append(line[0].strip())
+                        rows.append(line[1:numCols])
                     row = row + 1
                 except Exception:
                     self.error('Error: could not read file {0} at line {1}: {2}'.format(self.csvFile, row+1, traceback.format_exc()))
@@ -195,6 +208,8 @@ class SWATGraph(QObject):
         if row == 1:
             self.error('There is no data to plot in {0}'.format(self.csvFile))
             return
+        # parse values once, for graphs and statistics
+        self.data = SeriesTable.fromRows(headers, dates, rows)
         # columns are too narrow for headings
         self._dlg.table.resizeColumnsToContents()
         # rows are too widely spaced vertically
@@ -267,14 +282,13 @@ class SWATGraph(QObject):
             #print('colToTwin: {0}'.format(colToTwin))
             #print('Twins: {0}'.format(twins.keys()))
             numPlots = self._dlg.table.columnCount() - 1
-            rng = range(self._dlg.table.rowCount())
             fmt, widthBase = self.getDateFormat(str(self._dlg.table.item(0, 0).text()).strip())
             if fmt == '':
                 # could not parse
                 return
-            xVals = [datetime.strptime(str(self._dlg.table.item(i, 0).text()).strip(), fmt) for i in rng]
+            xVals = [datetime.strptime(d, fmt) for d in self.data.dates]
             for col in range(1, numPlots+1):
-                yVals = [self.makeFloat(self._dlg.table.item(i, col).text()) for i in rng]
+                yVals = self.data.series(col)
                 colour = self.getColour(col)
                 h = self._dlg.table.horizontalHeaderItem(col).text()
                 indx = colToTwin.get(col, -1)
@@ -310,11 +324,10 @@ class SWATGraph(QObject):
             colToTwin, twins = self.makeYAxes()
             numPlots = self._dlg.table.columnCount() - 1
             timeLen = self._dlg.table.rowCount()
-            rng = range(timeLen)
             exceedence = np.arange(1.0, timeLen + 1) / timeLen
             exceedence *= 100
             for col in range(1, numPlots+1):
-                yVals = sorted([self.makeFloat(self._dlg.table.item(i, col).text()) for i in rng], reverse=True)
+                yVals = sorted(self.data.series(col).tolist(), reverse=True)
                 colour = self.getColour(col)
                 h = self._dlg.table.horizontalHeaderItem(col).text()
                 indx = colToTwin.get(col, -1)
@@ -332,9 +345,8 @@ class SWATGraph(QObject):
                     twins[indx].tick_params(axis='y', colors=colour, **tkw)
                 plots.append(p)
         elif self.plotType == 3:  # scatter plot
-            rng = range(self._dlg.table.rowCount())
-            xVals = np.array([self.makeFloat(self._dlg.table.item(i, 1).text()) for i in rng])
-            yVals = np.array([self.makeFloat(self._dlg.table.item(i, 2).text()) for i in rng])
+            xVals = self.data.series(1)
+            yVals = self.data.series(2)
             self.ax1.scatter(xVals, yVals, marker=".")
             # Fit linear regression via least squares with numpy.polyfit
             # It returns intercept (a) and slope (b)
@@ -352,7 +364,6 @@ class SWATGraph(QObject):
             #print('colToIndex: {0}'.format(colToIndex))
             #print('count: {0}'.format(count))
             numPlots = len(count)
-            rng = range(self._dlg.table.rowCount())
             gs_kw = dict(width_ratios=[count[index] for index in count], height_ratios=[1])
             self.fig, axs = plt.subplots(1, numPlots, gridspec_kw=gs_kw)
             self.fig.subplots_adjust(left=0.05)
@@ -364,7 +375,7 @@ class SWATGraph(QObject):
                     # allow for observed in first column error
                     continue
                 index = colToIndex[col]
-                vals = [self.makeFloat(self._dlg.table.item(i, col).text()) for i in rng]
+                vals = self.data.series(col).tolist()
                 val2 = sorted([v for v in vals if not math.isnan(v)])
                 minn = val2[0]
                 maxx = val2[-1]
@@ -524,7 +535,7 @@ class SWATGraph(QObject):
         self._dlg.close()
         
     def writeStats(self):
-        """Write Pearson and Nash coefficients."""
+        """Write Pearson and Nash coefficients, plus percent bias, Kling-Gupta efficiency and RMSE-observations standard deviation ratio."""
         numCols = self._dlg.table.columnCount()
         numRows = self._dlg.table.rowCount()
         self._dlg.coeffs.clear()
@@ -537,83 +548,38 @@ class SWATGraph(QObject):
             if 'observed' in h:
                 self.nash(i+1, i, numRows)
         
-    def multiSums(self, idx1, idx2, N):
-        """Return various sums for two series, only including points where both are numbers, plus count of such values."""
-        s1 = 0
-        s2 = 0
-        s11 = 0
-        s22 = 0
-        s12 = 0
-        count = 0
-        for i in range(N):
-            val1 = self.makeFloat(self._dlg.table.item(i, idx1).text())
-            val2 = self.makeFloat(self._dlg.table.item(i, idx2).text())
-            # ignore missing values
-            if not (math.isnan(val1) or math.isnan(val2)):
-                s1 += val1
-                s2 += val2
-                s11 += val1 * val1
-                s22 += val2 * val2
-                s12 += val1 * val2
-                count = count + 1
-        return (s1, s2, s11, s22, s12, count)
-        
-        
-    def sum1(self, idx1, idx2, N):
-        """Return sum for series1, only including points where both are numbers, plus count of such values.""" 
-        s1 = 0
-        count = 0
-        for i in range(N):
-            val1 = self.makeFloat(self._dlg.table.item(i, idx1).text())
-            val2 = self.makeFloat(self._dlg.table.item(i, idx2).text())
-            # ignore missing values
-            if not (math.isnan(val1) or math.isnan(val2)):
-                s1 += val1
-                count = count + 1
-        return (s1, count)
+    @staticmethod
+    def countMessage(count, N):
+        """Message noting number of values used, if not all."""
+        if count < N:
+            return ' (using {0!s} of {1!s} values)'.format(count , N)
+        else:
+            return ''
         
     def pearson(self, idx1, idx2, N):
         """Calculate and display R2 and Pearson correlation coefficients for pair of plots."""
-        s1, s2, s11, s22, s12, count = self.multiSums(idx1, idx2, N)
-        if count == 0: return
-        sqx = (count * s11) - (s1 * s1)
-        sqy = (count * s22) - (s2 * s2)
-        sxy = (count * s12) - (s1 * s2)
-        deno = math.sqrt(sqx * sqy)
-        if deno == 0: return
-        rho = sxy / deno
-        if count < N:
-            extra = ' (using {0!s} of {1!s} values)'.format(count , N)
-        else:
-            extra = ''
+        rho, count = FitStatistics.pearson(self.data.series(idx1), self.data.series(idx2))
+        if rho is None: return
         msg = 'Series1: ' + self._dlg.table.horizontalHeaderItem(idx1).text() + \
-            '  Series2: ' + self._dlg.table.horizontalHeaderItem(idx2).text() + '  R2 = {0:.2f} (Pearson Correlation Coefficient = {1:.2f}){2}'.format(rho * rho, rho, extra)
+            '  Series2: ' + self._dlg.table.horizontalHeaderItem(idx2).text() + \
+            '  R2 = {0:.2f} (Pearson Correlation Coefficient = {1:.2f}){2}'.format(rho * rho, rho, self.countMessage(count, N))
         self._dlg.coeffs.append(SWATGraph.trans(msg))
 
     def nash(self, idx1, idx2, N):
-        """Calculate and display Nash-Sutcliffe efficiency coefficients for pair of plots, taking idx1 as observed."""
-        s1, count = self.sum1(idx1, idx2, N)
-        if count == 0: return
-        mean = s1 / count
-        num = 0
-        deno = 0
-        for i in range(N):
-            val1 = self.makeFloat(self._dlg.table.item(i, idx1).text())
-            val2 = self.makeFloat(self._dlg.table.item(i, idx2).text())
-            # ignore missing values
-            if not (math.isnan(val1) or math.isnan(val2)):
-                diff12 = val1 - val2
-                diff1m = val1 - mean
-                num += diff12 * diff12
-                deno += diff1m * diff1m
-        if deno == 0: return
-        result = 1 - (num / deno)
-        if count < N:
-            extra = ' (using {0!s} of {1!s} values)'.format(count , N)
-        else:
-            extra = ''
+        """Calculate and display Nash-Sutcliffe efficiency coefficient, percent bias, Kling-Gupta efficiency, 
+        and RMSE-observations standard deviation ratio for pair of plots, taking idx1 as observed."""
+        stats, count = FitStatistics.all(self.data.series(idx1), self.data.series(idx2))
+        if stats['NSE'] is None: return
         msg = 'Series1: ' + self._dlg.table.horizontalHeaderItem(idx1).text() + \
-            '  Series2: ' + self._dlg.table.horizontalHeaderItem(idx2).text() + '   Nash-Sutcliffe Efficiency Coefficient = {0:.2f}{1}'.format(result, extra)
+            '  Series2: ' + self._dlg.table.horizontalHeaderItem(idx2).text() + \
+            '   Nash-Sutcliffe Efficiency Coefficient = {0:.2f}'.format(stats['NSE'])
+        if stats['PBIAS'] is not None:
+            msg += '  PBIAS = {0:.1f}%'.format(stats['PBIAS'])
+        if stats['KGE'] is not None:
+            msg += '  KGE = {0:.2f}'.format(stats['KGE'])
+        if stats['RSR'] is not None:
+            msg += '  RSR = {0:.2f}'.format(stats['RSR'])
+        msg += self.countMessage(count, N)
         self._dlg.coeffs.append(SWATGraph.trans(msg))
 
 if __name__ == '__main__':
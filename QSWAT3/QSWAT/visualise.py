@@ -26,7 +26,7 @@ try:
     from qgis.PyQt.QtGui import QColor, QKeySequence, QGuiApplication, QFont, QFontMetricsF, QPainter, QTextDocument
     from qgis.PyQt.QtWidgets import QAbstractItemView, QTableWidgetItem, QWidget, QListWidgetItem, QFileDialog, QMessageBox, QShortcut, QStyleOptionGraphicsItem
     from qgis.PyQt.QtXml import QDomDocument
-    from qgis.core import QgsApplication, QgsLineSymbol, QgsFillSymbol, QgsColorRamp, QgsFields, QgsPrintLayout, QgsProviderRegistry, QgsRendererRange, QgsStyle, QgsGraduatedSymbolRenderer, QgsRendererRangeLabelFormat, QgsField, QgsMapLayer, QgsVectorLayer, QgsProject, QgsLayerTree, QgsReadWriteContext, QgsLayoutExporter, QgsSymbol, QgsProcessingContext, QgsGradientColorRamp, QgsGradientStop
+    from qgis.core import QgsApplication, QgsLineSymbol, QgsFillSymbol, QgsColorRamp, QgsFields, QgsPrintLayout, QgsProviderRegistry, QgsRendererRange, QgsStyle, QgsGraduatedSymbolRenderer, QgsRendererRangeLabelFormat, QgsField, QgsMapLayer, QgsVectorLayer, QgsProject, QgsLayerTree, QgsReadWriteContext, QgsLayoutExporter, QgsSymbol, QgsProcessingContext, QgsGradientColorRamp, QgsGradientStop, QgsFeatureRequest
     from qgis.gui import QgsMapCanvas, QgsMapCanvasItem
     from qgis.analysis import QgsNativeAlgorithms
     import processing  # type: ignore # @UnresolvedImport 
@@ -51,6 +51,7 @@ import glob
 from datetime import date
 import math
 import sqlite3
+import time
 import traceback
 from copy import deepcopy
 
@@ -58,13 +59,13 @@ from copy import deepcopy
 from .visualisedialog import VisualiseDialog  # type: ignore  # @UnresolvedImport
 from .QSWATUtils import QSWATUtils, fileWriter, FileTypes  # type: ignore  # @UnresolvedImport
 from .QSWATTopology import QSWATTopology  # type: ignore  # @UnresolvedImport
-from .swatgraph import SWATGraph  # type: ignore  # @UnresolvedImport
 from .parameters import Parameters  # type: ignore  # @UnresolvedImport
-from .jenks import jenks  # type: ignore  # @UnresolvedImport
+from .profiling import Profiler  # type: ignore  # @UnresolvedImport
+from .jenksbreaks import JenksBreaks  # type: ignore  # @UnresolvedImport
+from .periods import Period, DateIndex  # type: ignore  # @UnresolvedImport
 from .comparedialog import compareDialog  # type: ignore  # @UnresolvedImport
 
-if not TYPE_CHECKING:
-    from . import imageio  # @UnresolvedImport
+# swatgraph (which loads matplotlib) and imageio are imported when first used
     
 class Visualise(QObject):
     """Support visualisation of SWAT outputs, using data in SWAT output database."""
@@ -83,6 +84,8 @@ class Visualise(QObject):
     _FLOWDURATION = 'Duration curve'
     _SCATTER = 'Scatter plot'
     _BOX = 'Box plot'
+    ## number of rows readData fetches at a time
+    _FETCHROWS = 100000
     
     def __init__(self, gv: Any):
         """Initialise class variables."""
@@ -156,6 +159,8 @@ class Visualise(QObject):
         self.periodMonths = 0.0
         ## length of simulation in years (may be fractional)
         self.periodYears = 0.0
+        ## map of period and output frequency to date index of period
+        self.dateIndexes: Dict[Tuple[int, int, int, int, bool, bool], DateIndex] = dict()
         ## map canvas title
         self.mapTitle: Optional[MapTitle] = None
         ## flag to decide if we need to create a new results file:
@@ -183,6 +188,8 @@ class Visualise(QObject):
         self.animateIndexes: Dict[str, int] = dict()
         ## all values involved in animation, for calculating Jenks breaks
         self.allAnimateVals: List[float] = []
+        ## Jenks breaks calculator, caching breaks for each scenario, table, variable and period
+        self.jenks = JenksBreaks()
         ## timer used to run animation
         self.animateTimer = QTimer()
         ## flag to indicate if animation running
@@ -871,11 +878,8 @@ class Visualise(QObject):
                 else:
                     if not self.readData('', False, table, var, where, whereNum=whereNum):
                         return
-                (year, mon) = self.startYearMon()
-                (finishYear, finishMon) = self.finishYearMon()
                 layerData = self.staticData['']
-                finished = False
-                while not finished:
+                for (year, mon) in self.currentDateIndex().steps():
                     if not num in layerData:
                         if table == 'hru':
                             ref = 'HRU {0!s}'.format(sub)
@@ -910,8 +914,6 @@ class Visualise(QObject):
                             dates.append(str(year))
                         else:
                             dates.append(str(year) + '/' + str(mon))
-                    finished = (year == finishYear and mon == finishMon)
-                    (year, mon) = self.nextDate(year, mon)
                 datesDone = True
         if not datesDone:
             QSWATUtils.error('You must have at least one non-observed plot', self._gv.isBatch)
@@ -949,9 +951,11 @@ class Visualise(QObject):
 #         commands.append(csvFile)
 #         subprocess.Popen(commands)
 # above replaced with swatGraph form
+        from .swatgraph import SWATGraph  # type: ignore  # @UnresolvedImport
         graph = SWATGraph(csvFile, self._dlg.plotType.currentIndex())
         graph.run()
     
+    @Profiler.timed('Visualise.readData', log=True)
     def readData(self, layerId: str, isStatic: bool, table: str, var: str, where: str, whereNum: int=0) -> bool:
         """Read data from database table into staticData.  Return True if no error detected.
         
@@ -969,7 +973,6 @@ class Visualise(QObject):
             varz = self.varList(True)
         else:
             varz = ['[' + var + ']']
-        numVars = len(varz)
         if table == 'sub' or table == 'rch':
             if isStatic:
                 preString = 'SUB, YEAR, MON, AREAkm2, '
@@ -1015,38 +1018,66 @@ class Visualise(QObject):
         sql = self._gv.db.sqlSelect(table, selectString, '', where)
         #QSWATUtils.information('SQL: {0}'.format(sql), self._gv.isBatch)
         # guard against no table or no data
+        # rows with NULL index or date, and NULL values, are skipped and reported
+        nullRows = 0
+        nullVals = 0
         try:
-            for row in cursor.execute(sql):
+            cursor.execute(sql)
+            dateIndex = self.currentDateIndex()
+            # remove square brackets from each var
+            varNames = [var1[1:-1] for var1 in varz]
+            while True:
+                # read in chunks so only the rows in the period are kept
+                chunk = cursor.fetchmany(Visualise._FETCHROWS)
+                if len(chunk) == 0:
+                    break
+                rows = [row for row in chunk if row[0] is not None and row[1] is not None and row[2] is not None]
+                nullRows += len(chunk) - len(rows)
+                if len(rows) == 0:
+                    continue
                 # index is subbasin number unless multiple hrus, when it is the integer parsing of HRUGIS
-                index = int(row[0])
+                indexes = numpy.fromiter((int(row[0]) for row in rows), dtype=numpy.int64, count=len(rows))
+                years = numpy.fromiter((row[1] for row in rows), dtype=numpy.int64, count=len(rows))
+                mons = numpy.fromiter((row[2] for row in rows), dtype=numpy.int64, count=len(rows))
+                inPeriod = dateIndex.positions(years, mons) >= 0
                 # fudge to deal with WHERE x = n problem 
                 if whereNum > 0:
-                    if index != whereNum:
-                        continue
-                year = int(row[1])
-                mon = int(row[2])
-                if not self.inPeriod(year, mon):
-                    continue
-                if self.hasAreas:
-                    area = float(row[3])
-                if isStatic and self.hasAreas and not index in self.areas:
-                    self.areas[index] = area
-                if not index in layerData:
-                    layerData[index] = dict()
-                for i in range(numVars):
-                    # remove square brackets from each var
-                    var = varz[i][1:-1]
-                    val = float(row[i+preLen])
-                    if not var in layerData[index]:
-                        layerData[index][var] = dict()
-                    if not year in layerData[index][var]:
-                        layerData[index][var][year] = dict()
-                    layerData[index][var][year][mon] = val
+                    inPeriod &= indexes == whereNum
+                for i in numpy.flatnonzero(inPeriod).tolist():
+                    row = rows[i]
+                    index = int(indexes[i])
+                    year = int(years[i])
+                    mon = int(mons[i])
+                    if isStatic and self.hasAreas and not index in self.areas:
+                        if row[3] is None:
+                            nullVals += 1
+                        else:
+                            self.areas[index] = float(row[3])
+                    indexData = layerData.get(index, None)
+                    if indexData is None:
+                        indexData = dict()
+                        layerData[index] = indexData
+                    for var1, val in zip(varNames, row[preLen:]):
+                        if val is None:
+                            nullVals += 1
+                            continue
+                        varData = indexData.get(var1, None)
+                        if varData is None:
+                            varData = dict()
+                            indexData[var1] = varData
+                        yearData = varData.get(year, None)
+                        if yearData is None:
+                            yearData = dict()
+                            varData[year] = yearData
+                        yearData[mon] = float(val)
         except:
             # get scenario name
             scenario = self.scenarioFromDb()
             QSWATUtils.error('Cannot find {0} data for scenario {1}'.format(table, scenario), self._gv.isBatch)
             return False        
+        if nullRows > 0 or nullVals > 0:
+            QSWATUtils.information('Table {0} has {1!s} rows with no {2} or date and {3!s} empty values: these have been ignored'.
+                                   format(table, nullRows, preString.split(',')[0], nullVals), self._gv.isBatch)
         if len(layerData) == 0:
             QSWATUtils.error('No data has nbeen read.  Perhaps your dates are outside the dates of the table', self._gv.isBatch)
             return False
@@ -1067,22 +1098,26 @@ class Visualise(QObject):
         Assumes self.[julian]startYear/Month/Day and self.[julian]finishYear/Month/Day already set.
         Assumes mon is within 1..365/6 when daily, and within 1..12 when monthly.
         """
-        if year < self.startYear or year > self.finishYear:
-            return False
-        if self.isAnnual:
-            return True
-        if self.isDaily or self.table == 'wql':
-            if year == self.startYear:
-                return mon >= self.julianStartDay
-            if year == self.finishYear:
-                return mon <= self.julianFinishDay
-            return True
-        # monthly
-        if year == self.startYear:
-            return mon >= self.startMonth
-        if year == self.finishYear:
-            return mon <= self.finishMonth
-        return True
+        return self.currentDateIndex().position(year, mon) >= 0
+    
+    def currentDateIndex(self) -> DateIndex:
+        """
+        Return date index for requested period and output frequency, 
+        made on first use and reused until the period or frequency changes.
+        
+        Assumes self.[julian]startYear/Day and self.[julian]finishYear/Day already set.
+        """
+        isDaily = self.isDaily or self.table == 'wql'
+        key = (self.startYear, self.julianStartDay, self.finishYear, self.julianFinishDay, isDaily, self.isAnnual)
+        dateIndex = self.dateIndexes.get(key, None)
+        if dateIndex is None:
+            period = Period()
+            period.setDates(self.julianToDate(self.julianStartDay, self.startYear), self.julianToDate(self.julianFinishDay, self.finishYear))
+            period.isDaily = self.isDaily
+            period.isAnnual = self.isAnnual
+            dateIndex = DateIndex(period, isDaily)
+            self.dateIndexes[key] = dateIndex
+        return dateIndex
             
                 
     def summariseData(self, layerId: str, isStatic: bool) -> None:
@@ -1123,43 +1158,6 @@ class Visualise(QObject):
         else:
             return year * 100 + mon
         
-    def startYearMon(self) -> Tuple[int, int]:
-        """Return (year, mon) pair for start date according to period."""
-        if self.isDaily or self.table == 'wql':
-            return (self.startYear, self.julianStartDay)
-        elif self.isAnnual:
-            return (self.startYear, self.startYear)
-        else:
-            return (self.startYear, self.startMonth)
-        
-    def finishYearMon(self) -> Tuple[int, int]:
-        """Return (year, mon) pair for finish date according to period."""
-        if self.isDaily or self.table == 'wql':
-            return (self.finishYear, self.julianFinishDay)
-        elif self.isAnnual:
-            return (self.finishYear, self.finishYear)
-        else:
-            return (self.finishYear, self.finishMonth)
-            
-        
-    def nextDate(self, year: int, mon: int) -> Tuple[int, int]:
-        """Get next (year, mon) pair according to period."""
-        if self.isDaily or self.table == 'wql':
-            leapAdjust = 1 if self.isLeap(year) else 0
-            maxDays = 365 + leapAdjust
-            if mon < maxDays:
-                return (year, mon+1)
-            else:
-                return (year+1, 1)
-        elif self.isAnnual:
-            return (year+1, year+1)
-        else:
-            if mon < 12:
-                return (year, mon+1)
-            else:
-                return (year+1, 1)
-        return (0,0)  # for mypy    
-        
     def summarise(self, data: Dict[Any, Dict[Any, float]]) -> float:
         """Summarise values according to summary method."""
         if self._dlg.summaryCombo.currentText() == Visualise._TOTALS:
@@ -1217,13 +1215,7 @@ class Visualise(QObject):
     @staticmethod
     def isLeap(year: int) -> bool:
         """Return true if year is a leap year."""
-        if year % 4 == 0:
-            if year % 100 == 0:
-                return year % 400 == 0
-            else:
-                return True
-        else:
-            return False
+        return Period.isLeap(year)
         
     def setNumSubbasins(self, tables: List[str]) -> None:
         """Set self.numSubbasins from one of tables."""
@@ -1457,8 +1449,9 @@ class Visualise(QObject):
         for var in varz:
             varIndexes[var] = self._gv.topo.getIndex(layer, var)
         assert layer is not None
-        layer.startEditing()
-        for f in layer.getFeatures():
+        # map fid -> field index -> value, written in one operation
+        mmap: Dict[int, Dict[int, float]] = dict()
+        for f in layer.getFeatures(self.resultsRequest(layer)):
             fid = f.id()
             if self.useHRUs():
                 # May be split HRUs; just use first
@@ -1466,6 +1459,7 @@ class Visualise(QObject):
                 sub = int(f.attribute(QSWATTopology._HRUGIS).split(',')[0])
             else:
                 sub = f.attribute(QSWATTopology._SUBBASIN)
+            vals: Dict[int, float] = dict()
             if self.hasAreas:
                 area = self.areas.get(sub, None)
                 if area is None:
@@ -1475,9 +1469,7 @@ class Visualise(QObject):
                         ref = 'subbasin {0!s}'.format(sub)
                     QSWATUtils.error('Cannot get area for {0}: have you run SWAT and saved data since running QSWAT'.format(ref), self._gv.isBatch)
                     return
-                if not layer.changeAttributeValue(fid, varIndexes[Visualise._AREA], float(area)):
-                    QSWATUtils.error('Could not set attribute {0} in results file {1}'.format(Visualise._AREA, self.resultsFile), self._gv.isBatch)
-                    return
+                vals[varIndexes[Visualise._AREA]] = float(area)
             for var in varz:
                 subData = cast(Dict[int, Dict[str, float]], self.resultsData).get(sub, None)
                 if subData is not None:
@@ -1491,16 +1483,41 @@ class Visualise(QObject):
                         ref = 'subbasin {0!s}'.format(sub)
                     QSWATUtils.error('Cannot get data for variable {0} in {1}: have you run SWAT and saved data since running QSWAT'.format(var, ref), self._gv.isBatch)
                     return
-                if not layer.changeAttributeValue(fid, varIndexes[var], float(data) if isinstance(data, numpy.float64) else data):
-                    QSWATUtils.error('Could not set attribute {0} in results file {1}'.format(var, self.resultsFile), self._gv.isBatch)
-                    return
-        layer.commitChanges()
+                vals[varIndexes[var]] = float(data)
+            mmap[fid] = vals
+        if not self.writeAttributes(layer, mmap):
+            QSWATUtils.error('Could not write results to results file {0}'.format(self.resultsFile), self._gv.isBatch)
+            return
         self.summaryChanged = False
         
+    @staticmethod
+    def resultsRequest(layer: QgsVectorLayer) -> QgsFeatureRequest:
+        """Request for reading subbasin and HRU numbers from results layer without geometry."""
+        fields = layer.fields()
+        indexes = [fields.indexOf(name) for name in [QSWATTopology._SUBBASIN, QSWATTopology._HRUGIS]]
+        return QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([i for i in indexes if i >= 0])
+        
+    @Profiler.timed('Visualise.writeAttributes')
+    def writeAttributes(self, layer: QgsVectorLayer, mmap: Dict[int, Dict[int, float]]) -> bool:
+        """Write attribute values mmap (fid -> field index -> value) to layer in a single operation.  Return true if OK.
+        
+        Writes directly to the data provider, avoiding the layer's edit buffer."""
+        start = time.perf_counter()
+        if not layer.dataProvider().changeAttributeValues(mmap):
+            return False
+        layer.triggerRepaint()
+        numVals = sum(len(vals) for vals in mmap.values())
+        Profiler.setCount(numVals)
+        QSWATUtils.loginfo('Wrote {0} values for {1} features to {2} in {3:.2f} seconds'.
+                           format(numVals, len(mmap), layer.name(), time.perf_counter() - start))
+        return True
+    
     def makeJenksRenderer(self, vals: List[float], ramp: QgsColorRamp, var: str, invert: bool) -> QgsGraduatedSymbolRenderer:
         """Make renderer with Jenks algorithm using vals of var, setting colour rampe to ramp, inverted if invert"""
         count = 5
-        cbreaks = jenks(vals, count)
+        period = (self.startYear, self.startMonth, self.startDay, self.finishYear, self.finishMonth, self.finishDay,
+                  self._dlg.summaryCombo.currentText())
+        cbreaks = self.jenks.cachedBreaks((self.scenario, self.table, var, period), vals, count)
         QSWATUtils.loginfo('Breaks: {0!s}'.format(cbreaks))
         rangeList = []
         for i in range(count):
@@ -2480,9 +2497,11 @@ class Visualise(QObject):
         maxDiff = float('-inf')
         for layer in {layer1, layer2, layer3, layer4}:
             assert layer is not None
-            layer.startEditing()
-            for f in layer.getFeatures():
+            # map fid -> field index -> value, written in one operation
+            mmap: Dict[int, Dict[int, float]] = dict()
+            for f in layer.getFeatures(self.resultsRequest(layer)):
                 fid = f.id()
+                vals: Dict[int, float] = dict()
                 if self.useHRUs():
                     # May be split HRUs; just use first
                     # This is inadequate for some variables, but no way to know of correct val is sum of vals, mean, etc.
@@ -2497,12 +2516,8 @@ class Visualise(QObject):
                         else:
                             ref = 'subbasin {0!s}'.format(sub)
                         QSWATUtils.error('Cannot get area for {0}'.format(ref), self._gv.isBatch)
-                        layer.rollBack()
-                        return None, False
-                    if not layer.changeAttributeValue(fid, areaIndex, float(area)):
-                        QSWATUtils.error('Could not set attribute {0} in comparison results file'.format(Visualise._AREA), self._gv.isBatch)
-                        layer.rollBack()
                         return None, False
+                    vals[areaIndex] = float(area)
                 if layer == layer1:
                     subData = cast(Dict[int, Dict[str, float]], data1).get(sub, None)
                     if subData is not None:
@@ -2515,7 +2530,6 @@ class Visualise(QObject):
                         else:
                             ref = 'subbasin {0!s}'.format(sub)
                         QSWATUtils.error('Cannot get data for variable {0} in {1} in first scenario'.format(var, ref), self._gv.isBatch)
-                        layer.rollBack()
                         return None, False
                     allVals.append(data)
                 elif layer == layer2:
@@ -2530,7 +2544,6 @@ class Visualise(QObject):
                         else:
                             ref = 'subbasin {0!s}'.format(sub)
                         QSWATUtils.error('Cannot get data for variable {0} in {1} in second scenario'.format(var, ref), self._gv.isBatch)
-                        layer.rollBack()
                         return None, False
                     allVals.append(data)
                 else:
@@ -2545,7 +2558,6 @@ class Visualise(QObject):
                         else:
                             ref = 'subbasin {0!s}'.format(sub)
                         QSWATUtils.error('Cannot get data for variable {0} in {1} in first scenario'.format(var, ref), self._gv.isBatch)
-                        layer.rollBack()
                         return None, False
                     subData2 = cast(Dict[int, Dict[str, float]], self.resultsData).get(sub, None)
                     if subData2 is not None:
@@ -2558,7 +2570,6 @@ class Visualise(QObject):
                         else:
                             ref = 'subbasin {0!s}'.format(sub)
                         QSWATUtils.error('Cannot get data for variable {0} in {1} in second scenario'.format(var, ref), self._gv.isBatch)
-                        layer.rollBack()
                         return None, False
                     if layer == layer3:
                         data = val2 - val1
@@ -2566,11 +2577,11 @@ class Visualise(QObject):
                         maxDiff = max(maxDiff, data)
                     else: # layer 4
                         data = 0 if val1 == 0 else ((val2 - val1) / val1) * 100            
-                if not layer.changeAttributeValue(fid, varIndex, float(data) if isinstance(data, numpy.float64) else data):
-                    QSWATUtils.error('Could not set attribute {0} in comparison results file'.format(var), self._gv.isBatch)
-                    layer.rollBack()
-                    return None, False
-            layer.commitChanges()
+                vals[varIndex] = float(data)
+                mmap[fid] = vals
+            if not self.writeAttributes(layer, mmap):
+                QSWATUtils.error('Could not set attribute {0} in comparison results file'.format(var), self._gv.isBatch)
+                return None, False
         self.summaryChanged = False
         return allVals, abs(minDiff) > maxDiff
     
@@ -2777,12 +2788,7 @@ class Visualise(QObject):
             if not self.readData(lid, False, self.table, self.animateVar, ''):
                 return
             self.summariseData(lid, False)
-            if self.isDaily or self.table == 'wql':
-                animateLength = self.periodDays
-            elif self.isAnnual:
-                animateLength = round(self.periodYears)
-            else:
-                animateLength = round(self.periodMonths)
+            animateLength = self.currentDateIndex().length
             self._dlg.slider.setMinimum(1)
             self._dlg.slider.setMaximum(animateLength)
             self.colourAnimationLayer()
@@ -2820,6 +2826,7 @@ class Visualise(QObject):
             pass
         period = 1.0 / self._dlg.spinBox.value()
         try:
+            from . import imageio  # type: ignore  # @UnresolvedImport
             with imageio.get_writer('file://' + self.videoFile, mode='I', loop=1, duration=period) as writer:  # type: ignore
                 for filename in fileNames:
                     image = imageio.imread(QSWATUtils.join(self._gv.pngDir, filename))  # type: ignore
@@ -2902,15 +2909,7 @@ class Visualise(QObject):
         
     def sliderValToDate(self) -> int:
         """Convert slider value to date."""
-        if self.isDaily or self.table == 'wql':
-            return self.addDays( self.julianStartDay + self._dlg.slider.value() - 1,  self.startYear)
-        elif self.isAnnual:
-            return  self.startYear + self._dlg.slider.value() - 1
-        else:
-            totalMonths =  self.startMonth + self._dlg.slider.value() - 2
-            year = totalMonths // 12
-            month = totalMonths % 12 + 1
-            return ( self.startYear + year) * 100 + month
+        return int(self.currentDateIndex().dates[self._dlg.slider.value() - 1])
         
     def startCompareScenarios(self):
         """Run the compare scenarios form."""
@@ -2966,15 +2965,6 @@ class Visualise(QObject):
         self._dlg.compareLabel.setText('<html><head/><body><p>Compare X<br>and Y</p></body></html>')
         self._comparedlg.close()
             
-    def addDays(self, days: int, year: int) -> int:
-        """Make Julian date from year + days."""
-        leapAdjust = 1 if self.isLeap(year) else 0
-        lenYear = 365 + leapAdjust
-        if days <= lenYear:
-            return (year) * 1000 + days
-        else:
-            return self.addDays(days - lenYear, year + 1)
-            
     def julianToDate(self, day: int, year: int) -> date:
         """
         Return datetime.date from year and number of days.
@@ -2982,44 +2972,7 @@ class Visualise(QObject):
         The day may exceed the length of year, in which case a later year
         will be returned.
         """
-        if day <= 31:
-            return date(year, 1, day)
-        day -= 31
-        leapAdjust = 1 if self.isLeap(year) else 0
-        if day <= 28 + leapAdjust:
-            return date(year, 2, day)
-        day -= 28 + leapAdjust
-        if day <= 31:
-            return date(year, 3, day)
-        day -= 31
-        if day <= 30:
-            return date(year, 4, day)
-        day -= 30
-        if day <= 31:
-            return date(year, 5, day)
-        day -= 31
-        if day <= 30:
-            return date(year, 6, day)
-        day -= 30
-        if day <= 31:
-            return date(year, 7, day)
-        day -= 31
-        if day <= 31:
-            return date(year, 8, day)
-        day -= 31
-        if day <= 30:
-            return date(year, 9, day)
-        day -= 30
-        if day <= 31:
-            return date(year, 10, day)
-        day -= 31
-        if day <= 30:
-            return date(year, 11, day)
-        day -= 30
-        if day <= 31:
-            return date(year, 12, day)
-        else:
-            return self.julianToDate(day - 31, year + 1)
+        return Period.julianToDate(day, year)
         
     def dateToString(self, dat: int) -> str:
         """Convert integer date to string."""
@@ -3251,7 +3204,7 @@ class Visualise(QObject):
     # described at http://danieljlewis.org/2010/06/07/jenks-natural-breaks-algorithm-in-python/
     # amended following style of http://www.macwright.org/simple-statistics/docs/simple_statistics.html#section-116
  
-    # no longer used - replaced by Cython
+    # no longer used - replaced by JenksBreaks
     #===========================================================================
     # @staticmethod
     # def getJenksBreaks( dataList, numClass ):
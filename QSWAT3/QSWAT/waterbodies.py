@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+# Import the PyQt and QGIS libraries
+try:
+    from qgis.core import QgsFeatureRequest, QgsGeometry, QgsRectangle, QgsSpatialIndex, QgsVectorLayer
+except:
+    from qgis.core import QgsFeatureRequest, QgsGeometry, QgsRectangle, QgsSpatialIndex, QgsVectorLayer
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Set, Tuple
+
+
+class WaterBodies():
+    """
+    Intersections of NHD water body polygons with subbasins, for HUC and HAWQS projects.
+
+    Subbasin polygons are read once and put in a spatial index, and the water bodies are read once,
+    restricted to those whose bounding boxes meet the watershed extent.
+    Each water body is then only intersected with the subbasins whose bounding boxes it meets,
+    and the intersection areas for each water body are cached, since reservoirs and lakes can share polygons.
+    """
+
+    ## smallest intersection area recorded, in square metres: smaller areas round to 0.00 ha
+    _MINAREA = 50
+
+    def __init__(self, subbasinsFile: str, waterPolygonsFile: str) -> None:
+        """Initialise class variables."""
+        subbasinsLayer = QgsVectorLayer(subbasinsFile, 'subbasins', 'ogr')
+        polyIndex = subbasinsLayer.fields().lookupField('PolygonId')
+        ## feature id -> (basin, geometry) for subbasins
+        self.subbasins: Dict[int, Tuple[int, QgsGeometry]] = dict()
+        ## spatial index of subbasins
+        self.index = QgsSpatialIndex()
+        extent = QgsRectangle()
+        extent.setMinimal()
+        for subbasin in subbasinsLayer.getFeatures():
+            geom = subbasin.geometry()
+            self.subbasins[subbasin.id()] = (subbasin[polyIndex], geom)
+            self.index.addFeature(subbasin)
+            extent.combineExtentWith(geom.boundingBox())
+        ## OBJECTID -> geometry for water bodies that may meet the watershed
+        self.waterGeoms: Dict[int, QgsGeometry] = dict()
+        waterbodyLayer = QgsVectorLayer(waterPolygonsFile, 'water', 'ogr')
+        oidIndex = waterbodyLayer.fields().lookupField('OBJECTID')
+        request = QgsFeatureRequest().setFilterRect(extent)
+        for waterBody in waterbodyLayer.getFeatures(request):
+            self.waterGeoms[int(waterBody[oidIndex])] = waterBody.geometry()
+        ## OBJECTID -> list of (basin, intersection area in square metres)
+        self.intersectionsCache: Dict[int, List[Tuple[int, float]]] = dict()
+
+    def intersectionAreas(self, objectIds: Iterable[int]) -> Dict[int, float]:
+        """Return map basin -> area of intersection with water bodies objectIds, omitting areas below _MINAREA."""
+        interAreas: Dict[int, float] = dict()
+        for oid in objectIds:
+            for basin, interArea in self.objectIntersections(oid):
+                interAreas[basin] = interAreas.get(basin, 0) + interArea
+        return interAreas
+
+    def objectIntersections(self, oid: int) -> List[Tuple[int, float]]:
+        """Return list of (basin, area) for intersections of subbasins with water body oid, omitting areas below _MINAREA."""
+        intersections = self.intersectionsCache.get(oid, None)
+        if intersections is not None:
+            return intersections
+        intersections = []
+        waterGeom = self.waterGeoms.get(oid, None)
+        if waterGeom is not None:
+            # feature ids are returned in arbitrary order: use subbasin file order, as a full scan would
+            for fid in sorted(self.index.intersects(waterGeom.boundingBox())):
+                basin, geom = self.subbasins[fid]
+                intersect = geom.intersection(waterGeom)
+                if not QgsGeometry.isEmpty(intersect):
+                    interArea = intersect.area()
+                    if interArea >= WaterBodies._MINAREA:
+                        intersections.append((basin, interArea))
+        self.intersectionsCache[oid] = intersections
+        return intersections
+
+    @staticmethod
+    def topoSort(basins: Iterable[int], downBasins: Dict[int, int]) -> List[int]:
+        """
+        Make sorted list of basins so that a basin always drains to a basin earlier in the list, if any.
+
+        downBasins maps each basin to its downstream basin, or -1 if it is an outlet.
+        Gives the same order as placing each basin, in the order of basins,
+        at the front if it is an outlet or immediately after its downstream basin if that is already placed,
+        else putting it back at the end of the queue, but without searching the list for downstream basins.
+        Basins whose downstream basin is never placed are treated as outlets.
+        """
+        todo: Deque[int] = deque(basins)
+        placed: Set[int] = set()
+        # basins are placed after earlier ones with the same downstream basin, so lists are in reverse order
+        outlets: List[int] = []
+        upBasins: Dict[int, List[int]] = dict()
+        # number of basins requeued since one was last placed
+        waiting = 0
+        while len(todo) > 0:
+            basin = todo.popleft()
+            dsBasin = downBasins.get(basin, -1)
+            if dsBasin == -1 or waiting >= len(todo) + 1:
+                outlets.append(basin)
+            elif dsBasin in placed:
+                upBasins.setdefault(dsBasin, []).append(basin)
+            else:
+                todo.append(basin)
+                waiting += 1
+                continue
+            placed.add(basin)
+            waiting = 0
+        # each basin followed by its upstream basins, most recently placed first
+        result: List[int] = []
+        stack = outlets[:]
+        while len(stack) > 0:
+            basin = stack.pop()
+            result.append(basin)
+            stack.extend(upBasins.get(basin, []))
+        return result
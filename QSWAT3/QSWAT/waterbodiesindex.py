@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+
+import os
+import sqlite3
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+class WaterBodiesIndex:
+
+    """Indexed copy of the water bodies database used by HUC and HAWQS projects.
+
+    The reservoirs, ponds, wetlands, playas and lakes tables are copied with text key columns for the HUC12_10_8_6 and HUC14_12_10_8 fields,
+    which are indexed, and the OBJECTID lists of reservoirs and lakes are split into a separate table,
+    so that a project only reads its own rows.  Each copied row keeps the rowid of its source row as SRCID,
+    and rows are returned in source order, which is the order of a scan of the source table.
+    The index is stored next to the water bodies database and is built once, by buildWaterBodiesIndex.py.
+    It is only used if it was made from the current version of the water bodies database.
+    """
+
+    ## Index format version.  Increase when the stored tables change.
+    _VERSION = 1
+
+    ## suffix added to water bodies database name, without extension, to make index file name
+    _SUFFIX = '_index.sqlite'
+
+    ## water bodies tables copied
+    _TABLES = ['reservoirs', 'ponds', 'wetlands', 'playas', 'lakes']
+
+    ## HUC fields and the names of their key columns
+    _HUCKEYS = {'HUC12_10_8_6': 'HUC12KEY', 'HUC14_12_10_8': 'HUC14KEY'}
+
+    ## table of split OBJECTID lists
+    _OBJECTIDSTABLE = 'objectids'
+
+    ## table recording version and source database
+    _SOURCETABLE = 'source'
+
+    def __init__(self, indexFile: str) -> None:
+        """Initialise class variables."""
+        ## index database connection
+        self.conn = sqlite3.connect(indexFile)
+        ## tables in index
+        self.tables = [row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+
+    def close(self) -> None:
+        """Close index database."""
+        self.conn.close()
+
+    @staticmethod
+    def indexFile(waterBodiesFile: str) -> str:
+        """Return path of index for water bodies database."""
+        return os.path.splitext(waterBodiesFile)[0] + WaterBodiesIndex._SUFFIX
+
+    @staticmethod
+    def sourceStamp(waterBodiesFile: str) -> Tuple[int, int]:
+        """Return size and modification time of water bodies database."""
+        stat = os.stat(waterBodiesFile)
+        return stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def openIndex(waterBodiesFile: str) -> Optional['WaterBodiesIndex']:
+        """Return index for water bodies database, or None if there is no index made from its current version."""
+        indexFile = WaterBodiesIndex.indexFile(waterBodiesFile)
+        if not os.path.isfile(indexFile):
+            return None
+        try:
+            index = WaterBodiesIndex(indexFile)
+            row = index.conn.execute('SELECT VERSION, SIZE, MTIME FROM ' + WaterBodiesIndex._SOURCETABLE).fetchone()
+            if row is not None and row[0] == WaterBodiesIndex._VERSION and \
+                (row[1], row[2]) == WaterBodiesIndex.sourceStamp(waterBodiesFile):
+                return index
+            index.close()
+        except Exception:
+            pass  # unreadable index: use water bodies database
+        return None
+
+    @staticmethod
+    def build(waterBodiesFile: str) -> str:
+        """Build index for water bodies database.  Return index file path."""
+        indexFile = WaterBodiesIndex.indexFile(waterBodiesFile)
+        size, mtime = WaterBodiesIndex.sourceStamp(waterBodiesFile)
+        # write to a temporary file and rename so that concurrent projects never see a partial index
+        fd, tmpFile = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(indexFile)))
+        os.close(fd)
+        try:
+            with sqlite3.connect(tmpFile) as conn:
+                conn.execute("ATTACH DATABASE ? AS src", (waterBodiesFile,))
+                srcTables = set(row[0] for row in conn.execute("SELECT name FROM src.sqlite_master WHERE type='table'"))
+                conn.execute('CREATE TABLE {0} (TBL TEXT, SRCID INTEGER, SEQ INTEGER, OBJECTID INTEGER)'.format(WaterBodiesIndex._OBJECTIDSTABLE))
+                for table in WaterBodiesIndex._TABLES:
+                    if table not in srcTables:
+                        continue
+                    columns = [row[1] for row in conn.execute('PRAGMA src.table_info({0})'.format(table))]
+                    keys = [(field, key) for field, key in WaterBodiesIndex._HUCKEYS.items() if field in columns]
+                    selection = ', '.join(['rowid AS SRCID'] + ['[' + column + ']' for column in columns] +
+                                          ['CAST([{0}] AS TEXT) AS {1}'.format(field, key) for field, key in keys])
+                    conn.execute('CREATE TABLE {0} AS SELECT {1} FROM src.{0} ORDER BY rowid'.format(table, selection))
+                    for _, key in keys:
+                        conn.execute('CREATE INDEX idx{0}{1} ON {0} ({1}, SRCID)'.format(table, key))
+                    if 'OBJECTID' in columns:
+                        rows = []
+                        for srcId, objectIds in conn.execute('SELECT SRCID, OBJECTID FROM ' + table):
+                            if objectIds is None:
+                                continue
+                            for seq, strng in enumerate(str(objectIds).split(',')):
+                                rows.append((table, srcId, seq, int(strng)))
+                        conn.executemany('INSERT INTO {0} VALUES(?,?,?,?)'.format(WaterBodiesIndex._OBJECTIDSTABLE), rows)
+                conn.execute('CREATE INDEX idx{0} ON {0} (TBL, SRCID, SEQ)'.format(WaterBodiesIndex._OBJECTIDSTABLE))
+                conn.execute('CREATE TABLE {0} (VERSION INTEGER, SIZE INTEGER, MTIME INTEGER)'.format(WaterBodiesIndex._SOURCETABLE))
+                conn.execute('INSERT INTO {0} VALUES(?,?,?)'.format(WaterBodiesIndex._SOURCETABLE), (WaterBodiesIndex._VERSION, size, mtime))
+                conn.commit()
+                conn.execute('DETACH DATABASE src')
+            conn.close()
+            os.replace(tmpFile, indexFile)
+        except Exception:
+            if os.path.exists(tmpFile):
+                os.remove(tmpFile)
+            raise
+        return indexFile
+
+    def hasTable(self, table: str) -> bool:
+        """Return true if table was copied to index."""
+        return table in self.tables
+
+    def rows(self, table: str, selection: str, hucField: str, hucs: List[str]) -> List[Tuple[Any, ...]]:
+        """
+        Return rows of table with selected columns, for which hucField is one of hucs, in source order.
+        
+        An OBJECTID column is returned as a list of object ids.
+        """
+        hucKey = WaterBodiesIndex._HUCKEYS[hucField]
+        sql = 'SELECT SRCID, {0} FROM {1} WHERE {2} = ?'.format(selection, table, hucKey)
+        found: List[Tuple[Any, ...]] = []
+        for huc in set(hucs):
+            found.extend(self.conn.execute(sql, (str(huc),)))
+        found.sort(key=lambda row: row[0])
+        columns = [column.strip() for column in selection.split(',')]
+        if 'OBJECTID' not in columns:
+            return [tuple(row[1:]) for row in found]
+        objectIdIndex = columns.index('OBJECTID') + 1
+        sql = 'SELECT o.SRCID, o.OBJECTID FROM {0} AS t JOIN {1} AS o ON o.TBL = ? AND o.SRCID = t.SRCID WHERE t.{2} = ? ORDER BY o.SRCID, o.SEQ'. \
+            format(table, WaterBodiesIndex._OBJECTIDSTABLE, hucKey)
+        objectIds: Dict[int, List[int]] = dict()
+        for huc in set(hucs):
+            for srcId, objectId in self.conn.execute(sql, (table, str(huc))):
+                objectIds.setdefault(srcId, []).append(objectId)
+        return [tuple(row[1:objectIdIndex]) + (objectIds.get(row[0], []),) + tuple(row[objectIdIndex + 1:]) for row in found]
+
+    @staticmethod
+    def objectIdList(objectIds: Any) -> List[int]:
+        """Return OBJECTID column value as a list, splitting it if it is read from the water bodies database."""
+        if isinstance(objectIds, list):
+            return objectIds
+        return [int(strng) for strng in str(objectIds).split(',')]
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+'''
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+'''
+
+import queue
+import threading
+from typing import Any, List, Optional, Tuple
+
+from .profiling import Profiler  # type: ignore
+
+
+class WHURows():
+    """Rows for the Watershed, ElevationBand, hrus and uncomb tables for one grid basin, ready for inserting."""
+
+    def __init__(self) -> None:
+        """Initialise class variables."""
+        ## Watershed rows
+        self.watershed: List[Tuple[Any, ...]] = []
+        ## ElevationBand rows
+        self.elevationBand: List[Tuple[Any, ...]] = []
+        ## hrus rows
+        self.hrus: List[Tuple[Any, ...]] = []
+        ## uncomb rows
+        self.uncomb: List[Tuple[Any, ...]] = []
+
+    def size(self) -> int:
+        """Number of rows."""
+        return len(self.watershed) + len(self.elevationBand) + len(self.hrus) + len(self.uncomb)
+
+
+class WHUTableWriter():
+    """
+    Writes the Watershed, hrus, uncomb and ElevationBand tables for big grid models from a separate thread.
+
+    Rows for each basin are generated in basin order by the caller, which assigns OIDs and elevation band ids,
+    and passed to put.  The writer thread has its own database connection (connections cannot be shared between threads),
+    clears the tables, and inserts rows with executemany, committing every _BATCHROWS rows,
+    so reading rasters and making rows for later basins overlaps with writing earlier ones.
+    Rows are inserted in the order they were put, so the tables are the same as when rows are written one at a time.
+    """
+
+    ## number of rows inserted between commits
+    _BATCHROWS = 20000
+
+    ## maximum number of basins waiting to be written
+    _QUEUESIZE = 256
+
+    def __init__(self, db: Any) -> None:
+        """Initialise class variables."""
+        ## project database
+        self.db = db
+        ## basins waiting to be written.  None marks the end.
+        self.pending: queue.Queue = queue.Queue(maxsize=WHUTableWriter._QUEUESIZE)
+        ## exception raised in writer thread, if any
+        self.exception: Optional[BaseException] = None
+        ## flag set when the caller has failed, so rows not yet written are discarded
+        self.aborted = False
+        ## writer thread
+        self.thread = threading.Thread(target=self.run, name='WHUTableWriter', daemon=True)
+
+    def start(self) -> None:
+        """Start writer thread."""
+        self.thread.start()
+
+    def put(self, rows: WHURows) -> None:
+        """Queue rows for one basin.  Raise any exception from the writer thread."""
+        self.checkWriter()
+        # use a timeout so a failed writer cannot leave us blocked on a full queue
+        while True:
+            try:
+                self.pending.put(rows, timeout=1)
+                return
+            except queue.Full:
+                self.checkWriter()
+
+    def finish(self) -> None:
+        """Wait for all rows to be written.  Raise any exception from the writer thread."""
+        if self.thread.is_alive():
+            while True:
+                try:
+                    self.pending.put(None, timeout=1)
+                    break
+                except queue.Full:
+                    self.checkWriter()
+            self.thread.join()
+        self.checkWriter()
+
+    def abort(self) -> None:
+        """
+        Stop the writer thread, if still running, discarding rows not yet written, and wait for it.
+        
+        Does nothing after finish, so can be called in a finally clause.  
+        Used when the caller has failed, so any exception from the writer thread is dropped.
+        """
+        if self.thread.is_alive():
+            self.aborted = True
+            # discard waiting rows so the end marker can be queued
+            try:
+                while True:
+                    self.pending.get_nowait()
+            except queue.Empty:
+                pass
+            self.pending.put(None)
+            self.thread.join()
+        self.exception = None
+
+    def checkWriter(self) -> None:
+        """Raise exception from the writer thread, if any."""
+        if self.exception is not None:
+            exception = self.exception
+            self.exception = None
+            raise exception
+
+    @Profiler.timed('WHUTableWriter.run', log=True)
+    def run(self) -> None:
+        """Body of writer thread."""
+        try:
+            conn = self.db.connect()
+            if conn is None:
+                raise ValueError('Failed to connect to project database {0}'.format(self.db.dbFile))
+            try:
+                cursor = conn.cursor()
+                (sql1, sql2, sql3, sql4) = self.db.initWHUTables(cursor)
+                # do not hold a write lock while waiting for rows
+                conn.commit()
+                batch = WHURows()
+                written = 0
+                while True:
+                    rows = self.pending.get()
+                    if rows is None or self.aborted:
+                        break
+                    written += rows.size()
+                    batch.watershed.extend(rows.watershed)
+                    batch.elevationBand.extend(rows.elevationBand)
+                    batch.hrus.extend(rows.hrus)
+                    batch.uncomb.extend(rows.uncomb)
+                    if batch.size() >= WHUTableWriter._BATCHROWS:
+                        WHUTableWriter.insert(conn, cursor, batch, sql1, sql2, sql3, sql4)
+                        batch = WHURows()
+                if not self.aborted:
+                    WHUTableWriter.insert(conn, cursor, batch, sql1, sql2, sql3, sql4)
+                Profiler.setCount(written)
+            finally:
+                conn.close()
+        except BaseException as ex:
+            self.exception = ex
+            # drain the queue so the main thread is not blocked
+            try:
+                while self.pending.get_nowait() is not None:
+                    pass
+            except queue.Empty:
+                pass
+
+    @staticmethod
+    def insert(conn: Any, cursor: Any, batch: WHURows, sql1: str, sql2: str, sql3: str, sql4: str) -> None:
+        """Insert batch of rows and commit."""
+        if len(batch.watershed) > 0:
+            cursor.executemany(sql1, batch.watershed)
+        if len(batch.elevationBand) > 0:
+            cursor.executemany(sql4, batch.elevationBand)
+        if len(batch.hrus) > 0:
+            cursor.executemany(sql2, batch.hrus)
+        if len(batch.uncomb) > 0:
+            cursor.executemany(sql3, batch.uncomb)
+        conn.commit()
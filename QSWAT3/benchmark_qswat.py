@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+Performance benchmarks for delineation, HRU creation and visualisation.
+
+Each benchmark runs the plugin as test_qswat.py does, and records for each stage
+(Delineation.runTauDEM, CreateHRUs.generateBasins, CreateHRUs.removeSmallHRUs*,
+CreateHRUs.writeWHUTables and Visualise.readData) the wall time, the process peak RSS
+at the end of the stage, and the number of rows (HRUs or table rows) produced.
+Results are written to testdata/benchmark_results.json and compared with
+testdata/benchmark_baseline.json if it exists.
+
+Environment variables:
+    QSWAT_BENCH_SIZES      comma separated list of synthetic raster sizes (default 1000).
+                           Each size N upscales the ExampleDataset DEM, landuse and soil maps to N x N
+    QSWAT_BENCH_TOLERANCE  fractional increase in wall time or peak RSS that counts as a regression (default 0.25)
+    QSWAT_BENCH_UPDATE     if set to 1, results are saved as the new baseline instead of being compared
+    QSWAT_BENCH_RESULTS    optional QGIS project file of a project with SWAT results, used to benchmark Visualise.readData
+    QSWAT_BENCH_GRID       optional size:gridSize, eg 20000:50, to benchmark a grid model on a synthetic raster.
+                           CreateHRUs.writeWHUTables is only used for grid models with more than 100000 grid cells
+"""
+
+from qgis.core import QgsApplication, QgsProject, QgsProviderRegistry  # @UnresolvedImport
+from qgis.analysis import QgsNativeAlgorithms  # @UnresolvedImport
+
+from qgis.PyQt.QtCore import Qt, QCoreApplication, QFileInfo  # @UnresolvedImport
+from qgis.PyQt import QtTest  # @UnresolvedImport
+import os.path
+from osgeo import gdal
+import shutil
+import json
+import time
+import functools
+
+import unittest
+import atexit
+from processing.core.Processing import Processing    # @UnresolvedImport
+
+
+# create a new application object
+# without this importing processing causes the following error:
+# QWidget: Must construct a QApplication before a QPaintDevice
+app = QgsApplication([], True)
+
+from QSWAT import qswat  # @UnresolvedImport
+from QSWAT.delineation import Delineation  # @UnresolvedImport
+from QSWAT.hrus import HRUs, CreateHRUs  # @UnresolvedImport
+from QSWAT.visualise import Visualise  # @UnresolvedImport
+from QSWAT.QSWATUtils import QSWATUtils, FileTypes  # @UnresolvedImport
+from QSWAT.profiling import Profiler  # @UnresolvedImport
+
+osGeo4wRoot = os.getenv('OSGEO4W_ROOT')
+QgsApplication.setPrefixPath(osGeo4wRoot + r'\apps\qgis-ltr', True)
+
+QgsApplication.initQgis()
+
+if len(QgsProviderRegistry.instance().providerList()) == 0:
+    raise RuntimeError('No data providers available.  Check prefix path setting in benchmark_qswat.py.')
+
+atexit.register(QgsApplication.exitQgis)
+
+class DummyInterface(object):
+    """Dummy iface to give access to layers."""
+    def __getattr__(self, *args, **kwargs):  # @UnusedVariable
+        """Dummy function."""
+        def dummy(*args, **kwargs):  # @UnusedVariable
+            return self
+        return dummy
+    def __iter__(self):
+        """Dummy function."""
+        return self
+    def next(self):
+        """Dummy function."""
+        raise StopIteration
+    def layers(self):
+        """Simulate iface.legendInterface().layers()."""
+        return list(QgsProject.instance().mapLayers().values())
+iface = DummyInterface()
+
+QCoreApplication.setOrganizationName('QGIS')
+QCoreApplication.setApplicationName('QGIS3')
+
+## synthetic raster sizes
+benchSizes = [int(s) for s in os.getenv('QSWAT_BENCH_SIZES', '1000').split(',') if s.strip() != '']
+## fractional increase in wall time or peak RSS counted as a regression
+benchTolerance = float(os.getenv('QSWAT_BENCH_TOLERANCE', '0.25'))
+## flag to save results as new baseline
+benchUpdate = os.getenv('QSWAT_BENCH_UPDATE', '0') == '1'
+## project with SWAT results for benchmarking visualisation
+benchResultsProject = os.getenv('QSWAT_BENCH_RESULTS', '')
+## synthetic raster size and grid size for grid model benchmark
+benchGrid = [int(s) for s in os.getenv('QSWAT_BENCH_GRID', '0:0').split(':')]
+## stage times below this (seconds) are too noisy to compare
+minComparedTime = 1.0
+
+def hruCount(createHRUs):
+    """Number of HRU candidates currently held in basin data."""
+    return sum(len(data.hruMap) for data in createHRUs.basins.values())
+
+class StageRecorder():
+    """Record wall time, peak RSS and rows produced by instrumented methods."""
+
+    def __init__(self):
+        """Initialise class variables."""
+        ## stage name -> {'time': seconds, 'peakRSS': bytes, 'rows': number, 'calls': number}
+        self.stages = dict()
+        ## original methods, to restore: list of (class, name, method)
+        self.originals = []
+
+    def record(self, stage, elapsed, rows):
+        """Add measurement to stage, accumulating over calls."""
+        entry = self.stages.setdefault(stage, {'time': 0.0, 'peakRSS': 0, 'rows': 0, 'calls': 0})
+        entry['time'] += elapsed
+        entry['peakRSS'] = max(entry['peakRSS'], Profiler.peakRSS())
+        if rows is not None:
+            entry['rows'] += rows
+        entry['calls'] += 1
+
+    def instrument(self, cls, name, stage, rowsFun=None):
+        """Replace method name of cls by a timed version.
+
+        rowsFun, if given, is called with the instance, the call arguments and the result
+        and returns the number of rows produced by the call."""
+        original = getattr(cls, name)
+        self.originals.append((cls, name, original))
+        recorder = self
+        @functools.wraps(original)
+        def timed(obj, *args, **kwargs):
+            start = time.perf_counter()
+            result = original(obj, *args, **kwargs)
+            elapsed = time.perf_counter() - start
+            recorder.record(stage, elapsed, None if rowsFun is None else rowsFun(obj, args, result))
+            return result
+        setattr(cls, name, timed)
+
+    def restore(self):
+        """Restore instrumented methods."""
+        for cls, name, original in reversed(self.originals):
+            setattr(cls, name, original)
+        self.originals = []
+
+def whuRows(_, args, result):
+    """Rows written by writeWHUTables: change in hrus OID plus change in elevation band id."""
+    oid, elevBandId = args[0], args[1]
+    return (result[0] - oid) + (result[1] - elevBandId)
+
+class BenchmarkQswat(unittest.TestCase):
+    """Benchmarks for QSWAT."""
+
+    ## all benchmark results, keyed by case name
+    results = dict()
+
+    def setUp(self):
+        """Remove old project; read benchmark project file; instrument stages."""
+        Processing.initialize()
+        if 'native' not in [p.id() for p in QgsApplication.processingRegistry().providers()]:
+            QgsApplication.processingRegistry().addProvider(QgsNativeAlgorithms())
+        ## QSWAT plugin
+        self.plugin = qswat.QSwat(iface)
+        ## Main QSWAT form
+        self.dlg = self.plugin._odlg
+        ## Test data directory
+        self.dataDir = os.path.join(self.plugin.plugin_dir, '../testdata')
+        ## Example dataset directory
+        self.exampleDir = os.path.join(self.plugin.plugin_dir, '../ExampleDataset')
+        ## stage recorder
+        self.recorder = StageRecorder()
+        self.recorder.instrument(Delineation, 'runTauDEM', 'runTauDEM')
+        self.recorder.instrument(CreateHRUs, 'generateBasins', 'generateBasins', lambda obj, _, __: hruCount(obj))
+        for name in ['removeSmallHRUsByArea', 'removeSmallHRUsByThresholdPercent', 'removeSmallHRUsByThresholdArea',
+                     'removeSmallHRUsbyTarget', 'removeSmallHRUsbySubbasinTarget']:
+            self.recorder.instrument(CreateHRUs, name, 'removeSmallHRUs', lambda obj, _, __: hruCount(obj))
+        self.recorder.instrument(CreateHRUs, 'writeWHUTables', 'writeWHUTables', whuRows)
+        self.recorder.instrument(Visualise, 'readData', 'readData',
+                                 lambda obj, args, _: sum(len(d) for d in obj.staticData.get(args[0], dict()).values()))
+
+    def tearDown(self):
+        """Restore instrumented methods."""
+        self.recorder.restore()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Save results, and baseline if requested."""
+        resultsFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testdata', 'benchmark_results.json')
+        with open(resultsFile, 'w') as f:
+            json.dump(cls.results, f, indent=2, sort_keys=True)
+        if benchUpdate:
+            shutil.copy(resultsFile, BenchmarkQswat.baselineFile())
+
+    @staticmethod
+    def baselineFile():
+        """Stored baseline results."""
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testdata', 'benchmark_baseline.json')
+
+    def newProject(self, name):
+        """Make empty project name in test data directory and prepare for delineation."""
+        projDir = os.path.join(self.dataDir, name)
+        QgsProject.instance().removeAllMapLayers()
+        projectDatabase = os.path.join(projDir, name + '.mdb')
+        if os.path.exists(projectDatabase):
+            os.remove(projectDatabase)
+        for sub in ['Scenarios', 'Source', 'Watershed']:
+            shutil.rmtree(os.path.join(projDir, sub), ignore_errors=True)
+        shutil.copy(os.path.join(self.dataDir, 'test_proj_qgs'), projDir + '.qgs')
+        proj = QgsProject.instance()
+        proj.read(projDir + '.qgs')
+        self.plugin.setupProject(proj, True)
+        self.assertTrue(self.dlg.delinButton.isEnabled(), 'Delineate button not enabled')
+        ## Delineation object
+        self.delin = Delineation(self.plugin._gv, self.plugin._demIsProcessed)
+        self.delin.init()
+        self.delin._dlg.numProcesses.setValue(0)
+
+    def test01Example(self):
+        """Delineation and HRUs on ExampleDataset."""
+        print('\nBenchmark ExampleDataset')
+        self.newProject('bench')
+        dem = self.copyRaster(os.path.join(self.exampleDir, 'DEM/srtm_30m'), 'dem.tif', 0, gdal.GRA_Bilinear)
+        landuse = self.copyRaster(os.path.join(self.exampleDir, 'Landuse/roblandusenew'), 'landuse.tif', 0, gdal.GRA_NearestNeighbour)
+        soil = self.copyRaster(os.path.join(self.exampleDir, 'Soil/mowr_soil90'), 'soil.tif', 0, gdal.GRA_NearestNeighbour)
+        self.runCase('example', dem, landuse, soil)
+
+    def test02Synthetic(self):
+        """Delineation and HRUs on ExampleDataset rasters upscaled to each of the benchmark sizes."""
+        for size in benchSizes:
+            with self.subTest(size=size):
+                print('\nBenchmark synthetic {0} x {0}'.format(size))
+                # fresh plugin and instrumentation for each size
+                self.tearDown()
+                self.setUp()
+                self.newProject('bench')
+                dem = self.copyRaster(os.path.join(self.exampleDir, 'DEM/srtm_30m'), 'dem.tif', size, gdal.GRA_Bilinear)
+                landuse = self.copyRaster(os.path.join(self.exampleDir, 'Landuse/roblandusenew'), 'landuse.tif', size, gdal.GRA_NearestNeighbour)
+                soil = self.copyRaster(os.path.join(self.exampleDir, 'Soil/mowr_soil90'), 'soil.tif', size, gdal.GRA_NearestNeighbour)
+                self.runCase('synthetic{0}'.format(size), dem, landuse, soil)
+
+    def test03Grid(self):
+        """Grid model delineation and HRUs on an upscaled raster."""
+        size, gridSize = benchGrid
+        if size <= 0 or gridSize <= 0:
+            self.skipTest('Set QSWAT_BENCH_GRID to size:gridSize to benchmark a grid model')
+        print('\nBenchmark grid {0} on synthetic {1} x {1}'.format(gridSize, size))
+        self.newProject('bench')
+        dem = self.copyRaster(os.path.join(self.exampleDir, 'DEM/srtm_30m'), 'dem.tif', size, gdal.GRA_Bilinear)
+        landuse = self.copyRaster(os.path.join(self.exampleDir, 'Landuse/roblandusenew'), 'landuse.tif', size, gdal.GRA_NearestNeighbour)
+        soil = self.copyRaster(os.path.join(self.exampleDir, 'Soil/mowr_soil90'), 'soil.tif', size, gdal.GRA_NearestNeighbour)
+        self.runCase('grid{0}_{1}'.format(gridSize, size), dem, landuse, soil, gridSize=gridSize)
+
+    def test04Visualise(self):
+        """Read results tables of an existing project."""
+        if benchResultsProject == '' or not os.path.isfile(benchResultsProject):
+            self.skipTest('Set QSWAT_BENCH_RESULTS to a project with SWAT results to benchmark visualisation')
+        QgsProject.instance().removeAllMapLayers()
+        proj = QgsProject.instance()
+        proj.read(benchResultsProject)
+        self.plugin.setupProject(proj, True)
+        vis = Visualise(self.plugin._gv)
+        vis.init()
+        self.assertTrue(vis.conn, 'No results database for project {0}'.format(benchResultsProject))
+        self.assertTrue(vis.setPeriods(), 'Cannot set periods from results')
+        for i in range(1, vis._dlg.outputCombo.count()):
+            vis._dlg.outputCombo.setCurrentIndex(i)
+            vis.setVariables()
+            vis.allClick()
+            self.assertTrue(vis.readData('', True, vis.table, '', ''), 'Failed to read {0} table'.format(vis.table))
+        self.saveCase('visualise')
+
+    def runCase(self, case, dem, landuse, soil, gridSize=0):
+        """Run delineation, as a grid model if gridSize is positive, and HRU creation with percent filters 20/10/5,
+        and save results as case."""
+        gv = self.plugin._gv
+        root = QgsProject.instance().layerTreeRoot()
+        self.delin._dlg.selectDem.setText(dem)
+        ## HRUs object
+        self.hrus = HRUs(gv, self.dlg.reportsBox)
+        numLayers = len(QgsProject.instance().mapLayers().values())
+        demLayer, loaded = QSWATUtils.getLayerByFilename(root.findLayers(), dem, FileTypes._DEM,
+                                                         gv, True, QSWATUtils._WATERSHED_GROUP_NAME)
+        self.waitLayerAdded(numLayers)
+        self.assertTrue(demLayer and loaded, 'Failed to load DEM {0}'.format(dem))
+        QSWATUtils.copyFiles(QFileInfo(os.path.join(self.exampleDir, 'MainOutlet/MainOutlet.shp')), gv.shapesDir)
+        self.delin._dlg.selectOutlets.setText(os.path.join(gv.shapesDir, 'MainOutlet.shp'))
+        self.delin._dlg.useOutlets.setChecked(True)
+        if gridSize > 0:
+            self.delin._dlg.useGrid.setChecked(True)
+            self.delin._dlg.GridSize.setValue(gridSize)
+        QtTest.QTest.mouseClick(self.delin._dlg.delinRunButton2, Qt.LeftButton)
+        self.assertTrue(self.delin.areaOfCell > 0, 'Area of cell is ' + str(self.delin.areaOfCell))
+        QtTest.QTest.mouseClick(self.delin._dlg.OKButton, Qt.LeftButton)
+        self.assertTrue(self.dlg.hrusButton.isEnabled(), 'HRUs button not enabled')
+        self.hrus.init()
+        hrudlg = self.hrus._dlg
+        self.hrus.landuseFile = landuse
+        numLayers = len(QgsProject.instance().mapLayers().values())
+        self.hrus.landuseLayer, loaded = QSWATUtils.getLayerByFilename(root.findLayers(), landuse, FileTypes._LANDUSES,
+                                                                       gv, None, QSWATUtils._LANDUSE_GROUP_NAME)
+        self.waitLayerAdded(numLayers)
+        self.assertTrue(self.hrus.landuseLayer and loaded, 'Failed to load landuse file {0}'.format(landuse))
+        self.hrus.soilFile = soil
+        numLayers = len(QgsProject.instance().mapLayers().values())
+        self.hrus.soilLayer, loaded = QSWATUtils.getLayerByFilename(root.findLayers(), soil, FileTypes._SOILS,
+                                                                    gv, None, QSWATUtils._SOIL_GROUP_NAME)
+        self.waitLayerAdded(numLayers)
+        self.assertTrue(self.hrus.soilLayer and loaded, 'Failed to load soil file {0}'.format(soil))
+        landuseTable = self.hrus.readCsvFile(os.path.join(self.exampleDir, 'Robit_landuses.csv'), 'landuse', gv.db.landuseTableNames)
+        self.assertTrue(landuseTable != '', 'Failed to read landuse lookup csv file')
+        hrudlg.selectLanduseTable.insertItem(0, landuseTable)
+        hrudlg.selectLanduseTable.setCurrentIndex(0)
+        soilTable = self.hrus.readCsvFile(os.path.join(self.exampleDir, 'Robit_soils.csv'), 'soil', gv.db.soilTableNames)
+        self.assertTrue(soilTable != '', 'Failed to read soil lookup csv file')
+        hrudlg.selectSoilTable.insertItem(0, soilTable)
+        hrudlg.selectSoilTable.setCurrentIndex(0)
+        hrudlg.slopeBand.setText('10')
+        QtTest.QTest.mouseClick(hrudlg.insertButton, Qt.LeftButton)
+        QtTest.QTest.mouseClick(hrudlg.readButton, Qt.LeftButton)
+        self.assertTrue(hrudlg.filterLanduseButton.isEnabled(), 'Filter landuse button not enabled')
+        QtTest.QTest.mouseClick(hrudlg.filterLanduseButton, Qt.LeftButton)
+        QtTest.QTest.mouseClick(hrudlg.percentButton, Qt.LeftButton)
+        hrudlg.landuseVal.setText('20')
+        QtTest.QTest.mouseClick(hrudlg.landuseButton, Qt.LeftButton)
+        hrudlg.soilVal.setText('10')
+        QtTest.QTest.mouseClick(hrudlg.soilButton, Qt.LeftButton)
+        hrudlg.slopeVal.setText('5')
+        self.assertTrue(hrudlg.createButton.isEnabled(), 'Create button not enabled')
+        QtTest.QTest.mouseClick(hrudlg.createButton, Qt.LeftButton)
+        self.assertTrue(len(self.hrus.CreateHRUs.hrus) > 0, 'No HRUs created')
+        self.saveCase(case)
+
+    def saveCase(self, case):
+        """Store recorded stages for case, print them, and compare them with the baseline."""
+        stages = self.recorder.stages
+        self.recorder.stages = dict()
+        BenchmarkQswat.results[case] = stages
+        for stage, entry in sorted(stages.items()):
+            print('{0}: {1}: {2:.2f}s, peak RSS {3:.1f}MB, {4} rows, {5} calls'.
+                  format(case, stage, entry['time'], entry['peakRSS'] / 1048576, entry['rows'], entry['calls']))
+        if benchUpdate or not os.path.isfile(BenchmarkQswat.baselineFile()):
+            return
+        with open(BenchmarkQswat.baselineFile(), 'r') as f:
+            baseline = json.load(f).get(case, dict())
+        for stage, base in baseline.items():
+            entry = stages.get(stage, None)
+            self.assertIsNotNone(entry, '{0}: stage {1} not run'.format(case, stage))
+            # rows must not change: a difference means results have changed, not just performance
+            self.assertEqual(entry['rows'], base['rows'],
+                             '{0}: stage {1} produced {2} rows instead of {3}'.format(case, stage, entry['rows'], base['rows']))
+            if base['time'] >= minComparedTime:
+                self.assertLessEqual(entry['time'], base['time'] * (1 + benchTolerance),
+                                     '{0}: stage {1} took {2:.2f}s against baseline {3:.2f}s'.format(case, stage, entry['time'], base['time']))
+            if base['peakRSS'] > 0:
+                self.assertLessEqual(entry['peakRSS'], base['peakRSS'] * (1 + benchTolerance),
+                                     '{0}: stage {1} peak RSS {2} against baseline {3}'.format(case, stage, entry['peakRSS'], base['peakRSS']))
+
+    def copyRaster(self, inFileName, name, size, resampleAlg):
+        """Copy raster to Source directory as GeoTIFF, resampled to size x size if size is positive."""
+        outFileName = os.path.join(self.plugin._gv.sourceDir, name)
+        options = ['COMPRESS=LZW', 'TILED=YES', 'BIGTIFF=IF_SAFER']
+        if size > 0:
+            outDs = gdal.Warp(outFileName, inFileName, format='GTiff', width=size, height=size,
+                              resampleAlg=resampleAlg, creationOptions=options)
+        else:
+            outDs = gdal.Translate(outFileName, inFileName, format='GTiff', creationOptions=options)
+        if outDs is None:
+            raise RuntimeError('Failed to create {0}'.format(outFileName))
+        outDs = None
+        QSWATUtils.copyPrj(inFileName, outFileName)
+        return outFileName
+
+    def waitLayerAdded(self, numLayers):
+        """Wait for a new layer to be added."""
+        timeout = 20 # seconds
+        count = 0
+        while count < timeout:
+            QtTest.QTest.qWait(1000) # wait 1000ms
+            if len(QgsProject.instance().mapLayers().values()) > numLayers:
+                break
+            count += 1
+
+if __name__ == '__main__':
+    unittest.main()
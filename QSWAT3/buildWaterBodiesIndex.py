@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+Build the indexed copy of a water bodies database used by HUC and HAWQS projects.
+
+Usage: buildWaterBodiesIndex.py waterBodiesFile [waterBodiesFile ...]
+
+The index is written next to each water bodies database, for example QSWATWaterBodies_index.sqlite for QSWATWaterBodies.sqlite,
+and is used by projects instead of the water bodies database until that database is changed.
+Run this once before running HUC or HAWQS batches, and again after changing the water bodies database.
+"""
+
+import argparse
+import os
+import sys
+import time
+import traceback
+
+from QSWAT.waterbodiesindex import WaterBodiesIndex  # @UnresolvedImport
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build indexes of water bodies databases for HUC and HAWQS projects.')
+    parser.add_argument('waterBodiesFile', nargs='+', help='water bodies sqlite database')
+    args = parser.parse_args()
+    OK = True
+    for waterBodiesFile in args.waterBodiesFile:
+        if not os.path.isfile(waterBodiesFile):
+            print('ERROR: Cannot find water bodies file {0}'.format(waterBodiesFile))
+            OK = False
+            continue
+        started = time.perf_counter()
+        try:
+            indexFile = WaterBodiesIndex.build(waterBodiesFile)
+            print('Wrote {0} in {1:.1f} seconds'.format(indexFile, time.perf_counter() - started))
+        except Exception:
+            print('ERROR: Failed to index {0}: {1}'.format(waterBodiesFile, traceback.format_exc()))
+            OK = False
+    sys.exit(0 if OK else 1)
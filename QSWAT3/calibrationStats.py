@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+Calculate calibration statistics for many gauges and scenarios without QGIS.
+
+Usage: calibrationStats.py projDir observedDir [options]
+
+Each observed data file in observedDir is a csv file named after the output table and location it is compared with:
+rch-n.csv, sub-n.csv or sed-n.csv for reach or subbasin n, and hru-n-m.csv for HRU m of subbasin n.
+The first line holds the names of the table's variables, for example FLOW_OUTcms, optionally preceded by a date column.
+Dates, if present, are in the format written by the Visualise plot csv files:
+yyyyddd for daily output, yyyy/m for monthly output and yyyy for annual output.
+Without dates, values are taken to start at the start of the period, as in Visualise observed plots.
+The period is the period of each scenario's file.cio, optionally restricted by the --start and --finish options.
+The summary table has one row for each scenario, file and variable.
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+import sqlite3
+import sys
+import time
+import traceback
+from datetime import date
+from multiprocessing import Pool
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from QSWAT.fitstats import FitStatistics  # @UnresolvedImport
+from QSWAT.periods import Period  # @UnresolvedImport
+
+## folder of scenarios in project folder
+_SCENARIOS = 'Scenarios'
+## folder of output database in scenario folder
+_TABLESOUT = 'TablesOut'
+## folder of SWAT input and output files in scenario folder
+_TXTINOUT = 'TxtInOut'
+## SWAT master file
+_CIO = 'file.cio'
+## output database name without extension
+_OUTPUTDB = 'SWATOutput'
+## driver string for Access output databases
+_ACCESSSTRING = 'DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};DBQ='
+## column identifying location in each supported table
+_KEYCOLUMNS = {'rch': 'SUB', 'sub': 'SUB', 'sed': 'RCH', 'hru': 'HRUGIS'}
+## observed file names
+_OBSERVEDPATTERN = re.compile(r'^(rch|sub|sed)-(\d+)\.csv$|^(hru)-(\d+)-(\d+)\.csv$', re.IGNORECASE)
+## statistics written to summary table
+_STATISTICS = ['NSE', 'R2', 'PBIAS', 'KGE']
+
+class Gauge():
+    """Observed data for one output table location."""
+
+    def __init__(self, fileName: str, table: str, key: int, dates: Optional[List[str]], observed: Dict[str, np.ndarray]) -> None:
+        """Initialise class variables."""
+        ## name of observed data file
+        self.fileName = fileName
+        ## output table
+        self.table = table
+        ## subbasin or reach number, or HRUGIS number if table is hru
+        self.key = key
+        ## date labels from observed data file, or None if it has no date column
+        self.dates = dates
+        ## map of variable to observed values, nan if missing
+        self.observed = observed
+
+def readGauge(path: str, hruFactor: int) -> Optional[Gauge]:
+    """Read observed data file.  Return None if its name does not identify a table and location."""
+    fileName = os.path.split(path)[1]
+    match = _OBSERVEDPATTERN.match(fileName)
+    if match is None:
+        return None
+    if match.group(1) is not None:
+        table = match.group(1).lower()
+        key = int(match.group(2))
+    else:
+        table = 'hru'
+        key = int(match.group(4)) * hruFactor + int(match.group(5))
+    with open(path, 'r', newline='') as obs:
+        reader = csv.reader(obs)
+        headers = [h.strip() for h in next(reader, [])]
+        hasDates = len(headers) > 0 and headers[0].lower() == 'date'
+        start = 1 if hasDates else 0
+        dates: Optional[List[str]] = [] if hasDates else None
+        rows: List[List[str]] = []
+        for line in reader:
+            if len(line) <= start:
+                break # finish if e.g. a blank line
+            if dates is not None:
+                dates.append(line[0].strip())
+            rows.append(line[start:])
+    observed: Dict[str, np.ndarray] = dict()
+    for col, var in enumerate(headers[start:], start):
+        vals = np.full(len(rows), np.nan)
+        for i, row in enumerate(rows):
+            try:
+                vals[i] = float(row[col - start])
+            except (ValueError, IndexError):
+                pass
+        observed[var] = vals
+    return Gauge(fileName, table, key, dates, observed)
+
+def connect(outputDb: str) -> Any:
+    """Connect read only to output database."""
+    if outputDb.endswith('.sqlite'):
+        return sqlite3.connect('file:{0}?mode=ro'.format(outputDb), uri=True)
+    import pyodbc  # type: ignore
+    return pyodbc.connect(_ACCESSSTRING + outputDb, readonly=True)
+
+def scoreGauges(scenario: str, outputDb: str, table: str, period: Period, gauges: List[Gauge]) -> List[List[Any]]:
+    """
+    Read simulated values for gauges, all from table, and return summary rows comparing them with observed values.
+
+    Runs in a worker process, so makes its own connection and reports errors in the returned rows.
+    """
+    result: List[List[Any]] = []
+    try:
+        keyCol = _KEYCOLUMNS[table]
+        isDaily = period.isDaily
+        conn = connect(outputDb)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM {0} WHERE 1=0'.format(table))
+            columns = set(d[0] for d in cursor.description)
+            varz = sorted(set(var for gauge in gauges for var in gauge.observed if var in columns))
+            steps = period.steps(isDaily)
+            stepIndex = dict((step, i) for i, step in enumerate(steps))
+            simulated: Dict[int, np.ndarray] = dict((gauge.key, np.full((len(steps), len(varz)), np.nan)) for gauge in gauges)
+            if len(varz) > 0:
+                selectString = '{0}, YEAR, MON, {1}'.format(keyCol, ', '.join('[' + var + ']' for var in varz))
+                sql = 'SELECT {0} FROM {1}'.format(selectString, table)
+                if outputDb.endswith('.sqlite') and table != 'hru':
+                    # Access databases suffer from an Internal OLE Automation error with WHERE x = n, so filter after reading
+                    sql += ' WHERE {0} IN ({1}) AND YEAR >= {2} AND YEAR <= {3}'.format(keyCol, ', '.join(str(key) for key in simulated),
+                                                                                    period.startYear, period.finishYear)
+                for row in cursor.execute(sql):
+                    # HRUGIS is stored as a string, with a preceding space
+                    vals = simulated.get(int(row[0]), None)
+                    if vals is None:
+                        continue
+                    i = stepIndex.get((int(row[1]), int(row[2])), -1)
+                    if i < 0:
+                        # outside period, or an annual summary row in a monthly table
+                        continue
+                    vals[i] = [np.nan if val is None else float(val) for val in row[3:]]
+        finally:
+            conn.close()
+        labels = dict((period.label(year, mon, isDaily), i) for i, (year, mon) in enumerate(steps))
+        for gauge in gauges:
+            sim = simulated[gauge.key]
+            for var, obs in gauge.observed.items():
+                if var not in columns:
+                    result.append([scenario, gauge.fileName, table, gauge.key, var, 0] + [None] * len(_STATISTICS) +
+                                  ['no variable {0} in table {1}'.format(var, table)])
+                    continue
+                series = sim[:, varz.index(var)]
+                if gauge.dates is None:
+                    # observed values start at start of period
+                    aligned = np.full(len(steps), np.nan)
+                    num = min(len(steps), len(obs))
+                    aligned[:num] = obs[:num]
+                else:
+                    aligned = np.full(len(steps), np.nan)
+                    for dat, val in zip(gauge.dates, obs):
+                        i = labels.get(dat, -1)
+                        if i >= 0:
+                            aligned[i] = val
+                stats, count = FitStatistics.all(aligned, series)
+                note = '' if count > 0 else 'no observed values in period'
+                result.append([scenario, gauge.fileName, table, gauge.key, var, count] + [stats[stat] for stat in _STATISTICS] + [note])
+    except Exception:
+        message = 'exception: {0}'.format(traceback.format_exc().replace('\n', ' '))
+        result = [[scenario, gauge.fileName, table, gauge.key, var, 0] + [None] * len(_STATISTICS) + [message]
+                  for gauge in gauges for var in gauge.observed]
+    return result
+
+class CalibrationStats():
+    """Calculate NSE, R2, PBIAS and KGE for each observed data file and scenario, in parallel, and write a summary csv file."""
+
+    def __init__(self, projDir: str, observedDir: str, scenarios: List[str], startDate: Optional[date], finishDate: Optional[date],
+                 forTNC: bool, numProcesses: int) -> None:
+        """Initialise class variables."""
+        ## project folder
+        self.projDir = projDir
+        ## folder of observed data files
+        self.observedDir = observedDir
+        ## scenarios to score: all scenarios if empty
+        self.scenarios = scenarios
+        ## requested start date
+        self.startDate = startDate
+        ## requested finish date
+        self.finishDate = finishDate
+        ## HRUGIS is subbasin number times this plus HRU number
+        self.hruFactor = 100 if forTNC else 10000
+        ## number of worker processes
+        self.numProcesses = numProcesses
+
+    def outputDb(self, scenario: str) -> Optional[str]:
+        """Return output database for scenario, or None if there is none."""
+        outDir = os.path.join(self.projDir, _SCENARIOS, scenario, _TABLESOUT)
+        for ext in ['.sqlite', '.mdb']:
+            db = os.path.join(outDir, _OUTPUTDB + ext)
+            if os.path.isfile(db):
+                return db
+        return None
+
+    def run(self, summaryFile: str) -> bool:
+        """Calculate statistics and write summary file.  Return True if any statistics were calculated."""
+        started = time.process_time()
+        gauges: List[Gauge] = []
+        for path in sorted(glob.glob(os.path.join(self.observedDir, '*.csv'))):
+            gauge = readGauge(path, self.hruFactor)
+            if gauge is None:
+                print('Ignoring {0}: name does not identify a table and location'.format(path))
+            else:
+                gauges.append(gauge)
+        if len(gauges) == 0:
+            print('ERROR: No observed data files found in {0}'.format(self.observedDir))
+            return False
+        scenarios = self.scenarios
+        if len(scenarios) == 0:
+            scenarios = sorted(os.path.split(d)[1] for d in glob.glob(os.path.join(self.projDir, _SCENARIOS, '*')) if os.path.isdir(d))
+        byTable: Dict[str, List[Gauge]] = dict()
+        for gauge in gauges:
+            byTable.setdefault(gauge.table, []).append(gauge)
+        tasks: List[Tuple[str, str, str, Period, List[Gauge]]] = []
+        for scenario in scenarios:
+            outputDb = self.outputDb(scenario)
+            if outputDb is None:
+                print('ERROR: No output database for scenario {0}'.format(scenario))
+                continue
+            cioFile = os.path.join(self.projDir, _SCENARIOS, scenario, _TXTINOUT, _CIO)
+            if not os.path.isfile(cioFile):
+                print('ERROR: Cannot find cio file {0}'.format(cioFile))
+                continue
+            period = Period.fromCio(cioFile)
+            if not period.restrict(self.startDate, self.finishDate):
+                print('ERROR: Requested dates are outside the period of scenario {0}'.format(scenario))
+                continue
+            for table, tableGauges in byTable.items():
+                # divide gauges so each process scans the table once
+                chunkSize = max(1, -(-len(tableGauges) * len(scenarios) // self.numProcesses))
+                for first in range(0, len(tableGauges), chunkSize):
+                    tasks.append((scenario, outputDb, table, period, tableGauges[first:first + chunkSize]))
+        if len(tasks) == 0:
+            return False
+        print('Scoring {0} observed data files for {1} scenarios with {2} processes ...'.format(len(gauges), len(scenarios), self.numProcesses))
+        if self.numProcesses > 1 and len(tasks) > 1:
+            with Pool(processes=min(self.numProcesses, len(tasks))) as pool:
+                results = pool.starmap(scoreGauges, tasks, 1)
+        else:
+            results = [scoreGauges(*task) for task in tasks]
+        rows = sorted((row for result in results for row in result), key=lambda row: (row[0], row[2], row[3], row[4]))
+        with open(summaryFile, 'w', newline='') as summary:
+            writer = csv.writer(summary)
+            writer.writerow(['Scenario', 'File', 'Table', 'Location', 'Variable', 'Count'] + _STATISTICS + ['Note'])
+            for row in rows:
+                writer.writerow(row[:6] + ['' if val is None else '{0:.4f}'.format(val) for val in row[6:-1]] + row[-1:])
+        numScored = sum(1 for row in rows if row[5] > 0)
+        for row in rows:
+            if row[-1] != '':
+                print('{0} {1} {2}: {3}'.format(row[0], row[1], row[4], row[-1]))
+        print('Wrote {0} rows, {1} with statistics, to {2} in {3:.1f} seconds'.format(len(rows), numScored, summaryFile, time.process_time() - started))
+        return numScored > 0
+
+def parseDate(text: str) -> date:
+    """Parse yyyy-mm-dd date argument."""
+    try:
+        year, month, day = text.split('-')
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        raise argparse.ArgumentTypeError('{0} is not a date in the format yyyy-mm-dd'.format(text))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calculate calibration statistics for observed data files against SWAT output.')
+    parser.add_argument('projDir', help='QSWAT project folder')
+    parser.add_argument('observedDir', help='folder of observed data csv files')
+    parser.add_argument('-s', '--scenario', action='append', default=[], help='scenario to score (may be repeated; default all scenarios)')
+    parser.add_argument('--start', type=parseDate, default=None, help='start date yyyy-mm-dd (default start of scenario period)')
+    parser.add_argument('--finish', type=parseDate, default=None, help='finish date yyyy-mm-dd (default finish of scenario period)')
+    parser.add_argument('--tnc', action='store_true', help='project is a TNC project, with HRUGIS numbers subbasin * 100 + HRU')
+    parser.add_argument('-p', '--processes', type=int, default=min(os.cpu_count() or 1, 24), help='number of worker processes')
+    parser.add_argument('-o', '--output', default=None, help='summary csv file (default calibrationStats.csv in Scenarios folder)')
+    args = parser.parse_args()
+    summaryFile = args.output if args.output else os.path.join(args.projDir, _SCENARIOS, 'calibrationStats.csv')
+    c = CalibrationStats(args.projDir, args.observedDir, args.scenario, args.start, args.finish, args.tnc, max(1, args.processes))
+    sys.exit(0 if c.run(summaryFile) else 1)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+Report the import time of QSWAT modules.
+
+Usage: importProfile.py [-n N] [module ...]
+
+Each module (default QSWAT.qswat, the stage modules QSWAT.delineation and QSWAT.hrus, and QSWAT.visualise)
+is imported in a fresh Python process run with -X importtime.  For each the report gives the total import time,
+the N modules (default 15) with the largest cumulative import time,
+and which of the heavy optional modules (matplotlib, imageio, PIL and the stage modules) were loaded.
+Starting QGIS with the plugin should load QSWAT.qswat without the stage modules.
+Batch scripts also load QSWAT.delineation and QSWAT.hrus, and the Qt main dialog and its resources, since they drive that dialog:
+there is no import path without the GUI, but they should not load the visualisation modules.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+## modules imported by default
+DEFAULT_MODULES = ['QSWAT.qswat', 'QSWAT.delineation', 'QSWAT.hrus', 'QSWAT.visualise']
+
+## modules whose loading is reported
+HEAVY_MODULES = ['matplotlib', 'QSWAT.imageio', 'QSWAT.PIL', 'QSWAT.swatgraph',
+                 'QSWAT.delineation', 'QSWAT.hrus', 'QSWAT.visualise', 'QSWAT.resources_rc']
+
+def importTimes(module: str) -> List[Tuple[str, int, int]]:
+    """Import module in a new process and return list of (name, self microseconds, cumulative microseconds) for each module loaded."""
+    command = [sys.executable, '-X', 'importtime', '-c', 'import {0}'.format(module)]
+    result = subprocess.run(command, cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.PIPE,
+                            stdout=subprocess.DEVNULL, universal_newlines=True)
+    times: List[Tuple[str, int, int]] = []
+    for line in result.stderr.splitlines():
+        # lines are 'import time: self [us] | cumulative | imported package'
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        try:
+            times.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+        except ValueError:
+            continue  # header line
+    if result.returncode != 0:
+        # times for a partial import would be misleading
+        print('ERROR: import {0} failed:\n{1}'.format(module, result.stderr[-2000:]))
+        return []
+    return times
+
+def report(module: str, count: int) -> None:
+    """Print import time report for module."""
+    times = importTimes(module)
+    if len(times) == 0:
+        return
+    loaded = set(name for name, _, _ in times)
+    # the requested module is imported last, and its cumulative time includes everything it imported
+    total = next((cumulative for name, _, cumulative in times if name == module), max(cumulative for _, _, cumulative in times))
+    print('{0}: {1:.3f} seconds, {2} modules'.format(module, total / 1E6, len(times)))
+    for name, selfTime, cumulative in sorted(times, key=lambda t: t[2], reverse=True)[:count]:
+        print('    {0:>9.3f} {1:>9.3f}  {2}'.format(cumulative / 1E6, selfTime / 1E6, name))
+    print('    loaded: {0}'.format(', '.join(name for name in HEAVY_MODULES if name in loaded) or 'none'))
+    print('    not loaded: {0}'.format(', '.join(name for name in HEAVY_MODULES if name not in loaded) or 'none'))
+    print('')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report import times of QSWAT modules.')
+    parser.add_argument('-n', type=int, default=15, help='number of slowest modules listed')
+    parser.add_argument('module', nargs='*', default=DEFAULT_MODULES, help='module to import')
+    args = parser.parse_args()
+    print('Cumulative and self import times in seconds\n')
+    for module in args.module:
+        report(module, args.n)
@@ -119,6 +119,8 @@ class runHUC():
         gv.HUCDataDir = dataDir
         gv.useGridModel = False
         gv.existingWshed = True
+        # watershed grid is only needed by HRUs in this run: do not write it to disk
+        gv.basinGridInMemory = True
         self.delin.runExisting()
         self.delin.finishDelineation()
         self.delin._dlg.close()
@@ -15,5 +15,7 @@ set QGIS_PREFIX_PATH=%OSGEO4W_ROOT%\apps\qgis-ltr
 
 rem nosetests
 "%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_qswat
+"%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_hrutable
+"%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_dbutils
 "%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_polygonize
 "%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_polygonizeInC2
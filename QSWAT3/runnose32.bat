@@ -16,5 +16,7 @@ SET PROJ_LIB=%OSGEO4W_ROOT%\share\proj
 
 rem nosetests
 python3 -m unittest test_qswat
+python3 -m unittest test_hrutable
+python3 -m unittest test_dbutils
 python3 -m unittest test_polygonize
 python3 -m unittest test_polygonizeInC2
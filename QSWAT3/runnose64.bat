@@ -17,5 +17,7 @@ SET PROJ_LIB=%OSGEO4W_ROOT%\share\proj
 
 rem nosetests
 "%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_qswat
+"%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_hrutable
+"%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_dbutils
 "%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_polygonize
 "%OSGEO4W_ROOT%\bin\python3.exe" -m unittest test_polygonizeInC2
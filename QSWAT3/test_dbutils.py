@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+Tests for the array landuse and soil translations of DBUtils.
+
+Each array translation is compared with the per value translation it replaces when reading rasters,
+for values in a small range (dense lookup table) and in a large range (sparse lookup).
+"""
+
+import random
+import unittest
+
+import numpy
+
+from QSWAT.DBUtils import DBUtils  # @UnresolvedImport
+
+## no data value for landuse and soil
+NODATA = -32768
+
+def makeDb(useSSURGO=False, isHUC=False):
+    """Return DBUtils with the lookup tables used by the landuse and soil translations, but no database."""
+    db = DBUtils.__new__(DBUtils)
+    db.landuseVals = []
+    db._landuseTranslate = {2: 1, 5: 4, 1000001: 1000000}
+    db.landuseCodes = {1: 'AGRL', 3: 'WATR', 4: 'FRST', 1000000: 'URHD'}
+    db._undefinedLanduseIds = []
+    db.defaultLanduseCode = 'AGRL'
+    db.soilVals = []
+    db.soilTranslate = {7: 6, 9: 8, 3000001: 3000000}
+    db.useSSURGO = useSSURGO
+    db.isHUC = isHUC
+    db.isHAWQS = False
+    return db
+
+def makeValues(seed, high):
+    """Return random 2D array of values from 0 to high, with no data values."""
+    rnd = random.Random(seed)
+    pool = [rnd.randint(0, high) for _ in range(12)] + [1, 2, 3, 5, NODATA]
+    return numpy.array([[rnd.choice(pool) for _ in range(50)] for _ in range(4)], dtype=numpy.int64)
+
+class TestDBUtils(unittest.TestCase):
+    """Compare array translations with per value translations."""
+
+    ## seeds for random values
+    seeds = range(10)
+    ## ranges of values: small uses dense lookup table, large sparse lookup
+    highs = [10, DBUtils._MAXDENSELOOKUP * 4]
+
+    def test_translateLanduse(self):
+        """translateLanduseArray and landuseCodeArray."""
+        for seed in self.seeds:
+            for high in self.highs:
+                vals = makeValues(seed, high)
+                db1 = makeDb()
+                db2 = makeDb()
+                lids = db1.translateLanduseArray(vals, NODATA)
+                codes = db1.landuseCodeArray(lids, NODATA)
+                for (row, col), val in numpy.ndenumerate(vals):
+                    val = int(val)
+                    if val == NODATA:
+                        self.assertEqual(lids[row, col], NODATA)
+                        self.assertEqual(codes[row, col], '')
+                    else:
+                        lid = db2.translateLanduse(val)
+                        self.assertEqual(lids[row, col], lid)
+                        self.assertEqual(codes[row, col], db2.getLanduseCode(lid))
+                self.assertEqual(db1.landuseVals, db2.landuseVals)
+                self.assertEqual(sorted(db1._undefinedLanduseIds), sorted(db2._undefinedLanduseIds))
+
+    def test_translateSoil(self):
+        """translateSoilArray, with soil translation table and with SSURGO soils."""
+        for useSSURGO, isHUC in [(False, False), (True, False), (True, True)]:
+            for seed in self.seeds:
+                for high in self.highs:
+                    vals = makeValues(seed, high)
+                    db1 = makeDb(useSSURGO, isHUC)
+                    db2 = makeDb(useSSURGO, isHUC)
+                    calls = []
+                    # replace database lookup of SSURGO soils: odd values undefined
+                    def translateSSURGOSoil(sid):
+                        calls.append(sid)
+                        return (sid + 1, True) if sid % 2 == 0 else (NODATA, False)
+                    db1.translateSSURGOSoil = translateSSURGOSoil
+                    db2.translateSSURGOSoil = translateSSURGOSoil
+                    soils, OKs = db1.translateSoilArray(vals, NODATA)
+                    # each distinct soil is translated once
+                    self.assertEqual(len(calls), len(set(calls)))
+                    for (row, col), val in numpy.ndenumerate(vals):
+                        val = int(val)
+                        if val == NODATA:
+                            self.assertEqual(soils[row, col], NODATA)
+                            self.assertFalse(OKs[row, col])
+                        else:
+                            self.assertEqual((soils[row, col], OKs[row, col]), db2.translateSoil(val))
+                    self.assertEqual(db1.soilVals, db2.soilVals)
+
+    def test_empty(self):
+        """Rows of no data are not translated."""
+        db = makeDb()
+        vals = numpy.full((1, 5), NODATA, dtype=numpy.int64)
+        self.assertTrue(numpy.array_equal(db.translateLanduseArray(vals, NODATA), vals))
+        soils, OKs = db.translateSoilArray(vals, NODATA)
+        self.assertTrue(numpy.array_equal(soils, vals))
+        self.assertFalse(OKs.any())
+        self.assertEqual(db.landuseVals, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QSWAT
+                                 A QGIS plugin
+ Create SWAT inputs
+                              -------------------
+        begin                : 2014-07-18
+        copyright            : (C) 2014 by Chris George
+        email                : cgeorge@mcmaster.ca
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+Regression tests for HRUTable and HRUPreview.
+
+The HRU thresholds and the minMax slider limits applied by HRUTable are compared with
+the per subbasin loops of CreateHRUs that it replaced, which are reproduced here,
+on random subbasins with many equal HRU areas.
+"""
+
+import copy
+import random
+import types
+import unittest
+
+from QSWAT.QSWATData import BasinData  # @UnresolvedImport
+from QSWAT.hrutable import HRUTable, HRUPreview  # @UnresolvedImport
+
+## no data value for landuse, soil and slope
+NODATA = -1
+
+## cell area in square metres
+CELLAREA = 900.0
+
+## landuses treated as exempt
+EXEMPT = {3}
+
+def makeBasins(seed, numBasins=8):
+    """Return map basin -> BasinData of random subbasins, with areas set as after reading the rasters."""
+    rnd = random.Random(seed)
+    gv = types.SimpleNamespace(cropNoData=NODATA, soilNoData=NODATA, slopeNoData=NODATA,
+                               elevationNoData=NODATA, distNoData=NODATA)
+    basins = dict()
+    for basin in range(1, numBasins + 1):
+        basinData = BasinData(0, 0, 0, 0, 0, 0, 0, 30, True)
+        crops = rnd.sample(range(10), rnd.randint(1, 4))
+        soils = rnd.sample(range(10), rnd.randint(1, 4))
+        for _ in range(rnd.randint(20, 400)):
+            basinData.addCell(rnd.choice(crops), rnd.choice(soils), rnd.randint(0, 2), CELLAREA,
+                              100, rnd.random() * 0.2, NODATA, gv)
+        basinData.setAreas(True)
+        basins[basin] = basinData
+    return basins
+
+def isExempt(crop):
+    """Exempt landuse test."""
+    return crop in EXEMPT
+
+def maxValue(mapv):
+    """Return maximum value in map, as CreateHRUs.maxValue."""
+    maxm = 0.0
+    for val in mapv.values():
+        if val > maxm: maxm = val
+    return maxm
+
+def hasExemptCrop(basinData):
+    """Return true if basinData has an exempt crop, as CreateHRUs.hasExemptCrop."""
+    return any(isExempt(crop) for crop in basinData.cropSoilSlopeNumbers.keys())
+
+def removeHru(basin, basinData, hru, crop, soil, slope):
+    """Remove an HRU and redistribute its area within its subbasin, as CreateHRUs.removeHru."""
+    if len(basinData.hruMap) == 1:
+        return
+    areaToRedistribute = basinData.hruMap[hru].area
+    basinData.removeHRU(hru, crop, soil, slope)
+    if areaToRedistribute > 0:
+        if basinData.cropSoilSlopeArea - areaToRedistribute == 0:
+            raise ValueError('No HRUs for basin {0!s}'.format(basin))
+        basinData.redistribute(float(basinData.cropSoilSlopeArea) / (basinData.cropSoilSlopeArea - areaToRedistribute))
+
+def oldRemoveByArea(basins, areaVal, useArea):
+    """CreateHRUs.removeSmallHRUsByArea before HRUTable."""
+    for (basin, basinData) in basins.items():
+        count = len(basinData.hruMap)
+        basinThreshold = areaVal * 10000 if useArea else float(basinData.cropSoilSlopeArea * areaVal) / 100
+        areaToRedistribute = 0.0
+        unfinished = True
+        while unfinished:
+            minCrop = minSoil = minSlope = minHru = 0
+            minArea = basinThreshold
+            for (crop, soilSlopeNumbers) in basinData.cropSoilSlopeNumbers.items():
+                if not isExempt(crop):
+                    for (soil, slopeNumbers) in soilSlopeNumbers.items():
+                        for (slope, hru) in slopeNumbers.items():
+                            hruArea = basinData.hruMap[hru].area
+                            if hruArea < minArea:
+                                minArea = hruArea
+                                minHru, minCrop, minSoil, minSlope = hru, crop, soil, slope
+            if minArea < basinThreshold:
+                if count > 1:
+                    basinData.removeHRU(minHru, minCrop, minSoil, minSlope)
+                    count -= 1
+                    areaToRedistribute += minArea
+                else:
+                    unfinished = False
+                if areaToRedistribute > 0:
+                    if basinData.cropSoilSlopeArea - areaToRedistribute == 0:
+                        raise ValueError('No HRUs for basin {0!s}'.format(basin))
+                    basinData.redistribute(float(basinData.cropSoilSlopeArea) / (basinData.cropSoilSlopeArea - areaToRedistribute))
+                    areaToRedistribute = 0
+            else:
+                unfinished = False
+
+def oldRemoveByThresholdPercent(basins, minCropPercent, minSoilPercent, minSlopePercent):
+    """CreateHRUs.removeSmallHRUsByThresholdPercent before HRUTable."""
+    for (basin, basinData) in basins.items():
+        cropAreas = basinData.originalCropAreas
+        areaToRedistribute = 0.0
+        minCropArea = float(basinData.cropSoilSlopeArea * minCropPercent) / 100
+        if not hasExemptCrop(basinData):
+            minCropArea = min(minCropArea, maxValue(cropAreas))
+        for (crop, area) in cropAreas.items():
+            if not isExempt(crop) and area < minCropArea:
+                areaToRedistribute += area
+                for (soil, slopeNumbers) in list(basinData.cropSoilSlopeNumbers[crop].items()):
+                    for (slope, hru) in list(slopeNumbers.items()):
+                        basinData.removeHRU(hru, crop, soil, slope)
+        if areaToRedistribute > 0:
+            if basinData.cropSoilSlopeArea - areaToRedistribute == 0:
+                raise ValueError('No landuse data for basin {0!s}'.format(basin))
+            basinData.redistribute(float(basinData.cropSoilSlopeArea) / (basinData.cropSoilSlopeArea - areaToRedistribute))
+        basinData.setCropAreas(False)
+        cropAreas = basinData.cropAreas
+        for (crop, soilSlopeNumbers) in basinData.cropSoilSlopeNumbers.items():
+            cropArea = cropAreas[crop]
+            soilAreas = basinData.cropSoilAreas(crop)
+            minArea = min(float(cropArea * minSoilPercent) / 100, maxValue(soilAreas))
+            soilAreaToRedistribute = 0.0
+            for (soil, slopeNumbersCopy) in list(soilSlopeNumbers.items()):
+                soilArea = soilAreas[soil]
+                if soilArea < minArea:
+                    soilAreaToRedistribute += soilArea
+                    for (slope, hru) in list(slopeNumbersCopy.items()):
+                        basinData.removeHRU(hru, crop, soil, slope)
+            if soilAreaToRedistribute > 0:
+                if cropArea - soilAreaToRedistribute == 0:
+                    raise ValueError('No soil data for landuse {1!s} in basin {0!s}'.format(basin, crop))
+                soilRedistributeFactor = float(cropArea) / (cropArea - soilAreaToRedistribute)
+                for slopeNumbers in soilSlopeNumbers.values():
+                    for hru in slopeNumbers.values():
+                        basinData.hruMap[hru].multiply(soilRedistributeFactor)
+        for (crop, soilSlopeNumbers) in basinData.cropSoilSlopeNumbers.items():
+            for (soil, slopeNumbers) in soilSlopeNumbers.items():
+                soilArea = 0
+                for hru in slopeNumbers.values():
+                    soilArea += basinData.hruMap[hru].area
+                slopeAreas = basinData.cropSoilSlopeAreas(crop, soil)
+                minArea = min(float(soilArea * minSlopePercent) / 100, maxValue(slopeAreas))
+                slopeAreaToRedistribute = 0.0
+                for (slope, hru) in list(slopeNumbers.items()):
+                    slopeArea = slopeAreas[slope]
+                    if slopeArea < minArea:
+                        slopeAreaToRedistribute += slopeArea
+                        basinData.removeHRU(hru, crop, soil, slope)
+                if slopeAreaToRedistribute > 0:
+                    if soilArea - slopeAreaToRedistribute == 0:
+                        raise ValueError('No slope data for landuse {1!s} and soil {2!s} in basin {0!s}'.format(basin, crop, soil))
+                    slopeRedistributeFactor = float(soilArea) / (soilArea - slopeAreaToRedistribute)
+                    for hru in slopeNumbers.values():
+                        basinData.hruMap[hru].multiply(slopeRedistributeFactor)
+
+def oldRemoveByThresholdArea(basins, landuseVal, soilVal, slopeVal):
+    """CreateHRUs.removeSmallHRUsByThresholdArea before HRUTable."""
+    for (basin, basinData) in basins.items():
+        cropAreas = basinData.originalCropAreas
+        minCropArea = landuseVal * 10000
+        if not hasExemptCrop(basinData):
+            minCropArea = min(minCropArea, maxValue(cropAreas))
+        areaToRedistribute = 0.0
+        for (crop, area) in cropAreas.items():
+            if not isExempt(crop) and area < minCropArea:
+                for (soil, slopeNumbers) in list(basinData.cropSoilSlopeNumbers[crop].items()):
+                    for (slope, hru) in list(slopeNumbers.items()):
+                        areaToRedistribute += basinData.hruMap[hru].area
+                        basinData.removeHRU(hru, crop, soil, slope)
+        soilAreas = basinData.originalSoilAreas
+        minSoilArea = min(soilVal * 10000, maxValue(soilAreas))
+        for (soil, area) in soilAreas.items():
+            if area < minSoilArea:
+                for (crop, soilSlopeNumbers) in list(basinData.cropSoilSlopeNumbers.items()):
+                    slopeNumbers2 = soilSlopeNumbers.get(soil, None)
+                    if slopeNumbers2 is not None:
+                        for (slope, hru) in list(slopeNumbers2.items()):
+                            areaToRedistribute += basinData.hruMap[hru].area
+                            basinData.removeHRU(hru, crop, soil, slope)
+        slopeAreas = basinData.originalSlopeAreas
+        minSlopeArea = min(slopeVal * 10000, maxValue(slopeAreas))
+        for (slope, area) in slopeAreas.items():
+            if area < minSlopeArea:
+                for (crop, soilSlopeNumbers) in list(basinData.cropSoilSlopeNumbers.items()):
+                    for (soil, slopeNumbers) in list(soilSlopeNumbers.items()):
+                        hru = slopeNumbers.get(slope, -1)
+                        if hru != -1:
+                            areaToRedistribute += basinData.hruMap[hru].area
+                            basinData.removeHRU(hru, crop, soil, slope)
+        if areaToRedistribute > 0:
+            if basinData.cropSoilSlopeArea - areaToRedistribute == 0:
+                raise ValueError('Cannot redistribute {1:.2F} ha for basin {0!s}'.format(basin, (areaToRedistribute / 10000)))
+            basinData.redistribute(float(basinData.cropSoilSlopeArea) / (basinData.cropSoilSlopeArea - areaToRedistribute))
+
+def oldRemoveByTarget(basins, targetVal, useArea):
+    """CreateHRUs.removeSmallHRUsbyTarget before HRUTable."""
+    removals = []
+    for basin, basinData in basins.items():
+        basinArea = basinData.cropSoilSlopeArea
+        for crop, soilSlopeNumbers in basinData.cropSoilSlopeNumbers.items():
+            if not isExempt(crop):
+                for soil, slopeNumbers in soilSlopeNumbers.items():
+                    for slope, hru in slopeNumbers.items():
+                        hruArea = basinData.hruMap[hru].area
+                        size = hruArea if useArea else float(hruArea) / basinArea
+                        removals.append((basin, hru, crop, soil, slope, size))
+    removals.sort(key=lambda item: item[5])
+    numToRemove = min(sum(len(basinData.hruMap) for basinData in basins.values()) - targetVal, len(removals))
+    for i in range(numToRemove):
+        basin, hru, crop, soil, slope, _ = removals[i]
+        removeHru(basin, basins[basin], hru, crop, soil, slope)
+
+def oldRemoveBySubbasinTarget(basins, targetVal):
+    """CreateHRUs.removeSmallHRUsbySubbasinTarget before HRUTable."""
+    for basin, basinData in basins.items():
+        removals = []
+        hruCount = len(basinData.hruMap)
+        for crop, soilSlopeNumbers in basinData.cropSoilSlopeNumbers.items():
+            if not isExempt(crop):
+                for soil, slopeNumbers in soilSlopeNumbers.items():
+                    for slope, hru in slopeNumbers.items():
+                        removals.append((hru, crop, soil, slope, basinData.hruMap[hru].area))
+        removals.sort(key=lambda item: item[4])
+        for i in range(min(hruCount - targetVal, len(removals))):
+            hru, crop, soil, slope, _ = removals[i]
+            removeHru(basin, basinData, hru, crop, soil, slope)
+
+def oldMinMaxCropVal(basins, useArea):
+    """CreateHRUs.minMaxCropVal before HRUTable, for a project that is not HUC or HAWQS."""
+    minMax = float('inf') if useArea else 100.0
+    for (basin, basinData) in basins.items():
+        cropAreas = basinData.originalCropAreas
+        crop = BasinData.dominantKey(cropAreas)
+        if crop < 0:
+            raise ValueError('No landuse data for basin {0!s}'.format(basin))
+        val = float(cropAreas[crop]) / 10000 if useArea else (float(cropAreas[crop]) / basinData.cropSoilSlopeArea) * 100
+        if val < minMax: minMax = val
+    return minMax
+
+def oldMinMaxArea(basins, attr):
+    """CreateHRUs.minMaxSoilArea (attr originalSoilAreas) or minMaxSlopeArea (attr originalSlopeAreas) before HRUTable."""
+    minMax = float('inf')
+    for basinData in basins.values():
+        areas = getattr(basinData, attr)
+        val = float(areas[BasinData.dominantKey(areas)]) / 10000
+        if val < minMax: minMax = val
+    return minMax
+
+def oldMinMaxSoilPercent(basins, minCropVal):
+    """CreateHRUs.minMaxSoilPercent before HRUTable."""
+    minMax = 100.0
+    for basinData in basins.values():
+        for (crop, cropArea) in basinData.originalCropAreas.items():
+            if (float(cropArea) / basinData.cropSoilSlopeArea) * 100 >= minCropVal:
+                maximum = 0.0
+                for slopeNumbers in basinData.cropSoilSlopeNumbers[crop].values():
+                    area = 0.0
+                    for hru in slopeNumbers.values():
+                        area += basinData.hruMap[hru].area
+                    soilVal = (float(area) / cropArea) * 100
+                    if soilVal > maximum: maximum = soilVal
+                if maximum < minMax: minMax = maximum
+    return minMax
+
+def oldMinMaxSlopePercent(basins, minCropVal, minSoilVal):
+    """CreateHRUs.minMaxSlopePercent before HRUTable."""
+    minMax = 100.0
+    for basinData in basins.values():
+        for (crop, cropArea) in basinData.originalCropAreas.items():
+            if (float(cropArea) / basinData.cropSoilSlopeArea) * 100 >= minCropVal:
+                for slopeNumbers in basinData.cropSoilSlopeNumbers[crop].values():
+                    soilArea = 0.0
+                    for hru in slopeNumbers.values():
+                        soilArea += basinData.hruMap[hru].area
+                    if (float(soilArea) / cropArea) * 100 >= minSoilVal:
+                        maximum = 0.0
+                        for hru in slopeNumbers.values():
+                            slopeVal = (float(basinData.hruMap[hru].area) / soilArea) * 100
+                            if slopeVal > maximum: maximum = slopeVal
+                        if maximum < minMax: minMax = maximum
+    return minMax
+
+class TestHRUTable(unittest.TestCase):
+    """Compare HRUTable with the CreateHRUs loops it replaced."""
+
+    ## random seeds
+    seeds = range(12)
+
+    def applyBoth(self, seed, old, new):
+        """Apply old to basins and new to an HRUTable of a copy of them, and check the results are identical."""
+        basins = makeBasins(seed)
+        expected = copy.deepcopy(basins)
+        table = HRUTable(basins)
+        oldError = newError = None
+        try:
+            old(expected)
+        except ValueError as ex:
+            oldError = str(ex)
+        try:
+            new(table, table.exemptCropGroups(isExempt))
+            table.writeBack(basins)
+        except ValueError as ex:
+            newError = str(ex)
+        self.assertEqual(oldError, newError, 'Seed {0}: errors differ'.format(seed))
+        if oldError is not None:
+            return
+        self.assertEqual(table.countHRUs(), sum(len(basinData.hruMap) for basinData in expected.values()))
+        for basin, basinData in expected.items():
+            self.assertEqual(basinData.cropSoilSlopeNumbers, basins[basin].cropSoilSlopeNumbers,
+                             'Seed {0}: HRUs of basin {1} differ'.format(seed, basin))
+            for hru, cellData in basinData.hruMap.items():
+                newData = basins[basin].hruMap[hru]
+                self.assertEqual((cellData.cellCount, cellData.area, cellData.totalSlope),
+                                 (newData.cellCount, newData.area, newData.totalSlope),
+                                 'Seed {0}: HRU {1} of basin {2} differs'.format(seed, hru, basin))
+
+    def test_area(self):
+        """Area and percentage thresholds."""
+        for seed in self.seeds:
+            for areaVal, useArea in [(1, True), (5, True), (20, True), (1, False), (5, False), (15, False)]:
+                self.applyBoth(seed, lambda basins: oldRemoveByArea(basins, areaVal, useArea),
+                               lambda table, exempt: table.removeByArea(exempt, areaVal, useArea))
+
+    def test_thresholdPercent(self):
+        """Landuse, soil and slope percentage thresholds."""
+        for seed in self.seeds:
+            for vals in [(0, 0, 0), (10, 10, 10), (20, 5, 30), (40, 40, 40)]:
+                self.applyBoth(seed, lambda basins: oldRemoveByThresholdPercent(basins, *vals),
+                               lambda table, exempt: table.removeByThresholdPercent(exempt, *vals))
+
+    def test_thresholdArea(self):
+        """Landuse, soil and slope area thresholds."""
+        for seed in self.seeds:
+            for vals in [(0, 0, 0), (1, 1, 1), (2, 0.5, 3), (10, 10, 10)]:
+                self.applyBoth(seed, lambda basins: oldRemoveByThresholdArea(basins, *vals),
+                               lambda table, exempt: table.removeByThresholdArea(exempt, *vals))
+
+    def test_target(self):
+        """Watershed and subbasin HRU targets."""
+        for seed in self.seeds:
+            for targetVal in [1, 20, 50]:
+                for useArea in [True, False]:
+                    self.applyBoth(seed, lambda basins: oldRemoveByTarget(basins, targetVal, useArea),
+                                   lambda table, exempt: table.removeByTarget(exempt, targetVal, useArea))
+            for targetVal in [1, 3, 6]:
+                self.applyBoth(seed, lambda basins: oldRemoveBySubbasinTarget(basins, targetVal),
+                               lambda table, exempt: table.removeBySubbasinTarget(exempt, targetVal))
+
+    def test_minMax(self):
+        """Slider limits."""
+        for seed in self.seeds:
+            basins = makeBasins(seed)
+            table = HRUTable(basins)
+            for useArea in [True, False]:
+                self.assertEqual(oldMinMaxCropVal(basins, useArea), table.minMaxCropVal(useArea, False))
+            self.assertEqual(oldMinMaxArea(basins, 'originalSoilAreas'), table.minMaxSoilArea())
+            self.assertEqual(oldMinMaxArea(basins, 'originalSlopeAreas'), table.minMaxSlopeArea())
+            for minCropVal in [0, 10, 30]:
+                self.assertEqual(oldMinMaxSoilPercent(basins, minCropVal), table.minMaxSoilPercent(minCropVal))
+                for minSoilVal in [0, 20, 50]:
+                    self.assertEqual(oldMinMaxSlopePercent(basins, minCropVal, minSoilVal),
+                                     table.minMaxSlopePercent(minCropVal, minSoilVal))
+
+    def test_preview(self):
+        """HRUPreview counts match HRUTable, except for landuse, soil and slope percentages within rounding error of a key."""
+        for seed in self.seeds:
+            table = HRUTable(makeBasins(seed))
+            exempt = table.exemptCropGroups(isExempt)
+            preview = HRUPreview(table, exempt)
+            def count(remove):
+                result = table.copy()
+                try:
+                    remove(result)
+                except ValueError:
+                    pass
+                return result.countHRUs()
+            for val in [1, 5, 9, 15, 50]:
+                for useArea in [True, False]:
+                    self.assertEqual(preview.areaCount(val, useArea)[0], count(lambda t: t.removeByArea(exempt, val, useArea)))
+                self.assertEqual(preview.thresholdCount(val, val, val, True)[0],
+                                 count(lambda t: t.removeByThresholdArea(exempt, val, val, val)))
+                # percentages away from fractions of small cell counts
+                percent = val + 0.0123
+                self.assertEqual(preview.thresholdCount(percent, percent, percent, False)[0],
+                                 count(lambda t: t.removeByThresholdPercent(exempt, percent, percent, percent)))
+            for targetVal in [1, 20, 50]:
+                self.assertEqual(preview.targetCount(targetVal, True)[0], count(lambda t: t.removeByTarget(exempt, targetVal, True)))
+
+    def test_valForCount(self):
+        """Threshold values found by inverse search give at most the count."""
+        for seed in self.seeds:
+            table = HRUTable(makeBasins(seed))
+            preview = HRUPreview(table, table.exemptCropGroups(isExempt))
+            for target in [1, 10, 30, preview.numHRUs - 5]:
+                for useArea in [True, False]:
+                    areaVal = preview.areaValForCount(target, useArea)
+                    if areaVal is not None and areaVal > 0:
+                        self.assertLessEqual(preview.areaCount(areaVal, useArea)[0], target)
+                    for index in range(3):
+                        vals = [0.0, 0.0, 0.0]
+                        vals[index] = preview.thresholdValForCount(target, index, 0, 0, 0, useArea)
+                        if vals[index] is not None and vals[index] > 0:
+                            self.assertLessEqual(preview.thresholdCount(*vals, useArea)[0], target)
+
+if __name__ == '__main__':
+    unittest.main()